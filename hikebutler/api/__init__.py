@@ -0,0 +1 @@
+"""HTTP API 模块"""
@@ -0,0 +1,400 @@
+"""
+HTTP/JSON API
+
+供程序调用的轻量 ASGI 接口，与 Gradio UI 共用同一组编译好的工作流（hikebutler.graph.service），
+不导入 gradio 和 pandas，装备清单等结果按工作流输出原样返回 JSON。
+
+- POST /v1/plan：徒步准备，请求体 {location, duration, difficulty, user_id?, session_id?}；
+- POST /v1/plan/batch：批量规划，请求体 {location, duration, difficulty, user_ids}，共享阶段只运行一次；
+- POST /v1/review：徒步复盘，请求体 {gpx?, photos?（base64 列表）, thoughts?, user_id?, session_id?}；
+- 请求头 Accept: text/event-stream 或请求体 "stream": true 时以 SSE 逐个推送节点结果，最后推送 result 事件；
+- 每个请求带 X-Request-ID（客户端提供或服务端生成），响应头、响应体和日志中使用同一个 ID；
+- 服务端超时取 api.timeout（批量规划取 batch.timeout），地点解析也计入其中。超时后响应 504
+  （流式时推送 error 事件），响应中带 session_id；工作流在当前节点完成后停止，已完成的节点写入检查点，
+  客户端用相同输入和 session_id 重试时从检查点继续。
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+import re
+import threading
+import time
+import uuid
+from contextlib import closing
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from hikebutler.config.loader import load_config
+from hikebutler.graph import service
+from hikebutler.graph.runner import stream_workflow
+from hikebutler.storage.blob_store import get_blob_store
+import logging
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "x-request-id"
+# 只接受客户端提供的简单 ID，其他情况由服务端生成
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class APIError(Exception):
+    """可直接返回给客户端的请求错误。"""
+
+    def __init__(self, status_code: int, message: str, **details: Any):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.details = details  # 附加到响应体的字段（如超时时客户端重试需要的 session_id）
+
+
+class RequestIdMiddleware:
+    """为每个 HTTP 请求分配请求 ID，写入 request.state.request_id 和响应头。"""
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = dict(scope["headers"]).get(REQUEST_ID_HEADER.encode(), b"").decode("latin-1")
+        if not _REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        async def send_with_request_id(message: Dict[str, Any]):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (REQUEST_ID_HEADER.encode(), request_id.encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_request_id)
+
+
+def _json_default(obj: Any) -> Any:
+    """把中间结果 dataclass、消息对象等转换为 JSON 可序列化的值。"""
+    if is_dataclass(obj):
+        return asdict(obj)
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    if hasattr(obj, "type") and hasattr(obj, "content"):
+        return {"type": obj.type, "content": obj.content}
+    return str(obj)
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, default=_json_default)
+
+
+def _json_response(data: Dict[str, Any], status_code: int = 200) -> Response:
+    return Response(_dumps(data), status_code=status_code, media_type="application/json")
+
+
+def _timeout() -> float:
+    """服务端超时（秒）。"""
+    return float(load_config().get("api", {}).get("timeout", 150))
+
+
+def _wants_stream(request: Request, body: Dict[str, Any]) -> bool:
+    return bool(body.get("stream")) or "text/event-stream" in request.headers.get("accept", "")
+
+
+async def _read_json(request: Request) -> Dict[str, Any]:
+    try:
+        body = json.loads(await request.body() or b"{}")
+    except json.JSONDecodeError as e:
+        raise APIError(400, f"请求体不是合法的 JSON: {e}")
+    if not isinstance(body, dict):
+        raise APIError(400, "请求体必须是 JSON 对象")
+    return body
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {_dumps(data)}\n\n"
+
+
+async def _call(
+    request: Request,
+    func: Callable[[threading.Event], Any],
+    timeout: float,
+    session_id: Optional[str] = None,
+) -> Any:
+    """
+    在线程池中执行 func(cancelled)，超过服务端超时时置位 cancelled 并抛出 APIError(504)。
+
+    Args:
+        request: 请求
+        func: 工作函数，应在 cancelled 置位后尽快返回
+        timeout: 服务端超时（秒）
+        session_id: 客户端会话标识，超时响应中返回给客户端用于重试
+
+    Returns:
+        func 的返回值
+    """
+    loop = asyncio.get_running_loop()
+    cancelled = threading.Event()
+    try:
+        return await asyncio.wait_for(loop.run_in_executor(None, func, cancelled), timeout)
+    except asyncio.TimeoutError:
+        cancelled.set()
+        logger.warning(f"请求超时，工作流在当前节点完成后停止: request_id={request.state.request_id}")
+        details = {"session_id": session_id} if session_id else {}
+        raise APIError(504, "处理超时，请稍后用相同参数和 session_id 重试", **details)
+
+
+def _drive(
+    workflow: Any,
+    make_state: Callable[[], Dict[str, Any]],
+    cancelled: threading.Event,
+    on_node: Optional[Callable[[Dict[str, Any]], None]] = None,
+    **kwargs: Any,
+) -> Optional[Dict[str, Any]]:
+    """
+    在工作线程中构建初始状态并逐节点运行工作流。
+
+    cancelled 置位后在当前节点完成时停止：已完成的节点保存在检查点中，重试时从下一个节点继续。
+
+    Args:
+        workflow: 已编译的工作流
+        make_state: 构建初始状态的函数（徒步准备时包含地点解析）
+        cancelled: 取消标志
+        on_node: 每个节点更新的回调
+        kwargs: 传给 stream_workflow 的参数
+
+    Returns:
+        工作流最终状态，取消时为 None
+    """
+    initial_state = make_state()
+    if cancelled.is_set():
+        return None
+    with closing(stream_workflow(workflow, initial_state, **kwargs)) as updates:
+        for kind, payload in updates:
+            if kind == "state":
+                return payload or {}
+            if on_node is not None:
+                on_node(payload)
+            if cancelled.is_set():
+                logger.info(f"请求已超时，停止运行，已完成的节点保存在检查点中: {list(payload)}")
+                return None
+    return None
+
+
+async def _run(
+    request: Request,
+    workflow: Any,
+    make_state: Callable[[], Dict[str, Any]],
+    session_id: Optional[str],
+    **kwargs: Any,
+) -> Dict[str, Any]:
+    """在线程池中构建初始状态并运行工作流，超过服务端超时抛出 APIError(504)。"""
+    return await _call(
+        request,
+        lambda cancelled: _drive(workflow, make_state, cancelled, session_id=session_id, **kwargs),
+        _timeout(),
+        session_id,
+    )
+
+
+async def _stream(
+    request: Request,
+    workflow: Any,
+    make_state: Callable[[], Dict[str, Any]],
+    on_result: Callable[[Dict[str, Any]], Dict[str, Any]],
+    session_id: Optional[str],
+    **kwargs: Any,
+) -> AsyncIterator[str]:
+    """
+    在线程池中构建初始状态并运行工作流，把节点更新转换为 SSE 事件。
+
+    Args:
+        request: 请求
+        workflow: 已编译的工作流
+        make_state: 构建初始状态的函数
+        on_result: 把最终状态转换为 result 事件数据的函数（在工作线程中执行）
+        session_id: 客户端会话标识，随每个事件返回
+        kwargs: 传给 stream_workflow 的参数
+
+    Yields:
+        SSE 文本
+    """
+    loop = asyncio.get_running_loop()
+    queue: "asyncio.Queue[Tuple[str, Dict[str, Any]]]" = asyncio.Queue()
+    request_id = request.state.request_id
+    cancelled = threading.Event()
+
+    def publish(event: str, data: Dict[str, Any]):
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    def on_node(payload: Dict[str, Any]):
+        for node, update in payload.items():
+            publish("node", {"node": node, "update": update})
+
+    def produce():
+        try:
+            state = _drive(workflow, make_state, cancelled, on_node, session_id=session_id, **kwargs)
+            if state is not None:
+                publish("result", on_result(state))
+        except Exception as e:
+            logger.error(f"工作流执行失败: request_id={request_id}, {e}")
+            publish("error", {"error": str(e)})
+
+    loop.run_in_executor(None, produce)
+    deadline = time.monotonic() + _timeout()
+    envelope = {"request_id": request_id, "session_id": session_id}
+    while True:
+        try:
+            event, data = await asyncio.wait_for(queue.get(), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            cancelled.set()
+            logger.warning(f"请求超时，工作流在当前节点完成后停止: request_id={request_id}")
+            yield _sse("error", {**envelope, "error": "处理超时，请稍后用相同参数和 session_id 重试"})
+            return
+        yield _sse(event, {**envelope, **data})
+        if event != "node":
+            return
+
+
+def _plan_result(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {"output": state.get("output_data") or {}}
+
+
+async def plan(request: Request) -> Response:
+    """徒步准备。"""
+    body = await _read_json(request)
+    location = str(body.get("location") or "").strip()
+    if not location:
+        raise APIError(400, "缺少 location")
+    user_id = str(body.get("user_id") or "default_user")
+    session_id = body.get("session_id") or request.state.request_id
+
+    def make_state() -> Dict[str, Any]:
+        return service.preparation_state(
+            location,
+            str(body.get("duration") or ""),
+            str(body.get("difficulty") or ""),
+            user_id,
+            session_id,
+        )
+
+    if _wants_stream(request, body):
+        return StreamingResponse(
+            _stream(request, service.preparation_workflow, make_state, _plan_result, session_id),
+            media_type="text/event-stream",
+        )
+    state = await _run(request, service.preparation_workflow, make_state, session_id)
+    return _json_response({"request_id": request.state.request_id, "session_id": session_id, **_plan_result(state)})
+
+
+async def plan_batch(request: Request) -> Response:
+    """批量规划：同一路线、多名成员。"""
+    from hikebutler.graph.batch import plan_batch as run_batch
+
+    body = await _read_json(request)
+    location = str(body.get("location") or "").strip()
+    user_ids = body.get("user_ids")
+    if not location:
+        raise APIError(400, "缺少 location")
+    if not isinstance(user_ids, list) or not user_ids:
+        raise APIError(400, "user_ids 必须是非空列表")
+    input_data = {
+        "location": location,
+        "duration": str(body.get("duration") or ""),
+        "difficulty": str(body.get("difficulty") or ""),
+    }
+
+    def run(cancelled: threading.Event) -> Dict[str, Any]:
+        try:
+            return run_batch(input_data, [str(user_id) for user_id in user_ids], batch_id=request.state.request_id)
+        except ValueError as e:
+            raise APIError(400, str(e))
+
+    timeout = float(load_config().get("batch", {}).get("timeout", 300))
+    result = await _call(request, run, timeout)
+    return _json_response({"request_id": request.state.request_id, **result})
+
+
+def _store_review_inputs(body: Dict[str, Any]) -> Tuple[Optional[str], list]:
+    """GPX 文本和 base64 编码的照片存入 blob store。"""
+    blob_store = get_blob_store()
+    gpx = body.get("gpx")
+    gpx_ref = blob_store.put(gpx) if gpx else None
+    try:
+        photo_refs = [blob_store.put(base64.b64decode(photo, validate=True)) for photo in body.get("photos") or []]
+    except (binascii.Error, TypeError, ValueError):
+        raise APIError(400, "photos 必须是 base64 编码的字符串列表")
+    return gpx_ref, photo_refs
+
+
+async def review(request: Request) -> Response:
+    """徒步复盘。"""
+    body = await _read_json(request)
+    user_id = str(body.get("user_id") or "default_user")
+    session_id = body.get("session_id") or request.state.request_id
+    thoughts = body.get("thoughts")
+
+    loop = asyncio.get_running_loop()
+    gpx_ref, photo_refs = await loop.run_in_executor(None, _store_review_inputs, body)
+    review_id, initial_state = service.review_state(gpx_ref, photo_refs, thoughts, user_id, session_id)
+
+    def review_result(state: Dict[str, Any]) -> Dict[str, Any]:
+        output_data = state.get("output_data") or {}
+        service.finish_review(review_id, initial_state, output_data)
+        return {"review_id": review_id, "output": output_data}
+
+    if _wants_stream(request, body):
+        return StreamingResponse(
+            _stream(
+                request, service.review_workflow, lambda: initial_state, review_result, session_id, thread_id=review_id
+            ),
+            media_type="text/event-stream",
+        )
+    state = await _run(request, service.review_workflow, lambda: initial_state, session_id, thread_id=review_id)
+    result = await loop.run_in_executor(None, review_result, state)
+    return _json_response({"request_id": request.state.request_id, "session_id": session_id, **result})
+
+
+async def healthz(request: Request) -> Response:
+    """健康检查。"""
+    return JSONResponse({"status": "ok"})
+
+
+async def _api_error(request: Request, exc: APIError) -> Response:
+    return _json_response(
+        {"request_id": request.state.request_id, **exc.details, "error": exc.message}, exc.status_code
+    )
+
+
+async def _server_error(request: Request, exc: Exception) -> Response:
+    logger.error(f"请求处理失败: request_id={request.state.request_id}, {exc}", exc_info=True)
+    return _json_response({"request_id": request.state.request_id, "error": str(exc)}, 500)
+
+
+def create_api() -> Starlette:
+    """
+    创建 API 应用。
+
+    Returns:
+        Starlette 应用
+    """
+    app = Starlette(
+        routes=[
+            Route("/healthz", healthz, methods=["GET"]),
+            Route("/v1/plan", plan, methods=["POST"]),
+            Route("/v1/plan/batch", plan_batch, methods=["POST"]),
+            Route("/v1/review", review, methods=["POST"]),
+        ],
+        exception_handlers={APIError: _api_error, Exception: _server_error},
+    )
+    app.add_middleware(RequestIdMiddleware)
+    return app
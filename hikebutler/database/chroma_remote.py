@@ -0,0 +1,198 @@
+"""
+远程 ChromaDB 客户端
+
+通过 ChromaDB 服务的 v2 REST API 访问集合，请求走项目共享的 HTTP 连接池。
+不使用 chromadb.HttpClient：它自带独立的 httpx 客户端，且与部分 Docker 服务存在兼容问题
+（见 scripts/CHROMADB_ISSUE.md）。
+
+接口与 chromadb 集合对象的常用子集保持一致（add/upsert/query/get/delete/count），
+ChromaDBClient 可以在本地和远程模式之间切换而不改调用代码。
+"""
+
+from typing import Any, Dict, List, Optional
+import httpx
+from hikebutler.network.http_pool import get_http_client
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INCLUDE = ["documents", "metadatas", "distances"]
+
+
+class RemoteChromaError(RuntimeError):
+    """ChromaDB 服务返回错误。"""
+
+
+class RemoteCollection:
+    """远程 ChromaDB 集合。"""
+
+    def __init__(self, client: "RemoteChromaClient", collection_id: str, name: str):
+        """
+        初始化集合。
+
+        Args:
+            client: 所属的远程客户端
+            collection_id: 集合 ID
+            name: 集合名称
+        """
+        self._client = client
+        self.id = collection_id
+        self.name = name
+
+    def _post(self, action: str, payload: Dict[str, Any]) -> Any:
+        return self._client._request("POST", f"collections/{self.id}/{action}", json=payload)
+
+    def add(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        documents: Optional[List[str]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+    ):
+        """添加记录（ID 已存在时报错）。"""
+        self._post("add", _records(ids, embeddings, documents, metadatas))
+
+    def upsert(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        documents: Optional[List[str]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+    ):
+        """插入或更新记录。"""
+        self._post("upsert", _records(ids, embeddings, documents, metadatas))
+
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        按向量查询，一次请求可以携带多条查询向量。
+
+        Returns:
+            与 chromadb 相同结构的结果：ids/documents/metadatas/distances，每条查询一个列表
+        """
+        payload = {
+            "query_embeddings": query_embeddings,
+            "n_results": n_results,
+            "include": include or DEFAULT_INCLUDE,
+        }
+        if where:
+            payload["where"] = where
+        return self._post("query", payload)
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """按 ID 或元数据条件读取记录。"""
+        payload: Dict[str, Any] = {"include": include if include is not None else ["metadatas"]}
+        for key, value in (("ids", ids), ("where", where), ("limit", limit), ("offset", offset)):
+            if value is not None:
+                payload[key] = value
+        return self._post("get", payload)
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        """按 ID 或元数据条件删除记录。"""
+        payload: Dict[str, Any] = {}
+        if ids is not None:
+            payload["ids"] = ids
+        if where is not None:
+            payload["where"] = where
+        self._post("delete", payload)
+
+    def count(self) -> int:
+        """集合中的记录数。"""
+        return int(self._client._request("GET", f"collections/{self.id}/count"))
+
+
+def _records(
+    ids: List[str],
+    embeddings: List[List[float]],
+    documents: Optional[List[str]],
+    metadatas: Optional[List[Dict[str, Any]]],
+) -> Dict[str, Any]:
+    """构造 add/upsert 请求体，省略空字段。"""
+    payload: Dict[str, Any] = {"ids": ids, "embeddings": embeddings}
+    if documents is not None:
+        payload["documents"] = documents
+    if metadatas is not None:
+        # ChromaDB 不接受空的元数据字典
+        payload["metadatas"] = [m or None for m in metadatas]
+    return payload
+
+
+class RemoteChromaClient:
+    """ChromaDB 服务客户端。"""
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 8000,
+        tenant: str = "default_tenant",
+        database: str = "default_database",
+        ssl: bool = False,
+        http_client: Optional[httpx.Client] = None,
+    ):
+        """
+        初始化客户端。
+
+        Args:
+            host: 服务地址
+            port: 服务端口
+            tenant: 租户
+            database: 数据库
+            ssl: 是否使用 HTTPS
+            http_client: HTTP 客户端，默认使用共享连接池
+        """
+        scheme = "https" if ssl else "http"
+        self.server_url = f"{scheme}://{host}:{port}"
+        self.base_url = f"{self.server_url}/api/v2/tenants/{tenant}/databases/{database}"
+        self._http = http_client or get_http_client(self.server_url)
+
+    def _request(self, method: str, path: str, **kwargs) -> Any:
+        """发送请求并解析 JSON 响应。"""
+        response = self._http.request(method, f"{self.base_url}/{path}", **kwargs)
+        if response.status_code >= 400:
+            raise RemoteChromaError(
+                f"ChromaDB 请求失败 {method} {path}: {response.status_code} {response.text[:200]}"
+            )
+        return response.json() if response.content else None
+
+    def heartbeat(self) -> int:
+        """心跳检测，返回服务端时间戳（纳秒）。"""
+        response = self._http.get(f"{self.server_url}/api/v2/heartbeat")
+        response.raise_for_status()
+        return response.json().get("nanosecond heartbeat", 0)
+
+    def get_or_create_collection(
+        self,
+        name: str,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> RemoteCollection:
+        """
+        获取或创建集合。
+
+        Args:
+            name: 集合名称
+            metadata: 集合元数据（如 hnsw:space）
+
+        Returns:
+            RemoteCollection 实例
+        """
+        payload: Dict[str, Any] = {"name": name, "get_or_create": True}
+        if metadata:
+            payload["metadata"] = metadata
+        data = self._request("POST", "collections", json=payload)
+        return RemoteCollection(self, data["id"], data["name"])
+
+    def delete_collection(self, name: str):
+        """删除集合。"""
+        self._request("DELETE", f"collections/{name}")
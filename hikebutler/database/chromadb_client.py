@@ -2,45 +2,100 @@
 ChromaDB 向量数据库客户端
 
 用于 RAG 知识库，存储小红书动态、用户历史经验等。
+
+支持两种模式：
+- local：本地 PersistentClient，向量库存放在本进程的磁盘上；
+- remote：连接 ChromaDB 服务（HTTP 连接池），多个应用副本共享同一个向量库。
+
+集合可以按地区分片（集合名为 ``<collection_name>__<region>``），文档按 metadata 中的
+region 字段写入对应分片，未指定地区的查询并行查询所有分片后合并结果。
+
+查询可以带用户特征：按 feature_store.rag_filter 过滤元数据，多取候选后按 rerank_hits 重排序。
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 import chromadb
 from chromadb.config import Settings
-from langchain.embeddings.base import Embeddings
+from langchain_core.embeddings import Embeddings
 from hikebutler.config.loader import load_config
+from hikebutler.database.chroma_remote import RemoteChromaClient
+from hikebutler.database.feature_store import rag_filter, rerank_hits
 from hikebutler.models.embedding_factory import get_embedding
+from hikebutler.state import UserFeatures
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 未带 region 元数据的文档写入的分片
+DEFAULT_SHARD = "default"
+# 按用户特征重排序时，每条查询取 top_k 的倍数作为候选
+RERANK_FETCH_FACTOR = 3
+
 
 class ChromaDBClient:
     """ChromaDB 向量数据库客户端。"""
 
-    def __init__(self):
-        """初始化 ChromaDB 客户端。"""
-        config = load_config()
-        chroma_config = config.get("database", {}).get("chromadb", {})
+    def __init__(self, chroma_config: Optional[Dict[str, Any]] = None):
+        """
+        初始化 ChromaDB 客户端。
+
+        Args:
+            chroma_config: database.chromadb 配置，默认从 config.yaml 加载
+        """
+        if chroma_config is None:
+            chroma_config = load_config().get("database", {}).get("chromadb", {})
+        self.mode = chroma_config.get("mode", "local")
         self.path = chroma_config.get("path", "./chroma_db")
         self.collection_name = chroma_config.get("collection_name", "hiking_knowledge")
+        self.batch_size = int(chroma_config.get("batch_size", 256))
+        self.shards: List[str] = list(chroma_config.get("shards") or [])
+        self.shard_workers = int(chroma_config.get("shard_workers", 4))
 
         # 初始化 ChromaDB 客户端
-        self.client = chromadb.PersistentClient(
-            path=self.path,
-            settings=Settings(anonymized_telemetry=False),
-        )
+        if self.mode == "remote":
+            self.client = RemoteChromaClient(
+                host=chroma_config.get("host", "localhost"),
+                port=int(chroma_config.get("port", 8000)),
+                tenant=chroma_config.get("tenant", "default_tenant"),
+                database=chroma_config.get("database", "default_database"),
+                ssl=bool(chroma_config.get("ssl", False)),
+            )
+            location = self.client.server_url
+        elif self.mode == "local":
+            self.client = chromadb.PersistentClient(
+                path=self.path,
+                settings=Settings(anonymized_telemetry=False),
+            )
+            location = self.path
+        else:
+            raise ValueError(f"不支持的 ChromaDB 模式: {self.mode}")
 
-        # 获取或创建集合
-        self.collection = self.client.get_or_create_collection(
-            name=self.collection_name,
-            metadata={"hnsw:space": "cosine"},
-        )
+        # 获取或创建集合（分片时每个地区一个集合）
+        self.collections: Dict[str, Any] = {
+            shard: self.client.get_or_create_collection(
+                name=self._shard_collection_name(shard),
+                metadata={"hnsw:space": "cosine"},
+            )
+            for shard in (self.shards + [DEFAULT_SHARD] if self.shards else [DEFAULT_SHARD])
+        }
+        self.collection = self.collections[DEFAULT_SHARD]
 
         # 获取 Embedding 模型
         self.embedding_model = get_embedding()
 
-        logger.info(f"ChromaDB 客户端初始化成功: {self.path}")
+        logger.info(f"ChromaDB 客户端初始化成功: {self.mode} {location}")
+
+    def _shard_collection_name(self, shard: str) -> str:
+        """分片对应的集合名称，未分片时即为 collection_name。"""
+        if shard == DEFAULT_SHARD:
+            return self.collection_name
+        return f"{self.collection_name}__{shard}"
+
+    def _shard_of(self, metadata: Optional[Dict[str, Any]]) -> str:
+        """根据元数据中的 region 选择分片。"""
+        region = (metadata or {}).get("region")
+        return region if region in self.collections else DEFAULT_SHARD
 
     def add_documents(
         self,
@@ -51,14 +106,41 @@ class ChromaDBClient:
         """
         添加文档到向量库。
 
+        文档按 batch_size 分批生成 embedding 并写入，分片时按 region 写入对应集合。
+
+        Args:
+            documents: 文档列表
+            metadatas: 元数据列表
+            ids: 文档 ID 列表
+        """
+        self._write_documents("add", documents, metadatas, ids)
+        logger.info(f"已添加 {len(documents)} 个文档到向量库")
+
+    def upsert_documents(
+        self,
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ):
+        """
+        插入或更新文档（ID 已存在时覆盖）。
+
         Args:
             documents: 文档列表
             metadatas: 元数据列表
             ids: 文档 ID 列表
         """
-        # 生成 embeddings
-        embeddings = self.embedding_model.embed_documents(documents)
+        self._write_documents("upsert", documents, metadatas, ids)
+        logger.info(f"已更新 {len(documents)} 个文档到向量库")
 
+    def _write_documents(
+        self,
+        method: str,
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]],
+        ids: Optional[List[str]],
+    ):
+        """分批生成 embedding 并按分片写入。"""
         # 如果没有提供 IDs，自动生成
         if ids is None:
             ids = [f"doc_{i}" for i in range(len(documents))]
@@ -67,21 +149,32 @@ class ChromaDBClient:
         if metadatas is None:
             metadatas = [{}] * len(documents)
 
-        # 添加到集合
-        self.collection.add(
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids,
-        )
+        for start in range(0, len(documents), self.batch_size):
+            end = start + self.batch_size
+            batch_docs = documents[start:end]
+            batch_metas = metadatas[start:end]
+            batch_ids = ids[start:end]
+            embeddings = self.embedding_model.embed_documents(batch_docs)
 
-        logger.info(f"已添加 {len(documents)} 个文档到向量库")
+            by_shard: Dict[str, List[int]] = {}
+            for i, metadata in enumerate(batch_metas):
+                by_shard.setdefault(self._shard_of(metadata), []).append(i)
+
+            for shard, indexes in by_shard.items():
+                getattr(self.collections[shard], method)(
+                    embeddings=[embeddings[i] for i in indexes],
+                    documents=[batch_docs[i] for i in indexes],
+                    metadatas=[batch_metas[i] or None for i in indexes],
+                    ids=[batch_ids[i] for i in indexes],
+                )
 
     def search(
         self,
         query: str,
         top_k: int = 5,
         similarity_threshold: float = 0.7,
+        region: Optional[str] = None,
+        user_features: Optional[UserFeatures] = None,
     ) -> List[Dict[str, Any]]:
         """
         搜索相似文档。
@@ -90,43 +183,147 @@ class ChromaDBClient:
             query: 查询文本
             top_k: 返回前 k 个结果
             similarity_threshold: 相似度阈值
+            region: 只查询该地区的分片，默认查询所有分片
+            user_features: 用户特征，传入时按特征过滤并重排序
+
+        Returns:
+            搜索结果列表，每个结果包含 document、metadata、distance（重排序时另有 score）
+        """
+        return self.search_many([query], top_k, similarity_threshold, region, user_features)[0]
+
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        similarity_threshold: float = 0.7,
+        region: Optional[str] = None,
+        user_features: Optional[UserFeatures] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量搜索：一次生成所有查询的 embedding，每个分片只发一次查询请求。
+
+        传入用户特征时，查询带上 rag_filter 的元数据条件，每条查询多取候选，
+        按 rerank_hits 的得分重排序后再取前 top_k 个。
+
+        Args:
+            queries: 查询文本列表
+            top_k: 每条查询返回前 k 个结果
+            similarity_threshold: 相似度阈值
+            region: 只查询该地区的分片，默认并行查询所有分片
+            user_features: 用户特征
 
         Returns:
-            搜索结果列表，每个结果包含 document、metadata、distance
+            与 queries 一一对应的搜索结果列表
         """
+        if not queries:
+            return []
+
         # 生成查询 embedding
-        query_embedding = self.embedding_model.embed_query(query)
-
-        # 搜索
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-        )
-
-        # 格式化结果
-        formatted_results = []
-        if results["documents"] and len(results["documents"][0]) > 0:
-            for i, doc in enumerate(results["documents"][0]):
-                distance = results["distances"][0][i] if results["distances"] else 1.0
-                # ChromaDB 使用余弦距离，转换为相似度
-                similarity = 1 - distance
-
-                if similarity >= similarity_threshold:
-                    formatted_results.append(
-                        {
-                            "document": doc,
-                            "metadata": results["metadatas"][0][i]
-                            if results["metadatas"]
-                            else {},
-                            "similarity": similarity,
-                            "distance": distance,
-                        }
-                    )
+        query_embeddings = self.embedding_model.embed_documents(queries)
+
+        if region is not None:
+            collections = [self.collections.get(region, self.collection)]
+        else:
+            collections = list(self.collections.values())
+
+        where = rag_filter(user_features)
+        n_results = top_k * RERANK_FETCH_FACTOR if user_features is not None else top_k
+
+        def _query(collection) -> Dict[str, Any]:
+            return collection.query(query_embeddings=query_embeddings, n_results=n_results, where=where)
+
+        if len(collections) == 1:
+            shard_results = [_query(collections[0])]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(self.shard_workers, len(collections))
+            ) as executor:
+                shard_results = list(executor.map(_query, collections))
 
-        return formatted_results
+        results = [
+            _format_hits(shard_results, query_index, n_results, similarity_threshold)
+            for query_index in range(len(queries))
+        ]
+        if user_features is not None:
+            results = [rerank_hits(hits, user_features)[:top_k] for hits in results]
+        return results
+
+    def delete_documents(self, ids: List[str]):
+        """
+        按 ID 删除文档（文档可能位于任意分片）。
+
+        Args:
+            ids: 文档 ID 列表
+        """
+        for start in range(0, len(ids), self.batch_size):
+            batch_ids = ids[start:start + self.batch_size]
+            for collection in self.collections.values():
+                collection.delete(ids=batch_ids)
+        logger.info(f"已从向量库删除 {len(ids)} 个文档")
+
+    def list_ids(self, metadata_key: Optional[str] = None) -> List[str]:
+        """
+        列出所有分片中的文档 ID。
+
+        Args:
+            metadata_key: 只返回元数据中包含该字段的文档
+
+        Returns:
+            文档 ID 列表
+        """
+        ids: List[str] = []
+        include = ["metadatas"] if metadata_key else []
+        for collection in self.collections.values():
+            offset = 0
+            while True:
+                page = collection.get(include=include, limit=self.batch_size, offset=offset)
+                if metadata_key:
+                    ids.extend(
+                        doc_id
+                        for doc_id, metadata in zip(page["ids"], page["metadatas"])
+                        if metadata and metadata_key in metadata
+                    )
+                else:
+                    ids.extend(page["ids"])
+                if len(page["ids"]) < self.batch_size:
+                    break
+                offset += self.batch_size
+        return ids
 
     def delete_collection(self):
-        """删除集合（谨慎使用）。"""
-        self.client.delete_collection(name=self.collection_name)
+        """删除集合及其所有分片（谨慎使用）。"""
+        for shard in self.collections:
+            self.client.delete_collection(name=self._shard_collection_name(shard))
         logger.warning(f"已删除集合: {self.collection_name}")
 
+
+def _format_hits(
+    shard_results: List[Dict[str, Any]],
+    query_index: int,
+    top_k: int,
+    similarity_threshold: float,
+) -> List[Dict[str, Any]]:
+    """合并各分片中某条查询的结果，按距离取前 top_k 个并过滤相似度。"""
+    hits = []
+    for results in shard_results:
+        documents = results.get("documents") or []
+        if len(documents) <= query_index:
+            continue
+        distances = results.get("distances") or []
+        metadatas = results.get("metadatas") or []
+        for i, doc in enumerate(documents[query_index]):
+            distance = distances[query_index][i] if distances else 1.0
+            # ChromaDB 使用余弦距离，转换为相似度
+            similarity = 1 - distance
+            if similarity >= similarity_threshold:
+                hits.append(
+                    {
+                        "document": doc,
+                        "metadata": (metadatas[query_index][i] if metadatas else None) or {},
+                        "similarity": similarity,
+                        "distance": distance,
+                    }
+                )
+    hits.sort(key=lambda hit: hit["distance"])
+    return hits[:top_k]
+
@@ -0,0 +1,448 @@
+"""
+用户特征库
+
+为每个用户增量维护一份历史特征（经验等级、常规里程/爬升、偏好地形、常去地区、已有装备），
+节点不再在每次请求时扫描 trips 表和解析画像 JSON：
+- 每次保存徒步记录后调用 apply_trip() 累加一次，按 review_id 去重，任务重试不会重复累加；
+- 数值特征以定长 float32 向量存储，地区计数和装备等少量字段存为 JSON；
+- get() 带进程内 LRU 缓存，本进程写入后立即失效；画像变化（按哈希判断）时才重新合并画像字段。
+
+特征既作为节点的结构化输入（state["user_features"]），也用于 RAG 检索的过滤和重排序。
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+import numpy as np
+from hikebutler.config.loader import load_config
+from hikebutler.state import UserFeatures
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 数值特征在向量中的位置
+_FIELDS = [
+    "trip_count",
+    "total_distance_m",
+    "total_ascent_m",
+    "total_duration_s",
+    "max_distance_m",
+    "max_ascent_m",
+    "ewma_distance_m",
+    "ewma_ascent_m",
+    "ewma_duration_s",
+    "terrain_flat",
+    "terrain_rolling",
+    "terrain_mountain",
+    "last_trip_day",  # 距 1970-01-01 的天数
+]
+_INDEX = {name: i for i, name in enumerate(_FIELDS)}
+TERRAINS = ("flat", "rolling", "mountain")
+
+# 近期加权的指数平滑系数：越大越偏向最近的徒步
+EWMA_ALPHA = 0.3
+# 每公里爬升低于/高于该值（米）时视为平缓/山地
+ROLLING_ASCENT_PER_KM = 20.0
+MOUNTAIN_ASCENT_PER_KM = 60.0
+# 常去地区使用的 geohash 前缀长度（约 39 km）和保留个数
+REGION_PRECISION = 4
+MAX_REGIONS = 8
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_features (
+    user_id TEXT PRIMARY KEY,
+    vector BLOB NOT NULL,
+    extras TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS applied_trips (
+    review_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL
+);
+"""
+
+
+def classify_terrain(distance_m: Optional[float], ascent_m: Optional[float]) -> Optional[str]:
+    """
+    按每公里爬升划分地形。
+
+    Args:
+        distance_m: 里程（米）
+        ascent_m: 爬升（米）
+
+    Returns:
+        flat / rolling / mountain，缺少数据时为 None
+    """
+    if not distance_m or ascent_m is None:
+        return None
+    per_km = ascent_m / (distance_m / 1000)
+    if per_km < ROLLING_ASCENT_PER_KM:
+        return "flat"
+    if per_km < MOUNTAIN_ASCENT_PER_KM:
+        return "rolling"
+    return "mountain"
+
+
+def _level(vector: np.ndarray) -> str:
+    """根据徒步次数和最大爬升推断经验等级。"""
+    trips = vector[_INDEX["trip_count"]]
+    max_ascent = vector[_INDEX["max_ascent_m"]]
+    if trips >= 20 and max_ascent >= 1200:
+        return "advanced"
+    if trips >= 5 or max_ascent >= 600:
+        return "intermediate"
+    return "beginner"
+
+
+def _profile_fields(profile: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """从用户画像中取出特征相关的字段。"""
+    profile = profile or {}
+    gear = []
+    for item in profile.get("gear") or []:
+        name = item.get("name") if isinstance(item, dict) else item
+        if name:
+            gear.append(str(name))
+    return {
+        "gear": gear,
+        "level": profile.get("level"),
+        "terrain": profile.get("preferred_terrain"),
+    }
+
+
+def _profile_hash(fields: Dict[str, Any]) -> str:
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class FeatureStore:
+    """基于 SQLite 的用户特征库。"""
+
+    def __init__(
+        self,
+        path: Union[str, Path] = "./data/features.sqlite",
+        cache_size: int = 1024,
+        cache_ttl: float = 60.0,
+    ):
+        """
+        初始化特征库。
+
+        Args:
+            path: SQLite 文件路径
+            cache_size: 缓存的用户数
+            cache_ttl: 缓存有效期（秒），其他进程写入后最多延迟这么久可见
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        # user_id -> (过期时间, 特征, 已合并画像的哈希)
+        self._cache: "OrderedDict[str, Tuple[float, UserFeatures, Optional[str]]]" = OrderedDict()
+
+    def _load(self, user_id: str) -> Tuple[np.ndarray, Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT vector, extras FROM user_features WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            return np.zeros(len(_FIELDS), dtype=np.float32), {"regions": {}}
+        return np.frombuffer(row[0], dtype=np.float32).copy(), json.loads(row[1])
+
+    def _save(self, user_id: str, vector: np.ndarray, extras: Dict[str, Any]):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO user_features (user_id, vector, extras, updated_at) VALUES (?, ?, ?, ?)",
+            (user_id, vector.astype(np.float32).tobytes(), json.dumps(extras, ensure_ascii=False), time.time()),
+        )
+
+    def apply_trip(self, review_id: str, user_id: str, stats: Dict[str, Any]) -> bool:
+        """
+        把一次徒步的统计累加到用户特征中。
+
+        Args:
+            review_id: 复盘 ID（去重键）
+            user_id: 用户 ID
+            stats: 徒步统计（distance_m、ascent_m、duration_s、start_geohash、trip_date，可缺省）
+
+        Returns:
+            是否累加（该 review_id 已累加过时为 False）
+        """
+        distance = float(stats.get("distance_m") or 0.0)
+        ascent = float(stats.get("ascent_m") or 0.0)
+        duration = float(stats.get("duration_s") or 0.0)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO applied_trips (review_id, user_id) VALUES (?, ?)",
+                    (review_id, user_id),
+                )
+                if not cursor.rowcount:
+                    self._conn.execute("ROLLBACK")
+                    return False
+
+                v, extras = self._load(user_id)
+                first = v[_INDEX["trip_count"]] == 0
+                v[_INDEX["trip_count"]] += 1
+                v[_INDEX["total_distance_m"]] += distance
+                v[_INDEX["total_ascent_m"]] += ascent
+                v[_INDEX["total_duration_s"]] += duration
+                v[_INDEX["max_distance_m"]] = max(v[_INDEX["max_distance_m"]], distance)
+                v[_INDEX["max_ascent_m"]] = max(v[_INDEX["max_ascent_m"]], ascent)
+                for name, value in (
+                    ("ewma_distance_m", distance),
+                    ("ewma_ascent_m", ascent),
+                    ("ewma_duration_s", duration),
+                ):
+                    i = _INDEX[name]
+                    v[i] = value if first else EWMA_ALPHA * value + (1 - EWMA_ALPHA) * v[i]
+
+                terrain = classify_terrain(distance, ascent)
+                if terrain:
+                    v[_INDEX[f"terrain_{terrain}"]] += 1
+                trip_date = stats.get("trip_date")
+                if trip_date:
+                    if isinstance(trip_date, str):
+                        trip_date = date.fromisoformat(trip_date[:10])
+                    day = (trip_date - date(1970, 1, 1)).days
+                    v[_INDEX["last_trip_day"]] = max(v[_INDEX["last_trip_day"]], day)
+
+                geohash = stats.get("start_geohash")
+                if geohash:
+                    regions = extras.setdefault("regions", {})
+                    prefix = geohash[:REGION_PRECISION]
+                    regions[prefix] = regions.get(prefix, 0) + 1
+                    if len(regions) > MAX_REGIONS * 2:
+                        top = sorted(regions.items(), key=lambda kv: -kv[1])[:MAX_REGIONS]
+                        extras["regions"] = dict(top)
+
+                self._save(user_id, v, extras)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._cache.pop(user_id, None)
+        return True
+
+    def sync_profile(self, user_id: str, profile: Optional[Dict[str, Any]]) -> bool:
+        """
+        合并画像中的装备、等级和地形偏好；画像未变化时不写入。
+
+        Args:
+            user_id: 用户 ID
+            profile: 用户画像
+
+        Returns:
+            是否有变化
+        """
+        fields = _profile_fields(profile)
+        digest = _profile_hash(fields)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                vector, extras = self._load(user_id)
+                if extras.get("profile_hash") == digest:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                extras.update(profile=fields, profile_hash=digest)
+                self._save(user_id, vector, extras)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._cache.pop(user_id, None)
+        return True
+
+    def get(self, user_id: str, profile: Optional[Dict[str, Any]] = None) -> UserFeatures:
+        """
+        获取用户特征。
+
+        Args:
+            user_id: 用户 ID
+            profile: 当前用户画像（可选），与已合并的画像不同时先合并
+
+        Returns:
+            UserFeatures（新用户返回默认值）
+        """
+        if profile is not None:
+            cached = self._cached(user_id)
+            if cached is None or _profile_hash(_profile_fields(profile)) != cached[1]:
+                self.sync_profile(user_id, profile)
+        cached = self._cached(user_id)
+        if cached is not None:
+            return cached[0]
+
+        with self._lock:
+            vector, extras = self._load(user_id)
+            features = _to_features(vector, extras)
+            self._cache[user_id] = (time.monotonic() + self.cache_ttl, features, extras.get("profile_hash"))
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return features
+
+    def _cached(self, user_id: str) -> Optional[Tuple[UserFeatures, Optional[str]]]:
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            self._cache.move_to_end(user_id)
+            return entry[1], entry[2]
+
+    def close(self):
+        """关闭数据库连接。"""
+        with self._lock:
+            self._conn.close()
+
+
+def _to_features(vector: np.ndarray, extras: Dict[str, Any]) -> UserFeatures:
+    """把存储的向量和附加字段展开为 UserFeatures。"""
+    v = vector
+    trips = int(v[_INDEX["trip_count"]])
+    profile = extras.get("profile") or {}
+    terrain_counts = np.array([v[_INDEX[f"terrain_{t}"]] for t in TERRAINS])
+    terrain = (
+        {t: round(float(c / terrain_counts.sum()), 2) for t, c in zip(TERRAINS, terrain_counts) if c}
+        if terrain_counts.sum()
+        else {}
+    )
+    preferred = profile.get("terrain") or (TERRAINS[int(terrain_counts.argmax())] if terrain else None)
+    regions = sorted((extras.get("regions") or {}).items(), key=lambda kv: -kv[1])[:MAX_REGIONS]
+    last_day = int(v[_INDEX["last_trip_day"]])
+    return UserFeatures(
+        trip_count=trips,
+        level=profile.get("level") or _level(v),
+        total_distance_km=round(float(v[_INDEX["total_distance_m"]]) / 1000, 1),
+        total_ascent_m=round(float(v[_INDEX["total_ascent_m"]])),
+        typical_distance_km=round(float(v[_INDEX["ewma_distance_m"]]) / 1000, 1),
+        typical_ascent_m=round(float(v[_INDEX["ewma_ascent_m"]])),
+        typical_duration_h=round(float(v[_INDEX["ewma_duration_s"]]) / 3600, 1),
+        max_distance_km=round(float(v[_INDEX["max_distance_m"]]) / 1000, 1),
+        max_ascent_m=round(float(v[_INDEX["max_ascent_m"]])),
+        preferred_terrain=preferred,
+        terrain=terrain,
+        regions=[prefix for prefix, _ in regions],
+        gear=list(profile.get("gear") or []),
+        last_trip_date=(
+            date.fromordinal(date(1970, 1, 1).toordinal() + last_day).isoformat() if last_day else None
+        ),
+    )
+
+
+def format_features(features: Optional[UserFeatures]) -> str:
+    """
+    渲染为 Prompt 中的紧凑文本。
+
+    Args:
+        features: 用户特征
+
+    Returns:
+        文本，没有历史数据时为空字符串
+    """
+    if features is None or (not features.trip_count and not features.gear):
+        return ""
+    lines = [f"经验等级: {features.level}（累计 {features.trip_count} 次）"]
+    if features.trip_count:
+        lines.append(
+            f"常规单次: {features.typical_distance_km} km / 爬升 {features.typical_ascent_m} m / "
+            f"{features.typical_duration_h} h；最大: {features.max_distance_km} km / "
+            f"爬升 {features.max_ascent_m} m"
+        )
+    if features.preferred_terrain:
+        lines.append(f"偏好地形: {features.preferred_terrain}")
+    if features.gear:
+        lines.append(f"已有装备: {'、'.join(features.gear)}")
+    return "\n".join(lines)
+
+
+def rag_filter(features: Optional[UserFeatures]) -> Optional[Dict[str, Any]]:
+    """
+    RAG 检索的元数据过滤条件：新手不检索标为 hard 的路线（没有 difficulty 字段的文档不受影响）。
+
+    Args:
+        features: 用户特征
+
+    Returns:
+        ChromaDB where 条件，不需要过滤时为 None
+    """
+    if features is None or features.level != "beginner":
+        return None
+    return {"difficulty": {"$ne": "hard"}}
+
+
+def rag_boost(features: Optional[UserFeatures], metadata: Optional[Dict[str, Any]]) -> float:
+    """
+    根据用户特征计算检索结果的加权系数。
+
+    常去地区、偏好地形加分；爬升远超用户最大爬升的路线降权。
+
+    Args:
+        features: 用户特征
+        metadata: 文档元数据（geohash、terrain、ascent_m 等，可缺省）
+
+    Returns:
+        加权系数（1.0 为不调整）
+    """
+    if features is None or not metadata:
+        return 1.0
+    boost = 1.0
+    geohash = metadata.get("geohash")
+    if geohash and any(geohash.startswith(prefix) for prefix in features.regions):
+        boost *= 1.2
+    if features.preferred_terrain and metadata.get("terrain") == features.preferred_terrain:
+        boost *= 1.1
+    ascent = metadata.get("ascent_m")
+    if ascent is not None and features.max_ascent_m:
+        if ascent > features.max_ascent_m * 1.5:
+            boost *= 0.8
+        elif ascent <= features.max_ascent_m:
+            boost *= 1.05
+    return boost
+
+
+def rerank_hits(hits: List[Dict[str, Any]], features: Optional[UserFeatures]) -> List[Dict[str, Any]]:
+    """
+    按 (1 - distance) * 加权系数重新排序检索结果。
+
+    Args:
+        hits: ChromaDBClient.search 的结果
+        features: 用户特征
+
+    Returns:
+        重新排序后的结果，每条增加 score 字段
+    """
+    scored = [
+        {**hit, "score": (1 - hit.get("distance", 0.0)) * rag_boost(features, hit.get("metadata"))}
+        for hit in hits
+    ]
+    return sorted(scored, key=lambda hit: -hit["score"])
+
+
+_feature_store: Optional[FeatureStore] = None
+_feature_store_lock = threading.Lock()
+
+
+def get_feature_store() -> FeatureStore:
+    """
+    获取进程内共享的特征库。
+
+    Returns:
+        FeatureStore 实例
+    """
+    global _feature_store
+    with _feature_store_lock:
+        if _feature_store is None:
+            features_config = load_config().get("features", {})
+            _feature_store = FeatureStore(
+                features_config.get("path", "./data/features.sqlite"),
+                cache_size=features_config.get("cache_size", 1024),
+                cache_ttl=features_config.get("cache_ttl", 60.0),
+            )
+    return _feature_store
@@ -0,0 +1,363 @@
+"""
+知识库增量同步
+
+维护源文档清单（manifest：每个源文档的内容哈希、版本和分块 ID），每次同步时与清单比对：
+- 新增、修改的源文档重新分块，只对清单中不存在的分块生成 embedding 并写入；
+- 修改后不再出现的分块、已删除源文档的分块从向量库删除；
+- 删除的源文档在清单中留下墓碑，compact() 清理墓碑并移除向量库中的孤立分块。
+
+分块 ID 由源文档 ID 和分块内容哈希组成，内容不变的分块在文档修改后仍保持同一个 ID。
+
+清单存放在 SQLite 中，每个源文档一行：同步只读写本次涉及的源文档，不重写整个清单；
+每次同步在一个写事务（BEGIN IMMEDIATE）中完成，多个进程同时入库时依次执行，不会丢失更新。
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+from hikebutler.config.loader import load_config
+from hikebutler.database.chromadb_client import ChromaDBClient
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source_id TEXT PRIMARY KEY,
+    entry TEXT NOT NULL
+);
+"""
+
+# 等待其他进程的同步事务完成的最长时间（秒），同步期间会生成 embedding
+BUSY_TIMEOUT = 300.0
+
+
+@dataclass(slots=True)
+class SourceDocument:
+    """知识库源文档（一篇小红书笔记、一篇攻略等）。"""
+
+    source_id: str
+    text: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class SyncReport:
+    """一次同步的变更统计。"""
+
+    added: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    chunks_embedded: int = 0
+    chunks_deleted: int = 0
+
+
+def split_text(text: str, chunk_size: int = 500, chunk_overlap: int = 50) -> List[str]:
+    """
+    按字符数切分文本，优先在段落或句子边界处断开。
+
+    Args:
+        text: 文本
+        chunk_size: 每块最大字符数
+        chunk_overlap: 相邻分块重叠的字符数
+
+    Returns:
+        分块列表
+    """
+    text = text.strip()
+    if len(text) <= chunk_size:
+        return [text] if text else []
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            # 在后半段寻找最近的段落或句子边界
+            window = text[start + chunk_size // 2:end]
+            for separator in ("\n\n", "\n", "。", "！", "？", ".", " "):
+                cut = window.rfind(separator)
+                if cut >= 0:
+                    end = start + chunk_size // 2 + cut + len(separator)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - chunk_overlap, start + 1)
+    return chunks
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _chunk_id(source_id: str, chunk: str) -> str:
+    """分块 ID：源文档 ID + 分块内容哈希。"""
+    return f"{source_id}#{_sha256(chunk)[:16]}"
+
+
+class KnowledgeBaseSync:
+    """知识库增量同步器，可在多个线程间共享。"""
+
+    def __init__(
+        self,
+        client: ChromaDBClient,
+        manifest_path: Union[str, Path],
+        chunk_size: int = 500,
+        chunk_overlap: int = 50,
+    ):
+        """
+        初始化同步器。
+
+        Args:
+            client: 向量库客户端
+            manifest_path: 清单文件路径（SQLite）；同目录下有同名的旧版 JSON 清单且新清单为空时导入
+            chunk_size: 分块大小（字符）
+            chunk_overlap: 分块重叠（字符）
+        """
+        self.client = client
+        self.manifest_path = Path(manifest_path)
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._conn = sqlite3.connect(
+            str(self.manifest_path), timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._import_json(self.manifest_path.with_suffix(".json"))
+
+    @classmethod
+    def from_config(cls, client: Optional[ChromaDBClient] = None) -> "KnowledgeBaseSync":
+        """
+        根据 config.yaml 的 rag 配置创建同步器。
+
+        Args:
+            client: 向量库客户端，默认新建
+
+        Returns:
+            KnowledgeBaseSync 实例
+        """
+        rag_config = load_config().get("rag", {})
+        return cls(
+            client or ChromaDBClient(),
+            rag_config.get("manifest_path", "./data/kb_manifest.sqlite"),
+            chunk_size=rag_config.get("chunk_size", 500),
+            chunk_overlap=rag_config.get("chunk_overlap", 50),
+        )
+
+    def _import_json(self, json_path: Path):
+        """导入旧版 JSON 清单（{"version": 1, "sources": {...}}），只在新清单为空时执行一次。"""
+        if json_path == self.manifest_path or not json_path.exists():
+            return
+        with open(json_path, "r", encoding="utf-8") as f:
+            sources = json.load(f).get("sources", {})
+        with self._transaction():
+            if self._conn.execute("SELECT 1 FROM sources LIMIT 1").fetchone():
+                return
+            for source_id, entry in sources.items():
+                self._put(source_id, entry)
+        logger.info(f"已导入旧版知识库清单: {json_path}，源文档 {len(sources)} 篇")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """写事务：进程内按锁串行，进程间由 SQLite 写锁串行；异常时回滚清单的修改。"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _get(self, source_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT entry FROM sources WHERE source_id = ?", (source_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _put(self, source_id: str, entry: Dict[str, Any]):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sources (source_id, entry) VALUES (?, ?)",
+            (source_id, json.dumps(entry, ensure_ascii=False)),
+        )
+
+    def _entries(self) -> Dict[str, Dict[str, Any]]:
+        rows = self._conn.execute("SELECT source_id, entry FROM sources").fetchall()
+        return {source_id: json.loads(entry) for source_id, entry in rows}
+
+    @property
+    def sources(self) -> Dict[str, Dict[str, Any]]:
+        """清单中的源文档记录（只读快照）。"""
+        with self._lock:
+            return self._entries()
+
+    def sync(self, documents: Iterable[SourceDocument], full: bool = True) -> SyncReport:
+        """
+        将源文档同步到向量库。
+
+        Args:
+            documents: 当前的全部（full=True）或部分（full=False）源文档
+            full: documents 是否为完整语料；为 True 时清单中未出现的源文档视为已删除
+
+        Returns:
+            同步统计
+        """
+        report = SyncReport()
+        seen = set()
+        now = datetime.now().isoformat(timespec="seconds")
+
+        with self._transaction():
+            for document in documents:
+                seen.add(document.source_id)
+                entry = self._get(document.source_id)
+                content_hash = _sha256(document.text)
+                meta_hash = _sha256(json.dumps(document.metadata, sort_keys=True, ensure_ascii=False))
+                live_entry = entry if entry and not entry.get("deleted") else None
+                if (
+                    live_entry
+                    and live_entry["hash"] == content_hash
+                    and live_entry.get("meta_hash") == meta_hash
+                ):
+                    report.unchanged += 1
+                    continue
+
+                # 元数据变化时（可能换了地区分片）所有分块都要重写，否则只写新出现的分块
+                old_chunks = set(live_entry["chunks"]) if live_entry else set()
+                reusable = old_chunks if live_entry and live_entry.get("meta_hash") == meta_hash else set()
+                chunks = split_text(document.text, self.chunk_size, self.chunk_overlap)
+                chunk_ids = [_chunk_id(document.source_id, chunk) for chunk in chunks]
+
+                stale = sorted(old_chunks - (reusable & set(chunk_ids)))
+                if stale:
+                    self.client.delete_documents(stale)
+
+                new_indexes = []
+                written = set(reusable)
+                for i, cid in enumerate(chunk_ids):
+                    if cid not in written:
+                        written.add(cid)
+                        new_indexes.append(i)
+                if new_indexes:
+                    self.client.upsert_documents(
+                        [chunks[i] for i in new_indexes],
+                        metadatas=[
+                            {**document.metadata, "source_id": document.source_id}
+                            for _ in new_indexes
+                        ],
+                        ids=[chunk_ids[i] for i in new_indexes],
+                    )
+
+                report.chunks_embedded += len(new_indexes)
+                report.chunks_deleted += len(stale)
+                if live_entry:
+                    report.updated += 1
+                else:
+                    report.added += 1
+                self._put(
+                    document.source_id,
+                    {
+                        "hash": content_hash,
+                        "meta_hash": meta_hash,
+                        "version": (entry or {}).get("version", 0) + 1,
+                        "chunks": list(dict.fromkeys(chunk_ids)),
+                        "updated_at": now,
+                    },
+                )
+
+            if full:
+                for source_id, entry in self._entries().items():
+                    if source_id in seen or entry.get("deleted"):
+                        continue
+                    self._tombstone(source_id, entry, now, report)
+
+        logger.info(
+            f"知识库同步完成: 新增 {report.added}, 更新 {report.updated}, 删除 {report.deleted}, "
+            f"未变 {report.unchanged}, 生成 embedding {report.chunks_embedded} 块"
+        )
+        return report
+
+    def delete(self, source_ids: Iterable[str]) -> SyncReport:
+        """
+        删除指定的源文档。
+
+        Args:
+            source_ids: 源文档 ID 列表
+
+        Returns:
+            同步统计
+        """
+        report = SyncReport()
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._transaction():
+            for source_id in source_ids:
+                entry = self._get(source_id)
+                if entry and not entry.get("deleted"):
+                    self._tombstone(source_id, entry, now, report)
+        return report
+
+    def _tombstone(self, source_id: str, entry: Dict[str, Any], now: str, report: SyncReport):
+        """删除源文档的分块，并在清单中标记为已删除。"""
+        if entry["chunks"]:
+            self.client.delete_documents(entry["chunks"])
+        report.deleted += 1
+        report.chunks_deleted += len(entry["chunks"])
+        self._put(
+            source_id,
+            {
+                "hash": entry["hash"],
+                "version": entry.get("version", 0) + 1,
+                "chunks": [],
+                "deleted": True,
+                "updated_at": now,
+            },
+        )
+
+    def compact(self) -> int:
+        """
+        压缩：移除清单中的墓碑，并删除向量库中不属于任何有效源文档的分块
+        （例如同步中途失败遗留的分块）。
+
+        Returns:
+            删除的孤立分块数
+        """
+        with self._transaction():
+            entries = self._entries()
+            live = {cid for entry in entries.values() for cid in entry["chunks"]}
+            # 只检查同步写入的分块（带 source_id 元数据），不影响其他途径写入的文档
+            synced = self.client.list_ids(metadata_key="source_id")
+            orphans = [cid for cid in synced if cid not in live]
+            if orphans:
+                self.client.delete_documents(orphans)
+
+            tombstones = [sid for sid, entry in entries.items() if entry.get("deleted")]
+            self._conn.executemany("DELETE FROM sources WHERE source_id = ?", [(sid,) for sid in tombstones])
+        logger.info(f"知识库压缩完成: 移除墓碑 {len(tombstones)} 个, 孤立分块 {len(orphans)} 个")
+        return len(orphans)
+
+
+_kb_sync: Optional[KnowledgeBaseSync] = None
+_kb_sync_lock = threading.Lock()
+
+
+def get_kb_sync() -> KnowledgeBaseSync:
+    """
+    获取进程内共享的知识库同步器（复用同一个向量库客户端和清单连接）。
+
+    Returns:
+        KnowledgeBaseSync 实例
+    """
+    global _kb_sync
+    with _kb_sync_lock:
+        if _kb_sync is None:
+            _kb_sync = KnowledgeBaseSync.from_config()
+    return _kb_sync
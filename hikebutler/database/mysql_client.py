@@ -4,15 +4,65 @@ MySQL 数据库客户端
 负责用户画像和历史徒步数据的存储和查询。
 """
 
+from datetime import date
 from typing import Dict, Any, Optional, List
 import pymysql
 from pymysql.connections import Connection
 from pymysql.cursors import DictCursor
 from hikebutler.config.loader import load_config
+from hikebutler.geo.track import compress_track, compute_stats, decompress_track, parse_gpx
 import logging
 
 logger = logging.getLogger(__name__)
 
+# trips 表的轨迹统计列：写入时从 GPX 计算，分析查询只读这些列
+TRIP_COLUMNS = [
+    ("review_id", "VARCHAR(64) UNIQUE"),
+    ("trip_date", "DATE"),
+    ("distance_m", "FLOAT"),
+    ("ascent_m", "FLOAT"),
+    ("descent_m", "FLOAT"),
+    ("duration_s", "INT"),
+    ("min_lat", "DOUBLE"),
+    ("min_lon", "DOUBLE"),
+    ("max_lat", "DOUBLE"),
+    ("max_lon", "DOUBLE"),
+    ("start_geohash", "CHAR(8)"),
+    ("point_count", "INT"),
+    ("track_z", "MEDIUMBLOB"),  # zlib 压缩的原始 GPX
+]
+
+TRIP_INDEXES = [
+    ("idx_trips_user_created", "user_id, created_at"),
+    ("idx_trips_geohash", "start_geohash"),
+]
+
+TRIP_SUMMARY_COLUMNS = (
+    "id, user_id, trip_date, distance_m, ascent_m, descent_m, duration_s, "
+    "min_lat, min_lon, max_lat, max_lon, start_geohash, created_at"
+)
+
+
+def trip_row(gpx: Optional[str]) -> Dict[str, Any]:
+    """
+    从 GPX 计算 trips 表的统计列和压缩轨迹。
+
+    Args:
+        gpx: GPX 文本（可为空）
+
+    Returns:
+        列名到值的映射（不含 review_id）
+    """
+    row: Dict[str, Any] = {name: None for name, _ in TRIP_COLUMNS if name != "review_id"}
+    if not gpx:
+        return row
+    row["track_z"] = compress_track(gpx)
+    stats = compute_stats(parse_gpx(gpx))
+    if stats is not None:
+        for key, value in stats.to_dict().items():
+            row["point_count" if key == "points" else key] = value
+    return row
+
 
 class MySQLClient:
     """MySQL 数据库客户端。"""
@@ -133,6 +183,112 @@ class MySQLClient:
         profile_json = json.dumps(profile, ensure_ascii=False)
         self.execute_update(sql, (user_id, profile_json, profile_json))
 
+    def save_trip(
+        self,
+        review_id: str,
+        user_id: str,
+        gpx: Optional[str],
+        notes: Optional[str],
+    ) -> Dict[str, Any]:
+        """
+        保存一次徒步记录，同一 review_id 重复保存时更新已有记录。
+
+        轨迹统计在写入时计算并存入列中，原始 GPX 压缩后存入 track_z。
+
+        Args:
+            review_id: 复盘 ID
+            user_id: 用户 ID
+            gpx: GPX 轨迹内容
+            notes: 感想
+
+        Returns:
+            写入的统计列（见 trip_row）
+        """
+        # trips.user_id 外键要求用户存在
+        self.execute_update("INSERT IGNORE INTO users (id) VALUES (%s)", (user_id,))
+        row = trip_row(gpx)
+        columns = ["review_id", "user_id", "notes", *row]
+        updates = ", ".join(f"{c} = VALUES({c})" for c in columns[2:])
+        sql = f"""
+            INSERT INTO trips ({", ".join(columns)})
+            VALUES ({", ".join(["%s"] * len(columns))})
+            ON DUPLICATE KEY UPDATE {updates}
+        """
+        self.execute_update(sql, (review_id, user_id, notes, *row.values()))
+        return row
+
+    def get_user_totals(
+        self,
+        user_id: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """
+        统计用户在日期范围内的徒步次数、总里程、总爬升和总耗时（只读统计列）。
+
+        Args:
+            user_id: 用户 ID
+            start: 起始日期（含）
+            end: 结束日期（不含）
+
+        Returns:
+            {"trips", "distance_m", "ascent_m", "duration_s"}
+        """
+        sql = """
+            SELECT COUNT(*) AS trips,
+                   COALESCE(SUM(distance_m), 0) AS distance_m,
+                   COALESCE(SUM(ascent_m), 0) AS ascent_m,
+                   COALESCE(SUM(duration_s), 0) AS duration_s
+            FROM trips
+            WHERE user_id = %s AND created_at >= %s AND created_at < %s
+        """
+        params = (user_id, start or date.min, end or date.max)
+        return self.execute_query(sql, params)[0]
+
+    def find_trips_near(
+        self,
+        geohash_prefixes: List[str],
+        user_id: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        按起点 geohash 前缀查找附近的徒步记录（不读取轨迹）。
+
+        Args:
+            geohash_prefixes: geohash 前缀列表（通常为中心格子及其相邻格子）
+            user_id: 只查该用户的记录（可选）
+            limit: 最多返回的条数
+
+        Returns:
+            徒步记录统计列表，按时间倒序
+        """
+        if not geohash_prefixes:
+            return []
+        conditions = " OR ".join(["start_geohash LIKE %s"] * len(geohash_prefixes))
+        params: List[Any] = [f"{prefix}%" for prefix in geohash_prefixes]
+        sql = f"SELECT {TRIP_SUMMARY_COLUMNS} FROM trips WHERE ({conditions})"
+        if user_id:
+            sql += " AND user_id = %s"
+            params.append(user_id)
+        sql += " ORDER BY created_at DESC LIMIT %s"
+        params.append(limit)
+        return self.execute_query(sql, tuple(params))
+
+    def get_trip_track(self, trip_id: int) -> Optional[str]:
+        """
+        读取并解压一次徒步的原始 GPX。
+
+        Args:
+            trip_id: 徒步记录 ID
+
+        Returns:
+            GPX 文本，没有轨迹时返回 None
+        """
+        results = self.execute_query("SELECT track_z FROM trips WHERE id = %s", (trip_id,))
+        if not results or results[0]["track_z"] is None:
+            return None
+        return decompress_track(results[0]["track_z"])
+
     def init_tables(self):
         """初始化数据库表结构。"""
         # 创建 users 表
@@ -145,14 +301,17 @@ class MySQLClient:
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
         """
 
-        # 创建 trips 表
-        trips_sql = """
+        # 创建 trips 表（统计列见 TRIP_COLUMNS，已有的表用 scripts/migrate_trips.py 迁移）
+        columns = ",\n".join(f"                {name} {ddl}" for name, ddl in TRIP_COLUMNS)
+        indexes = ",\n".join(f"                INDEX {name} ({cols})" for name, cols in TRIP_INDEXES)
+        trips_sql = f"""
             CREATE TABLE IF NOT EXISTS trips (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 user_id VARCHAR(255),
-                gpx TEXT,
+{columns},
                 notes TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+{indexes},
                 FOREIGN KEY (user_id) REFERENCES users(id)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
         """
@@ -164,4 +323,3 @@ class MySQLClient:
         except Exception as e:
             logger.error(f"数据库表初始化失败: {e}")
             raise
-
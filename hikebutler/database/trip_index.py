@@ -0,0 +1,290 @@
+"""
+历史徒步相似检索
+
+按轨迹指纹（见 hikebutler.geo.fingerprint）检索相似的历史徒步：
+- 指纹和重采样轨迹存放在 SQLite，启动时一次载入进程内矩阵，保存徒步记录时增量写入；
+- 每次检索前只读取 updated_at 晚于已载入记录的行，其他进程（任务工作进程）写入的记录随即可见；
+- 检索是一次矩阵运算的 k 近邻（同时比较正向和反向指纹），不解析任何 GPX；
+- match_track 只对前 candidates 名候选计算离散 Fréchet 距离做精确重排序。
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+import numpy as np
+from hikebutler.config.loader import load_config
+from hikebutler.geo.fingerprint import (
+    DIM,
+    SHAPE_POINTS,
+    TrackFingerprint,
+    fingerprint,
+    frechet_many,
+    plan_fingerprint,
+    reverse_fingerprint,
+)
+from hikebutler.geo.track import Track
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trip_fingerprints (
+    review_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    shape BLOB NOT NULL,
+    distance_m REAL NOT NULL,
+    ascent_m REAL NOT NULL,
+    start_lat REAL NOT NULL,
+    start_lon REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trip_fingerprints_updated ON trip_fingerprints (updated_at);
+"""
+
+# 增量载入时回看的时间（秒）：其他进程取时间戳和提交之间有间隔，稍早的时间戳可能晚于已载入的行提交
+REFRESH_OVERLAP = 1.0
+
+
+class TripIndex:
+    """基于 SQLite 和进程内矩阵的历史徒步指纹索引。"""
+
+    def __init__(self, path: Union[str, Path] = "./data/trip_index.sqlite", candidates: int = 32):
+        """
+        打开索引并载入全部指纹。
+
+        Args:
+            path: SQLite 文件路径
+            candidates: match_track 精确重排序的候选数
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.candidates = candidates
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+        self._rows: Dict[str, int] = {}
+        self._trips: List[Dict[str, Any]] = []
+        self._vectors = np.zeros((16, DIM), dtype=np.float32)
+        self._shapes = np.zeros((16, SHAPE_POINTS, 2), dtype=np.float32)
+        self._user_rows: Dict[str, List[int]] = {}
+        self._loaded_at = float("-inf")
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        """载入 updated_at 晚于上次载入的行（调用方持有锁）；重复载入的行原位覆盖。"""
+        rows = self._conn.execute(
+            "SELECT review_id, user_id, vector, shape, distance_m, ascent_m, start_lat, start_lon, updated_at "
+            "FROM trip_fingerprints WHERE updated_at > ? ORDER BY updated_at",
+            (self._loaded_at - REFRESH_OVERLAP,),
+        ).fetchall()
+        for review_id, user_id, vector, shape, distance_m, ascent_m, start_lat, start_lon, updated_at in rows:
+            self._put(
+                review_id,
+                user_id,
+                TrackFingerprint(
+                    vector=np.frombuffer(vector, dtype=np.float32),
+                    shape=np.frombuffer(shape, dtype=np.float32).reshape(SHAPE_POINTS, 2),
+                    distance_m=distance_m,
+                    ascent_m=ascent_m,
+                    start_lat=start_lat,
+                    start_lon=start_lon,
+                ),
+            )
+            self._loaded_at = max(self._loaded_at, updated_at)
+
+    def __len__(self) -> int:
+        return len(self._trips)
+
+    def _put(self, review_id: str, user_id: str, fp: TrackFingerprint):
+        """写入内存矩阵：已有的 review_id 原位覆盖，矩阵按容量倍增。"""
+        row = self._rows.get(review_id)
+        if row is None:
+            row = len(self._trips)
+            if row == len(self._vectors):
+                self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+                self._shapes = np.concatenate([self._shapes, np.zeros_like(self._shapes)])
+            self._rows[review_id] = row
+            self._trips.append({})
+        else:
+            self._user_rows[self._trips[row]["user_id"]].remove(row)
+        self._user_rows.setdefault(user_id, []).append(row)
+        self._vectors[row] = fp.vector
+        self._shapes[row] = fp.shape
+        self._trips[row] = {
+            "review_id": review_id,
+            "user_id": user_id,
+            "distance_km": round(fp.distance_m / 1000, 2),
+            "ascent_m": round(fp.ascent_m),
+            "start_lat": fp.start_lat,
+            "start_lon": fp.start_lon,
+        }
+
+    def add(self, review_id: str, user_id: str, track: Track) -> bool:
+        """
+        写入一次徒步的指纹，同一 review_id 重复写入时覆盖。
+
+        Args:
+            review_id: 复盘 ID
+            user_id: 用户 ID
+            track: 轨迹
+
+        Returns:
+            是否写入（轨迹太短时不写入）
+        """
+        fp = fingerprint(track)
+        if fp is None:
+            return False
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO trip_fingerprints "
+                "(review_id, user_id, vector, shape, distance_m, ascent_m, start_lat, start_lon, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    review_id,
+                    user_id,
+                    fp.vector.tobytes(),
+                    fp.shape.tobytes(),
+                    fp.distance_m,
+                    fp.ascent_m,
+                    fp.start_lat,
+                    fp.start_lon,
+                    time.time(),
+                ),
+            )
+            self._put(review_id, user_id, fp)
+        return True
+
+    def search(
+        self,
+        vector: np.ndarray,
+        k: int = 10,
+        columns: Optional[Sequence[int]] = None,
+        user_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        按指纹欧氏距离检索 k 近邻，正向和反向指纹取较近者。检索前先载入其他进程新写入的记录。
+
+        Args:
+            vector: 查询指纹
+            k: 返回条数
+            columns: 只比较这些分量（部分指纹，见 plan_fingerprint）
+            user_id: 只检索该用户的记录（可选）
+
+        Returns:
+            徒步记录列表（带 distance），按距离升序
+        """
+        queries = np.stack([vector, reverse_fingerprint(vector)]).astype(np.float32)
+        with self._lock:
+            self._refresh()
+            if user_id is None:
+                rows = np.arange(len(self._trips))
+                matrix = self._vectors[: len(rows)]
+            else:
+                rows = np.array(self._user_rows.get(user_id, []), dtype=np.int64)
+                matrix = self._vectors[rows]
+            if not len(rows):
+                return []
+            if columns is not None:
+                matrix = matrix[:, columns]
+                queries = queries[:, columns]
+            # 直接对差值求平方和：位置分量数值很大，展开成内积会在 float32 下抵消掉精度
+            diff = matrix - queries[0]
+            forward = np.einsum("ij,ij->i", diff, diff)
+            diff = matrix - queries[1]
+            distance = np.sqrt(np.minimum(forward, np.einsum("ij,ij->i", diff, diff)))
+            k = min(k, len(rows))
+            top = np.argpartition(distance, k - 1)[:k]
+            top = top[np.argsort(distance[top])]
+            return [
+                {**self._trips[rows[i]], "row": int(rows[i]), "distance": round(float(distance[i]), 3)}
+                for i in top
+            ]
+
+    def similar_to_plan(
+        self,
+        lat: float,
+        lon: float,
+        distance_km: Optional[float] = None,
+        ascent_m: Optional[float] = None,
+        k: int = 5,
+        user_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        与计划路线（起点、里程、爬升）相似的历史徒步。
+
+        Args:
+            lat: 起点纬度
+            lon: 起点经度
+            distance_km: 计划里程（可选）
+            ascent_m: 计划爬升（可选）
+            k: 返回条数
+            user_id: 只检索该用户的记录（可选）
+
+        Returns:
+            徒步记录列表，按距离升序
+        """
+        vector, columns = plan_fingerprint(lat, lon, distance_km, ascent_m)
+        hits = self.search(vector, k=k, columns=columns, user_id=user_id)
+        for hit in hits:
+            hit.pop("row")
+        return hits
+
+    def match_track(self, track: Track, k: int = 5, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        与给定轨迹最接近的历史徒步：指纹检索候选后按离散 Fréchet 距离重排序。
+
+        Args:
+            track: 轨迹
+            k: 返回条数
+            user_id: 只检索该用户的记录（可选）
+
+        Returns:
+            徒步记录列表（带 frechet_m，正反两个方向取较小者），按 Fréchet 距离升序
+        """
+        fp = fingerprint(track)
+        if fp is None:
+            return []
+        hits = self.search(fp.vector, k=max(k, self.candidates), user_id=user_id)
+        if not hits:
+            return []
+        with self._lock:
+            shapes = self._shapes[[hit.pop("row") for hit in hits]]
+        # 反向比较等价于把候选轨迹倒序，两个方向合并为一次计算
+        values = frechet_many(fp.shape, np.concatenate([shapes, shapes[:, ::-1]])).reshape(2, -1).min(axis=0)
+        for hit, value in zip(hits, values):
+            hit["frechet_m"] = round(float(value), 1)
+        return sorted(hits, key=lambda hit: hit["frechet_m"])[:k]
+
+    def close(self):
+        """关闭数据库连接。"""
+        with self._lock:
+            self._conn.close()
+
+
+_trip_index: Optional[TripIndex] = None
+_trip_index_lock = threading.Lock()
+
+
+def get_trip_index() -> TripIndex:
+    """
+    获取进程内共享的徒步指纹索引。
+
+    Returns:
+        TripIndex 实例
+    """
+    global _trip_index
+    with _trip_index_lock:
+        if _trip_index is None:
+            index_config = load_config().get("trip_index", {})
+            _trip_index = TripIndex(
+                index_config.get("path", "./data/trip_index.sqlite"),
+                candidates=index_config.get("candidates", 32),
+            )
+            logger.info(f"徒步指纹索引: {_trip_index.path}，记录 {len(_trip_index)}")
+    return _trip_index
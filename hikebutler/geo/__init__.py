@@ -0,0 +1 @@
+"""地理数据处理模块"""
@@ -0,0 +1,233 @@
+"""
+数字高程模型（DEM）
+
+以内存映射方式打开本地 DEM 瓦片，只读取实际访问到的页面，一个 1° SRTM 瓦片（3601×3601，约 25 MB）
+不需要整体载入内存：
+- HGT（SRTM）：大端 int16，文件名给出西南角（如 N39E116.hgt），格点配准，第 0 行为北边界；
+- GeoTIFF：需要安装 tifffile，且必须是未压缩的单波段影像（压缩影像先用 gdal_translate -co COMPRESS=NONE 转换）。
+
+radial_sweep 从一个点向四周等角度发射射线，沿射线采样高程，同时得到：
+- 可视域：从该点能看到的格网（视线互易，近似为从这些格网能看到该点）；
+- 天际线：每个方位上地形遮挡的最大仰角。
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple, Union
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371008.8
+# 大气折射系数，视线弯曲使远处地形的表观下沉减少约 13%
+REFRACTION_COEFFICIENT = 0.13
+METERS_PER_DEGREE = 111320.0
+_HGT_NAME = re.compile(r"^([NS])(\d{1,2})([EW])(\d{1,3})", re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class Dem:
+    """规则经纬度格网上的高程，第 0 行、第 0 列为西北角格点。"""
+
+    data: np.ndarray  # 形状 (行, 列)，通常是 np.memmap
+    north: float  # 第 0 行格点纬度
+    west: float  # 第 0 列格点经度
+    dlat: float  # 行间距（度）
+    dlon: float  # 列间距（度）
+    nodata: Optional[float] = None
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.data.shape
+
+    def rowcol(self, lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+        """经纬度对应的最近格点行列号（可能越界）。"""
+        rows = np.rint((self.north - np.asarray(lat, dtype=np.float64)) / self.dlat).astype(np.int64)
+        cols = np.rint((np.asarray(lon, dtype=np.float64) - self.west) / self.dlon).astype(np.int64)
+        return rows, cols
+
+    def sample(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """
+        读取格点高程，越界或无数据的格点为 NaN。
+
+        Args:
+            rows: 行号数组
+            cols: 列号数组
+
+        Returns:
+            高程数组（米）
+        """
+        inside = (rows >= 0) & (rows < self.shape[0]) & (cols >= 0) & (cols < self.shape[1])
+        values = np.full(np.shape(rows), np.nan)
+        values[inside] = self.data[rows[inside], cols[inside]]
+        if self.nodata is not None:
+            values[values == self.nodata] = np.nan
+        return values
+
+    def elevation(self, lat, lon) -> np.ndarray:
+        """经纬度处的高程（最近格点）。"""
+        return self.sample(*self.rowcol(lat, lon))
+
+
+def open_dem(path: Union[str, Path]) -> Dem:
+    """
+    以内存映射方式打开 DEM 瓦片。
+
+    Args:
+        path: .hgt 或 .tif/.tiff 文件路径
+
+    Returns:
+        Dem
+
+    Raises:
+        ValueError: 文件格式不支持
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".hgt":
+        return _open_hgt(path)
+    if suffix in (".tif", ".tiff"):
+        return _open_geotiff(path)
+    raise ValueError(f"不支持的 DEM 格式: {path.name}")
+
+
+def _open_hgt(path: Path) -> Dem:
+    match = _HGT_NAME.match(path.stem)
+    if not match:
+        raise ValueError(f"HGT 文件名应为 N39E116.hgt 的形式: {path.name}")
+    size = int(math.isqrt(path.stat().st_size // 2))
+    if size * size * 2 != path.stat().st_size:
+        raise ValueError(f"HGT 文件大小不是正方形格网: {path.name}")
+    lat = int(match.group(2)) * (1 if match.group(1).upper() == "N" else -1)
+    lon = int(match.group(4)) * (1 if match.group(3).upper() == "E" else -1)
+    step = 1.0 / (size - 1)
+    data = np.memmap(path, dtype=">i2", mode="r", shape=(size, size))
+    return Dem(data=data, north=lat + 1.0, west=float(lon), dlat=step, dlon=step, nodata=-32768)
+
+
+def _open_geotiff(path: Path) -> Dem:
+    # 需要安装 tifffile
+    import tifffile
+
+    with tifffile.TiffFile(path) as tif:
+        page = tif.pages[0]
+        scale = page.tags["ModelPixelScaleTag"].value
+        tiepoint = page.tags["ModelTiepointTag"].value
+        nodata_tag = page.tags.get("GDAL_NODATA")
+        nodata = float(str(nodata_tag.value).strip("\x00 ")) if nodata_tag is not None else None
+    try:
+        data = tifffile.memmap(path, mode="r")
+    except ValueError as e:
+        raise ValueError(f"GeoTIFF 无法内存映射（需要未压缩的单波段影像）: {path.name}, {e}") from e
+    i, j, _, x, y, _ = tiepoint[:6]
+    dlon, dlat = float(scale[0]), float(scale[1])
+    # 默认 PixelIsArea：控制点对应像元 (i, j) 的左上角，格点取像元中心
+    return Dem(
+        data=data,
+        north=float(y) + (float(j) - 0.5) * dlat,
+        west=float(x) - (float(i) - 0.5) * dlon,
+        dlat=dlat,
+        dlon=dlon,
+        nodata=nodata,
+    )
+
+
+@dataclass(slots=True)
+class Sweep:
+    """一次径向扫描的结果。"""
+
+    visible: np.ndarray  # 以中心点为中心的布尔窗口，形状 (2*half_rows+1, 2*half_cols+1)
+    north: float  # 窗口第 0 行格点纬度
+    west: float  # 窗口第 0 列格点经度
+    dlat: float
+    dlon: float
+    elevation_m: float  # 中心点地面高程
+    horizon_deg: np.ndarray  # 各方位（正北顺时针，等分）地形遮挡的最大仰角
+
+
+def radial_sweep(
+    dem: Dem,
+    lat: float,
+    lon: float,
+    radius_m: float = 30000.0,
+    observer_height_m: float = 2.0,
+    target_height_m: float = 1.7,
+    azimuth_bins: int = 360,
+    ray_block: int = 256,
+) -> Sweep:
+    """
+    从 (lat, lon) 径向扫描可视域和天际线，考虑地球曲率和大气折射。
+
+    每条射线按格网间距采样，采样点的仰角不低于其前方所有采样点地形仰角的最大值时可见；
+    射线数取半径处周长上的格点数，保证半径内每个格网至少被一条射线经过。
+
+    Args:
+        dem: 高程模型
+        lat: 中心点纬度
+        lon: 中心点经度
+        radius_m: 扫描半径（米）
+        observer_height_m: 中心点上方的观察高度
+        target_height_m: 目标格网上方的高度（徒步者视线高度）
+        azimuth_bins: 天际线的方位分段数
+        ray_block: 每批计算的射线数（控制内存占用）
+
+    Returns:
+        Sweep
+    """
+    cell_y = dem.dlat * METERS_PER_DEGREE
+    cell_x = dem.dlon * METERS_PER_DEGREE * math.cos(math.radians(lat))
+    step = min(cell_x, cell_y)
+    n_steps = max(1, int(math.ceil(radius_m / step)))
+    n_rays = max(azimuth_bins, int(math.ceil(2 * math.pi * n_steps)))
+    half_rows = int(math.ceil(radius_m / cell_y))
+    half_cols = int(math.ceil(radius_m / cell_x))
+
+    center_row, center_col = dem.rowcol(lat, lon)
+    center_row, center_col = int(center_row), int(center_col)
+    ground = float(dem.sample(np.array([center_row]), np.array([center_col]))[0])
+    if not np.isfinite(ground):
+        raise ValueError(f"中心点不在 DEM 范围内或无数据: ({lat}, {lon})")
+    eye = ground + observer_height_m
+
+    distance = step * np.arange(1, n_steps + 1, dtype=np.float64)
+    drop = distance**2 / (2 * EARTH_RADIUS_M) * (1 - REFRACTION_COEFFICIENT)
+    visible = np.zeros((2 * half_rows + 1, 2 * half_cols + 1), dtype=bool)
+    visible[half_rows, half_cols] = True
+    horizon = np.full(n_rays, -np.inf)
+
+    for start in range(0, n_rays, ray_block):
+        azimuth = 2 * np.pi * np.arange(start, min(n_rays, start + ray_block)) / n_rays
+        # 窗口内的行列偏移（北为行号减小）
+        d_rows = np.rint(-np.cos(azimuth)[:, None] * distance / cell_y).astype(np.int64)
+        d_cols = np.rint(np.sin(azimuth)[:, None] * distance / cell_x).astype(np.int64)
+        heights = dem.sample(center_row + d_rows, center_col + d_cols)
+        terrain = (heights - drop - eye) / distance
+        target = (heights + target_height_m - drop - eye) / distance
+        blocking = np.where(np.isfinite(terrain), terrain, -np.inf)
+        # 每个采样点之前（不含自身）地形仰角的最大值
+        ahead = np.maximum.accumulate(blocking, axis=1)
+        ahead = np.concatenate([np.full((len(azimuth), 1), -np.inf), ahead[:, :-1]], axis=1)
+        seen = (target >= ahead) & np.isfinite(target)
+        inside = (np.abs(d_rows) <= half_rows) & (np.abs(d_cols) <= half_cols)
+        seen &= inside
+        visible[half_rows + d_rows[seen], half_cols + d_cols[seen]] = True
+        horizon[start:start + len(azimuth)] = blocking.max(axis=1)
+
+    # 射线按方位分段取最大仰角
+    bins = (np.arange(n_rays) * azimuth_bins) // n_rays
+    horizon_bins = np.full(azimuth_bins, -np.inf)
+    np.maximum.at(horizon_bins, bins, horizon)
+    horizon_deg = np.degrees(np.arctan(horizon_bins))
+
+    return Sweep(
+        visible=visible,
+        north=dem.north - (center_row - half_rows) * dem.dlat,
+        west=dem.west + (center_col - half_cols) * dem.dlon,
+        dlat=dem.dlat,
+        dlon=dem.dlon,
+        elevation_m=ground,
+        horizon_deg=horizon_deg,
+    )
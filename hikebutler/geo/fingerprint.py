@@ -0,0 +1,204 @@
+"""
+轨迹指纹
+
+两两比较 GPX 轨迹（DTW、Fréchet 距离）是平方复杂度，不适合在全部历史记录上逐一计算。
+每条轨迹先压缩成定长指纹向量，欧氏距离近似轨迹差异，k 近邻检索后只对前几名候选做精确比较：
+- 海拔剖面：按里程等分重采样 PROFILE_BINS 个点，减去均值，按 PROFILE_SCALE_M 缩放（差 1 表示均方根相差约 200 米）；
+- 位置：起点、终点、中心点的地心单位向量乘以地球半径、除以 POSITION_SCALE_M（差 1 表示相距约 2 公里）；
+- 统计：里程、爬升、下降取对数（差 1 表示相差约 1.5 倍），平均海拔按 ELEVATION_SCALE_M 缩放。
+shape 是按里程等分的 SHAPE_POINTS 个轨迹点，供 frechet_many 精确重排序。
+反向走的同一条路线用 reverse_fingerprint 匹配。
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from hikebutler.geo.dem import METERS_PER_DEGREE
+from hikebutler.geo.track import EARTH_RADIUS_M, Track, compute_stats, segment_lengths
+
+PROFILE_BINS = 32
+SHAPE_POINTS = 64
+PROFILE_SCALE_M = 200.0
+POSITION_SCALE_M = 2000.0
+ELEVATION_SCALE_M = 300.0
+RATIO_SCALE = float(np.log(1.5))
+
+# 指纹各分量在向量中的位置
+GROUPS: Dict[str, slice] = {
+    "profile": slice(0, PROFILE_BINS),
+    "start": slice(PROFILE_BINS, PROFILE_BINS + 3),
+    "end": slice(PROFILE_BINS + 3, PROFILE_BINS + 6),
+    "center": slice(PROFILE_BINS + 6, PROFILE_BINS + 9),
+    "distance": slice(PROFILE_BINS + 9, PROFILE_BINS + 10),
+    "ascent": slice(PROFILE_BINS + 10, PROFILE_BINS + 11),
+    "descent": slice(PROFILE_BINS + 11, PROFILE_BINS + 12),
+    "elevation": slice(PROFILE_BINS + 12, PROFILE_BINS + 13),
+}
+DIM = PROFILE_BINS + 13
+
+
+@dataclass(slots=True)
+class TrackFingerprint:
+    """一条轨迹的指纹。"""
+
+    vector: np.ndarray  # 形状 (DIM,)，float32
+    shape: np.ndarray  # 形状 (SHAPE_POINTS, 2)，按里程等分的 (纬度, 经度)，float32
+    distance_m: float
+    ascent_m: float
+    start_lat: float
+    start_lon: float
+
+
+def _unit_vectors(lat, lon) -> np.ndarray:
+    """经纬度转地心单位向量，形状 (..., 3)。"""
+    lat_r, lon_r = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat_r) * np.cos(lon_r), np.cos(lat_r) * np.sin(lon_r), np.sin(lat_r)], axis=-1)
+
+
+def _position(lat: float, lon: float) -> np.ndarray:
+    return _unit_vectors(lat, lon) * (EARTH_RADIUS_M / POSITION_SCALE_M)
+
+
+def _log_ratio(value: float, floor: float) -> float:
+    return float(np.log(max(value, 0.0) + floor) / RATIO_SCALE)
+
+
+def fingerprint(track: Track) -> Optional[TrackFingerprint]:
+    """
+    计算轨迹指纹。没有海拔的轨迹海拔剖面为平直、平均海拔为 0。
+
+    Args:
+        track: 轨迹
+
+    Returns:
+        TrackFingerprint，少于 2 个点时返回 None
+    """
+    stats = compute_stats(track)
+    if stats is None or len(track) < 2:
+        return None
+    distance = np.concatenate([[0.0], np.cumsum(segment_lengths(track.lat, track.lon))])
+    if distance[-1] <= 0:
+        return None
+
+    stations = np.linspace(0.0, distance[-1], SHAPE_POINTS)
+    lat = np.interp(stations, distance, track.lat)
+    lon = np.interp(stations, distance, track.lon)
+    center = _unit_vectors(lat, lon).mean(axis=0)
+
+    valid = np.isfinite(track.ele)
+    profile = np.zeros(PROFILE_BINS)
+    mean_elevation = 0.0
+    if valid.any():
+        ele = np.interp(np.linspace(0.0, distance[-1], PROFILE_BINS), distance[valid], track.ele[valid])
+        mean_elevation = float(ele.mean())
+        profile = (ele - mean_elevation) / (PROFILE_SCALE_M * np.sqrt(PROFILE_BINS))
+
+    vector = np.empty(DIM)
+    vector[GROUPS["profile"]] = profile
+    vector[GROUPS["start"]] = _position(track.lat[0], track.lon[0])
+    vector[GROUPS["end"]] = _position(track.lat[-1], track.lon[-1])
+    vector[GROUPS["center"]] = center / np.linalg.norm(center) * (EARTH_RADIUS_M / POSITION_SCALE_M)
+    vector[GROUPS["distance"]] = _log_ratio(stats.distance_m, 100.0)
+    vector[GROUPS["ascent"]] = _log_ratio(stats.ascent_m, 100.0)
+    vector[GROUPS["descent"]] = _log_ratio(stats.descent_m, 100.0)
+    vector[GROUPS["elevation"]] = mean_elevation / ELEVATION_SCALE_M
+    return TrackFingerprint(
+        vector=vector.astype(np.float32),
+        shape=np.stack([lat, lon], axis=1).astype(np.float32),
+        distance_m=stats.distance_m,
+        ascent_m=stats.ascent_m,
+        start_lat=float(track.lat[0]),
+        start_lon=float(track.lon[0]),
+    )
+
+
+def reverse_fingerprint(vector: np.ndarray) -> np.ndarray:
+    """
+    反向行走同一条轨迹时的指纹：海拔剖面倒序、起终点互换、爬升与下降互换。
+
+    Args:
+        vector: 指纹向量（最后一维为 DIM）
+
+    Returns:
+        新的指纹向量
+    """
+    reversed_vector = np.array(vector, copy=True)
+    reversed_vector[..., GROUPS["profile"]] = vector[..., GROUPS["profile"]][..., ::-1]
+    reversed_vector[..., GROUPS["start"]] = vector[..., GROUPS["end"]]
+    reversed_vector[..., GROUPS["end"]] = vector[..., GROUPS["start"]]
+    reversed_vector[..., GROUPS["ascent"]] = vector[..., GROUPS["descent"]]
+    reversed_vector[..., GROUPS["descent"]] = vector[..., GROUPS["ascent"]]
+    return reversed_vector
+
+
+def plan_fingerprint(
+    lat: float,
+    lon: float,
+    distance_km: Optional[float] = None,
+    ascent_m: Optional[float] = None,
+) -> Tuple[np.ndarray, List[int]]:
+    """
+    只有起点和里程、爬升的计划路线的部分指纹。
+
+    Args:
+        lat: 起点纬度
+        lon: 起点经度
+        distance_km: 计划里程（可选）
+        ascent_m: 计划爬升（可选）
+
+    Returns:
+        (指纹向量, 参与比较的分量下标)
+    """
+    vector = np.zeros(DIM)
+    vector[GROUPS["start"]] = _position(lat, lon)
+    groups = ["start"]
+    if distance_km is not None:
+        vector[GROUPS["distance"]] = _log_ratio(distance_km * 1000.0, 100.0)
+        groups.append("distance")
+    if ascent_m is not None:
+        vector[GROUPS["ascent"]] = _log_ratio(ascent_m, 100.0)
+        groups.append("ascent")
+    columns = [i for name in groups for i in range(DIM)[GROUPS[name]]]
+    return vector.astype(np.float32), columns
+
+
+def frechet_many(query: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """
+    查询轨迹与多条候选轨迹的离散 Fréchet 距离，动态规划沿反对角线推进，所有候选一次计算。
+
+    Args:
+        query: 形状 (n, 2) 的 (纬度, 经度)
+        candidates: 形状 (k, m, 2) 的 (纬度, 经度)
+
+    Returns:
+        形状 (k,) 的距离（米），以查询轨迹中心做等距圆柱投影
+    """
+    query = np.asarray(query, dtype=np.float64)
+    candidates = np.asarray(candidates, dtype=np.float64)
+    k, m = candidates.shape[:2]
+    n = len(query)
+    if not k:
+        return np.empty(0)
+    # 以查询轨迹中心为原点投影到米后转为 float32；Fréchet 距离只比较大小，动态规划在距离平方上进行，最后再开方
+    origin = query.mean(axis=0)
+    scale = np.array([1.0, np.cos(np.radians(origin[0]))]) * METERS_PER_DEGREE
+    query = ((query - origin) * scale).astype(np.float32)
+    candidates = ((candidates - origin) * scale).astype(np.float32)
+    dx = query[None, :, None, 0] - candidates[:, None, :, 0]
+    dy = query[None, :, None, 1] - candidates[:, None, :, 1]
+    dx *= dx
+    dy *= dy
+    dx += dy
+    flipped = dx[:, :, ::-1]  # (k, n, m)，第 s 条反对角线 cost[:, i, s - i] 是它的一条对角线
+
+    # prev1、prev2 为前两条反对角线上的累计值，按 i 存放且整体后移一位，第 0 位表示 i = -1
+    prev1 = np.full((k, n + 1), np.inf, dtype=np.float32)
+    prev2 = np.full((k, n + 1), np.inf, dtype=np.float32)
+    prev2[:, 0] = 0.0
+    for s in range(n + m - 1):
+        lo, hi = max(0, s - m + 1), min(s, n - 1) + 1
+        best = np.minimum(np.minimum(prev1[:, lo:hi], prev1[:, lo + 1:hi + 1]), prev2[:, lo:hi])
+        current = np.full((k, n + 1), np.inf, dtype=np.float32)
+        current[:, lo + 1:hi + 1] = np.maximum(np.diagonal(flipped, m - 1 - s, axis1=1, axis2=2), best)
+        prev1, prev2 = current, prev1
+    return np.sqrt(prev1[:, n].astype(np.float64))
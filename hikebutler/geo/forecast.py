@@ -0,0 +1,465 @@
+"""
+天气预报处理
+
+把 Windy 点预报（7 天，每 1~3 小时一个时刻）载入 numpy 数组，按徒步时段切片，按路线海拔分带估算气温，
+并向量化计算危险指标（0~1，越大越危险）：
+- wind_chill：风寒体感温度（加拿大环境部/NWS 公式，气温 ≤ 10°C 且风速 > 4.8 km/h 时生效）；
+- thunderstorm：雷暴概率的代理值，由对流有效位能（CAPE）和对流降水估计；
+- precipitation：时段内平均每天的累计降水量；
+- freezing_level：由各气压层的位势高度和气温插值出 0°C 层高度，与路线最高点比较；
+- wind：最大阵风。
+
+结果是给装备节点和融合节点使用的紧凑摘要，原始预报 JSON 只以 blob 句柄保存。
+"""
+
+import math
+import re
+from dataclasses import dataclass, fields
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Windy 点预报请求的参数和气压层（响应键为 "<参数>-<层>"，如 temp-850h）
+WINDY_PARAMETERS = ("temp", "wind", "windGust", "precip", "convPrecip", "cape", "lclouds", "mclouds", "hclouds", "gh")
+WINDY_LEVELS = ("surface", "1000h", "950h", "925h", "900h", "850h", "800h", "700h", "600h", "500h")
+
+_DAY_WORDS = {"一": 1, "两": 2, "二": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7}
+
+ZERO_C = 273.15
+# 标准大气气温递减率（°C/m），没有分层数据时用于按海拔修正气温
+LAPSE_RATE = 0.0065
+
+
+@dataclass(slots=True)
+class Forecast:
+    """点预报的时间序列，分层数据按高度升序排列。"""
+
+    ts: np.ndarray  # Unix 时间戳（秒），形状 (T,)
+    temp_c: np.ndarray  # 地面气温
+    wind_ms: np.ndarray  # 地面风速
+    gust_ms: np.ndarray  # 阵风
+    precip_mm: np.ndarray  # 每个时刻之前一个步长内的降水
+    conv_precip_mm: np.ndarray  # 其中的对流降水
+    cape: np.ndarray  # 对流有效位能（J/kg）
+    cloud_pct: np.ndarray  # 低、中、高云量的最大值
+    level_height_m: np.ndarray  # 各气压层位势高度，形状 (L, T)
+    level_temp_c: np.ndarray  # 各气压层气温，形状 (L, T)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def take(self, index: np.ndarray) -> "Forecast":
+        """
+        按时间轴取子集。
+
+        Args:
+            index: 布尔掩码或下标数组
+
+        Returns:
+            新的 Forecast
+        """
+        return Forecast(
+            **{
+                f.name: getattr(self, f.name)[..., index]
+                for f in fields(self)
+            }
+        )
+
+
+def _series(data: Dict[str, Any], key: str, n: int) -> np.ndarray:
+    """读取一个时间序列，缺失的键或值为 NaN。"""
+    values = data.get(key)
+    if values is None:
+        return np.full(n, np.nan)
+    return np.fromiter((np.nan if v is None else v for v in values), dtype=np.float64, count=n)
+
+
+def parse_windy(payload: Dict[str, Any]) -> Forecast:
+    """
+    解析 Windy 点预报响应（可以包在 "data" 键下）。
+
+    Args:
+        payload: 响应 JSON
+
+    Returns:
+        Forecast
+    """
+    data = payload.get("data", payload)
+    ts = np.asarray(data.get("ts") or [], dtype=np.float64) / 1000.0
+    n = len(ts)
+
+    heights, temps = [], []
+    for level in WINDY_LEVELS[1:]:
+        if f"gh-{level}" in data and f"temp-{level}" in data:
+            heights.append(_series(data, f"gh-{level}", n))
+            temps.append(_series(data, f"temp-{level}", n) - ZERO_C)
+    level_height = np.vstack(heights) if heights else np.empty((0, n))
+    level_temp = np.vstack(temps) if temps else np.empty((0, n))
+    if len(heights) > 1:
+        order = np.argsort(np.nanmean(level_height, axis=1))
+        level_height, level_temp = level_height[order], level_temp[order]
+
+    clouds = np.vstack([_series(data, f"{name}-surface", n) for name in ("lclouds", "mclouds", "hclouds")])
+    with np.errstate(invalid="ignore"):
+        cloud = np.where(np.isnan(clouds).all(axis=0), np.nan, np.nanmax(np.nan_to_num(clouds, nan=-1), axis=0))
+
+    return Forecast(
+        ts=ts,
+        temp_c=_series(data, "temp-surface", n) - ZERO_C,
+        wind_ms=np.hypot(_series(data, "wind_u-surface", n), _series(data, "wind_v-surface", n)),
+        gust_ms=_series(data, "gust-surface", n),
+        precip_mm=_series(data, "past3hprecip-surface", n) * 1000.0,
+        conv_precip_mm=_series(data, "past3hconvprecip-surface", n) * 1000.0,
+        cape=_series(data, "cape-surface", n),
+        cloud_pct=cloud,
+        level_height_m=level_height,
+        level_temp_c=level_temp,
+    )
+
+
+def hike_days(duration: str, duration_h: Optional[float] = None) -> Tuple[int, Optional[float]]:
+    """
+    由徒步时长估算天数和每天的行进小时数。
+
+    Args:
+        duration: 用户选择的时长，如 "半天"、"一天"、"两天"、"三天以上"、"3天"
+        duration_h: 路线规划给出的行进时间（小时）
+
+    Returns:
+        (天数, 每天行进小时数)，小时数为 None 时使用配置的每天时段
+    """
+    duration = duration or ""
+    if "半天" in duration:
+        return 1, 5.0
+    match = re.search(r"(\d+)\s*天", duration)
+    if match:
+        return max(1, int(match.group(1))), None
+    for word, days in _DAY_WORDS.items():
+        if f"{word}天" in duration:
+            return days, None
+    if duration_h:
+        return 1, min(float(duration_h), 12.0)
+    return 1, None
+
+
+def hike_start_date(value: Any, tz: str = "Asia/Shanghai") -> date:
+    """
+    徒步开始日期。
+
+    Args:
+        value: date 或 ISO 格式字符串
+        tz: 时区
+
+    Returns:
+        开始日期，未指定或无法解析时为当地明天
+    """
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            logger.warning(f"无法解析徒步日期: {value}")
+    return datetime.now(ZoneInfo(tz)).date() + timedelta(days=1)
+
+
+def hike_windows(
+    start: date,
+    days: int,
+    start_hour: float,
+    end_hour: float,
+    tz: str = "Asia/Shanghai",
+) -> List[Tuple[float, float]]:
+    """
+    徒步的逐日时段（只包含白天的行进时间）。
+
+    Args:
+        start: 第一天
+        days: 天数
+        start_hour: 每天出发时刻（当地时间，小时）
+        end_hour: 每天结束时刻（当地时间，小时）
+        tz: 时区
+
+    Returns:
+        [(开始时间戳, 结束时间戳)] 列表
+    """
+    zone = ZoneInfo(tz)
+    windows = []
+    for offset in range(max(1, days)):
+        midnight = datetime.combine(start + timedelta(days=offset), time(), tzinfo=zone).timestamp()
+        windows.append((midnight + start_hour * 3600, midnight + end_hour * 3600))
+    return windows
+
+
+def select_windows(forecast: Forecast, windows: Sequence[Tuple[float, float]]) -> Forecast:
+    """
+    取落在任一时段内的预报时刻。
+
+    Args:
+        forecast: 预报
+        windows: [(开始时间戳, 结束时间戳)]
+
+    Returns:
+        切片后的预报
+    """
+    bounds = np.asarray(windows, dtype=np.float64).reshape(-1, 2)
+    ts = forecast.ts[:, None]
+    mask = ((ts >= bounds[:, 0]) & (ts <= bounds[:, 1])).any(axis=1)
+    return forecast.take(mask)
+
+
+def temperature_at(
+    forecast: Forecast,
+    elevations: Sequence[float],
+    reference_elevation: Optional[float] = None,
+) -> np.ndarray:
+    """
+    估算各海拔的气温：在气压层的位势高度上线性插值（超出范围时按相邻两层外推），
+    没有分层数据时按标准递减率从地面气温修正。
+
+    Args:
+        forecast: 预报
+        elevations: 海拔（米）
+        reference_elevation: 地面气温对应的海拔，默认取 elevations 的最小值
+
+    Returns:
+        形状 (海拔数, T) 的气温
+    """
+    elev = np.asarray(elevations, dtype=np.float64)[:, None]
+    reference = float(elev.min()) if reference_elevation is None else reference_elevation
+    fallback = forecast.temp_c[None, :] - LAPSE_RATE * (elev - reference)
+
+    h, t = forecast.level_height_m, forecast.level_temp_c
+    if h.shape[0] < 2:
+        return fallback
+    columns = np.arange(h.shape[1])
+    # 每个海拔、每个时刻所在的层区间 [lo, hi]
+    hi = np.clip((h[None, :, :] <= elev[:, :, None]).sum(axis=1), 1, h.shape[0] - 1)
+    lo = hi - 1
+    h_lo, h_hi = h[lo, columns], h[hi, columns]
+    t_lo, t_hi = t[lo, columns], t[hi, columns]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        interpolated = t_lo + (elev - h_lo) / (h_hi - h_lo) * (t_hi - t_lo)
+    return np.where(np.isfinite(interpolated), interpolated, fallback)
+
+
+def freezing_level(forecast: Forecast, reference_elevation: Optional[float] = None) -> np.ndarray:
+    """
+    0°C 层高度：自下而上第一个气温 ≤ 0°C 的气压层与其下一层之间线性插值。
+
+    Args:
+        forecast: 预报
+        reference_elevation: 没有分层数据时，地面气温对应的海拔
+
+    Returns:
+        形状 (T,) 的高度（米），无法估算时为 NaN
+    """
+    h, t = forecast.level_height_m, forecast.level_temp_c
+    if h.shape[0] < 2:
+        if reference_elevation is None:
+            return np.full(len(forecast), np.nan)
+        return reference_elevation + forecast.temp_c / LAPSE_RATE
+
+    columns = np.arange(h.shape[1])
+    cold = t <= 0
+    first = np.argmax(cold, axis=0)
+    lo = np.clip(first - 1, 0, None)
+    hi = np.where(first == 0, 1, first)
+    h_lo, h_hi = h[lo, columns], h[hi, columns]
+    t_lo, t_hi = t[lo, columns], t[hi, columns]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        crossing = h_lo + t_lo / (t_lo - t_hi) * (h_hi - h_lo)
+    # 最高层仍高于 0°C 时按递减率向上外推
+    above = h[-1] + t[-1] / LAPSE_RATE
+    return np.where(cold.any(axis=0), crossing, above)
+
+
+def wind_chill(temp_c: np.ndarray, wind_ms: np.ndarray) -> np.ndarray:
+    """
+    风寒体感温度。
+
+    Args:
+        temp_c: 气温（°C）
+        wind_ms: 风速（m/s）
+
+    Returns:
+        体感温度（°C），公式不适用时为气温本身
+    """
+    v = np.nan_to_num(wind_ms) * 3.6
+    vp = np.power(v, 0.16)
+    chill = 13.12 + 0.6215 * temp_c - 11.37 * vp + 0.3965 * temp_c * vp
+    return np.where((temp_c <= 10) & (v > 4.8), chill, temp_c)
+
+
+def thunder_probability(cape: np.ndarray, conv_precip_mm: np.ndarray) -> np.ndarray:
+    """
+    雷暴概率代理值：CAPE 300~2500 J/kg 线性映射到 0~1，有明显对流降水时至少 0.5。
+
+    Args:
+        cape: 对流有效位能（J/kg）
+        conv_precip_mm: 对流降水（mm）
+
+    Returns:
+        0~1 的概率代理值
+    """
+    probability = np.clip((np.nan_to_num(cape) - 300.0) / 2200.0, 0.0, 1.0)
+    return np.where(np.nan_to_num(conv_precip_mm) >= 0.5, np.maximum(probability, 0.5), probability)
+
+
+def _condition(precip_mm: float, temp_c: float, thunder: float, cloud: float) -> str:
+    if precip_mm >= 0.2:
+        if thunder >= 0.5:
+            return "雷阵雨"
+        return "雪" if temp_c <= 0 else "雨"
+    if math.isnan(cloud):
+        return ""
+    return "阴" if cloud >= 70 else "多云" if cloud >= 30 else "晴"
+
+
+def _finite(value: float, digits: int = 1) -> Optional[float]:
+    return round(float(value), digits) if np.isfinite(value) else None
+
+
+def _level(score: float) -> str:
+    return "高" if score >= 0.6 else "中" if score >= 0.3 else "低"
+
+
+def analyze_forecast(
+    forecast: Forecast,
+    windows: Sequence[Tuple[float, float]],
+    min_elevation: Optional[float] = None,
+    max_elevation: Optional[float] = None,
+    bands: int = 3,
+    tz: str = "Asia/Shanghai",
+) -> Optional[Dict[str, Any]]:
+    """
+    在徒步时段和路线海拔范围内汇总天气并计算危险指标。
+
+    Args:
+        forecast: 完整预报
+        windows: 徒步时段（见 hike_windows）
+        min_elevation: 路线最低海拔（米），未知时只使用地面预报
+        max_elevation: 路线最高海拔（米）
+        bands: 海拔分带数
+        tz: 时区（用于逐时刻的时间标签）
+
+    Returns:
+        {"summary", "hazards", "metrics", "hourly"}，徒步时段不在预报范围内时返回 None
+    """
+    window = select_windows(forecast, windows)
+    if not len(window):
+        return None
+
+    if min_elevation is not None and max_elevation is not None:
+        elevations = np.linspace(min_elevation, max_elevation, max(2, bands))
+        band_temp = temperature_at(window, elevations, reference_elevation=min_elevation)
+    else:
+        elevations = None
+        band_temp = window.temp_c[None, :]
+    freezing = freezing_level(window, reference_elevation=min_elevation)
+    return summarize_weather(window, band_temp, freezing, days=len(windows), elevations=elevations, tz=tz)
+
+
+def summarize_weather(
+    window: Forecast,
+    band_temp: np.ndarray,
+    freezing: np.ndarray,
+    days: int = 1,
+    elevations: Optional[np.ndarray] = None,
+    tz: str = "Asia/Shanghai",
+) -> Dict[str, Any]:
+    """
+    汇总已切片的预报并计算危险指标。
+
+    Args:
+        window: 徒步时段内的预报（风、降水、对流等取沿线最不利值）
+        band_temp: 各海拔的气温，形状 (海拔数, T)
+        freezing: 0°C 层高度，形状 (T,)
+        days: 徒步天数
+        elevations: band_temp 各行对应的海拔，None 表示只有地面气温
+        tz: 时区（用于逐时刻的时间标签）
+
+    Returns:
+        {"summary", "hazards", "metrics", "hourly"}
+    """
+    if elevations is not None:
+        elevations = np.asarray(elevations, dtype=np.float64)
+        low_temp, top_temp = band_temp[np.argmin(elevations)], band_temp[np.argmax(elevations)]
+        max_elevation = float(elevations.max())
+    else:
+        low_temp = top_temp = band_temp[0]
+        max_elevation = None
+
+    wind = window.wind_ms
+    chill = wind_chill(top_temp, wind)
+    thunder = thunder_probability(window.cape, window.conv_precip_mm)
+    days = max(1, days)
+    precip_total = float(np.nansum(window.precip_mm))
+
+    metrics = {
+        "temp_min_c": _finite(np.nanmin(band_temp)),
+        "temp_max_c": _finite(np.nanmax(low_temp)),
+        "wind_chill_min_c": _finite(np.nanmin(chill)),
+        "wind_max_ms": _finite(np.nanmax(wind)),
+        "gust_max_ms": _finite(np.nanmax(window.gust_ms)) if np.isfinite(window.gust_ms).any() else None,
+        "precip_mm": round(precip_total, 1),
+        "thunder_max": round(float(thunder.max()), 2),
+        "freezing_level_min_m": _finite(np.nanmin(freezing), 0) if np.isfinite(freezing).any() else None,
+    }
+    if max_elevation is not None:
+        metrics["route_max_elevation_m"] = round(float(max_elevation))
+
+    hazards = {
+        "precipitation": round(min(1.0, precip_total / days / 20.0), 2),
+        "thunderstorm": metrics["thunder_max"],
+    }
+    if metrics["wind_chill_min_c"] is not None:
+        hazards["wind_chill"] = round(float(np.clip(-metrics["wind_chill_min_c"] / 25.0, 0, 1)), 2)
+    gust = metrics["gust_max_ms"] if metrics["gust_max_ms"] is not None else metrics["wind_max_ms"]
+    if gust is not None:
+        hazards["wind"] = round(float(np.clip((gust - 10.0) / 10.0, 0, 1)), 2)
+    margin = None
+    if metrics["freezing_level_min_m"] is not None and max_elevation is not None:
+        margin = metrics["freezing_level_min_m"] - max_elevation
+        hazards["freezing_level"] = round(float(np.clip((300.0 - margin) / 600.0, 0, 1)), 2)
+
+    zone = ZoneInfo(tz)
+    label = "%m-%d %H:%M" if days > 1 else "%H:%M"
+    hourly = []
+    for i, ts in enumerate(window.ts):
+        hour = {
+            "time": datetime.fromtimestamp(float(ts), zone).strftime(label),
+            "condition": _condition(
+                float(np.nan_to_num(window.precip_mm[i])), float(low_temp[i]), float(thunder[i]), float(window.cloud_pct[i])
+            ),
+            "temp": _finite(low_temp[i]),
+            "wind": _finite(wind[i]),
+            "precip": round(float(np.nan_to_num(window.precip_mm[i])), 1),
+        }
+        if elevations is not None:
+            hour["temp_top"] = _finite(top_temp[i])
+        hourly.append(hour)
+
+    parts = []
+    if metrics["temp_min_c"] is not None and metrics["temp_max_c"] is not None:
+        text = f"气温 {metrics['temp_min_c']:.0f}~{metrics['temp_max_c']:.0f}°C"
+        if elevations is not None:
+            text += f"（海拔 {max_elevation:.0f} m 处最低 {np.nanmin(top_temp):.0f}°C）"
+        parts.append(text)
+    if metrics["wind_chill_min_c"] is not None and metrics["wind_chill_min_c"] < (metrics["temp_min_c"] or 0) - 1:
+        parts.append(f"体感最低 {metrics['wind_chill_min_c']:.0f}°C")
+    if gust is not None:
+        parts.append(f"最大风速 {gust:.0f} m/s")
+    parts.append(f"累计降水 {precip_total:.1f} mm" if precip_total >= 0.1 else "无明显降水")
+    if metrics["freezing_level_min_m"] is not None:
+        text = f"0°C 层最低 {metrics['freezing_level_min_m']:.0f} m"
+        if margin is not None:
+            text += f"（{'高于' if margin >= 0 else '低于'}路线最高点 {abs(margin):.0f} m）"
+        parts.append(text)
+    parts.append(f"雷暴风险{_level(hazards['thunderstorm'])}")
+
+    return {"summary": "，".join(parts), "hazards": hazards, "metrics": metrics, "hourly": hourly}
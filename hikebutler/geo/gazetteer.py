@@ -0,0 +1,255 @@
+"""
+离线地名库
+
+把自由文本地点（如“北京香山”“xiangshan”“香山公园”）解析为坐标，不调用 LLM 或远程地理编码：
+- 地名、别名、拼音规范化后（NFKC、小写、去掉空白和标点）作为键放入字典，精确命中只需一次查表；
+- 查询带行政区前缀（“北京”“北京市海淀区”）时剥离前缀再查，同名地点优先所属行政区出现在查询中的；
+- 去掉“景区”“森林公园”等通用后缀再查；
+- 仍未命中时按字符二元组倒排索引做模糊匹配（Dice 系数），只遍历与查询共享二元组的键。
+
+地名库文件为 JSON 数组或带表头的 CSV，字段见 read_places；可由 scripts/build_gazetteer.py 从 GeoNames 导出生成。
+"""
+
+import csv
+import json
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from hikebutler.config.loader import load_config
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 行政区名称的后缀，剥离前缀时同时尝试带后缀和不带后缀的写法
+ADMIN_SUFFIXES = ("特别行政区", "自治区", "自治州", "自治县", "地区", "省", "市", "区", "县", "盟", "旗")
+# 景点名称的通用后缀，“香山公园”与“香山”视为同一地点
+GENERIC_SUFFIXES = ("国家级风景名胜区", "风景名胜区", "国家森林公园", "国家地质公园", "森林公园", "国家公园", "风景区", "景区", "公园")
+
+
+@dataclass(slots=True)
+class Place:
+    """地名库中的一个地点（坐标为 WGS-84）。"""
+
+    name: str
+    lat: float
+    lon: float
+    admin: str = ""  # 所属行政区，空格分隔（如“北京市 海淀区”）
+    kind: str = ""
+    bbox: Optional[Tuple[float, float, float, float]] = None  # (min_lat, min_lon, max_lat, max_lon)
+    rank: float = 0.0  # 同名地点的优先级（人口、热度等），大者优先
+    source: str = "gazetteer"  # 坐标来源：gazetteer / remote / llm（缓存命中时保留原来源）
+
+
+def normalize(text: str) -> str:
+    """
+    规范化地名：全角转半角、小写、去掉空白和标点（“Xi'an”与“xian”相同）。
+
+    Args:
+        text: 地名
+
+    Returns:
+        规范化后的键
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return "".join(ch for ch in text if ch.isalnum())
+
+
+def _strip_suffix(key: str, suffixes: Sequence[str]) -> str:
+    for suffix in suffixes:
+        if key.endswith(suffix) and len(key) - len(suffix) >= 2:
+            return key[: -len(suffix)]
+    return key
+
+
+def _grams(key: str) -> set:
+    """字符二元组集合，单字键为其自身。"""
+    if len(key) < 2:
+        return {key}
+    return {key[i : i + 2] for i in range(len(key) - 1)}
+
+
+def read_places(path: Union[str, Path]) -> List[Tuple[Place, List[str]]]:
+    """
+    读取地名库文件。
+
+    JSON 数组的元素或 CSV 的列：name、lat、lon，可选 aliases（JSON 为列表，CSV 用 | 分隔）、pinyin、
+    admin、kind、rank，以及外包矩形（JSON 为 bbox: [min_lat, min_lon, max_lat, max_lon]，CSV 为同名四列）。
+
+    Args:
+        path: 地名库文件路径
+
+    Returns:
+        [(地点, 别名和拼音)]
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            rows: List[Dict[str, Any]] = list(csv.DictReader(f))
+        for row in rows:
+            row["aliases"] = [a for a in (row.get("aliases") or "").split("|") if a]
+            if row.get("min_lat"):
+                row["bbox"] = [row["min_lat"], row["min_lon"], row["max_lat"], row["max_lon"]]
+    else:
+        rows = json.loads(path.read_text(encoding="utf-8"))
+    entries = []
+    for row in rows:
+        bbox = row.get("bbox")
+        place = Place(
+            name=row["name"],
+            lat=float(row["lat"]),
+            lon=float(row["lon"]),
+            admin=row.get("admin") or "",
+            kind=row.get("kind") or "",
+            bbox=tuple(float(v) for v in bbox) if bbox else None,
+            rank=float(row.get("rank") or 0.0),
+        )
+        entries.append((place, list(row.get("aliases") or []) + ([row["pinyin"]] if row.get("pinyin") else [])))
+    return entries
+
+
+class Gazetteer:
+    """内存中的地名索引。"""
+
+    def __init__(self, entries: Iterable[Tuple[Place, Sequence[str]]]):
+        """
+        构建索引。
+
+        Args:
+            entries: (地点, 别名和拼音) 序列
+        """
+        self.places: List[Place] = []
+        self._exact: Dict[str, List[int]] = {}
+        self._key_place: List[int] = []
+        self._key_grams: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._admin_tokens: List[Tuple[str, ...]] = []
+        admins = set()
+        for place, aliases in entries:
+            pid = len(self.places)
+            self.places.append(place)
+            tokens = set()
+            for token in place.admin.split():
+                for variant in (normalize(token), _strip_suffix(normalize(token), ADMIN_SUFFIXES)):
+                    if len(variant) >= 2:
+                        tokens.add(variant)
+            self._admin_tokens.append(tuple(tokens))
+            admins.update(tokens)
+            keys = set()
+            for name in [place.name, *aliases]:
+                key = normalize(name)
+                if key:
+                    keys.update({key, _strip_suffix(key, GENERIC_SUFFIXES)})
+            for key in keys:
+                self._exact.setdefault(key, []).append(pid)
+                kid = len(self._key_place)
+                self._key_place.append(pid)
+                grams = _grams(key)
+                self._key_grams.append(len(grams))
+                for gram in grams:
+                    self._postings.setdefault(gram, []).append(kid)
+        self._admins = admins
+        self._admin_len = max(map(len, admins), default=0)
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "Gazetteer":
+        """
+        从地名库文件构建索引（格式见 read_places）。
+
+        Args:
+            path: 地名库文件路径
+
+        Returns:
+            Gazetteer
+        """
+        return cls(read_places(path))
+
+    def _pick(self, pids: Iterable[int], query: str) -> int:
+        """同名地点中选所属行政区出现在查询中的，其次按 rank。"""
+        return max(
+            pids,
+            key=lambda pid: (any(token in query for token in self._admin_tokens[pid]), self.places[pid].rank),
+        )
+
+    def _strip_admin(self, key: str) -> List[str]:
+        """
+        逐个剥离开头的行政区名（长者优先，“北京市”先于“北京”），剩余至少两个字符。
+
+        地名本身也可能是行政区名（“黄山”与“黄山市”），因此返回每一步的剩余部分，从未剥离的开始。
+        """
+        remainders = [key]
+        length = min(self._admin_len, len(key) - 2)
+        while length >= 2:
+            if key[:length] in self._admins:
+                key = key[length:]
+                remainders.append(key)
+                length = min(self._admin_len, len(key) - 2)
+            else:
+                length -= 1
+        return remainders
+
+    def lookup(self, query: str, min_score: float = 0.6) -> Optional[Tuple[Place, float]]:
+        """
+        解析地点。
+
+        Args:
+            query: 自由文本地点
+            min_score: 模糊匹配的最低 Dice 系数
+
+        Returns:
+            (地点, 匹配度)，精确命中为 1.0；未命中时返回 None
+        """
+        key = normalize(query)
+        if not key:
+            return None
+        remainders = self._strip_admin(key)
+        for rest in remainders:
+            for candidate in (rest, _strip_suffix(rest, GENERIC_SUFFIXES)):
+                pids = self._exact.get(candidate)
+                if pids:
+                    return self.places[self._pick(pids, key)], 1.0
+
+        best: Optional[Tuple[float, bool, float, int]] = None
+        for rest in remainders:
+            grams = _grams(rest)
+            overlap: Counter = Counter()
+            for gram in grams:
+                overlap.update(self._postings.get(gram, ()))
+            for kid, shared in overlap.items():
+                score = 2.0 * shared / (len(grams) + self._key_grams[kid])
+                if score < min_score:
+                    continue
+                pid = self._key_place[kid]
+                rank = (score, any(token in key for token in self._admin_tokens[pid]), self.places[pid].rank, pid)
+                if best is None or rank[:3] > best[:3]:
+                    best = rank
+        if best is None:
+            return None
+        return self.places[best[3]], round(best[0], 3)
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """
+    获取进程内共享的地名库，文件不存在时返回 None。
+
+    Returns:
+        Gazetteer 实例或 None
+    """
+    global _gazetteer
+    path = Path(load_config().get("geocoding", {}).get("gazetteer", "./data/gazetteer.json"))
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            if not path.exists():
+                return None
+            _gazetteer = Gazetteer.from_file(path)
+            logger.info(f"地名库: {path}，地点 {len(_gazetteer)}")
+    return _gazetteer
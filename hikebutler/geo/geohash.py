@@ -0,0 +1,113 @@
+"""
+Geohash 编解码
+
+把经纬度编码为 base32 字符串，前缀相同的点在地理上相邻，可以直接用字符串前缀做范围查询。
+精度参考：5 位约 4.9 km，6 位约 1.2 km，7 位约 150 m。
+"""
+
+from typing import List, Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+
+def encode(lat: float, lon: float, precision: int = 7) -> str:
+    """
+    编码经纬度。
+
+    Args:
+        lat: 纬度
+        lon: 经度
+        precision: 字符数
+
+    Returns:
+        geohash 字符串
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # 偶数位编码经度
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def decode_bbox(geohash: str) -> Tuple[float, float, float, float]:
+    """
+    解码为外包矩形。
+
+    Args:
+        geohash: geohash 字符串
+
+    Returns:
+        (min_lat, min_lon, max_lat, max_lon)
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def decode(geohash: str) -> Tuple[float, float]:
+    """
+    解码为矩形中心点。
+
+    Args:
+        geohash: geohash 字符串
+
+    Returns:
+        (lat, lon)
+    """
+    min_lat, min_lon, max_lat, max_lon = decode_bbox(geohash)
+    return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+
+def neighbors(geohash: str) -> List[str]:
+    """
+    获取同精度的 8 个相邻格子（查询附近时与自身一起使用，避免边界附近漏查）。
+
+    Args:
+        geohash: geohash 字符串
+
+    Returns:
+        相邻格子的 geohash 列表
+    """
+    min_lat, min_lon, max_lat, max_lon = decode_bbox(geohash)
+    lat, lon = (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+    dlat, dlon = max_lat - min_lat, max_lon - min_lon
+    result = []
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            if i == 0 and j == 0:
+                continue
+            nlat = lat + i * dlat
+            if not -90 <= nlat <= 90:
+                continue
+            nlon = (lon + j * dlon + 180) % 360 - 180
+            result.append(encode(nlat, nlon, len(geohash)))
+    return result
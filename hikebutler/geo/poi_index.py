@@ -0,0 +1,410 @@
+"""
+步道知识点空间索引
+
+水源、避难所、下撤点、观景点等知识点按固定经纬度网格分块，离线由 GeoJSON 批量生成
+（见 scripts/build_poi_index.py），请求时按范围查表，不走 RAG 检索：
+- 点按网格编号（行 × 列数 + 列）排序存放，同一行相邻格子的点在数组中连续，
+  矩形范围查询对每个网格行做两次二分查找即可取出候选；
+- cell.npy、lat.npy、lon.npy、kind.npy、prop_offset.npy 与 props.bin（各点属性的 JSON）内存映射读取，
+  多个工作进程共享操作系统页缓存，只有命中的点才解析属性；
+- index.json：网格边长、类别表和点数（最后写入，存在即表示索引完整）。
+"""
+
+import json
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+import numpy as np
+from hikebutler.config.loader import load_config
+from hikebutler.geo.dem import METERS_PER_DEGREE
+from hikebutler.geo.track import segment_lengths
+import logging
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+PROPS_FILE = "props.bin"
+FORMAT_VERSION = 1
+_ARRAYS = ("cell", "lat", "lon", "kind", "prop_offset")
+
+# 没有 kind 属性时按 OSM 标签归类，未列出的点归为 other
+OSM_KINDS = {
+    ("amenity", "drinking_water"): "water",
+    ("amenity", "water_point"): "water",
+    ("natural", "spring"): "water",
+    ("amenity", "shelter"): "shelter",
+    ("tourism", "alpine_hut"): "shelter",
+    ("tourism", "wilderness_hut"): "shelter",
+    ("tourism", "camp_site"): "campsite",
+    ("highway", "bus_stop"): "bailout",
+    ("amenity", "parking"): "bailout",
+    ("railway", "station"): "bailout",
+    ("tourism", "viewpoint"): "viewpoint",
+    ("natural", "peak"): "peak",
+}
+
+
+def _centroid(geometry: Dict[str, Any]) -> Optional[tuple]:
+    """几何的代表点 (lat, lon)：点取自身，线和面取顶点均值。"""
+    coords = (geometry or {}).get("coordinates")
+    if not coords:
+        return None
+    if geometry.get("type") == "Point":
+        return float(coords[1]), float(coords[0])
+    flat = []
+
+    def walk(value):
+        if len(value) and isinstance(value[0], (int, float)):
+            flat.append(value[:2])
+        else:
+            for item in value:
+                walk(item)
+
+    walk(coords)
+    if not flat:
+        return None
+    lon, lat = np.asarray(flat, dtype=np.float64).mean(axis=0)
+    return float(lat), float(lon)
+
+
+def read_geojson(path: Union[str, Path]) -> List[Dict[str, Any]]:
+    """
+    读取 GeoJSON FeatureCollection 中的知识点。
+
+    Args:
+        path: GeoJSON 文件路径
+
+    Returns:
+        知识点列表：name、kind、lat、lon 加上其余属性
+    """
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    features = data.get("features", []) if data.get("type") == "FeatureCollection" else [data]
+    pois = []
+    for feature in features:
+        point = _centroid(feature.get("geometry") or {})
+        if point is None:
+            continue
+        props = dict(feature.get("properties") or {})
+        kind = props.pop("kind", None) or next(
+            (value for (key, tag), value in OSM_KINDS.items() if props.get(key) == tag), "other"
+        )
+        name = props.pop("name", None) or props.pop("name:zh", None) or ""
+        pois.append({"name": name, "kind": kind, "lat": point[0], "lon": point[1], **props})
+    return pois
+
+
+def _columns(cell_deg: float) -> int:
+    return int(math.ceil(360.0 / cell_deg))
+
+
+def _cell_rowcol(lat: np.ndarray, lon: np.ndarray, cell_deg: float) -> tuple:
+    rows = np.floor((np.asarray(lat, dtype=np.float64) + 90.0) / cell_deg).astype(np.int64)
+    cols = np.floor((np.asarray(lon, dtype=np.float64) + 180.0) / cell_deg).astype(np.int64)
+    return rows, np.clip(cols, 0, _columns(cell_deg) - 1)
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """把若干区间 [start, end) 展开为连续下标。"""
+    counts = ends - starts
+    total = int(counts.sum())
+    if total <= 0:
+        return np.empty(0, dtype=np.int64)
+    shift = np.repeat(starts - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+    return np.arange(total, dtype=np.int64) + shift
+
+
+def write_poi_index(path: Union[str, Path], pois: Iterable[Dict[str, Any]], cell_deg: float = 0.01) -> int:
+    """
+    写入空间索引（覆盖已有文件）。
+
+    Args:
+        path: 输出目录
+        pois: 知识点，包含 name、kind、lat、lon，其余键作为属性保存
+        cell_deg: 网格边长（度）
+
+    Returns:
+        写入的知识点数
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    index_path = path / INDEX_FILE
+    # 先删除索引，写入中途失败时不会留下与数据不一致的索引
+    index_path.unlink(missing_ok=True)
+
+    pois = [p for p in pois if p.get("lat") is not None and p.get("lon") is not None]
+    lat = np.array([float(p["lat"]) for p in pois], dtype=np.float64)
+    lon = np.array([float(p["lon"]) for p in pois], dtype=np.float64)
+    rows, cols = _cell_rowcol(lat, lon, cell_deg)
+    cell = rows * _columns(cell_deg) + cols
+    order = np.argsort(cell, kind="stable")
+
+    kinds = sorted({p.get("kind") or "other" for p in pois})
+    kind_ids = {kind: i for i, kind in enumerate(kinds)}
+    offsets = [0]
+    with open(path / PROPS_FILE, "wb") as f:
+        for i in order:
+            data = json.dumps(pois[i], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            f.write(data)
+            offsets.append(offsets[-1] + len(data))
+    arrays = {
+        "cell": cell[order],
+        "lat": lat[order],
+        "lon": lon[order],
+        "kind": np.array([kind_ids[pois[i].get("kind") or "other"] for i in order], dtype=np.uint8),
+        "prop_offset": np.array(offsets, dtype=np.int64),
+    }
+    for key in _ARRAYS:
+        np.save(path / f"{key}.npy", arrays[key])
+
+    tmp_path = index_path.with_suffix(".tmp")
+    tmp_path.write_text(
+        json.dumps(
+            {"version": FORMAT_VERSION, "cell_deg": cell_deg, "kinds": kinds, "count": len(pois)},
+            ensure_ascii=False,
+        ),
+        encoding="utf-8",
+    )
+    os.replace(tmp_path, index_path)
+    return len(pois)
+
+
+class PoiIndex:
+    """知识点空间索引的只读查询。"""
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        以内存映射方式打开索引。
+
+        Args:
+            path: 索引目录（见 write_poi_index）
+        """
+        path = Path(path)
+        index = json.loads((path / INDEX_FILE).read_text(encoding="utf-8"))
+        self.cell_deg: float = index["cell_deg"]
+        self.kinds: List[str] = index["kinds"]
+        for key in _ARRAYS:
+            setattr(self, key, np.load(path / f"{key}.npy", mmap_mode="r"))
+        size = (path / PROPS_FILE).stat().st_size
+        self._props = np.memmap(path / PROPS_FILE, dtype=np.uint8, mode="r") if size else np.empty(0, np.uint8)
+        self._columns = _columns(self.cell_deg)
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def _kind_mask(self, rows: np.ndarray, kinds: Optional[Sequence[str]]) -> np.ndarray:
+        if kinds is None:
+            return np.ones(len(rows), dtype=bool)
+        ids = [i for i, kind in enumerate(self.kinds) if kind in kinds]
+        return np.isin(np.asarray(self.kind)[rows], ids)
+
+    def _cells(self, cells: np.ndarray) -> np.ndarray:
+        """
+        给定网格编号（升序、不重复）内的全部点。
+
+        相邻编号合并为区间，每个区间两次二分查找。
+        """
+        if not len(cells) or not len(self):
+            return np.empty(0, dtype=np.int64)
+        breaks = np.flatnonzero(np.diff(cells) != 1) + 1
+        first = cells[np.concatenate([[0], breaks])]
+        last = cells[np.concatenate([breaks - 1, [len(cells) - 1]])]
+        return _ranges(np.searchsorted(self.cell, first, side="left"), np.searchsorted(self.cell, last, side="right"))
+
+    def _records(self, rows: Sequence[int], **columns: np.ndarray) -> List[Dict[str, Any]]:
+        """解析命中点的属性，附加 columns 中的计算值。"""
+        offsets = self.prop_offset
+        records = []
+        for j, i in enumerate(rows):
+            record = json.loads(self._props[offsets[i] : offsets[i + 1]].tobytes())
+            for key, values in columns.items():
+                # 里程保留两位小数（千米），距离取整（米）
+                record[key] = round(float(values[j]), 2) if key == "km" else int(round(float(values[j])))
+            records.append(record)
+        return records
+
+    def bbox(
+        self,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        kinds: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        矩形范围内的知识点。
+
+        Args:
+            min_lat: 南边界
+            min_lon: 西边界
+            max_lat: 北边界
+            max_lon: 东边界
+            kinds: 只返回这些类别（可选）
+            limit: 最多返回条数（可选）
+
+        Returns:
+            知识点列表，按网格顺序
+        """
+        rows = self._bbox_rows(min_lat, min_lon, max_lat, max_lon)
+        lat, lon = np.asarray(self.lat)[rows], np.asarray(self.lon)[rows]
+        keep = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+        rows = rows[keep & self._kind_mask(rows, kinds)]
+        return self._records(rows[:limit])
+
+    def _bbox_rows(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> np.ndarray:
+        """矩形覆盖的网格内的全部点：每个网格行是一个连续编号区间。"""
+        (r0, r1), (c0, c1) = _cell_rowcol(np.array([min_lat, max_lat]), np.array([min_lon, max_lon]), self.cell_deg)
+        grid_rows = np.arange(r0, r1 + 1, dtype=np.int64) * self._columns
+        return _ranges(
+            np.searchsorted(self.cell, grid_rows + c0, side="left"),
+            np.searchsorted(self.cell, grid_rows + c1, side="right"),
+        )
+
+    def radius(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: float,
+        kinds: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        给定位置周边的知识点。
+
+        Args:
+            lat: 纬度
+            lon: 经度
+            radius_m: 半径（米）
+            kinds: 只返回这些类别（可选）
+            limit: 最多返回条数（可选）
+
+        Returns:
+            知识点列表（带 distance_m），按距离升序
+        """
+        dlat = radius_m / METERS_PER_DEGREE
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        rows = self._bbox_rows(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+        rows = rows[self._kind_mask(rows, kinds)]
+        dy = (np.asarray(self.lat)[rows] - lat) * METERS_PER_DEGREE
+        dx = (np.asarray(self.lon)[rows] - lon) * METERS_PER_DEGREE * math.cos(math.radians(lat))
+        distance = np.hypot(dx, dy)
+        keep = np.flatnonzero(distance <= radius_m)
+        keep = keep[np.argsort(distance[keep], kind="stable")][:limit]
+        return self._records(rows[keep], distance_m=distance[keep])
+
+    def corridor(
+        self,
+        lats: Sequence[float],
+        lons: Sequence[float],
+        width_m: float,
+        kinds: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        路线两侧 width_m 以内的知识点。
+
+        先取路线经过的网格向外扩展 width_m 后的全部格子作为候选，再精确计算到折线的距离。
+
+        Args:
+            lats: 路线纬度数组
+            lons: 路线经度数组
+            width_m: 走廊半宽（米）
+            kinds: 只返回这些类别（可选）
+            limit: 最多返回条数（按离路线的距离取最近者，可选）
+
+        Returns:
+            知识点列表（带 km：最近点的里程，offset_m：离路线的距离），按里程升序
+        """
+        lats, lons = np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+        if not len(lats) or not len(self):
+            return []
+        # 加密到不超过半个格子，保证经过的格子不遗漏
+        length = np.concatenate([[0.0], np.cumsum(segment_lengths(lats, lons))])
+        cos_lat = math.cos(math.radians(float(lats.mean())))
+        step_m = self.cell_deg * METERS_PER_DEGREE * cos_lat / 2
+        stations = np.linspace(0.0, length[-1], max(2, int(math.ceil(length[-1] / step_m)) + 1))
+        rows, cols = _cell_rowcol(np.interp(stations, length, lats), np.interp(stations, length, lons), self.cell_deg)
+        pad_rows = int(math.ceil(width_m / (self.cell_deg * METERS_PER_DEGREE)))
+        pad_cols = int(math.ceil(width_m / (self.cell_deg * METERS_PER_DEGREE * max(cos_lat, 1e-6))))
+        offsets = np.arange(-pad_rows, pad_rows + 1)[:, None] * self._columns + np.arange(-pad_cols, pad_cols + 1)
+        cells = np.unique((rows * self._columns + cols)[:, None] + offsets.ravel())
+        candidates = self._cells(cells)
+        candidates = candidates[self._kind_mask(candidates, kinds)]
+        if not len(candidates):
+            return []
+
+        # 以路线中心为原点的局部平面坐标（米），逐段求点到线段的最近距离
+        origin_lat, origin_lon = float(lats.mean()), float(lons.mean())
+        px = (np.asarray(self.lon)[candidates] - origin_lon) * METERS_PER_DEGREE * cos_lat
+        py = (np.asarray(self.lat)[candidates] - origin_lat) * METERS_PER_DEGREE
+        x = (lons - origin_lon) * METERS_PER_DEGREE * cos_lat
+        y = (lats - origin_lat) * METERS_PER_DEGREE
+        if len(x) == 1:
+            x, y, length = np.repeat(x, 2), np.repeat(y, 2), np.zeros(2)
+        ax, ay, dx, dy = x[:-1], y[:-1], np.diff(x), np.diff(y)
+        seg_sq = np.maximum(dx * dx + dy * dy, 1e-9)
+        best = np.full(len(candidates), np.inf)
+        along = np.zeros(len(candidates))
+        chunk = max(1, (1 << 21) // len(ax))
+        for start in range(0, len(candidates), chunk):
+            qx, qy = px[start : start + chunk, None], py[start : start + chunk, None]
+            t = np.clip(((qx - ax) * dx + (qy - ay) * dy) / seg_sq, 0.0, 1.0)
+            ex, ey = ax + t * dx - qx, ay + t * dy - qy
+            distance = ex * ex + ey * ey
+            nearest = np.argmin(distance, axis=1)
+            picked = np.arange(len(nearest))
+            best[start : start + chunk] = np.sqrt(distance[picked, nearest])
+            seg_len = length[nearest + 1] - length[nearest]
+            along[start : start + chunk] = length[nearest] + t[picked, nearest] * seg_len
+
+        keep = np.flatnonzero(best <= width_m)
+        if limit is not None:
+            keep = keep[np.argsort(best[keep], kind="stable")][:limit]
+        keep = keep[np.argsort(along[keep], kind="stable")]
+        return self._records(candidates[keep], km=along[keep] / 1000, offset_m=best[keep])
+
+
+_poi_index: Optional[PoiIndex] = None
+_poi_index_lock = threading.Lock()
+
+
+def get_poi_index() -> Optional[PoiIndex]:
+    """
+    获取进程内共享的知识点空间索引，尚未生成时返回 None。
+
+    Returns:
+        PoiIndex 实例或 None
+    """
+    global _poi_index
+    path = Path(load_config().get("poi_index", {}).get("path", "./data/poi_index"))
+    with _poi_index_lock:
+        if _poi_index is None:
+            if not (path / INDEX_FILE).exists():
+                return None
+            _poi_index = PoiIndex(path)
+            logger.info(f"知识点空间索引: {path}，知识点 {len(_poi_index)}")
+    return _poi_index
+
+
+def pois_near(lats: Sequence[float], lons: Sequence[float], kinds: Sequence[str]) -> List[Dict[str, Any]]:
+    """
+    按 config.yaml 的 poi_index 配置查询路线沿线（多于一个点时）或单点周边的知识点。
+
+    Args:
+        lats: 路线纬度数组，或只有起点
+        lons: 路线经度数组，或只有起点
+        kinds: 类别
+
+    Returns:
+        知识点列表，索引未生成时为空
+    """
+    index = get_poi_index()
+    if index is None or not len(lats):
+        return []
+    config = load_config().get("poi_index", {})
+    limit = config.get("limit", 20)
+    if len(lats) > 1:
+        return index.corridor(lats, lons, config.get("corridor_m", 500), kinds=kinds, limit=limit)
+    return index.radius(float(lats[0]), float(lons[0]), config.get("radius_m", 3000), kinds=kinds, limit=limit)
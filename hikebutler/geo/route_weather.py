@@ -0,0 +1,329 @@
+"""
+沿路线的分段天气
+
+长距离山脊路线跨越几十公里、上千米海拔，只在起点查询一次预报不够，逐个轨迹点查询又太多。
+这里按里程和海拔变化选出少量代表点，按预报网格去重（同一网格内的点共用一份预报），并发查询后
+再沿里程插值回整条轨迹：
+- 气温由各网格的分层预报按每个轨迹点的海拔估算，再在相邻代表点之间按里程线性插值；
+- 风、降水、对流、云量和 0°C 层高度按里程线性插值；
+- 汇总时风、降水等取沿线最不利值，气温按海拔分别计算。
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from functools import reduce
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from hikebutler.geo.forecast import (
+    Forecast,
+    freezing_level,
+    parse_windy,
+    summarize_weather,
+    temperature_at,
+)
+from hikebutler.geo.track import Track, segment_lengths
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class RouteWeather:
+    """插值到轨迹站点上的预报，二维数组形状为 (站点数, T)。"""
+
+    ts: np.ndarray  # Unix 时间戳（秒），形状 (T,)
+    distance_m: np.ndarray  # 站点里程，形状 (N,)
+    ele: np.ndarray  # 站点海拔，形状 (N,)
+    sample_distance_m: np.ndarray  # 代表点里程，形状 (K,)
+    temp_c: np.ndarray
+    wind_ms: np.ndarray
+    gust_ms: np.ndarray
+    precip_mm: np.ndarray
+    conv_precip_mm: np.ndarray
+    cape: np.ndarray
+    cloud_pct: np.ndarray
+    freezing_level_m: np.ndarray
+
+    def take(self, index: np.ndarray) -> "RouteWeather":
+        """
+        按时间轴取子集。
+
+        Args:
+            index: 布尔掩码或下标数组
+
+        Returns:
+            新的 RouteWeather
+        """
+        values = {f.name: getattr(self, f.name) for f in fields(self)}
+        for name, value in values.items():
+            if name not in ("distance_m", "ele", "sample_distance_m"):
+                values[name] = value[..., index]
+        return RouteWeather(**values)
+
+
+def _cumulative_distance(track: Track) -> np.ndarray:
+    """各轨迹点的累计里程（米）。"""
+    if len(track) < 2:
+        return np.zeros(len(track))
+    return np.concatenate([[0.0], np.cumsum(segment_lengths(track.lat, track.lon))])
+
+
+def _filled_elevation(ele: np.ndarray, distance: np.ndarray) -> np.ndarray:
+    """按里程插值补齐缺失海拔，全部缺失时为 NaN。"""
+    valid = np.isfinite(ele)
+    if valid.all() or not valid.any():
+        return ele.astype(np.float64)
+    return np.interp(distance, distance[valid], ele[valid])
+
+
+def sample_route(
+    track: Track,
+    distance_step_m: float = 5000.0,
+    elevation_step_m: float = 300.0,
+    max_points: int = 12,
+) -> np.ndarray:
+    """
+    选出代表点：从起点出发，距上一个代表点的里程达到 distance_step_m 或海拔变化达到 elevation_step_m 时
+    取一个点；起点、终点和最高、最低点总是保留。超过 max_points 时按里程均匀抽稀。
+
+    Args:
+        track: 轨迹
+        distance_step_m: 里程间隔（米）
+        elevation_step_m: 海拔变化间隔（米）
+        max_points: 代表点上限
+
+    Returns:
+        代表点在轨迹中的下标（升序）
+    """
+    n = len(track)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    distance = _cumulative_distance(track)
+    ele = _filled_elevation(track.ele, distance)
+    has_ele = bool(np.isfinite(ele).all())
+
+    picks = [0]
+    i = 0
+    while i < n - 1:
+        # 下一个里程或海拔达到间隔的点，两者取先到者
+        candidates = [int(np.searchsorted(distance, distance[i] + distance_step_m))]
+        if has_ele:
+            changed = np.abs(ele[i + 1:] - ele[i]) >= elevation_step_m
+            if changed.any():
+                candidates.append(i + 1 + int(np.argmax(changed)))
+        i = min(min(candidates), n - 1)
+        picks.append(i)
+
+    required = {0, n - 1}
+    if has_ele:
+        required |= {int(np.argmax(ele)), int(np.argmin(ele))}
+    picks = np.unique(np.concatenate([picks, sorted(required)]))
+    if len(picks) > max_points:
+        others = np.setdiff1d(picks, sorted(required))
+        slots = max(0, max_points - len(required))
+        targets = np.linspace(0.0, distance[-1], slots + 2)[1:-1]
+        nearest = np.abs(distance[others][None, :] - targets[:, None]).argmin(axis=1) if len(others) else []
+        picks = np.unique(np.concatenate([others[nearest] if len(others) else [], sorted(required)])).astype(np.int64)
+    return picks
+
+
+def grid_cells(lat: np.ndarray, lon: np.ndarray, resolution: float = 0.1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    按预报网格去重。
+
+    Args:
+        lat: 纬度数组
+        lon: 经度数组
+        resolution: 网格分辨率（度）
+
+    Returns:
+        (各网格中心的 [纬度, 经度] 数组 (C, 2), 每个点所在网格的下标 (n,))
+    """
+    cells = np.stack([np.floor(lat / resolution), np.floor(lon / resolution)], axis=1).astype(np.int64)
+    unique, inverse = np.unique(cells, axis=0, return_inverse=True)
+    centers = np.round((unique + 0.5) * resolution, 6)
+    return centers, inverse.reshape(-1)
+
+
+def fetch_forecasts(
+    centers: np.ndarray,
+    fetch: Callable[[float, float], Dict[str, Any]],
+    max_workers: int = 4,
+) -> List[Optional[Forecast]]:
+    """
+    并发查询各网格的预报。
+
+    Args:
+        centers: 网格中心 [纬度, 经度] 数组
+        fetch: 查询函数（通常是带缓存的 mcp_windy_fetch），返回 Windy 响应
+        max_workers: 并发数
+
+    Returns:
+        与 centers 对应的预报列表，查询失败或尚无数据的网格为 None
+    """
+
+    def fetch_one(center: np.ndarray) -> Optional[Forecast]:
+        try:
+            payload = fetch(float(center[0]), float(center[1]))
+        except Exception as e:
+            logger.warning(f"网格预报查询失败: {center.tolist()}, {e}")
+            return None
+        if payload.get("status") == "pending":
+            return None
+        forecast = parse_windy(payload)
+        return forecast if len(forecast) else None
+
+    if not len(centers):
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(centers)))) as executor:
+        return list(executor.map(fetch_one, centers))
+
+
+def interpolate_route(
+    track: Track,
+    samples: np.ndarray,
+    sample_cells: np.ndarray,
+    forecasts: Sequence[Optional[Forecast]],
+    station_step_m: float = 250.0,
+) -> Optional[RouteWeather]:
+    """
+    把代表点的预报沿里程插值到轨迹站点上（轨迹先按 station_step_m 重采样，长路线也只有几百个站点）。
+
+    Args:
+        track: 轨迹
+        samples: 代表点下标（见 sample_route）
+        sample_cells: 每个代表点所在网格的下标（见 grid_cells）
+        forecasts: 各网格的预报（见 fetch_forecasts）
+        station_step_m: 站点间隔（米）
+
+    Returns:
+        RouteWeather，没有可用预报时返回 None
+    """
+    valid = np.array([forecasts[c] is not None for c in sample_cells], dtype=bool)
+    if not valid.any():
+        return None
+    samples, sample_cells = samples[valid], sample_cells[valid]
+
+    # 各网格的预报对齐到共同的时刻
+    used = sorted(set(sample_cells.tolist()))
+    common = reduce(np.intersect1d, [forecasts[c].ts for c in used])
+    if not len(common):
+        return None
+    aligned = {c: forecasts[c].take(np.isin(forecasts[c].ts, common)) for c in used}
+
+    distance = _cumulative_distance(track)
+    ele = _filled_elevation(track.ele, distance)
+    total = float(distance[-1]) if len(distance) else 0.0
+    stations = np.linspace(0.0, total, max(2, int(np.ceil(total / station_step_m)) + 1))
+    station_ele = np.interp(stations, distance, ele) if np.isfinite(ele).all() else np.full(len(stations), np.nan)
+    sample_distance = distance[samples]
+
+    # 站点在相邻代表点之间的位置
+    position = np.interp(stations, sample_distance, np.arange(len(samples), dtype=np.float64))
+    lo = np.floor(position).astype(np.int64)
+    hi = np.minimum(lo + 1, len(samples) - 1)
+    weight = (position - lo)[:, None]
+
+    def along(series: np.ndarray) -> np.ndarray:
+        """形状 (K, T) 的代表点序列插值到站点。"""
+        return series[lo] * (1.0 - weight) + series[hi] * weight
+
+    def per_sample(name: str) -> np.ndarray:
+        return np.stack([getattr(aligned[c], name) for c in sample_cells])
+
+    # 各网格按站点海拔估算气温，网格内代表点的平均海拔作为地面气温的参考海拔
+    cell_temp = {}
+    cell_freezing = {}
+    for c in used:
+        reference = ele[samples[sample_cells == c]]
+        reference = float(np.mean(reference)) if np.isfinite(reference).all() else None
+        if np.isfinite(station_ele).all():
+            cell_temp[c] = temperature_at(aligned[c], station_ele, reference_elevation=reference)
+        else:
+            cell_temp[c] = np.repeat(aligned[c].temp_c[None, :], len(stations), axis=0)
+        cell_freezing[c] = freezing_level(aligned[c], reference_elevation=reference)
+    temps = np.stack([cell_temp[c] for c in used])
+    rows = np.arange(len(stations))
+    temp_lo = temps[np.searchsorted(used, sample_cells[lo]), rows]
+    temp_hi = temps[np.searchsorted(used, sample_cells[hi]), rows]
+
+    return RouteWeather(
+        ts=common,
+        distance_m=stations,
+        ele=station_ele,
+        sample_distance_m=sample_distance,
+        temp_c=temp_lo * (1.0 - weight) + temp_hi * weight,
+        wind_ms=along(per_sample("wind_ms")),
+        gust_ms=along(per_sample("gust_ms")),
+        precip_mm=along(per_sample("precip_mm")),
+        conv_precip_mm=along(per_sample("conv_precip_mm")),
+        cape=along(per_sample("cape")),
+        cloud_pct=along(per_sample("cloud_pct")),
+        freezing_level_m=along(np.stack([cell_freezing[c] for c in sample_cells])),
+    )
+
+
+def analyze_route(
+    route_weather: RouteWeather,
+    windows: Sequence[Tuple[float, float]],
+    tz: str = "Asia/Shanghai",
+) -> Optional[Dict[str, Any]]:
+    """
+    在徒步时段内汇总沿线天气：风、降水、对流取沿线最不利值，气温按各站点海拔计算，并给出分段摘要。
+
+    Args:
+        route_weather: 沿线预报（见 interpolate_route）
+        windows: 徒步时段（见 hikebutler.geo.forecast.hike_windows）
+        tz: 时区
+
+    Returns:
+        {"summary", "hazards", "metrics", "hourly", "segments"}，徒步时段不在预报范围内时返回 None
+    """
+    bounds = np.asarray(windows, dtype=np.float64).reshape(-1, 2)
+    ts = route_weather.ts[:, None]
+    mask = ((ts >= bounds[:, 0]) & (ts <= bounds[:, 1])).any(axis=1)
+    if not mask.any():
+        return None
+    rw = route_weather.take(mask)
+
+    has_ele = bool(np.isfinite(rw.ele).all())
+    low = int(np.argmin(rw.ele)) if has_ele else 0
+    worst = Forecast(
+        ts=rw.ts,
+        temp_c=rw.temp_c[low],
+        wind_ms=np.fmax.reduce(rw.wind_ms, axis=0),
+        gust_ms=np.fmax.reduce(rw.gust_ms, axis=0),
+        precip_mm=np.fmax.reduce(rw.precip_mm, axis=0),
+        conv_precip_mm=np.fmax.reduce(rw.conv_precip_mm, axis=0),
+        cape=np.fmax.reduce(rw.cape, axis=0),
+        cloud_pct=np.fmax.reduce(rw.cloud_pct, axis=0),
+        level_height_m=np.empty((0, len(rw.ts))),
+        level_temp_c=np.empty((0, len(rw.ts))),
+    )
+    analysis = summarize_weather(
+        worst,
+        rw.temp_c,
+        np.fmin.reduce(rw.freezing_level_m, axis=0),
+        days=len(windows),
+        elevations=rw.ele if has_ele else None,
+        tz=tz,
+    )
+
+    # 相邻代表点之间为一段
+    edges = rw.sample_distance_m
+    segment_of = np.clip(np.searchsorted(edges, rw.distance_m, side="right") - 1, 0, max(0, len(edges) - 2))
+    segments = []
+    for k in np.unique(segment_of):
+        rows = segment_of == k
+        segment = {
+            "from_km": round(float(rw.distance_m[rows].min()) / 1000, 1),
+            "to_km": round(float(rw.distance_m[rows].max()) / 1000, 1),
+            "temp_min_c": round(float(np.nanmin(rw.temp_c[rows])), 1),
+            "wind_max_ms": round(float(np.nanmax(rw.wind_ms[rows])), 1),
+            "precip_mm": round(float(np.nanmax(np.nansum(rw.precip_mm[rows], axis=1))), 1),
+        }
+        if has_ele:
+            segment["max_elevation_m"] = round(float(rw.ele[rows].max()))
+        segments.append(segment)
+    analysis["segments"] = segments
+    return analysis
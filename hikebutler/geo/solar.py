@@ -0,0 +1,241 @@
+"""
+太阳位置与光线时段
+
+NOAA 太阳位置算法（NOAA Solar Calculator 使用的 Meeus 简化公式，1800~2100 年间误差约 1 分钟）的 numpy 实现，
+对 (纬度, 经度, 时间) 数组一次性计算，不依赖外部服务：
+- solar_position：太阳高度角（含大气折射修正）和方位角（正北顺时针）；
+- sun_events：日出、日落、正午，以及黄金时段（太阳高度 -4°~6°）和蓝调时段（-6°~-4°）；
+- sun_times_many / sun_times：按 geohash 网格（5 位约 4.9 km）和日期缓存的光线时段。
+极昼、极夜时无法到达的高度角对应的时刻为 NaN。
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from hikebutler.geo import geohash
+
+ArrayLike = Union[float, np.ndarray]
+
+# 日出日落时太阳中心的高度角（含折射和太阳视半径）
+SUNRISE_ALTITUDE = -0.833
+GOLDEN_HIGH = 6.0
+GOLDEN_LOW = -4.0
+BLUE_LOW = -6.0
+# 缓存日照时段的 geohash 精度
+CACHE_PRECISION = 5
+CACHE_SIZE = 4096
+
+_cache: "OrderedDict[Tuple[str, date], Dict[str, Optional[float]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _julian_century(ts: ArrayLike) -> np.ndarray:
+    """Unix 时间戳（秒）转换为 J2000 起算的儒略世纪数。"""
+    return (np.asarray(ts, dtype=np.float64) / 86400.0 + 2440587.5 - 2451545.0) / 36525.0
+
+
+def _sun_geometry(ts: ArrayLike):
+    """
+    太阳赤纬和时差。
+
+    Args:
+        ts: Unix 时间戳（秒）
+
+    Returns:
+        (赤纬（弧度）, 时差（分钟）)
+    """
+    jc = _julian_century(ts)
+    mean_long = np.radians((280.46646 + jc * (36000.76983 + jc * 0.0003032)) % 360.0)
+    mean_anom = np.radians(357.52911 + jc * (35999.05029 - 0.0001537 * jc))
+    eccent = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+    center = (
+        np.sin(mean_anom) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+        + np.sin(2 * mean_anom) * (0.019993 - 0.000101 * jc)
+        + np.sin(3 * mean_anom) * 0.000289
+    )
+    omega = np.radians(125.04 - 1934.136 * jc)
+    apparent_long = np.radians(np.degrees(mean_long) + center - 0.00569 - 0.00478 * np.sin(omega))
+    obliquity = np.radians(
+        23.0 + (26.0 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60.0) / 60.0
+        + 0.00256 * np.cos(omega)
+    )
+    declination = np.arcsin(np.sin(obliquity) * np.sin(apparent_long))
+    y = np.tan(obliquity / 2) ** 2
+    equation_of_time = 4.0 * np.degrees(
+        y * np.sin(2 * mean_long)
+        - 2 * eccent * np.sin(mean_anom)
+        + 4 * eccent * y * np.sin(mean_anom) * np.cos(2 * mean_long)
+        - 0.5 * y * y * np.sin(4 * mean_long)
+        - 1.25 * eccent * eccent * np.sin(2 * mean_anom)
+    )
+    return declination, equation_of_time
+
+
+def _refraction(elevation: np.ndarray) -> np.ndarray:
+    """大气折射修正（度），NOAA 的分段近似。"""
+    e = elevation
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tan_e = np.tan(np.radians(e))
+        arcsec = np.select(
+            [e > 85.0, e > 5.0, e > -0.575],
+            [
+                0.0,
+                58.1 / tan_e - 0.07 / tan_e**3 + 0.000086 / tan_e**5,
+                1735.0 + e * (-518.2 + e * (103.4 + e * (-12.79 + e * 0.711))),
+            ],
+            default=-20.772 / tan_e,
+        )
+    return arcsec / 3600.0
+
+
+def solar_position(lat: ArrayLike, lon: ArrayLike, ts: ArrayLike, refraction: bool = True):
+    """
+    太阳位置，参数按 numpy 规则广播。
+
+    Args:
+        lat: 纬度（度）
+        lon: 经度（度，东经为正）
+        ts: Unix 时间戳（秒）
+        refraction: 是否修正大气折射
+
+    Returns:
+        (高度角, 方位角)，单位为度，方位角自正北顺时针
+    """
+    lat_r = np.radians(np.asarray(lat, dtype=np.float64))
+    ts = np.asarray(ts, dtype=np.float64)
+    declination, equation_of_time = _sun_geometry(ts)
+    true_solar_minutes = (ts % 86400.0) / 60.0 + equation_of_time + 4.0 * np.asarray(lon, dtype=np.float64)
+    hour_angle = np.radians((true_solar_minutes / 4.0) % 360.0 - 180.0)
+
+    cos_zenith = np.sin(lat_r) * np.sin(declination) + np.cos(lat_r) * np.cos(declination) * np.cos(hour_angle)
+    elevation = 90.0 - np.degrees(np.arccos(np.clip(cos_zenith, -1.0, 1.0)))
+    azimuth = (
+        np.degrees(
+            np.arctan2(
+                np.sin(hour_angle),
+                np.cos(hour_angle) * np.sin(lat_r) - np.tan(declination) * np.cos(lat_r),
+            )
+        )
+        + 180.0
+    ) % 360.0
+    if refraction:
+        elevation = elevation + _refraction(elevation)
+    return elevation, azimuth
+
+
+def _crossing(
+    lat_r: np.ndarray, noon: np.ndarray, noon_declination: np.ndarray, altitude: float, sign: int
+) -> np.ndarray:
+    """太阳高度达到 altitude 的时刻（sign=-1 为上午，+1 为下午）：先用正午赤纬估算，再按估算时刻的赤纬修正一次。"""
+    sin_alt = np.sin(np.radians(altitude))
+    declination = noon_declination
+    ts = noon
+    for step in range(2):
+        cos_ha = (sin_alt - np.sin(lat_r) * np.sin(declination)) / (np.cos(lat_r) * np.cos(declination))
+        hour_angle = np.degrees(np.arccos(np.where(np.abs(cos_ha) <= 1.0, cos_ha, np.nan)))
+        ts = noon + sign * hour_angle * 240.0
+        if step == 0:
+            declination, _ = _sun_geometry(np.where(np.isfinite(ts), ts, noon))
+    return ts
+
+
+def sun_events(lat: ArrayLike, lon: ArrayLike, day: ArrayLike) -> Dict[str, np.ndarray]:
+    """
+    日出日落和光线时段，参数按 numpy 规则广播。
+
+    Args:
+        lat: 纬度（度）
+        lon: 经度（度，东经为正）
+        day: 日期对应的 UTC 零点时间戳（秒），当天是按当地太阳时计的日期
+
+    Returns:
+        时间戳数组字典：solar_noon、sunrise、sunset、blue_morning_start、golden_morning_start、
+        golden_morning_end、golden_evening_start、golden_evening_end、blue_evening_end，
+        以及 sunrise_azimuth、sunset_azimuth（度）
+    """
+    lat_r = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.asarray(lon, dtype=np.float64)
+    day = np.asarray(day, dtype=np.float64)
+    # 正午：当地太阳时 12:00，用当天的时差修正两次
+    noon = day + (720.0 - 4.0 * lon) * 60.0
+    for _ in range(2):
+        declination, equation_of_time = _sun_geometry(noon)
+        noon = day + (720.0 - 4.0 * lon - equation_of_time) * 60.0
+
+    events = {"solar_noon": np.broadcast_to(noon, np.broadcast(lat_r, noon).shape).copy()}
+    for name, altitude in (
+        ("sunrise", SUNRISE_ALTITUDE),
+        ("blue_morning_start", BLUE_LOW),
+        ("golden_morning_start", GOLDEN_LOW),
+        ("golden_morning_end", GOLDEN_HIGH),
+    ):
+        events[name] = _crossing(lat_r, noon, declination, altitude, -1)
+    for name, altitude in (
+        ("sunset", SUNRISE_ALTITUDE),
+        ("golden_evening_start", GOLDEN_HIGH),
+        ("golden_evening_end", GOLDEN_LOW),
+        ("blue_evening_end", BLUE_LOW),
+    ):
+        events[name] = _crossing(lat_r, noon, declination, altitude, 1)
+    for name in ("sunrise", "sunset"):
+        _, azimuth = solar_position(np.degrees(lat_r), lon, np.nan_to_num(events[name]))
+        events[f"{name}_azimuth"] = np.where(np.isfinite(events[name]), azimuth, np.nan)
+    return events
+
+
+def day_timestamp(day: date) -> float:
+    """日期对应的 UTC 零点时间戳（秒）。"""
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+
+
+def sun_times_many(
+    lats: Sequence[float], lons: Sequence[float], days: Sequence[date]
+) -> List[Dict[str, Optional[float]]]:
+    """
+    多个地点、日期的光线时段，按 geohash 网格中心计算并缓存（网格内日出时刻相差不到半分钟），
+    未命中缓存的组合一次向量化计算。
+
+    Args:
+        lats: 纬度列表
+        lons: 经度列表
+        days: 日期列表（与 lats、lons 一一对应）
+
+    Returns:
+        与 sun_events 相同键的字典列表，时刻为时间戳（秒），不会发生的事件为 None
+    """
+    keys = [(geohash.encode(lat, lon, CACHE_PRECISION), day) for lat, lon, day in zip(lats, lons, days)]
+    found = {}
+    with _cache_lock:
+        for key in dict.fromkeys(keys):
+            if key in _cache:
+                _cache.move_to_end(key)
+                found[key] = _cache[key]
+    missing = [key for key in dict.fromkeys(keys) if key not in found]
+    if missing:
+        centers = np.array([geohash.decode(cell) for cell, _ in missing])
+        events = sun_events(centers[:, 0], centers[:, 1], np.array([day_timestamp(day) for _, day in missing]))
+        for i, key in enumerate(missing):
+            found[key] = {name: float(values[i]) if np.isfinite(values[i]) else None for name, values in events.items()}
+        with _cache_lock:
+            for key in missing:
+                _cache[key] = found[key]
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+    return [dict(found[key]) for key in keys]
+
+
+def sun_times(lat: float, lon: float, day: date) -> Dict[str, Optional[float]]:
+    """
+    单个地点单日的光线时段（见 sun_times_many）。
+
+    Args:
+        lat: 纬度
+        lon: 经度
+        day: 日期
+
+    Returns:
+        与 sun_events 相同键的字典，时刻为时间戳（秒），不会发生的事件为 None
+    """
+    return sun_times_many([lat], [lon], [day])[0]
@@ -0,0 +1,649 @@
+"""
+离线步道网络与路线计算
+
+从 OSM 数据（.osm XML，或需要安装 osmium 的 .pbf）中提取徒步道路，构建步道图：
+- 顶点为道路交叉点和端点，边为两个顶点之间的一段道路，几何点高程优先取 DEM（见 hikebutler.geo.dem），
+  其次取 OSM 节点的 ele 标签；
+- 有向弧按 CSR（压缩稀疏行）存储：indptr[v]:indptr[v + 1] 为顶点 v 的出弧，权重为 Tobler 徒步函数估算的
+  行走时间（秒），同一条边上坡和下坡方向的时间不同；
+- 图以若干 .npy 文件加 index.json 保存（index.json 最后写入，存在即表示完整），打开时内存映射。
+
+路线查询：点到点用 A*（启发函数为直线距离除以最大步行速度），备选路线对已用过的边加罚后重算；
+环线从起点做有界 Dijkstra，按方位在各扇区选折返点，返程用 A* 并对去程的边加罚，尽量不走回头路。
+"""
+
+import heapq
+import json
+import math
+import os
+import threading
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import gpxpy.gpx
+import numpy as np
+from hikebutler.config.loader import load_config
+from hikebutler.geo.dem import METERS_PER_DEGREE, Dem
+from hikebutler.geo.track import segment_lengths
+import logging
+
+logger = logging.getLogger(__name__)
+
+HIKING_HIGHWAYS = frozenset({"path", "footway", "track", "bridleway", "steps"})
+# OSM sac_scale 到难度等级（1~6），没有标注的按 1 处理
+SAC_SCALE = {
+    "hiking": 1,
+    "mountain_hiking": 2,
+    "demanding_mountain_hiking": 3,
+    "alpine_hiking": 4,
+    "demanding_alpine_hiking": 5,
+    "difficult_alpine_hiking": 6,
+}
+# Tobler 徒步函数在坡度 -5% 时取得的最大速度（米/秒）
+MAX_SPEED_MS = 6.0 / 3.6
+# 备选路线和环线返程对已用过的边的时间加罚倍数
+REUSE_PENALTY = 4.0
+# 环线折返点：去程时间占目标时长的比例范围、方位扇区数
+TURNAROUND_RANGE = (0.4, 0.6)
+TURNAROUND_SECTORS = 8
+
+INDEX_FILE = "index.json"
+FORMAT_VERSION = 1
+_ARRAYS = (
+    "node_lat",
+    "node_lon",
+    "indptr",
+    "arc_target",
+    "arc_edge",
+    "arc_time",
+    "edge_distance",
+    "edge_ascent",
+    "edge_descent",
+    "edge_sac",
+    "edge_name",
+    "geom_offset",
+    "geom_lat",
+    "geom_lon",
+    "geom_ele",
+)
+
+
+@dataclass(slots=True)
+class OsmWay:
+    """一条徒步道路（缺少坐标的节点处已断开）。"""
+
+    refs: np.ndarray  # OSM 节点 ID
+    lat: np.ndarray
+    lon: np.ndarray
+    ele: np.ndarray  # OSM ele 标签，缺失为 NaN
+    sac: int
+    name: str
+
+
+def _is_trail(tags: Dict[str, str]) -> bool:
+    """是否是可徒步的道路。"""
+    return (
+        tags.get("highway") in HIKING_HIGHWAYS
+        and tags.get("access") not in ("private", "no")
+        and tags.get("foot") != "no"
+    )
+
+
+def _parse_float(value: Optional[str]) -> float:
+    try:
+        return float(value) if value else math.nan
+    except ValueError:
+        return math.nan
+
+
+def _make_ways(
+    refs: Sequence[int], coords: Dict[int, Tuple[float, float, float]], tags: Dict[str, str]
+) -> List[OsmWay]:
+    """按节点坐标生成道路，缺少坐标的节点处断开（区域截取的数据边缘常见）。"""
+    ways, piece = [], []
+    for ref in list(refs) + [None]:
+        if ref is not None and ref in coords:
+            piece.append(ref)
+            continue
+        if len(piece) >= 2:
+            lat, lon, ele = (np.array(values) for values in zip(*(coords[r] for r in piece)))
+            ways.append(
+                OsmWay(
+                    refs=np.array(piece, dtype=np.int64),
+                    lat=lat,
+                    lon=lon,
+                    ele=ele,
+                    sac=SAC_SCALE.get(tags.get("sac_scale", ""), 1),
+                    name=tags.get("name", ""),
+                )
+            )
+        piece = []
+    return ways
+
+
+def _read_xml(path: Path) -> List[OsmWay]:
+    nodes: Dict[int, Tuple[float, float, float]] = {}
+    ways: List[OsmWay] = []
+    for _, elem in ET.iterparse(path, events=("end",)):
+        if elem.tag == "node":
+            ele = next((tag.get("v") for tag in elem.iter("tag") if tag.get("k") == "ele"), None)
+            nodes[int(elem.get("id"))] = (float(elem.get("lat")), float(elem.get("lon")), _parse_float(ele))
+            elem.clear()
+        elif elem.tag == "way":
+            tags = {tag.get("k"): tag.get("v") for tag in elem.iter("tag")}
+            if _is_trail(tags):
+                ways.extend(_make_ways([int(nd.get("ref")) for nd in elem.iter("nd")], nodes, tags))
+            elem.clear()
+        elif elem.tag == "relation":
+            elem.clear()
+    return ways
+
+
+def _read_pbf(path: Path) -> List[OsmWay]:
+    # 需要安装 osmium（pyosmium）
+    import osmium
+
+    ways: List[OsmWay] = []
+
+    class _Handler(osmium.SimpleHandler):
+        def way(self, way):
+            tags = {tag.k: tag.v for tag in way.tags}
+            if not _is_trail(tags):
+                return
+            refs, coords = [], {}
+            for node in way.nodes:
+                refs.append(node.ref)
+                if node.location.valid():
+                    coords[node.ref] = (node.location.lat, node.location.lon, math.nan)
+            ways.extend(_make_ways(refs, coords, tags))
+
+    _Handler().apply_file(str(path), locations=True)
+    return ways
+
+
+def read_osm(path: Union[str, Path]) -> List[OsmWay]:
+    """
+    读取 OSM 数据中的徒步道路（highway=path/footway/track/bridleway/steps，排除禁止通行的）。
+
+    Args:
+        path: .osm（XML）或 .osm.pbf 文件
+
+    Returns:
+        道路列表
+    """
+    path = Path(path)
+    if path.name.lower().endswith(".pbf"):
+        return _read_pbf(path)
+    return _read_xml(path)
+
+
+def tobler_speed(slope: np.ndarray) -> np.ndarray:
+    """Tobler 徒步函数：坡度（升高/水平距离）对应的步行速度（米/秒）。"""
+    return 6.0 / 3.6 * np.exp(-3.5 * np.abs(slope + 0.05))
+
+
+class TrailGraph:
+    """CSR 存储的步道图和路线查询。"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], names: List[str]):
+        """
+        Args:
+            arrays: _ARRAYS 中各数组
+            names: 道路名称表（edge_name 为下标，-1 表示无名）
+        """
+        for key in _ARRAYS:
+            setattr(self, key, arrays[key])
+        self.names = names
+        # 弧对应的边下标（arc_edge 中反向弧存为 ~edge）
+        self.arc_edge_id = np.where(self.arc_edge >= 0, self.arc_edge, ~self.arc_edge)
+        # A* 启发函数用图中实际的最大步行速度（不高估剩余时间），比 Tobler 函数的理论最大值更紧
+        speed = np.asarray(self.edge_distance)[self.arc_edge_id] / np.maximum(np.asarray(self.arc_time), 1e-3)
+        self.max_speed = float(min(MAX_SPEED_MS, speed.max())) if len(speed) else MAX_SPEED_MS
+        self._lists: Optional[Tuple[List[Any], ...]] = None
+        self._lists_lock = threading.Lock()
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_lat)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.edge_distance)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        保存到目录（覆盖已有文件）。
+
+        Args:
+            path: 输出目录
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        index_path = path / INDEX_FILE
+        # 先删除索引，写入中途失败时不会留下与数据不一致的索引
+        index_path.unlink(missing_ok=True)
+        for key in _ARRAYS:
+            np.save(path / f"{key}.npy", np.asarray(getattr(self, key)))
+        tmp_path = index_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {"version": FORMAT_VERSION, "nodes": self.node_count, "edges": self.edge_count, "names": self.names},
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> "TrailGraph":
+        """
+        以内存映射方式打开已保存的图。
+
+        Args:
+            path: 图目录（见 save）
+
+        Returns:
+            TrailGraph
+        """
+        path = Path(path)
+        index = json.loads((path / INDEX_FILE).read_text(encoding="utf-8"))
+        arrays = {key: np.load(path / f"{key}.npy", mmap_mode="r") for key in _ARRAYS}
+        return cls(arrays, index["names"])
+
+    def nearest(self, lat: float, lon: float) -> Tuple[int, float]:
+        """
+        距离给定位置最近的顶点。
+
+        Args:
+            lat: 纬度
+            lon: 经度
+
+        Returns:
+            (顶点下标, 距离（米）)
+        """
+        dy = (np.asarray(self.node_lat) - lat) * METERS_PER_DEGREE
+        dx = (np.asarray(self.node_lon) - lon) * METERS_PER_DEGREE * math.cos(math.radians(lat))
+        distance = dx * dx + dy * dy
+        node = int(np.argmin(distance))
+        return node, float(math.sqrt(distance[node]))
+
+    def _adjacency(self) -> Tuple[List[Any], ...]:
+        """
+        搜索用的邻接表副本（Python 列表），首次查询时从数组转换一次。
+
+        搜索循环逐个访问弧，列表下标访问比 numpy 标量快一个数量级。
+        """
+        with self._lists_lock:
+            if self._lists is None:
+                self._lists = (
+                    np.asarray(self.indptr).tolist(),
+                    np.asarray(self.arc_target).tolist(),
+                    np.asarray(self.arc_time).tolist(),
+                    self.arc_edge_id.tolist(),
+                    np.asarray(self.edge_sac)[self.arc_edge_id].tolist(),
+                    np.asarray(self.node_lat).tolist(),
+                    np.asarray(self.node_lon).tolist(),
+                )
+        return self._lists
+
+    def _search(
+        self,
+        source: int,
+        max_sac: int,
+        target: Optional[int] = None,
+        limit_s: float = math.inf,
+        penalty: Optional[Dict[int, float]] = None,
+    ) -> Tuple[Dict[int, float], Dict[int, Tuple[int, int]]]:
+        """
+        Dijkstra（给定 target 时为 A*）。
+
+        Args:
+            source: 起点顶点
+            max_sac: 允许的最高难度等级
+            target: 终点顶点，到达后停止
+            limit_s: 只搜索行走时间不超过该值的顶点
+            penalty: 边下标到时间加罚倍数
+
+        Returns:
+            (顶点到已确定的最短时间, 顶点到 (入弧, 前驱顶点))
+        """
+        indptr, arc_target, arc_time, arc_edge, arc_sac, node_lat, node_lon = self._adjacency()
+        if target is not None:
+            t_lat, t_lon = node_lat[target], node_lon[target]
+            cos_lat = math.cos(math.radians(t_lat))
+            scale = METERS_PER_DEGREE / self.max_speed
+
+            def heuristic(node: int) -> float:
+                dy = node_lat[node] - t_lat
+                dx = (node_lon[node] - t_lon) * cos_lat
+                return math.sqrt(dx * dx + dy * dy) * scale
+
+        else:
+
+            def heuristic(node: int) -> float:
+                return 0.0
+
+        best = {source: 0.0}
+        parent: Dict[int, Tuple[int, int]] = {}
+        done: Dict[int, float] = {}
+        heap = [(heuristic(source), 0.0, source)]
+        while heap:
+            _, g, node = heapq.heappop(heap)
+            if node in done or g > limit_s:
+                continue
+            done[node] = g
+            if node == target:
+                break
+            for arc in range(indptr[node], indptr[node + 1]):
+                next_node = arc_target[arc]
+                if arc_sac[arc] > max_sac or next_node in done:
+                    continue
+                time_s = arc_time[arc]
+                if penalty and arc_edge[arc] in penalty:
+                    time_s *= penalty[arc_edge[arc]]
+                cost = g + time_s
+                if cost < best.get(next_node, math.inf):
+                    best[next_node] = cost
+                    parent[next_node] = (arc, node)
+                    heapq.heappush(heap, (cost + heuristic(next_node), cost, next_node))
+        return done, parent
+
+    @staticmethod
+    def _arcs(parent: Dict[int, Tuple[int, int]], node: int) -> List[int]:
+        """从前驱表回溯到起点的弧序列。"""
+        arcs = []
+        while node in parent:
+            arc, node = parent[node]
+            arcs.append(arc)
+        return arcs[::-1]
+
+    def _route(self, arcs: List[int], kind: str) -> "RoutePlan":
+        """由弧序列汇总路线。"""
+        arcs_array = np.array(arcs, dtype=np.int64)
+        edges = self.arc_edge_id[arcs_array]
+        forward = self.arc_edge[arcs_array] >= 0
+        distance = self.edge_distance[edges]
+        lat, lon, ele = [], [], []
+        for i, (edge, fwd) in enumerate(zip(edges.tolist(), forward.tolist())):
+            piece = slice(int(self.geom_offset[edge]), int(self.geom_offset[edge + 1]))
+            step = 1 if fwd else -1
+            skip = 1 if i else 0
+            lat.append(np.asarray(self.geom_lat[piece])[::step][skip:])
+            lon.append(np.asarray(self.geom_lon[piece])[::step][skip:])
+            ele.append(np.asarray(self.geom_ele[piece])[::step][skip:])
+        unique_edges, counts = np.unique(edges, return_counts=True)
+        reused = float((distance * np.isin(edges, unique_edges[counts > 1])).sum())
+        names = []
+        for name_id in self.edge_name[edges].tolist():
+            if name_id >= 0 and self.names[name_id] not in names:
+                names.append(self.names[name_id])
+        total = float(distance.sum())
+        return RoutePlan(
+            kind=kind,
+            duration_s=float(self.arc_time[arcs_array].sum()),
+            distance_m=total,
+            ascent_m=float(np.where(forward, self.edge_ascent[edges], self.edge_descent[edges]).sum()),
+            descent_m=float(np.where(forward, self.edge_descent[edges], self.edge_ascent[edges]).sum()),
+            max_sac=int(self.edge_sac[edges].max()),
+            overlap=reused / total if total else 0.0,
+            names=names,
+            lat=np.concatenate(lat),
+            lon=np.concatenate(lon),
+            ele=np.concatenate(ele),
+            edges=frozenset(edges.tolist()),
+        )
+
+    def point_to_point(self, source: int, target: int, max_sac: int = 6, count: int = 2) -> List["RoutePlan"]:
+        """
+        点到点路线：最快路线，以及对已用过的边加罚后得到的备选路线。
+
+        Args:
+            source: 起点顶点
+            target: 终点顶点
+            max_sac: 允许的最高难度等级
+            count: 最多返回的路线数
+
+        Returns:
+            路线列表，第一条最快；不可达时为空列表
+        """
+        plans: List[RoutePlan] = []
+        penalty: Dict[int, float] = {}
+        for _ in range(count):
+            done, parent = self._search(source, max_sac, target=target, penalty=penalty)
+            if target not in done or source == target:
+                break
+            plan = self._route(self._arcs(parent, target), "point_to_point")
+            if any(plan.edges == other.edges for other in plans):
+                break
+            plans.append(plan)
+            for edge in plan.edges:
+                penalty[edge] = penalty.get(edge, 1.0) * REUSE_PENALTY
+        return plans
+
+    def loops(
+        self,
+        source: int,
+        target_s: float,
+        max_sac: int = 6,
+        count: int = 3,
+        max_ascent_m: Optional[float] = None,
+    ) -> List["RoutePlan"]:
+        """
+        从起点出发回到起点的环线，按与目标时长的偏差、重复路段比例和超出的爬升排序。
+
+        Args:
+            source: 起点顶点
+            target_s: 目标行走时间（秒）
+            max_sac: 允许的最高难度等级
+            count: 最多返回的路线数
+            max_ascent_m: 爬升上限（超出部分计入排序惩罚）
+
+        Returns:
+            环线列表；起点附近没有可走的道路时为空列表
+        """
+        low, high = TURNAROUND_RANGE
+        done, parent = self._search(source, max_sac, limit_s=target_s * high)
+        nodes = np.array([node for node in done if node != source], dtype=np.int64)
+        if not len(nodes):
+            return []
+        times = np.array([done[node] for node in nodes.tolist()])
+        in_range = (times >= target_s * low) & (times <= target_s * high)
+        if not in_range.any():
+            # 目标太长、附近的路不够：退而选最远的一批顶点
+            in_range = times >= times.max() * 0.8
+        nodes, times = nodes[in_range], times[in_range]
+        s_lat, s_lon = float(self.node_lat[source]), float(self.node_lon[source])
+        bearing = np.degrees(
+            np.arctan2(
+                (np.asarray(self.node_lon)[nodes] - s_lon) * math.cos(math.radians(s_lat)),
+                np.asarray(self.node_lat)[nodes] - s_lat,
+            )
+        )
+        sector = ((bearing % 360.0) / (360.0 / TURNAROUND_SECTORS)).astype(np.int64)
+        mid = target_s * (low + high) / 2
+        turnarounds = []
+        for s in np.unique(sector).tolist():
+            members = np.flatnonzero(sector == s)
+            turnarounds.append(int(nodes[members[np.argmin(np.abs(times[members] - mid))]]))
+
+        plans: List[RoutePlan] = []
+        for node in turnarounds:
+            outbound = self._arcs(parent, node)
+            penalty = {int(edge): REUSE_PENALTY for edge in self.arc_edge_id[outbound].tolist()}
+            back_done, back_parent = self._search(node, max_sac, target=source, penalty=penalty)
+            if source not in back_done:
+                continue
+            plan = self._route(outbound + self._arcs(back_parent, source), "loop")
+            if any(plan.edges == other.edges for other in plans):
+                continue
+            excess = max(0.0, plan.ascent_m - max_ascent_m) / max_ascent_m if max_ascent_m else 0.0
+            plan.score = abs(plan.duration_s - target_s) / target_s + plan.overlap + excess
+            plans.append(plan)
+        return sorted(plans, key=lambda plan: plan.score)[:count]
+
+
+@dataclass(slots=True)
+class RoutePlan:
+    """一条计算出的路线。"""
+
+    kind: str  # loop / point_to_point
+    duration_s: float
+    distance_m: float
+    ascent_m: float
+    descent_m: float
+    max_sac: int
+    overlap: float  # 重复走过的路段占总里程的比例
+    names: List[str]
+    lat: np.ndarray
+    lon: np.ndarray
+    ele: np.ndarray
+    edges: frozenset
+    score: float = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        """写入状态的紧凑摘要。"""
+        return {
+            "kind": self.kind,
+            "distance_km": round(self.distance_m / 1000, 1),
+            "duration_h": round(self.duration_s / 3600, 1),
+            "ascent_m": round(self.ascent_m),
+            "descent_m": round(self.descent_m),
+            "max_sac": self.max_sac,
+            "overlap": round(self.overlap, 2),
+            "ways": self.names[:6],
+        }
+
+    def to_gpx(self, name: str = "") -> str:
+        """
+        路线导出为 GPX 轨迹。
+
+        Args:
+            name: 轨迹名称
+
+        Returns:
+            GPX 文本
+        """
+        gpx = gpxpy.gpx.GPX()
+        track = gpxpy.gpx.GPXTrack(name=name or None)
+        segment = gpxpy.gpx.GPXTrackSegment()
+        for lat, lon, ele in zip(self.lat.tolist(), self.lon.tolist(), self.ele.tolist()):
+            segment.points.append(
+                gpxpy.gpx.GPXTrackPoint(lat, lon, elevation=None if math.isnan(ele) else round(ele, 1))
+            )
+        track.segments.append(segment)
+        gpx.tracks.append(track)
+        return gpx.to_xml()
+
+
+def build_trail_graph(ways: Sequence[OsmWay], dems: Sequence[Dem] = ()) -> TrailGraph:
+    """
+    由徒步道路构建步道图。
+
+    Args:
+        ways: 道路（见 read_osm）
+        dems: 高程模型，几何点在任一 DEM 内时使用 DEM 高程
+
+    Returns:
+        TrailGraph
+    """
+    if not ways:
+        raise ValueError("没有可用的徒步道路")
+    refs, counts = np.unique(np.concatenate([way.refs for way in ways]), return_counts=True)
+    junctions = set(refs[counts >= 2].tolist())
+    for way in ways:
+        junctions.add(int(way.refs[0]))
+        junctions.add(int(way.refs[-1]))
+
+    vertex: Dict[int, int] = {}
+    node_lat, node_lon = [], []
+    names: List[str] = []
+    name_index: Dict[str, int] = {}
+    edge_u, edge_v, edge_sac, edge_name, geom_sizes = [], [], [], [], []
+    geom_lat, geom_lon, geom_ele = [], [], []
+    for way in ways:
+        way_refs = way.refs.tolist()
+        cuts = [i for i, ref in enumerate(way_refs) if ref in junctions]
+        for i in cuts:
+            if way_refs[i] not in vertex:
+                vertex[way_refs[i]] = len(node_lat)
+                node_lat.append(way.lat[i])
+                node_lon.append(way.lon[i])
+        if way.name and way.name not in name_index:
+            name_index[way.name] = len(names)
+            names.append(way.name)
+        for a, b in zip(cuts[:-1], cuts[1:]):
+            edge_u.append(vertex[way_refs[a]])
+            edge_v.append(vertex[way_refs[b]])
+            edge_sac.append(way.sac)
+            edge_name.append(name_index.get(way.name, -1))
+            geom_sizes.append(b - a + 1)
+            geom_lat.append(way.lat[a:b + 1])
+            geom_lon.append(way.lon[a:b + 1])
+            geom_ele.append(way.ele[a:b + 1])
+
+    geom_offset = np.concatenate([[0], np.cumsum(geom_sizes)]).astype(np.int64)
+    lat = np.concatenate(geom_lat)
+    lon = np.concatenate(geom_lon)
+    ele = np.concatenate(geom_ele).astype(np.float64)
+    for dem in dems:
+        sampled = dem.elevation(lat, lon)
+        ele = np.where(np.isfinite(sampled), sampled, ele)
+
+    # 相邻几何点的线段，跨越两条边的线段不计
+    n_edges = len(edge_u)
+    inside = np.ones(len(lat) - 1, dtype=bool)
+    inside[geom_offset[1:-1] - 1] = False
+    seg_edge = np.repeat(np.arange(n_edges), np.diff(geom_offset) - 1)
+    length = segment_lengths(lat, lon)[inside]
+    rise = np.nan_to_num(np.diff(ele))[inside]
+    slope = np.divide(rise, length, out=np.zeros_like(rise), where=length > 0)
+    time_forward = np.bincount(seg_edge, weights=length / tobler_speed(slope), minlength=n_edges)
+    time_backward = np.bincount(seg_edge, weights=length / tobler_speed(-slope), minlength=n_edges)
+
+    edge_u_arr = np.array(edge_u, dtype=np.int64)
+    edge_v_arr = np.array(edge_v, dtype=np.int64)
+    source = np.concatenate([edge_u_arr, edge_v_arr])
+    order = np.argsort(source, kind="stable")
+    edge_ids = np.arange(n_edges, dtype=np.int32)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(source, minlength=len(node_lat)))])
+    arrays = {
+        "node_lat": np.array(node_lat, dtype=np.float64),
+        "node_lon": np.array(node_lon, dtype=np.float64),
+        "indptr": indptr.astype(np.int64),
+        "arc_target": np.concatenate([edge_v_arr, edge_u_arr])[order].astype(np.int32),
+        "arc_edge": np.concatenate([edge_ids, ~edge_ids])[order],
+        "arc_time": np.concatenate([time_forward, time_backward])[order].astype(np.float32),
+        "edge_distance": np.bincount(seg_edge, weights=length, minlength=n_edges).astype(np.float32),
+        "edge_ascent": np.bincount(seg_edge, weights=np.maximum(rise, 0), minlength=n_edges).astype(np.float32),
+        "edge_descent": np.bincount(seg_edge, weights=np.maximum(-rise, 0), minlength=n_edges).astype(np.float32),
+        "edge_sac": np.array(edge_sac, dtype=np.uint8),
+        "edge_name": np.array(edge_name, dtype=np.int32),
+        "geom_offset": geom_offset,
+        "geom_lat": lat,
+        "geom_lon": lon,
+        "geom_ele": ele.astype(np.float32),
+    }
+    return TrailGraph(arrays, names)
+
+
+_trail_graph: Optional[TrailGraph] = None
+_trail_graph_lock = threading.Lock()
+
+
+def get_trail_graph() -> Optional[TrailGraph]:
+    """
+    获取进程内共享的步道图，尚未构建时返回 None。
+
+    Returns:
+        TrailGraph 实例或 None
+    """
+    global _trail_graph
+    path = Path(load_config().get("trail_graph", {}).get("path", "./data/trail_graph"))
+    with _trail_graph_lock:
+        if _trail_graph is None:
+            if not (path / INDEX_FILE).exists():
+                return None
+            _trail_graph = TrailGraph.open(path)
+            logger.info(f"步道图: {path}，顶点 {_trail_graph.node_count}，边 {_trail_graph.edge_count}")
+    return _trail_graph
@@ -0,0 +1,258 @@
+"""
+景观点可视域与天际线库
+
+离线为已知景观点（山峰、观景台等）预计算可视域和天际线（见 scripts/build_viewsheds.py），
+请求时拍摄计划节点只做查表，不做视线计算：
+- visible.bin：各景观点可视域窗口的位图（np.packbits），内存映射读取，每个轨迹点 O(1) 查一个比特；
+- horizons.npy：各景观点的天际线仰角，形状 (景观点数, 方位分段数)；
+- index.json：景观点元数据、窗口的地理范围和在位图中的字节偏移（最后写入，存在即表示库完整）。
+"""
+
+import json
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+import numpy as np
+from hikebutler.config.loader import load_config
+from hikebutler.geo.dem import METERS_PER_DEGREE, Dem, Sweep, open_dem, radial_sweep
+import logging
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+BITS_FILE = "visible.bin"
+HORIZONS_FILE = "horizons.npy"
+FORMAT_VERSION = 1
+
+
+def write_viewsheds(path: Union[str, Path], points: Sequence[Dict[str, Any]], sweeps: Sequence[Sweep]) -> None:
+    """
+    写入可视域库（覆盖已有文件）。
+
+    Args:
+        path: 输出目录
+        points: 景观点，包含 name、lat、lon，可选 kind
+        sweeps: 与 points 对应的扫描结果
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    index_path = path / INDEX_FILE
+    # 先删除索引，写入中途失败时不会留下与数据不一致的索引
+    index_path.unlink(missing_ok=True)
+
+    entries = []
+    offset = 0
+    with open(path / BITS_FILE, "wb") as f:
+        for i, (point, sweep) in enumerate(zip(points, sweeps)):
+            packed = np.packbits(sweep.visible, axis=None)
+            f.write(packed.tobytes())
+            rows, cols = sweep.visible.shape
+            entries.append(
+                {
+                    "id": i,
+                    "name": point["name"],
+                    "kind": point.get("kind", ""),
+                    "lat": float(point["lat"]),
+                    "lon": float(point["lon"]),
+                    "elevation_m": round(sweep.elevation_m, 1),
+                    "north": sweep.north,
+                    "west": sweep.west,
+                    "dlat": sweep.dlat,
+                    "dlon": sweep.dlon,
+                    "rows": rows,
+                    "cols": cols,
+                    "offset": offset,
+                }
+            )
+            offset += len(packed)
+    horizons = np.stack([sweep.horizon_deg for sweep in sweeps]).astype(np.float32) if sweeps else np.empty((0, 0))
+    np.save(path / HORIZONS_FILE, horizons)
+
+    tmp_path = index_path.with_suffix(".tmp")
+    tmp_path.write_text(
+        json.dumps({"version": FORMAT_VERSION, "points": entries}, ensure_ascii=False), encoding="utf-8"
+    )
+    os.replace(tmp_path, index_path)
+
+
+def build_viewsheds(
+    dem_paths: Sequence[Union[str, Path]],
+    points: Sequence[Dict[str, Any]],
+    output: Union[str, Path],
+    radius_m: float = 30000.0,
+    observer_height_m: float = 2.0,
+    target_height_m: float = 1.7,
+    azimuth_bins: int = 360,
+) -> int:
+    """
+    为景观点预计算可视域和天际线并写入库。
+
+    每个景观点使用包含它的 DEM 瓦片，扫描范围不跨瓦片（瓦片外的地形视为不可见、不遮挡）。
+
+    Args:
+        dem_paths: DEM 瓦片路径
+        points: 景观点，包含 name、lat、lon，可选 kind
+        output: 输出目录
+        radius_m: 扫描半径（米）
+        observer_height_m: 景观点上方的观察高度
+        target_height_m: 徒步者视线高度
+        azimuth_bins: 天际线的方位分段数
+
+    Returns:
+        写入的景观点数
+    """
+    dems = [open_dem(p) for p in dem_paths]
+    kept, sweeps = [], []
+    for point in points:
+        dem = _covering(dems, float(point["lat"]), float(point["lon"]))
+        if dem is None:
+            logger.warning(f"景观点不在任何 DEM 瓦片内，跳过: {point['name']}")
+            continue
+        sweeps.append(
+            radial_sweep(
+                dem,
+                float(point["lat"]),
+                float(point["lon"]),
+                radius_m=radius_m,
+                observer_height_m=observer_height_m,
+                target_height_m=target_height_m,
+                azimuth_bins=azimuth_bins,
+            )
+        )
+        kept.append(point)
+        logger.info(f"可视域: {point['name']}，可见格网 {int(sweeps[-1].visible.sum())}")
+    write_viewsheds(output, kept, sweeps)
+    return len(kept)
+
+
+def _covering(dems: Sequence[Dem], lat: float, lon: float) -> Optional[Dem]:
+    """包含该点的 DEM 瓦片。"""
+    for dem in dems:
+        rows, cols = dem.rowcol(lat, lon)
+        if 0 <= rows < dem.shape[0] and 0 <= cols < dem.shape[1]:
+            return dem
+    return None
+
+
+class ViewshedStore:
+    """可视域库的只读查询。"""
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        打开可视域库。
+
+        Args:
+            path: 库目录（见 write_viewsheds）
+        """
+        path = Path(path)
+        index = json.loads((path / INDEX_FILE).read_text(encoding="utf-8"))
+        self.points: List[Dict[str, Any]] = index["points"]
+        size = (path / BITS_FILE).stat().st_size
+        self._bits = np.memmap(path / BITS_FILE, dtype=np.uint8, mode="r") if size else np.empty(0, np.uint8)
+        self._horizons = np.load(path / HORIZONS_FILE, mmap_mode="r")
+        self._lat = np.array([p["lat"] for p in self.points])
+        self._lon = np.array([p["lon"] for p in self.points])
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def covering(self, lats: Sequence[float], lons: Sequence[float]) -> List[int]:
+        """
+        可视域窗口覆盖任一给定点的景观点。
+
+        Args:
+            lats: 纬度数组
+            lons: 经度数组
+
+        Returns:
+            景观点下标列表
+        """
+        lats, lons = np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+        if not len(lats):
+            return []
+        result = []
+        for i, p in enumerate(self.points):
+            south = p["north"] - (p["rows"] - 1) * p["dlat"]
+            east = p["west"] + (p["cols"] - 1) * p["dlon"]
+            if np.any((lats >= south) & (lats <= p["north"]) & (lons >= p["west"]) & (lons <= east)):
+                result.append(i)
+        return result
+
+    def visible(self, index: int, lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+        """
+        景观点从各位置是否可见，每个位置读取一个比特。
+
+        Args:
+            index: 景观点下标
+            lats: 纬度数组
+            lons: 经度数组
+
+        Returns:
+            布尔数组，窗口外为 False
+        """
+        p = self.points[index]
+        rows = np.rint((p["north"] - np.asarray(lats, dtype=np.float64)) / p["dlat"]).astype(np.int64)
+        cols = np.rint((np.asarray(lons, dtype=np.float64) - p["west"]) / p["dlon"]).astype(np.int64)
+        inside = (rows >= 0) & (rows < p["rows"]) & (cols >= 0) & (cols < p["cols"])
+        bit = np.where(inside, rows * p["cols"] + cols, 0)
+        values = self._bits[p["offset"] + (bit >> 3)] & (0x80 >> (bit & 7)).astype(np.uint8)
+        return inside & (values != 0)
+
+    def horizon(self, index: int, azimuth: Union[float, np.ndarray]) -> np.ndarray:
+        """
+        景观点在给定方位上的天际线仰角。
+
+        Args:
+            index: 景观点下标
+            azimuth: 方位角（度，正北顺时针）
+
+        Returns:
+            仰角（度）
+        """
+        profile = self._horizons[index]
+        bins = np.floor(np.asarray(azimuth, dtype=np.float64) % 360.0 / 360.0 * len(profile)).astype(np.int64)
+        return np.asarray(profile)[bins % len(profile)]
+
+    def nearest(self, lat: float, lon: float, max_distance_m: float = 300.0) -> Optional[int]:
+        """
+        距离给定位置最近的景观点。
+
+        Args:
+            lat: 纬度
+            lon: 经度
+            max_distance_m: 最大距离（米）
+
+        Returns:
+            景观点下标，没有足够近的景观点时返回 None
+        """
+        if not len(self.points):
+            return None
+        dy = (self._lat - lat) * METERS_PER_DEGREE
+        dx = (self._lon - lon) * METERS_PER_DEGREE * math.cos(math.radians(lat))
+        distance = np.hypot(dx, dy)
+        i = int(np.argmin(distance))
+        return i if distance[i] <= max_distance_m else None
+
+
+_viewshed_store: Optional[ViewshedStore] = None
+_viewshed_store_lock = threading.Lock()
+
+
+def get_viewshed_store() -> Optional[ViewshedStore]:
+    """
+    获取进程内共享的可视域库，库尚未生成时返回 None。
+
+    Returns:
+        ViewshedStore 实例或 None
+    """
+    global _viewshed_store
+    path = Path(load_config().get("viewshed", {}).get("path", "./data/viewsheds"))
+    with _viewshed_store_lock:
+        if _viewshed_store is None:
+            if not (path / INDEX_FILE).exists():
+                return None
+            _viewshed_store = ViewshedStore(path)
+            logger.info(f"可视域库: {path}，景观点 {len(_viewshed_store)}")
+    return _viewshed_store
@@ -0,0 +1,142 @@
+"""
+批量规划
+
+徒步俱乐部常常要为同一条路线的 20~50 名参与者各生成一份计划。逐个调用徒步准备工作流会为每个人
+重复路线检索、天气查询和拍摄计划。批量规划把工作拆成两段：
+
+- 共享阶段：路线、天气、基础装备清单、拍摄计划只运行一次（同样先解析地点坐标、查热门路线缓存，产物写回缓存）；
+- 成员阶段：每个成员在共享中间结果之上只运行个性化和融合，成员之间并发执行。
+
+单个成员失败不影响其他成员，结果中记录错误信息。
+"""
+
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Dict, List, Optional
+from hikebutler.config.loader import load_config
+from hikebutler.graph.workflow import create_member_workflow, create_shared_workflow
+from hikebutler.state import HikeButlerState
+from hikebutler.storage.plan_cache import get_plan_cache
+from hikebutler.tools.geocoding import resolve_location
+import logging
+
+logger = logging.getLogger(__name__)
+
+_shared_workflow = None
+_member_workflow = None
+
+
+def _workflows():
+    """懒加载共享阶段和成员阶段工作流。"""
+    global _shared_workflow, _member_workflow
+    if _shared_workflow is None:
+        _shared_workflow = create_shared_workflow()
+        _member_workflow = create_member_workflow()
+    return _shared_workflow, _member_workflow
+
+
+def _shared_input(input_data: Dict[str, Any]) -> Dict[str, Any]:
+    """共享阶段的输入：与单人请求一样补上地点坐标，步道图路线和计划缓存键与单人请求一致。"""
+    input_data = dict(input_data)
+    if input_data.get("lat") is None and input_data.get("location"):
+        place = resolve_location(input_data["location"])
+        if place is not None:
+            input_data.update(lat=place.lat, lon=place.lon, place=place.name)
+    return input_data
+
+
+def _shared_state(input_data: Dict[str, Any]) -> HikeButlerState:
+    """共享阶段的初始状态（不含用户信息）。"""
+    return {
+        "messages": [],
+        "user_profile": None,
+        "user_id": None,
+        "user_features": None,
+        "session_id": None,
+        "intermediate_results": {},
+        "current_task": "preparation",
+        "input_data": dict(input_data),
+        "output_data": None,
+    }
+
+
+def plan_batch(
+    input_data: Dict[str, Any],
+    user_ids: List[str],
+    max_workers: Optional[int] = None,
+    batch_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    为同一条路线的多名成员生成个性化计划。
+
+    Args:
+        input_data: 徒步准备输入（location、duration、difficulty）
+        user_ids: 成员用户 ID 列表（重复的 ID 只计算一次）
+        max_workers: 并发执行的成员数，默认读取 batch.max_workers
+        batch_id: 批次 ID，用于区分各成员的记忆会话，默认随机生成
+
+    Returns:
+        {"batch_id", "shared": 共享中间结果, "members": [{"user_id", "output"} 或 {"user_id", "error"}],
+         "timings": 共享阶段和成员阶段耗时（秒）}
+
+    Raises:
+        ValueError: 成员数超过 batch.max_members
+    """
+    from hikebutler.graph.service import preparation_state
+
+    batch_config = load_config().get("batch", {})
+    user_ids = list(dict.fromkeys(user_ids))
+    max_members = batch_config.get("max_members", 50)
+    if len(user_ids) > max_members:
+        raise ValueError(f"成员数 {len(user_ids)} 超过上限 {max_members}")
+    max_workers = max_workers or batch_config.get("max_workers", 8)
+    batch_id = batch_id or uuid.uuid4().hex
+    shared_workflow, member_workflow = _workflows()
+
+    started = time.perf_counter()
+    input_data = _shared_input(input_data)
+    shared = shared_workflow.invoke(_shared_state(input_data))["intermediate_results"]
+    shared_elapsed = time.perf_counter() - started
+    try:
+        # 同一路线当天的单人请求可以直接命中
+        cache = get_plan_cache()
+        if cache is not None:
+            cache.put(input_data, date.today(), shared)
+    except Exception as e:
+        logger.warning(f"批量规划产物写入计划缓存失败: {e}")
+    logger.info(f"批量规划共享阶段完成: batch_id={batch_id}, 耗时 {shared_elapsed:.2f} s")
+
+    def plan_member(user_id: str) -> Dict[str, Any]:
+        try:
+            state = preparation_state(
+                input_data.get("location", ""),
+                input_data.get("duration", ""),
+                input_data.get("difficulty", ""),
+                user_id,
+                f"{batch_id}:{user_id}",
+            )
+            state["intermediate_results"] = dict(shared)
+            result = member_workflow.invoke(state)
+            return {"user_id": user_id, "output": result.get("output_data") or {}}
+        except Exception as e:
+            logger.error(f"成员计划生成失败: batch_id={batch_id}, user_id={user_id}, {e}")
+            return {"user_id": user_id, "error": str(e)}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(user_ids) or 1))) as executor:
+        members = list(executor.map(plan_member, user_ids))
+    members_elapsed = time.perf_counter() - started
+    failed = sum("error" in member for member in members)
+    logger.info(
+        f"批量规划完成: batch_id={batch_id}, 成员 {len(members)}（失败 {failed}），"
+        f"成员阶段耗时 {members_elapsed:.2f} s"
+    )
+
+    return {
+        "batch_id": batch_id,
+        "shared": shared,
+        "members": members,
+        "timings": {"shared_s": round(shared_elapsed, 3), "members_s": round(members_elapsed, 3)},
+    }
@@ -0,0 +1,104 @@
+"""
+LangGraph 检查点配置
+
+为工作流提供持久化检查点，节点失败后重试可以从最后一个成功的节点继续执行。
+默认使用本地 SQLite，可选 MySQL；序列化使用 LangGraph 的 JsonPlusSerializer（msgpack 编码）。
+"""
+
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Optional
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from hikebutler.config.loader import load_config
+from hikebutler.state import RouteResult, WeatherResult, GearResult, PhotoPlanResult, UserFeatures
+import logging
+
+logger = logging.getLogger(__name__)
+
+_checkpointer: Optional[BaseCheckpointSaver] = None
+
+# 允许从检查点反序列化的状态类型
+_STATE_TYPES = (RouteResult, WeatherResult, GearResult, PhotoPlanResult, UserFeatures)
+
+
+def _create_serializer() -> JsonPlusSerializer:
+    """创建检查点序列化器，并登记状态中使用的 dataclass 类型。"""
+    allowed = [(cls.__module__, cls.__name__) for cls in _STATE_TYPES]
+    try:
+        return JsonPlusSerializer(allowed_msgpack_modules=allowed)
+    except TypeError:
+        # 旧版本 langgraph 不限制反序列化类型
+        return JsonPlusSerializer()
+
+
+def create_checkpointer(config: Optional[Dict[str, Any]] = None) -> Optional[BaseCheckpointSaver]:
+    """
+    根据配置创建检查点存储。
+
+    Args:
+        config: 完整配置字典，默认从 config.yaml 加载
+
+    Returns:
+        检查点存储实例，未启用时返回 None
+
+    Raises:
+        ValueError: 不支持的检查点后端
+    """
+    if config is None:
+        config = load_config()
+    checkpoint_config = config.get("langgraph", {}).get("checkpoint", {})
+
+    if not checkpoint_config.get("enabled", False):
+        return None
+
+    backend = checkpoint_config.get("backend", "sqlite")
+    serde = _create_serializer()
+
+    if backend == "sqlite":
+        from langgraph.checkpoint.sqlite import SqliteSaver
+
+        path = Path(checkpoint_config.get("path", "./data/checkpoints.sqlite"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        saver = SqliteSaver(conn, serde=serde)
+        saver.setup()
+        logger.info(f"检查点存储: SQLite {path}")
+        return saver
+    elif backend == "mysql":
+        # 需要安装 langgraph-checkpoint-mysql
+        import pymysql
+        from langgraph.checkpoint.mysql.pymysql import PyMySQLSaver
+
+        mysql_config = config.get("database", {}).get("mysql", {})
+        conn = pymysql.connect(
+            host=mysql_config.get("host", "localhost"),
+            port=int(mysql_config.get("port", 3306)),
+            user=mysql_config.get("user", "root"),
+            password=mysql_config.get("password", ""),
+            database=mysql_config.get("database", "hikebutler"),
+            autocommit=True,
+        )
+        saver = PyMySQLSaver(conn, serde=serde)
+        saver.setup()
+        logger.info("检查点存储: MySQL")
+        return saver
+    elif backend == "memory":
+        return InMemorySaver(serde=serde)
+    else:
+        raise ValueError(f"不支持的检查点后端: {backend}")
+
+
+def get_checkpointer() -> Optional[BaseCheckpointSaver]:
+    """
+    获取进程内共享的检查点存储。
+
+    Returns:
+        检查点存储实例，未启用时返回 None
+    """
+    global _checkpointer
+    if _checkpointer is None:
+        _checkpointer = create_checkpointer()
+    return _checkpointer
@@ -0,0 +1,178 @@
+"""
+工作流运行器
+
+为每次运行分配 thread_id，并在启用检查点时支持从失败节点处恢复执行。
+同一 thread_id 的运行串行执行，避免两个请求同时读写同一条检查点链。
+"""
+
+import hashlib
+import json
+import threading
+from datetime import date
+from typing import Any, Dict, Iterator, Optional, Tuple
+from hikebutler.config.loader import load_config
+from hikebutler.state import HikeButlerState
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 按 thread_id 分段的运行锁（固定数量，避免为每个 thread_id 创建锁导致内存增长）
+_RUN_LOCK_STRIPES = 64
+_run_locks = [threading.Lock() for _ in range(_RUN_LOCK_STRIPES)]
+
+
+def _run_lock(thread_id: str) -> threading.Lock:
+    """获取 thread_id 对应的运行锁。"""
+    digest = hashlib.sha1(thread_id.encode("utf-8")).digest()
+    return _run_locks[int.from_bytes(digest[:4], "big") % _RUN_LOCK_STRIPES]
+
+
+def make_thread_id(
+    task: str,
+    user_id: Optional[str],
+    input_data: Optional[Dict[str, Any]],
+    day: Optional[date] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    """
+    根据任务、用户、会话和输入生成 thread_id。
+
+    同一会话、同一天内相同的输入得到相同的 thread_id，因此用户重试时可以命中上次的检查点。
+    session_id 由服务端为每个客户端会话生成并在重试时带回，
+    使用相同（默认）用户 ID 的不同客户端不会共享检查点。
+
+    Args:
+        task: 任务类型（preparation 或 review）
+        user_id: 用户 ID
+        input_data: 用户输入数据
+        day: 日期，默认今天
+        session_id: 客户端会话标识
+
+    Returns:
+        thread_id 字符串
+    """
+    day = day or date.today()
+    payload = json.dumps(
+        {"session": session_id, "input": input_data or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+    return f"{task}-{user_id or 'anonymous'}-{day:%Y%m%d}-{digest}"
+
+
+def _run_config(
+    initial_state: HikeButlerState,
+    thread_id: Optional[str],
+    session_id: Optional[str],
+) -> Dict[str, Any]:
+    """构建运行配置，未指定 thread_id 时根据初始状态和 session_id 生成。"""
+    if thread_id is None:
+        thread_id = make_thread_id(
+            initial_state.get("current_task") or "task",
+            initial_state.get("user_id"),
+            initial_state.get("input_data"),
+            session_id=session_id,
+        )
+
+    langgraph_config = load_config().get("langgraph", {})
+    return {
+        "configurable": {"thread_id": thread_id},
+        "recursion_limit": langgraph_config.get("recursion_limit", 50),
+    }
+
+
+def _resume_input(
+    workflow: Any, initial_state: HikeButlerState, run_config: Dict[str, Any]
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    确定本次运行的输入和配置。
+
+    上次运行未完成时返回 None（从检查点继续）；该 thread_id 上的运行已经完成时，
+    改用带序号的新 thread_id（“-2”“-3”……，取第一个未完成的），避免 reducer 把上次的中间结果
+    和消息合并进新的运行、计划缓存判断误以为节点已完成；新运行中途失败时重试同样会找到它继续。
+
+    Returns:
+        (工作流输入, 运行配置)
+    """
+    base_id = run_config["configurable"]["thread_id"]
+    attempt = 1
+    while True:
+        snapshot = workflow.get_state(run_config)
+        if snapshot.next:
+            # 上次运行未完成，已完成节点的输出保存在检查点中，无需重算
+            logger.info(
+                f"从检查点恢复运行: thread_id={run_config['configurable']['thread_id']}, "
+                f"待执行节点={snapshot.next}"
+            )
+            return None, run_config
+        if not snapshot.values:
+            return initial_state, run_config
+        attempt += 1
+        configurable = {**run_config["configurable"], "thread_id": f"{base_id}-{attempt}"}
+        run_config = {**run_config, "configurable": configurable}
+
+
+def run_workflow(
+    workflow: Any,
+    initial_state: HikeButlerState,
+    thread_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    运行工作流；若该 thread_id 上次运行中途失败，则从最后一个成功的节点继续，已完成时重新运行。
+
+    Args:
+        workflow: 已编译的 LangGraph 工作流
+        initial_state: 初始状态
+        thread_id: 运行 ID，默认根据初始状态和 session_id 生成
+        session_id: 客户端会话标识（见 make_thread_id）
+
+    Returns:
+        工作流最终状态
+    """
+    run_config = _run_config(initial_state, thread_id, session_id)
+    if getattr(workflow, "checkpointer", None) is None:
+        return workflow.invoke(initial_state, run_config)
+
+    with _run_lock(run_config["configurable"]["thread_id"]):
+        input_state, run_config = _resume_input(workflow, initial_state, run_config)
+        return workflow.invoke(input_state, run_config)
+
+
+def stream_workflow(
+    workflow: Any,
+    initial_state: HikeButlerState,
+    thread_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> Iterator[Tuple[str, Any]]:
+    """
+    运行工作流并逐个产出节点更新，恢复逻辑与 run_workflow 相同。
+
+    Args:
+        workflow: 已编译的 LangGraph 工作流
+        initial_state: 初始状态
+        thread_id: 运行 ID，默认根据初始状态和 session_id 生成
+        session_id: 客户端会话标识（见 make_thread_id）
+
+    Yields:
+        ("node", {节点名: 状态增量}) 若干次，最后是 ("state", 工作流最终状态)
+    """
+    run_config = _run_config(initial_state, thread_id, session_id)
+
+    def _stream(input_state: Any, run_config: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+        final_state = None
+        for mode, chunk in workflow.stream(input_state, run_config, stream_mode=["updates", "values"]):
+            if mode == "updates":
+                yield "node", chunk
+            else:
+                final_state = chunk
+        yield "state", final_state
+
+    if getattr(workflow, "checkpointer", None) is None:
+        yield from _stream(initial_state, run_config)
+        return
+
+    with _run_lock(run_config["configurable"]["thread_id"]):
+        yield from _stream(*_resume_input(workflow, initial_state, run_config))
@@ -0,0 +1,163 @@
+"""
+工作流服务
+
+Gradio UI 和 HTTP API 共用的请求处理逻辑：同一组编译好的工作流、初始状态构建和复盘后的后台任务提交。
+本模块不依赖 gradio 和 pandas，展示层的格式转换由调用方负责。
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from hikebutler.database.feature_store import get_feature_store
+from hikebutler.database.mysql_client import MySQLClient
+from hikebutler.graph.runner import make_thread_id
+from hikebutler.graph.workflow import create_preparation_workflow, create_review_workflow
+from hikebutler.jobs.handlers import enqueue_review_jobs
+from hikebutler.jobs.worker import get_worker_pool
+from hikebutler.memory.session_cache import get_memory_cache
+from hikebutler.state import HikeButlerState
+from hikebutler.tools.geocoding import resolve_location
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 初始化工作流（进程内只编译一次）
+preparation_workflow = create_preparation_workflow()
+review_workflow = create_review_workflow()
+
+
+def load_user_profile(user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    读取用户画像，数据库不可用时返回 None。
+
+    Args:
+        user_id: 用户 ID
+
+    Returns:
+        用户画像字典
+    """
+    client = MySQLClient()
+    try:
+        profile = client.get_user_profile(user_id)
+    except Exception as e:
+        logger.warning(f"读取用户画像失败: {e}")
+        return None
+    finally:
+        client.close()
+    if isinstance(profile, str):
+        profile = json.loads(profile)
+    return profile
+
+
+def preparation_state(
+    location: str,
+    duration: str,
+    difficulty: str,
+    user_id: str = "default_user",
+    session_id: Optional[str] = None,
+) -> HikeButlerState:
+    """
+    构建徒步准备工作流的初始状态，同时在后台预取用户记忆，并把地点解析为坐标
+    （input_data 的 lat、lon，见 hikebutler.tools.geocoding；解析不到时不设置）。
+
+    Args:
+        location: 徒步地点
+        duration: 期望时长
+        difficulty: 难度偏好
+        user_id: 用户 ID
+        session_id: 客户端会话标识
+
+    Returns:
+        初始状态
+    """
+    # 后台预取用户记忆，同时在当前线程读取用户画像
+    get_memory_cache().prefetch(session_id or user_id, user_id, [location])
+    user_profile = load_user_profile(user_id)
+    user_features = get_feature_store().get(user_id, profile=user_profile)
+
+    input_data: Dict[str, Any] = {
+        "location": location,
+        "duration": duration,
+        "difficulty": difficulty,
+    }
+    place = resolve_location(location)
+    if place is not None:
+        input_data.update(lat=place.lat, lon=place.lon, place=place.name)
+
+    return {
+        "messages": [],
+        "user_profile": user_profile,
+        "user_id": user_id,
+        "user_features": user_features,
+        "session_id": session_id,
+        "intermediate_results": {},
+        "current_task": "preparation",
+        "input_data": input_data,
+        "output_data": None,
+    }
+
+
+def review_state(
+    gpx_ref: Optional[str],
+    photo_refs: List[str],
+    thoughts: Optional[str],
+    user_id: str = "default_user",
+    session_id: Optional[str] = None,
+) -> Tuple[str, HikeButlerState]:
+    """
+    构建徒步复盘工作流的初始状态。
+
+    Args:
+        gpx_ref: GPX 轨迹的 blob 句柄
+        photo_refs: 照片的 blob 句柄
+        thoughts: 个人感想
+        user_id: 用户 ID
+        session_id: 客户端会话标识
+
+    Returns:
+        (复盘 ID, 初始状态)，复盘 ID 同时用作工作流的 thread_id
+    """
+    initial_state: HikeButlerState = {
+        "messages": [],
+        "user_profile": None,
+        "user_id": user_id,
+        "user_features": None,
+        "session_id": session_id,
+        "intermediate_results": {},
+        "current_task": "review",
+        "input_data": {
+            "gpx_ref": gpx_ref,
+            "photo_refs": photo_refs,
+            "thoughts": thoughts,
+        },
+        "output_data": None,
+    }
+    review_id = make_thread_id("review", user_id, initial_state["input_data"], session_id=session_id)
+    return review_id, initial_state
+
+
+def finish_review(review_id: str, initial_state: HikeButlerState, output_data: Dict[str, Any]):
+    """
+    复盘完成后提交后台任务（保存轨迹、写入记忆、知识库入库），不阻塞响应。
+
+    Args:
+        review_id: 复盘 ID
+        initial_state: 复盘工作流的初始状态
+        output_data: 复盘工作流的输出
+    """
+    input_data = initial_state["input_data"]
+    user_id = initial_state["user_id"]
+    thoughts = input_data.get("thoughts")
+    enqueue_review_jobs(
+        review_id,
+        user_id,
+        input_data.get("gpx_ref"),
+        input_data.get("photo_refs") or [],
+        thoughts,
+        output_data.get("post"),
+    )
+    get_worker_pool().notify()
+    if thoughts:
+        # 记忆由任务队列持久化，这里只让本会话立即可见
+        get_memory_cache().remember(
+            initial_state.get("session_id") or user_id, user_id, thoughts, {"type": "review"}, persist=False
+        )
@@ -4,7 +4,8 @@ LangGraph 工作流定义
 定义准备阶段和复盘阶段的工作流。
 """
 
-from typing import Literal
+from typing import Any, Literal, Optional
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
 from langsmith import traceable
@@ -16,20 +17,63 @@ from hikebutler.nodes import (
     gear_node,
     photo_plan_node,
     fusion_node,
+    plan_cache_node,
+    personalize_node,
     post_gen_node,
     xhs_node,
 )
 from hikebutler.tools.mcp_tools import mcp_windy_fetch, mcp_xhs_post
+from hikebutler.graph.checkpoint import get_checkpointer
+from hikebutler.nodes.plan_cache_node import plan_cache_hit
 import logging
 
 logger = logging.getLogger(__name__)
 
+# checkpointer 参数的默认值：使用配置中的检查点后端（显式传入 None 表示不启用检查点）
+_CONFIGURED_CHECKPOINTER: Any = object()
+
+
+def _add_shared_stages(workflow: StateGraph, then: str):
+    """
+    添加与用户无关的阶段：先查热门路线缓存，命中时跳过路线和拍摄计划，只运行天气和装备
+    （装备清单依赖当天的天气危险指标）。
+
+    Args:
+        workflow: 工作流图
+        then: 共享阶段之后的节点（或 END）
+    """
+    workflow.add_node("plan_cache", plan_cache_node)
+    workflow.add_node("route", route_node)
+    workflow.add_node("weather", weather_node)
+    workflow.add_node("gear", gear_node)
+    workflow.add_node("photo_plan", photo_plan_node)
+
+    workflow.set_entry_point("plan_cache")
+    workflow.add_conditional_edges(
+        "plan_cache",
+        lambda state: "weather" if plan_cache_hit(state) else "route",
+        ["weather", "route"],
+    )
+    workflow.add_edge("route", "weather")
+    workflow.add_edge("weather", "gear")
+    workflow.add_conditional_edges(
+        "gear",
+        lambda state: then if plan_cache_hit(state) else "photo_plan",
+        [then, "photo_plan"],
+    )
+    workflow.add_edge("photo_plan", then)
+
 
 @traceable(name="hikebutler_workflow")
-def create_preparation_workflow() -> StateGraph:
+def create_preparation_workflow(
+    checkpointer: Optional[BaseCheckpointSaver] = _CONFIGURED_CHECKPOINTER,
+) -> StateGraph:
     """
     创建徒步准备阶段的工作流。
 
+    Args:
+        checkpointer: 检查点存储，默认使用配置中的检查点后端，传入 None 不启用检查点
+
     Returns:
         LangGraph StateGraph 实例
     """
@@ -43,21 +87,13 @@ def create_preparation_workflow() -> StateGraph:
     workflow = StateGraph(HikeButlerState)
 
     # 添加节点
-    workflow.add_node("route", route_node)
-    workflow.add_node("weather", weather_node)
-    workflow.add_node("gear", gear_node)
-    workflow.add_node("photo_plan", photo_plan_node)
+    workflow.add_node("personalize", personalize_node)
     workflow.add_node("fusion", fusion_node)
     workflow.add_node("tools", tool_node)
 
-    # 设置入口点
-    workflow.set_entry_point("route")
-
-    # 添加边
-    workflow.add_edge("route", "weather")
-    workflow.add_edge("weather", "gear")
-    workflow.add_edge("gear", "photo_plan")
-    workflow.add_edge("photo_plan", "fusion")
+    # 与用户无关的阶段（计划缓存、路线、天气、装备、拍摄计划）
+    _add_shared_stages(workflow, then="personalize")
+    workflow.add_edge("personalize", "fusion")
     workflow.add_edge("fusion", END)
 
     # 条件边（如果需要）
@@ -70,14 +106,76 @@ def create_preparation_workflow() -> StateGraph:
     #     },
     # )
 
+    if checkpointer is _CONFIGURED_CHECKPOINTER:
+        checkpointer = get_checkpointer()
+
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def create_warm_workflow() -> StateGraph:
+    """
+    创建计划缓存预热工作流：只运行与用户无关的节点（不含个性化和融合），不启用检查点。
+
+    天气节点保留在装备节点之前，与准备阶段工作流的顺序一致。
+
+    Returns:
+        LangGraph StateGraph 实例
+    """
+    workflow = StateGraph(HikeButlerState)
+    workflow.add_node("route", route_node)
+    workflow.add_node("weather", weather_node)
+    workflow.add_node("gear", gear_node)
+    workflow.add_node("photo_plan", photo_plan_node)
+
+    workflow.set_entry_point("route")
+    workflow.add_edge("route", "weather")
+    workflow.add_edge("weather", "gear")
+    workflow.add_edge("gear", "photo_plan")
+    workflow.add_edge("photo_plan", END)
+
+    return workflow.compile()
+
+
+def create_shared_workflow() -> StateGraph:
+    """
+    创建批量规划的共享阶段工作流：与准备阶段工作流的前半段相同，不含个性化和融合，不启用检查点。
+
+    Returns:
+        LangGraph StateGraph 实例
+    """
+    workflow = StateGraph(HikeButlerState)
+    _add_shared_stages(workflow, then=END)
+    return workflow.compile()
+
+
+def create_member_workflow() -> StateGraph:
+    """
+    创建批量规划的成员工作流：在共享阶段的中间结果上只运行个性化和融合，不启用检查点。
+
+    Returns:
+        LangGraph StateGraph 实例
+    """
+    workflow = StateGraph(HikeButlerState)
+    workflow.add_node("personalize", personalize_node)
+    workflow.add_node("fusion", fusion_node)
+
+    workflow.set_entry_point("personalize")
+    workflow.add_edge("personalize", "fusion")
+    workflow.add_edge("fusion", END)
+
     return workflow.compile()
 
 
 @traceable(name="hikebutler_review_workflow")
-def create_review_workflow() -> StateGraph:
+def create_review_workflow(
+    checkpointer: Optional[BaseCheckpointSaver] = _CONFIGURED_CHECKPOINTER,
+) -> StateGraph:
     """
     创建徒步复盘阶段的工作流。
 
+    Args:
+        checkpointer: 检查点存储，默认使用配置中的检查点后端，传入 None 不启用检查点
+
     Returns:
         LangGraph StateGraph 实例
     """
@@ -102,7 +200,10 @@ def create_review_workflow() -> StateGraph:
     workflow.add_edge("post_gen", "xhs")
     workflow.add_edge("xhs", END)
 
-    return workflow.compile()
+    if checkpointer is _CONFIGURED_CHECKPOINTER:
+        checkpointer = get_checkpointer()
+
+    return workflow.compile(checkpointer=checkpointer)
 
 
 def should_continue(state: HikeButlerState) -> Literal["continue", "end"]:
@@ -0,0 +1,123 @@
+"""
+复盘后台任务
+
+复盘完成后需要执行的副作用，全部通过任务队列异步执行：
+- trip.save：GPX 轨迹和感想写入 MySQL trips 表（按 review_id 幂等），累加到用户特征库，并写入轨迹指纹索引；
+- memory.add：感想写入长期记忆；
+- kb.ingest：复盘帖子和感想作为一篇源文档增量同步到知识库（内容不变时不重复生成 embedding）。
+"""
+
+import threading
+from typing import Any, Dict, List, Optional
+from hikebutler.jobs.queue import get_job_queue
+import logging
+
+logger = logging.getLogger(__name__)
+
+_mem0_client = None
+_mem0_lock = threading.Lock()
+
+
+def save_trip(payload: Dict[str, Any]):
+    """保存徒步记录，更新用户特征和轨迹指纹索引。"""
+    from hikebutler.database.feature_store import get_feature_store
+    from hikebutler.database.mysql_client import MySQLClient
+    from hikebutler.database.trip_index import get_trip_index
+    from hikebutler.geo.track import parse_gpx
+    from hikebutler.storage.blob_store import get_blob_store
+
+    gpx = get_blob_store().get_text(payload["gpx_ref"]) if payload.get("gpx_ref") else None
+    client = MySQLClient()
+    try:
+        stats = client.save_trip(payload["review_id"], payload["user_id"], gpx, payload.get("notes"))
+    finally:
+        client.close()
+    get_feature_store().apply_trip(payload["review_id"], payload["user_id"], stats)
+    if gpx:
+        get_trip_index().add(payload["review_id"], payload["user_id"], parse_gpx(gpx))
+
+
+def add_memory(payload: Dict[str, Any]):
+    """写入长期记忆。"""
+    global _mem0_client
+    from hikebutler.memory.mem0_client import Mem0Client
+
+    with _mem0_lock:
+        if _mem0_client is None:
+            _mem0_client = Mem0Client()
+    _mem0_client.add_memories(payload["user_id"], [(payload["memory"], payload.get("metadata"))])
+
+
+def ingest_trip(payload: Dict[str, Any]):
+    """复盘内容同步到知识库（清单的写事务使多个工作线程、进程的入库依次执行）。"""
+    from hikebutler.database.kb_sync import SourceDocument, get_kb_sync
+
+    document = SourceDocument(
+        source_id=f"trip:{payload['review_id']}",
+        text=payload["text"],
+        metadata={"type": "trip", "user_id": payload["user_id"]},
+    )
+    get_kb_sync().sync([document], full=False)
+
+
+HANDLERS = {
+    "trip.save": save_trip,
+    "memory.add": add_memory,
+    "kb.ingest": ingest_trip,
+}
+
+
+def enqueue_review_jobs(
+    review_id: str,
+    user_id: str,
+    gpx_ref: Optional[str],
+    photo_refs: List[str],
+    thoughts: Optional[str],
+    post: Optional[str],
+) -> List[int]:
+    """
+    提交一次复盘的全部后台任务。幂等键包含 review_id，同一次复盘重试时不会重复入队。
+
+    Args:
+        review_id: 复盘 ID（复盘工作流的 thread_id）
+        user_id: 用户 ID
+        gpx_ref: GPX 轨迹的 blob 句柄
+        photo_refs: 照片的 blob 句柄
+        thoughts: 个人感想
+        post: 生成的帖子
+
+    Returns:
+        任务 ID 列表
+    """
+    queue = get_job_queue()
+    job_ids = [
+        queue.enqueue(
+            "trip.save",
+            {
+                "review_id": review_id,
+                "user_id": user_id,
+                "gpx_ref": gpx_ref,
+                "photo_refs": photo_refs,
+                "notes": thoughts,
+            },
+            idempotency_key=f"trip.save:{review_id}",
+        )
+    ]
+    if thoughts:
+        job_ids.append(
+            queue.enqueue(
+                "memory.add",
+                {"user_id": user_id, "memory": thoughts, "metadata": {"type": "review"}},
+                idempotency_key=f"memory.add:{review_id}",
+            )
+        )
+    text = "\n\n".join(part for part in (post, thoughts) if part)
+    if text:
+        job_ids.append(
+            queue.enqueue(
+                "kb.ingest",
+                {"review_id": review_id, "user_id": user_id, "text": text},
+                idempotency_key=f"kb.ingest:{review_id}",
+            )
+        )
+    return job_ids
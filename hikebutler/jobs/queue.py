@@ -0,0 +1,307 @@
+"""
+持久化任务队列
+
+基于 SQLite 的本地任务队列，用于把复盘后的副作用（保存轨迹、写入记忆、知识库入库）移出请求路径：
+- 任务带幂等键，同一个键只会入队一次，请求重试不会产生重复任务；
+- 工作线程领取任务时获得租约，进程崩溃后租约过期的任务会被重新领取；
+- 失败的任务按指数退避重试，超过最大次数后进入死信，可查看并手动重新入队。
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from hikebutler.config.loader import load_config
+import logging
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    idempotency_key TEXT UNIQUE,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_at REAL NOT NULL,
+    lease_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, run_at);
+"""
+
+
+@dataclass(slots=True)
+class Job:
+    """一个已领取的任务。"""
+
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+    created_at: float
+
+
+class JobQueue:
+    """SQLite 任务队列，可在多个线程间共享。"""
+
+    def __init__(
+        self,
+        path: Union[str, Path] = "./data/jobs.sqlite",
+        max_attempts: int = 5,
+        base_backoff: float = 2.0,
+        max_backoff: float = 300.0,
+        lease: float = 300.0,
+    ):
+        """
+        初始化队列。
+
+        Args:
+            path: SQLite 文件路径
+            max_attempts: 默认最大执行次数（含首次）
+            base_backoff: 首次重试的等待时间（秒），之后每次翻倍
+            max_backoff: 重试等待时间上限（秒）
+            lease: 领取任务后的租约时长（秒），超时未完成的任务会被重新领取
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+        max_attempts: Optional[int] = None,
+        delay: float = 0.0,
+    ) -> int:
+        """
+        提交任务；幂等键已存在时不重复入队。
+
+        Args:
+            kind: 任务类型（对应一个处理函数）
+            payload: 任务参数，需可 JSON 序列化
+            idempotency_key: 幂等键
+            max_attempts: 最大执行次数，默认使用队列配置
+            delay: 延迟执行的秒数
+
+        Returns:
+            任务 ID（重复提交时为已有任务的 ID）
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (kind, payload, idempotency_key, status, max_attempts, run_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    kind,
+                    json.dumps(payload, ensure_ascii=False),
+                    idempotency_key,
+                    PENDING,
+                    max_attempts or self.max_attempts,
+                    now + delay,
+                    now,
+                ),
+            )
+            if cursor.rowcount:
+                return cursor.lastrowid
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+        logger.info(f"任务已存在，跳过入队: {idempotency_key}")
+        return row[0]
+
+    def claim(self) -> Optional[Job]:
+        """
+        领取一个到期的任务（包括租约已过期的运行中任务）。
+
+        Returns:
+            任务，没有可执行的任务时为 None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ? "
+                "WHERE id = ("
+                "  SELECT id FROM jobs"
+                "  WHERE (status = ? AND run_at <= ?) OR (status = ? AND lease_until < ?)"
+                "  ORDER BY run_at LIMIT 1"
+                ") RETURNING id, kind, payload, attempts, max_attempts, created_at",
+                (RUNNING, now + self.lease, PENDING, now, RUNNING, now),
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, kind, payload, attempts, max_attempts, created_at = row
+        return Job(job_id, kind, json.loads(payload), attempts, max_attempts, created_at)
+
+    def complete(self, job_id: int):
+        """标记任务完成。"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, lease_until = NULL, last_error = NULL, finished_at = ? "
+                "WHERE id = ?",
+                (DONE, time.time(), job_id),
+            )
+
+    def fail(self, job: Job, error: str) -> bool:
+        """
+        记录任务失败：未超过最大次数时按指数退避重新排队，否则进入死信。
+
+        Args:
+            job: 失败的任务
+            error: 错误信息
+
+        Returns:
+            是否会重试
+        """
+        now = time.time()
+        retry = job.attempts < job.max_attempts
+        with self._lock:
+            if retry:
+                backoff = min(self.max_backoff, self.base_backoff * 2 ** (job.attempts - 1))
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, run_at = ?, lease_until = NULL, last_error = ? WHERE id = ?",
+                    (PENDING, now + backoff, error, job.id),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, lease_until = NULL, last_error = ?, finished_at = ? "
+                    "WHERE id = ?",
+                    (DEAD, error, now, job.id),
+                )
+        return retry
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        查看死信任务。
+
+        Args:
+            limit: 最多返回的条数
+
+        Returns:
+            任务列表（id、kind、payload、attempts、last_error、finished_at）
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, payload, attempts, last_error, finished_at FROM jobs "
+                "WHERE status = ? ORDER BY finished_at DESC LIMIT ?",
+                (DEAD, limit),
+            ).fetchall()
+        return [
+            {
+                "id": job_id,
+                "kind": kind,
+                "payload": json.loads(payload),
+                "attempts": attempts,
+                "last_error": last_error,
+                "finished_at": finished_at,
+            }
+            for job_id, kind, payload, attempts, last_error, finished_at in rows
+        ]
+
+    def retry_dead(self, job_id: int) -> bool:
+        """
+        将死信任务重新入队（执行次数清零）。
+
+        Args:
+            job_id: 任务 ID
+
+        Returns:
+            是否成功重新入队
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, run_at = ?, finished_at = NULL "
+                "WHERE id = ? AND status = ?",
+                (PENDING, time.time(), job_id, DEAD),
+            )
+        return bool(cursor.rowcount)
+
+    def purge_done(self, older_than: float = 7 * 86400) -> int:
+        """
+        删除早于指定时间完成的任务。
+
+        Args:
+            older_than: 完成时间距今的秒数
+
+        Returns:
+            删除的任务数
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status = ? AND finished_at < ?",
+                (DONE, time.time() - older_than),
+            )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取队列指标。
+
+        Returns:
+            各状态任务数、depth（已到期待执行数）、lag（最早到期任务已等待的秒数）
+        """
+        now = time.time()
+        with self._lock:
+            counts = dict(
+                self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+            )
+            depth, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(run_at) FROM jobs WHERE status = ? AND run_at <= ?",
+                (PENDING, now),
+            ).fetchone()
+        return {
+            **{status: counts.get(status, 0) for status in (PENDING, RUNNING, DONE, DEAD)},
+            "depth": depth,
+            "lag": now - oldest if oldest is not None else 0.0,
+        }
+
+    def close(self):
+        """关闭数据库连接。"""
+        with self._lock:
+            self._conn.close()
+
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """
+    获取进程内共享的任务队列。
+
+    Returns:
+        JobQueue 实例
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            jobs_config = load_config().get("jobs", {})
+            _job_queue = JobQueue(
+                jobs_config.get("path", "./data/jobs.sqlite"),
+                max_attempts=jobs_config.get("max_attempts", 5),
+                base_backoff=jobs_config.get("base_backoff", 2.0),
+                max_backoff=jobs_config.get("max_backoff", 300.0),
+                lease=jobs_config.get("lease", 300.0),
+            )
+    return _job_queue
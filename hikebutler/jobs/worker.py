@@ -0,0 +1,173 @@
+"""
+任务工作线程池
+
+从 JobQueue 领取任务并按任务类型分发给处理函数。处理函数抛出异常时任务按队列策略重试或进入死信，
+因此处理函数必须是幂等的：同一任务可能因重试或租约过期被执行多次。
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from hikebutler.config.loader import load_config
+from hikebutler.jobs.queue import Job, JobQueue, get_job_queue
+import logging
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], None]
+
+
+class WorkerPool:
+    """后台任务工作线程池。"""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, Handler],
+        workers: int = 2,
+        poll_interval: float = 0.5,
+    ):
+        """
+        初始化线程池。
+
+        Args:
+            queue: 任务队列
+            handlers: 任务类型到处理函数的映射
+            workers: 工作线程数
+            poll_interval: 队列为空时的轮询间隔（秒）
+        """
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads: list = []
+        self._stats_lock = threading.Lock()
+        self._stats = {"succeeded": 0, "retried": 0, "dead": 0}
+
+    def _incr(self, key: str):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def start(self):
+        """启动工作线程（重复调用无效果）。"""
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"后台任务线程池已启动: {self.workers} 个线程")
+
+    def notify(self):
+        """有新任务入队时唤醒空闲线程，不必等到下一次轮询。"""
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self.run_job(job)
+
+    def run_job(self, job: Job):
+        """
+        执行一个已领取的任务，并记录结果。
+
+        Args:
+            job: 任务
+        """
+        handler = self.handlers.get(job.kind)
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                raise KeyError(f"未注册的任务类型: {job.kind}")
+            handler(job.payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if self.queue.fail(job, error):
+                self._incr("retried")
+                logger.warning(f"任务失败，稍后重试: id={job.id}, kind={job.kind}, 第 {job.attempts} 次, {error}")
+            else:
+                self._incr("dead")
+                logger.error(f"任务进入死信: id={job.id}, kind={job.kind}, {error}")
+            return
+
+        self.queue.complete(job.id)
+        self._incr("succeeded")
+        logger.info(
+            f"任务完成: id={job.id}, kind={job.kind}, 耗时 {(time.perf_counter() - started) * 1000:.0f} ms, "
+            f"排队 {time.time() - job.created_at:.1f} s"
+        )
+
+    def drain(self, timeout: float = 10.0) -> bool:
+        """
+        在当前线程中执行所有已到期的任务（用于测试和命令行脚本）。
+
+        Args:
+            timeout: 最长执行时间（秒）
+
+        Returns:
+            队列中是否已没有到期任务
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = self.queue.claim()
+            if job is None:
+                return True
+            self.run_job(job)
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取执行统计和队列指标。
+
+        Returns:
+            成功、重试、死信次数，以及队列的 depth、lag 等指标
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {**stats, **self.queue.stats()}
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        停止工作线程，正在执行的任务会先完成。
+
+        Args:
+            timeout: 等待每个线程退出的最长时间（秒）
+        """
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+
+_worker_pool: Optional[WorkerPool] = None
+_worker_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> WorkerPool:
+    """
+    获取进程内共享的工作线程池（注册全部任务处理函数，未启动）。
+
+    Returns:
+        WorkerPool 实例
+    """
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            from hikebutler.jobs.handlers import HANDLERS
+
+            jobs_config = load_config().get("jobs", {})
+            _worker_pool = WorkerPool(
+                get_job_queue(),
+                HANDLERS,
+                workers=jobs_config.get("workers", 2),
+                poll_interval=jobs_config.get("poll_interval", 0.5),
+            )
+    return _worker_pool
@@ -1,12 +1,12 @@
 """
 HikeButler 主程序入口
 
-启动 Gradio UI 和初始化服务。
+启动 Gradio UI 和初始化服务。workers 大于 1 时以多进程模式运行（见 hikebutler/serving/server.py）。
 """
 
+import argparse
 import logging
 import sys
-from hikebutler.ui.gradio_app import launch_ui
 from hikebutler.config.loader import load_config
 
 # 配置日志
@@ -23,17 +23,36 @@ logger = logging.getLogger(__name__)
 
 def main():
     """主函数。"""
+    parser = argparse.ArgumentParser(description="启动 HikeButler")
+    parser.add_argument("--host", help="监听地址，默认读取 server.host")
+    parser.add_argument("--port", type=int, help="监听端口，默认读取 server.port")
+    parser.add_argument("--workers", type=int, help="工作进程数，默认读取 server.workers")
+    parser.add_argument("--api-only", action="store_true", help="只提供 HTTP API（/api），不启动 Gradio UI")
+    args = parser.parse_args()
+
     try:
         # 加载配置
         config = load_config()
         app_config = config.get("app", {})
         app_name = app_config.get("name", "HikeButler")
         app_version = app_config.get("version", "0.1.0")
+        server_config = config.get("server", {})
+        host = args.host or server_config.get("host", "127.0.0.1")
+        port = args.port or server_config.get("port", 7860)
+        workers = args.workers or server_config.get("workers", 1)
 
         logger.info(f"启动 {app_name} v{app_version}")
 
-        # 启动 UI
-        launch_ui(share=False, server_name="127.0.0.1", server_port=7860)
+        if workers > 1 or args.api_only:
+            from hikebutler.serving.server import Supervisor
+
+            Supervisor.from_config(
+                host=host, port=port, workers=workers, ui=not args.api_only
+            ).serve_forever()
+        else:
+            from hikebutler.ui.gradio_app import launch_ui
+
+            launch_ui(share=False, server_name=host, server_port=port)
 
     except KeyboardInterrupt:
         logger.info("程序被用户中断")
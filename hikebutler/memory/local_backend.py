@@ -0,0 +1,399 @@
+"""
+本地记忆后端
+
+不依赖托管服务的 Mem0 替代实现：记录存放在 SQLite，召回用进程内的向量索引。
+- 按用户分区：每个用户的向量矩阵在首次访问时从 SQLite 载入，按 LRU 保留最近访问的用户；
+  之后每次访问只读取该用户 updated_at 晚于已载入记录的行，其他进程新增或合并的记忆随即可见；
+- embedding 使用字符 n-gram 哈希向量，本地计算、无需模型，召回一次矩阵乘法即可完成；
+- 写入时与该用户已有记忆比对，相似度超过阈值的视为重复，合并到已有记录而不是新增。
+
+接口与 mem0.MemoryClient 的常用子集保持一致（search/get_all/add），
+Mem0Client 可以在托管和本地后端之间切换而不改调用代码。
+"""
+
+import json
+import sqlite3
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIM = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memories (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    memory TEXT NOT NULL,
+    metadata TEXT,
+    vector BLOB NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_memories_user ON memories (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_memories_user_updated ON memories (user_id, updated_at);
+"""
+
+# 增量载入时回看的时间（秒）：其他进程取时间戳和提交之间有间隔，稍早的时间戳可能晚于已载入的行提交
+REFRESH_OVERLAP = 1.0
+
+
+class HashingEmbedder:
+    """字符 n-gram 哈希向量：中文按字切分，1~3 元组哈希到固定维度后归一化。"""
+
+    def __init__(self, dim: int = DEFAULT_DIM, ngram_range: tuple = (1, 3)):
+        """
+        初始化。
+
+        Args:
+            dim: 向量维度
+            ngram_range: n-gram 长度范围（闭区间）
+        """
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        生成单条文本的归一化向量。
+
+        Args:
+            text: 文本
+
+        Returns:
+            float32 向量
+        """
+        vector = np.zeros(self.dim, dtype=np.float32)
+        text = "".join(text.lower().split())
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(text) - n + 1):
+                h = zlib.crc32(text[i:i + n].encode("utf-8"))
+                # 最高位决定符号，减少哈希冲突带来的偏差
+                vector[h % self.dim] += -1.0 if h & 0x80000000 else 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class _UserIndex:
+    """一个用户的记忆向量索引，矩阵按容量倍增，避免每次写入都复制。"""
+
+    __slots__ = ("ids", "memories", "matrix", "size", "lock", "positions", "loaded_at")
+
+    def __init__(self, dim: int):
+        self.ids: List[str] = []
+        self.memories: List[str] = []
+        self.matrix = np.zeros((16, dim), dtype=np.float32)
+        self.size = 0
+        self.lock = threading.Lock()
+        self.positions: Dict[str, int] = {}
+        self.loaded_at = ""  # 已载入记录的最大 updated_at
+
+    def put(self, memory_id: str, memory: str, vector: np.ndarray):
+        """写入一条记忆，已在索引中的原位覆盖。"""
+        position = self.positions.get(memory_id)
+        if position is not None:
+            self.matrix[position] = vector
+            self.memories[position] = memory
+            return
+        if self.size == len(self.matrix):
+            grown = np.zeros((len(self.matrix) * 2, self.matrix.shape[1]), dtype=np.float32)
+            grown[: self.size] = self.matrix[: self.size]
+            self.matrix = grown
+        self.matrix[self.size] = vector
+        self.ids.append(memory_id)
+        self.memories.append(memory)
+        self.positions[memory_id] = self.size
+        self.size += 1
+
+    def scores(self, vector: np.ndarray) -> np.ndarray:
+        return self.matrix[: self.size] @ vector
+
+
+class LocalMemoryStore:
+    """基于 SQLite 和进程内向量索引的本地记忆库。"""
+
+    def __init__(
+        self,
+        path: Union[str, Path] = "./data/memories.sqlite",
+        dim: int = DEFAULT_DIM,
+        dedup_threshold: float = 0.9,
+        max_users: int = 1024,
+        user_id_field: str = "user_id",
+    ):
+        """
+        初始化记忆库。
+
+        Args:
+            path: SQLite 文件路径
+            dim: 向量维度
+            dedup_threshold: 视为重复记忆的余弦相似度阈值
+            max_users: 内存中最多保留索引的用户数
+            user_id_field: filters 中用户 ID 的字段名
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.embedder = HashingEmbedder(dim)
+        self.dedup_threshold = dedup_threshold
+        self.max_users = max_users
+        self.user_id_field = user_id_field
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._db_lock = threading.Lock()
+        self._indexes: "OrderedDict[str, _UserIndex]" = OrderedDict()
+        self._indexes_lock = threading.Lock()
+
+    def _user_id(self, filters: Optional[Dict[str, Any]]) -> str:
+        user_id = (filters or {}).get(self.user_id_field)
+        if not user_id:
+            raise ValueError(f"filters 中缺少 {self.user_id_field}")
+        return str(user_id)
+
+    def _index(self, user_id: str) -> _UserIndex:
+        """获取用户索引，并载入 SQLite 中该用户新增或更新的记忆。"""
+        with self._indexes_lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                index = self._indexes[user_id] = _UserIndex(self.embedder.dim)
+                while len(self._indexes) > self.max_users:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(user_id)
+        self._refresh(user_id, index)
+        return index
+
+    def _refresh(self, user_id: str, index: _UserIndex):
+        """载入该用户 updated_at 晚于上次载入的行（首次访问时为全部记忆）。"""
+        with index.lock:
+            since = index.loaded_at
+            if since:
+                since = (datetime.fromisoformat(since) - timedelta(seconds=REFRESH_OVERLAP)).isoformat(
+                    timespec="microseconds"
+                )
+            with self._db_lock:
+                rows = self._conn.execute(
+                    "SELECT id, memory, vector, updated_at FROM memories "
+                    "WHERE user_id = ? AND updated_at > ? ORDER BY updated_at",
+                    (user_id, since),
+                ).fetchall()
+            for memory_id, memory, blob, updated_at in rows:
+                index.put(memory_id, memory, np.frombuffer(blob, dtype=np.float32))
+                index.loaded_at = max(index.loaded_at, updated_at)
+
+    def _fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """按 ID 读取记录。"""
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._db_lock:
+            rows = self._conn.execute(
+                f"SELECT id, user_id, memory, metadata, hits, created_at, updated_at "
+                f"FROM memories WHERE id IN ({placeholders})",
+                ids,
+            ).fetchall()
+        return {row[0]: _row_to_record(row) for row in rows}
+
+    def search(
+        self,
+        query: str,
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+    ) -> Dict[str, Any]:
+        """
+        召回与查询最相关的记忆。
+
+        Args:
+            query: 查询文本
+            filters: 过滤条件，必须包含用户 ID
+            top_k: 返回的记忆数
+
+        Returns:
+            {"results": [记录, ...]}，按相关度降序，每条带 score
+        """
+        index = self._index(self._user_id(filters))
+        vector = self.embedder.embed(query)
+        with index.lock:
+            if not index.size:
+                return {"results": []}
+            scores = index.scores(vector)
+            k = min(top_k, index.size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            hits = [(index.ids[i], float(scores[i])) for i in top]
+
+        records = self._fetch([memory_id for memory_id, _ in hits])
+        return {
+            "results": [
+                {**records[memory_id], "score": score}
+                for memory_id, score in hits
+                if memory_id in records
+            ]
+        }
+
+    def get_all(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        page: int = 1,
+        page_size: int = 100,
+    ) -> Dict[str, Any]:
+        """
+        分页读取用户记忆：第 1 页为最近的记忆，页内按时间升序。
+
+        Args:
+            filters: 过滤条件，必须包含用户 ID
+            page: 页码（从 1 开始）
+            page_size: 每页条数
+
+        Returns:
+            {"results": [记录, ...]}
+        """
+        user_id = self._user_id(filters)
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT id, user_id, memory, metadata, hits, created_at, updated_at "
+                "FROM memories WHERE user_id = ? ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (user_id, page_size, (page - 1) * page_size),
+            ).fetchall()
+        return {"results": [_row_to_record(row) for row in reversed(rows)]}
+
+    def add(
+        self,
+        messages: List[Dict[str, str]],
+        filters: Optional[Dict[str, Any]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        添加记忆：每条用户消息一条记忆，与已有记忆重复时合并。
+
+        Args:
+            messages: 消息列表（role/content）
+            filters: 过滤条件，必须包含用户 ID
+            metadata: 元数据（可选）
+
+        Returns:
+            {"results": [{"id", "memory", "event": "ADD" | "UPDATE"}, ...]}
+        """
+        user_id = self._user_id(filters)
+        index = self._index(user_id)
+        results = []
+        for message in messages:
+            if message.get("role", "user") != "user" or not message.get("content"):
+                continue
+            results.append(self._add_one(user_id, index, message["content"], metadata))
+        return {"results": results}
+
+    def _add_one(
+        self,
+        user_id: str,
+        index: _UserIndex,
+        memory: str,
+        metadata: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """写入一条记忆，重复时合并到最相似的已有记录。"""
+        vector = self.embedder.embed(memory)
+        now = datetime.now().isoformat(timespec="microseconds")
+        with index.lock:
+            duplicate = None
+            if index.size:
+                scores = index.scores(vector)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.dedup_threshold:
+                    duplicate = best
+
+            if duplicate is None:
+                memory_id = uuid.uuid4().hex
+                with self._db_lock, self._conn:
+                    self._conn.execute(
+                        "INSERT INTO memories (id, user_id, memory, metadata, vector, created_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            memory_id,
+                            user_id,
+                            memory,
+                            json.dumps(metadata, ensure_ascii=False) if metadata else None,
+                            vector.tobytes(),
+                            now,
+                            now,
+                        ),
+                    )
+                index.put(memory_id, memory, vector)
+                return {"id": memory_id, "memory": memory, "event": "ADD"}
+
+            # 合并：保留较新的表述，元数据取并集，记录被重复提及的次数
+            memory_id = index.ids[duplicate]
+            with self._db_lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT metadata FROM memories WHERE id = ?", (memory_id,)
+                ).fetchone()
+                merged = {**json.loads(row[0] or "{}"), **(metadata or {})}
+                self._conn.execute(
+                    "UPDATE memories SET memory = ?, metadata = ?, vector = ?, hits = hits + 1, "
+                    "updated_at = ? WHERE id = ?",
+                    (
+                        memory,
+                        json.dumps(merged, ensure_ascii=False) if merged else None,
+                        vector.tobytes(),
+                        now,
+                        memory_id,
+                    ),
+                )
+            index.matrix[duplicate] = vector
+            index.memories[duplicate] = memory
+            return {"id": memory_id, "memory": memory, "event": "UPDATE"}
+
+    def close(self):
+        """关闭数据库连接。"""
+        with self._db_lock:
+            self._conn.close()
+
+
+def _row_to_record(row: tuple) -> Dict[str, Any]:
+    memory_id, user_id, memory, metadata, hits, created_at, updated_at = row
+    return {
+        "id": memory_id,
+        "user_id": user_id,
+        "memory": memory,
+        "metadata": json.loads(metadata) if metadata else {},
+        "hits": hits,
+        "created_at": created_at,
+        "updated_at": updated_at,
+    }
+
+
+_stores: Dict[str, LocalMemoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_local_store(local_config: Optional[Dict[str, Any]] = None, user_id_field: str = "user_id") -> LocalMemoryStore:
+    """
+    获取共享的本地记忆库，同一个文件只打开一次，保证各处看到同一份索引。
+
+    Args:
+        local_config: mem0.local 配置
+        user_id_field: filters 中用户 ID 的字段名
+
+    Returns:
+        LocalMemoryStore 实例
+    """
+    local_config = local_config or {}
+    path = str(Path(local_config.get("path", "./data/memories.sqlite")).resolve())
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = LocalMemoryStore(
+                path,
+                dim=local_config.get("dim", DEFAULT_DIM),
+                dedup_threshold=local_config.get("dedup_threshold", 0.9),
+                max_users=local_config.get("max_users", 1024),
+                user_id_field=user_id_field,
+            )
+            _stores[path] = store
+    return store
@@ -2,16 +2,19 @@
 Mem0 长期记忆客户端
 
 管理用户的长期记忆，例如"上次雨天徒步时脚滑了，需要注意防滑"。
+后端由 mem0.backend 选择：hosted 使用 Mem0 托管服务，local 使用本地 SQLite 记忆库
+（见 local_backend.py）。
 """
 
-from typing import Dict, Any, List, Optional
+import json
+from typing import Dict, Any, List, Optional, Tuple
 from hikebutler.config.loader import load_config
+from hikebutler.network.http_pool import get_http_client
 import logging
 
 logger = logging.getLogger(__name__)
 
-# TODO: 实现 Mem0 客户端
-# 需要安装 mem0ai 包并配置 API key
+MEM0_HOST = "https://api.mem0.ai"
 
 
 class Mem0Client:
@@ -22,36 +25,74 @@ class Mem0Client:
         config = load_config()
         mem0_config = config.get("mem0", {})
         self.api_key = mem0_config.get("api_key")
+        self.host = mem0_config.get("host") or MEM0_HOST
         self.user_id_field = mem0_config.get("user_id_field", "user_id")
+        self.backend = mem0_config.get("backend", "hosted")
+        self.client = None
 
-        if not self.api_key:
+        if self.backend == "local":
+            from hikebutler.memory.local_backend import get_local_store
+
+            self.client = get_local_store(mem0_config.get("local"), self.user_id_field)
+            return
+        if self.backend != "hosted":
+            raise ValueError(f"不支持的 Mem0 后端: {self.backend}")
+
+        # 未设置的环境变量会原样保留为 "${...}"
+        if not self.api_key or self.api_key.startswith("${"):
             logger.warning("Mem0 API Key 未配置，记忆功能将不可用")
-            self.client = None
-        else:
-            # TODO: 初始化 Mem0 客户端
-            # from mem0 import Memory
-            # self.client = Memory(api_key=self.api_key)
-            logger.warning("Mem0 客户端初始化待实现")
-            self.client = None
-
-    def get_memories(self, user_id: str, query: Optional[str] = None) -> List[Dict[str, Any]]:
+            return
+
+        try:
+            from mem0 import MemoryClient
+
+            self.client = MemoryClient(
+                api_key=self.api_key,
+                host=self.host,
+                client=get_http_client(self.host),
+            )
+        except Exception as e:
+            logger.warning(f"Mem0 客户端初始化失败: {e}")
+
+    def _filters(self, user_id: str) -> Dict[str, Any]:
+        return {self.user_id_field: user_id}
+
+    def get_memories(
+        self,
+        user_id: str,
+        query: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
         """
         获取用户记忆。
 
         Args:
             user_id: 用户 ID
-            query: 查询关键词（可选）
+            query: 查询关键词（可选），提供时按相关度返回
+            limit: 最多返回的记忆数
 
         Returns:
-            记忆列表
+            记忆列表，每项至少包含 memory 字段
         """
         if not self.client:
             logger.warning("Mem0 客户端未初始化")
             return []
 
-        # TODO: 实现记忆获取逻辑
-        # return self.client.get_all(user_id=user_id, query=query)
-        return []
+        try:
+            if query:
+                response = self.client.search(
+                    query, filters=self._filters(user_id), top_k=limit
+                )
+            else:
+                response = self.client.get_all(
+                    filters=self._filters(user_id), page=1, page_size=limit
+                )
+        except Exception as e:
+            logger.warning(f"获取用户记忆失败: {e}")
+            return []
+
+        results = response.get("results", []) if isinstance(response, dict) else response
+        return list(results or [])
 
     def add_memory(self, user_id: str, memory: str, metadata: Optional[Dict[str, Any]] = None):
         """
@@ -62,11 +103,34 @@ class Mem0Client:
             memory: 记忆内容
             metadata: 元数据（可选）
         """
+        self.add_memories(user_id, [(memory, metadata)])
+
+    def add_memories(
+        self,
+        user_id: str,
+        memories: List[Tuple[str, Optional[Dict[str, Any]]]],
+    ):
+        """
+        批量添加同一用户的记忆，元数据相同的记忆合并为一次请求。
+
+        Args:
+            user_id: 用户 ID
+            memories: (记忆内容, 元数据) 列表
+        """
         if not self.client:
             logger.warning("Mem0 客户端未初始化")
             return
 
-        # TODO: 实现记忆添加逻辑
-        # self.client.add(user_id=user_id, memory=memory, metadata=metadata)
-        logger.info(f"记忆添加功能待实现: {memory}")
-
+        groups: Dict[str, List[str]] = {}
+        for memory, metadata in memories:
+            key = json.dumps(metadata or {}, sort_keys=True, ensure_ascii=False)
+            groups.setdefault(key, []).append(memory)
+
+        for key, contents in groups.items():
+            metadata = json.loads(key) or None
+            self.client.add(
+                [{"role": "user", "content": content} for content in contents],
+                filters=self._filters(user_id),
+                metadata=metadata,
+            )
+        logger.info(f"已添加 {len(memories)} 条记忆: user_id={user_id}")
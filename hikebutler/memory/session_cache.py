@@ -0,0 +1,359 @@
+"""
+会话记忆缓存
+
+徒步准备请求开始时在后台一次性预取用户记忆（与用户画像查询并行），
+节点召回记忆时只在缓存上做本地 top-k 相关度过滤，不再发起远程请求：
+- 记忆与查询提示在预取时批量生成 embedding，召回时按余弦相似度排序；
+- 未预取到的查询、会话中新增的记忆在首次召回时补一次 embedding 并缓存；
+- embedding 不可用时按时间顺序返回最近的记忆；
+- 新记忆立即写入会话缓存，并交给后台写入线程批量持久化，不阻塞响应。
+"""
+
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from hikebutler.config.loader import load_config
+from hikebutler.memory.mem0_client import Mem0Client
+from hikebutler.models.embedding_factory import get_embedding
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class _SessionMemories:
+    """一个会话缓存的用户记忆。"""
+
+    user_id: str
+    memories: List[Dict[str, Any]]
+    vectors: Optional[np.ndarray]  # 行归一化的记忆向量，embedding 不可用时为 None
+    query_vectors: Dict[str, np.ndarray] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _memory_text(memory: Dict[str, Any]) -> str:
+    return str(memory.get("memory", ""))
+
+
+class AsyncMemoryWriter:
+    """后台批量写入记忆：攒够 batch_size 条或等待 flush_interval 秒后写一次。"""
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Mem0Client] = Mem0Client,
+        batch_size: int = 16,
+        flush_interval: float = 2.0,
+    ):
+        """
+        初始化写入器。
+
+        Args:
+            client_factory: 创建记忆客户端的函数（在写入线程中调用）
+            batch_size: 每批最多写入的记忆数
+            flush_interval: 最长攒批时间（秒）
+        """
+        self.client_factory = client_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Tuple[str, str, Optional[Dict[str, Any]]]]]" = queue.Queue()
+        self._client: Optional[Mem0Client] = None
+        self._idle = threading.Condition()
+        self._pending = 0
+        self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, user_id: str, memory: str, metadata: Optional[Dict[str, Any]] = None):
+        """提交一条记忆，立即返回。"""
+        with self._idle:
+            self._pending += 1
+        self._queue.put((user_id, memory, metadata))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    next_item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if next_item is None:
+                    stop = True
+                    break
+                batch.append(next_item)
+
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: List[Tuple[str, str, Optional[Dict[str, Any]]]]):
+        """按用户分组写入一批记忆，失败只记录日志。"""
+        by_user: Dict[str, List[Tuple[str, Optional[Dict[str, Any]]]]] = {}
+        for user_id, memory, metadata in batch:
+            by_user.setdefault(user_id, []).append((memory, metadata))
+        try:
+            if self._client is None:
+                self._client = self.client_factory()
+            for user_id, memories in by_user.items():
+                self._client.add_memories(user_id, memories)
+        except Exception as e:
+            logger.warning(f"批量写入记忆失败（{len(batch)} 条）: {e}")
+        finally:
+            with self._idle:
+                self._pending -= len(batch)
+                self._idle.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待已提交的记忆全部写完。
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            是否全部写完
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self):
+        """写完剩余记忆后停止写入线程。"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+class MemorySessionCache:
+    """按会话缓存用户记忆及其 embedding。"""
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Mem0Client] = Mem0Client,
+        embedding_provider: Callable[[], Embeddings] = get_embedding,
+        writer: Optional[AsyncMemoryWriter] = None,
+        ttl: float = 1800,
+        max_sessions: int = 256,
+        prefetch_limit: int = 200,
+        recall_timeout: float = 2.0,
+        workers: int = 4,
+    ):
+        """
+        初始化缓存。
+
+        Args:
+            client_factory: 创建记忆客户端的函数
+            embedding_provider: 获取 embedding 模型的函数
+            writer: 异步写入器，默认新建
+            ttl: 会话缓存有效期（秒）
+            max_sessions: 最多缓存的会话数
+            prefetch_limit: 每个用户预取的最大记忆数
+            recall_timeout: 召回时等待预取完成的最长时间（秒）
+            workers: 预取线程数
+        """
+        self.client_factory = client_factory
+        self.embedding_provider = embedding_provider
+        self.writer = writer or AsyncMemoryWriter(client_factory)
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.prefetch_limit = prefetch_limit
+        self.recall_timeout = recall_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="memory-prefetch")
+        self._sessions: "OrderedDict[str, Tuple[float, Future]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._client: Optional[Mem0Client] = None
+
+    def _get_client(self) -> Mem0Client:
+        """懒加载记忆客户端（托管客户端初始化时会校验 API Key）。"""
+        with self._lock:
+            if self._client is None:
+                self._client = self.client_factory()
+            return self._client
+
+    def prefetch(self, session_key: str, user_id: str, query_hints: Optional[List[str]] = None) -> Future:
+        """
+        在后台预取用户记忆，同一会话只预取一次。
+
+        Args:
+            session_key: 会话标识
+            user_id: 用户 ID
+            query_hints: 预计会用到的查询（如徒步地点），与记忆一起生成 embedding
+
+        Returns:
+            预取结果 Future
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._sessions.get(session_key)
+            if cached and cached[0] > now:
+                self._sessions.move_to_end(session_key)
+                return cached[1]
+            future = self._executor.submit(self._load, user_id, list(query_hints or []))
+            self._sessions[session_key] = (now + self.ttl, future)
+            self._sessions.move_to_end(session_key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return future
+
+    def _load(self, user_id: str, query_hints: List[str]) -> _SessionMemories:
+        """拉取记忆并批量生成 embedding。"""
+        memories = self._get_client().get_memories(user_id, limit=self.prefetch_limit)
+        entry = _SessionMemories(user_id=user_id, memories=memories, vectors=None)
+        texts = [_memory_text(m) for m in memories]
+        if not texts:
+            return entry
+        try:
+            vectors = np.asarray(
+                self.embedding_provider().embed_documents(texts + query_hints), dtype=np.float32
+            )
+        except Exception as e:
+            logger.warning(f"记忆 embedding 生成失败，召回按时间排序: {e}")
+            return entry
+        vectors = _normalize(vectors)
+        entry.vectors = vectors[: len(texts)]
+        entry.query_vectors = dict(zip(query_hints, vectors[len(texts):]))
+        return entry
+
+    def recall(
+        self,
+        session_key: str,
+        user_id: str,
+        query: Optional[str] = None,
+        top_k: int = 5,
+    ) -> List[Dict[str, Any]]:
+        """
+        从会话缓存中召回与查询最相关的记忆。
+
+        Args:
+            session_key: 会话标识
+            user_id: 用户 ID
+            query: 查询文本，为空时返回最近的记忆
+            top_k: 返回的记忆数
+
+        Returns:
+            记忆列表
+        """
+        future = self.prefetch(session_key, user_id, [query] if query else None)
+        try:
+            entry: _SessionMemories = future.result(timeout=self.recall_timeout)
+        except FutureTimeoutError:
+            logger.warning(f"记忆预取超时，本次不使用记忆: session={session_key}")
+            return []
+        except Exception as e:
+            logger.warning(f"记忆预取失败: {e}")
+            return []
+
+        with entry.lock:
+            memories = list(entry.memories)
+            vectors = entry.vectors
+        if not memories:
+            return []
+        if not query or vectors is None:
+            return memories[-top_k:][::-1]
+
+        query_vector = entry.query_vectors.get(query)
+        missing = [_memory_text(m) for m in memories[len(vectors):]]
+        if query_vector is None or missing:
+            texts = missing + ([query] if query_vector is None else [])
+            try:
+                new_vectors = _normalize(
+                    np.asarray(self.embedding_provider().embed_documents(texts), dtype=np.float32)
+                )
+            except Exception as e:
+                logger.warning(f"查询 embedding 生成失败: {e}")
+                return memories[-top_k:][::-1]
+            if query_vector is None:
+                query_vector = new_vectors[-1]
+                entry.query_vectors[query] = query_vector
+            if missing:
+                vectors = np.vstack([vectors, new_vectors[: len(missing)]])
+                with entry.lock:
+                    if len(entry.vectors) < len(vectors):
+                        entry.vectors = vectors
+
+        scores = vectors @ query_vector
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [{**memories[i], "score": float(scores[i])} for i in top]
+
+    def remember(
+        self,
+        session_key: str,
+        user_id: str,
+        memory: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        persist: bool = True,
+    ):
+        """
+        添加一条记忆：立即在会话缓存中可见，持久化由后台批量完成。
+
+        Args:
+            session_key: 会话标识
+            user_id: 用户 ID
+            memory: 记忆内容
+            metadata: 元数据（可选）
+            persist: 是否交给写入线程持久化；已由其他途径（如任务队列）持久化时传 False
+        """
+        if persist:
+            self.writer.add(user_id, memory, metadata)
+        with self._lock:
+            cached = self._sessions.get(session_key)
+        if cached is None or not cached[1].done() or cached[1].exception() is not None:
+            return
+
+        entry: _SessionMemories = cached[1].result()
+        with entry.lock:
+            # 向量在下次召回时补齐
+            entry.memories.append({"memory": memory, "metadata": metadata or {}})
+
+    def invalidate(self, session_key: str):
+        """丢弃会话缓存。"""
+        with self._lock:
+            self._sessions.pop(session_key, None)
+
+
+_memory_cache: Optional[MemorySessionCache] = None
+_memory_cache_lock = threading.Lock()
+
+
+def get_memory_cache() -> MemorySessionCache:
+    """
+    获取进程内共享的会话记忆缓存。
+
+    Returns:
+        MemorySessionCache 实例
+    """
+    global _memory_cache
+    with _memory_cache_lock:
+        if _memory_cache is None:
+            mem0_config = load_config().get("mem0", {})
+            cache_config = mem0_config.get("session_cache", {})
+            writer_config = mem0_config.get("writer", {})
+            _memory_cache = MemorySessionCache(
+                writer=AsyncMemoryWriter(
+                    batch_size=writer_config.get("batch_size", 16),
+                    flush_interval=writer_config.get("flush_interval", 2.0),
+                ),
+                ttl=cache_config.get("ttl", 1800),
+                max_sessions=cache_config.get("max_sessions", 256),
+                prefetch_limit=cache_config.get("prefetch_limit", 200),
+                recall_timeout=cache_config.get("recall_timeout", 2.0),
+            )
+    return _memory_cache
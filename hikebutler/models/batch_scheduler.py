@@ -0,0 +1,237 @@
+"""
+LLM 调度器
+
+融合、路线叙述、地点解析等节点的对话补全调用都经由进程内共享的调度器发出：
+- 请求提交后立即派发，全局并发上限由固定大小的线程池保证，超出上限的请求在线程池中排队；
+- 遇到 429 时按 Retry-After 或指数退避进入全局冷却期，冷却期间暂停所有派发；
+- 每个请求返回独立的 Future。
+
+对话补全接口没有批量端点，先汇集再派发只会增加等待时间，因此调度器不做微批。
+调度器是唯一决定退避重试的地方：交给它的 LLM 实例都关闭了 SDK 自带的重试（max_retries=0）。
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+import openai
+from langchain_core.runnables import Runnable
+from hikebutler.config.loader import load_model_config
+from hikebutler.models.llm_factory import get_llm, get_llm_for_node
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class _Request:
+    """待派发的请求。"""
+
+    messages: Any
+    node: Optional[str]
+    profile: Optional[str]
+    future: Future = field(default_factory=Future)
+
+
+def _default_llm_provider(node: Optional[str], profile: Optional[str]) -> Runnable:
+    """按节点或档位获取关闭 SDK 重试的 LLM 实例。"""
+    if node:
+        return get_llm_for_node(node, max_retries=0)
+    return get_llm(profile, max_retries=0)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """从 429 响应头中解析 Retry-After 秒数。"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LLMScheduler:
+    """LLM 调度器：全局并发上限和 429 冷却。"""
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        base_backoff: float = 1.0,
+        llm_provider: Callable[[Optional[str], Optional[str]], Runnable] = _default_llm_provider,
+    ):
+        """
+        初始化调度器。
+
+        Args:
+            max_concurrency: 全局并发上限
+            max_retries: 429 最大重试次数
+            base_backoff: 指数退避的初始等待时间（秒）
+            llm_provider: 根据 (节点, 档位) 返回 LLM 实例的函数
+        """
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.llm_provider = llm_provider
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._cooldown_until = 0.0
+        self._cooldown_lock = threading.Lock()
+        self._stats = {"requests": 0, "queued": 0, "active": 0, "rate_limited": 0}
+        self._stats_lock = threading.Lock()
+        # 保护 _running 与派发，保证关闭之后不会再有请求提交到线程池
+        self._state_lock = threading.Lock()
+        self._running = True
+
+    def submit(
+        self,
+        messages: Any,
+        node: Optional[str] = None,
+        profile: Optional[str] = None,
+    ) -> Future:
+        """
+        提交一次对话补全请求，立即派发（达到并发上限时排队）。
+
+        Args:
+            messages: 传给 LLM 的消息（与 Runnable.invoke 的输入一致）
+            node: 节点名称，用于选择模型档位
+            profile: 模型档位（未指定 node 时使用）
+
+        Returns:
+            结果 Future，完成后得到 LLM 的返回消息
+        """
+        request = _Request(messages=messages, node=node, profile=profile)
+        with self._state_lock:
+            if not self._running:
+                raise RuntimeError("调度器已关闭")
+            self._incr("requests")
+            self._incr("queued")
+            self._executor.submit(self._dispatch, request)
+        return request.future
+
+    def invoke(
+        self,
+        messages: Any,
+        node: Optional[str] = None,
+        profile: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        同步提交请求并等待结果。
+
+        Args:
+            messages: 传给 LLM 的消息
+            node: 节点名称
+            profile: 模型档位
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            LLM 返回的消息
+        """
+        return self.submit(messages, node=node, profile=profile).result(timeout=timeout)
+
+    def _incr(self, key: str, amount: int = 1):
+        """线程安全地累加统计值。"""
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _wait_for_cooldown(self):
+        """处于 429 冷却期时等待。"""
+        while True:
+            with self._cooldown_lock:
+                wait = self._cooldown_until - time.monotonic()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def _enter_cooldown(self, seconds: float):
+        """进入全局冷却期，所有派发暂停 seconds 秒。"""
+        with self._cooldown_lock:
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + seconds)
+
+    def _dispatch(self, request: _Request):
+        """在线程池中执行单个请求，记录排队和执行中的请求数。"""
+        self._incr("queued", -1)
+        if not request.future.set_running_or_notify_cancel():
+            return
+
+        self._incr("active")
+        try:
+            self._call(request)
+        finally:
+            self._incr("active", -1)
+
+    def _call(self, request: _Request):
+        """调用 LLM，遇到 429 时退避重试，结果写入 Future。"""
+        try:
+            llm = self.llm_provider(request.node, request.profile)
+        except Exception as e:
+            request.future.set_exception(e)
+            return
+
+        attempt = 0
+        while True:
+            self._wait_for_cooldown()
+            try:
+                request.future.set_result(llm.invoke(request.messages))
+                return
+            except openai.RateLimitError as e:
+                self._incr("rate_limited")
+                if attempt >= self.max_retries:
+                    request.future.set_exception(e)
+                    return
+                backoff = _retry_after(e) or self.base_backoff * (2**attempt)
+                logger.warning(f"LLM 触发限流，{backoff:.2f} 秒后重试（第 {attempt + 1} 次）")
+                self._enter_cooldown(backoff)
+                attempt += 1
+            except Exception as e:
+                request.future.set_exception(e)
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取调度统计。
+
+        Returns:
+            请求数、正在执行的请求数、排队数、限流次数
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return stats
+
+    def shutdown(self, wait: bool = True):
+        """
+        关闭调度器，已提交的请求会继续完成。
+
+        Args:
+            wait: 是否等待所有请求完成
+        """
+        with self._state_lock:
+            self._running = False
+        self._executor.shutdown(wait=wait)
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_batch_scheduler() -> LLMScheduler:
+    """
+    获取进程内共享的 LLM 调度器。
+
+    Returns:
+        LLMScheduler 实例
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            batch_config = load_model_config().get("batching", {})
+            _scheduler = LLMScheduler(
+                max_concurrency=batch_config.get("max_concurrency", 8),
+                max_retries=batch_config.get("max_retries", 3),
+                base_backoff=batch_config.get("base_backoff", 1.0),
+            )
+    return _scheduler
@@ -0,0 +1,289 @@
+"""
+上下文预算器
+
+根据 models.yaml 中模型的上下文窗口，为 Prompt 的各个段落分配 token 预算，
+按优先级压缩低优先级段落，保证融合 Prompt 不超过目标大小。
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from hikebutler.config.loader import load_model_config
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 常见模型的上下文窗口（token），models.yaml 中未配置 context_window 时使用
+KNOWN_CONTEXT_WINDOWS = {
+    "deepseek-chat": 64000,
+    "deepseek-reasoner": 64000,
+    "qwen-turbo": 8000,
+    "qwen-plus": 32000,
+    "qwen-max": 8000,
+    "gpt-3.5-turbo": 16385,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+}
+
+DEFAULT_CONTEXT_WINDOW = 8000
+
+TRUNCATION_MARK = "…（已省略）"
+
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的 token 数。
+
+    中日韩字符按每字 1 个 token 计，其余字符按每 4 个字符 1 个 token 计。
+    比调用分词器快得多，足以用于预算分配。
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的 token 数
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+@lru_cache(maxsize=512)
+def compact_text(text: str, max_tokens: int) -> str:
+    """
+    将文本压缩到 max_tokens 以内，结果按 (文本, 预算) 缓存。
+
+    先去掉空行和重复行，仍超出预算时按行截断，保留靠前的内容。
+
+    Args:
+        text: 原始文本
+        max_tokens: token 上限
+
+    Returns:
+        压缩后的文本
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    seen = set()
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped in seen:
+            continue
+        seen.add(stripped)
+        lines.append(line.rstrip())
+
+    budget = max_tokens - estimate_tokens(TRUNCATION_MARK)
+    kept = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            # 整行放不下时截取行首
+            remaining = budget - used
+            if remaining > 8:
+                kept.append(_cut_line(line, remaining))
+            break
+        kept.append(line)
+        used += cost
+    else:
+        return "\n".join(kept)
+
+    kept.append(TRUNCATION_MARK)
+    return "\n".join(kept)
+
+
+def _cut_line(line: str, max_tokens: int) -> str:
+    """按 token 预算截取单行文本。"""
+    low, high = 0, len(line)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(line[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return line[:low]
+
+
+def dedupe_weather_hours(hours: List[Dict[str, Any]]) -> List[str]:
+    """
+    合并天气状况相同的连续小时。
+
+    Args:
+        hours: 逐小时天气，每项包含 time、condition、temp、wind、precip 等字段
+
+    Returns:
+        合并后的时段描述，例如 "08:00-11:00 晴 12~15°C 风 3m/s"
+    """
+    lines = []
+    group: List[Dict[str, Any]] = []
+
+    def _key(hour: Dict[str, Any]) -> Tuple:
+        return (
+            hour.get("condition"),
+            round(float(hour.get("wind", 0) or 0)),
+            round(float(hour.get("precip", 0) or 0), 1),
+        )
+
+    def _flush():
+        if not group:
+            return
+        temps = [float(h["temp"]) for h in group if h.get("temp") is not None]
+        start, end = group[0].get("time", ""), group[-1].get("time", "")
+        span = start if start == end else f"{start}-{end}"
+        parts = [span, str(group[0].get("condition") or "")]
+        if temps:
+            low, high = round(min(temps)), round(max(temps))
+            parts.append(f"{low}°C" if low == high else f"{low}~{high}°C")
+        wind = group[0].get("wind")
+        if wind is not None:
+            parts.append(f"风 {round(float(wind))}m/s")
+        precip = sum(float(h.get("precip", 0) or 0) for h in group)
+        if precip > 0:
+            parts.append(f"降水 {precip:.1f}mm")
+        lines.append(" ".join(p for p in parts if p))
+
+    for hour in hours:
+        if group and _key(hour) != _key(group[-1]):
+            _flush()
+            group = []
+        group.append(hour)
+    _flush()
+
+    return lines
+
+
+def _section_tokens(name: str, body: str) -> int:
+    """段落渲染为 "## 标题\n正文" 后的 token 数（含段落间分隔）。"""
+    return estimate_tokens(f"## {name}") + estimate_tokens(body) + 1
+
+
+@dataclass(slots=True)
+class PromptSection:
+    """Prompt 段落，priority 越小越重要。"""
+
+    name: str
+    content: str
+    priority: int = 0
+    min_tokens: int = 64
+
+
+class ContextBudgeter:
+    """按优先级为 Prompt 段落分配 token 预算。"""
+
+    def __init__(self, context_window: int, target_tokens: int, reserve_tokens: int = 0):
+        """
+        初始化预算器。
+
+        Args:
+            context_window: 模型上下文窗口大小
+            target_tokens: Prompt 目标 token 数
+            reserve_tokens: 为模型输出预留的 token 数
+        """
+        self.context_window = context_window
+        self.budget = max(0, min(target_tokens, context_window - reserve_tokens))
+
+    @classmethod
+    def from_model_config(
+        cls,
+        model_config: Optional[Dict[str, Any]] = None,
+        task: str = "fusion",
+    ) -> "ContextBudgeter":
+        """
+        根据 models.yaml 创建预算器。
+
+        Args:
+            model_config: 模型配置字典，默认从 models.yaml 加载
+            task: 任务名称，对应 prompt_budget 与 llm_routing 下的配置
+
+        Returns:
+            ContextBudgeter 实例
+        """
+        if model_config is None:
+            model_config = load_model_config()
+        # 使用任务路由到的模型档位的配置
+        llm_config = dict(model_config.get("llm", {}))
+        profile = model_config.get("llm_routing", {}).get(task)
+        if profile:
+            llm_config.update(model_config.get("llm_profiles", {}).get(profile) or {})
+        model_name = llm_config.get("model_name", "")
+        context_window = llm_config.get("context_window") or KNOWN_CONTEXT_WINDOWS.get(
+            model_name, DEFAULT_CONTEXT_WINDOW
+        )
+        budget_config = model_config.get("prompt_budget", {}).get(task, {})
+        target_tokens = budget_config.get("target_tokens", context_window)
+        reserve_tokens = llm_config.get("max_tokens", 2000)
+        return cls(int(context_window), int(target_tokens), int(reserve_tokens))
+
+    def build(self, sections: List[PromptSection]) -> Tuple[str, Dict[str, Any]]:
+        """
+        按预算拼接 Prompt。
+
+        高优先级段落优先获得完整篇幅；低优先级段落只在剩余预算内保留，
+        但每段至少保留 min_tokens（若原文更短则保留原文）。
+
+        Args:
+            sections: Prompt 段落列表
+
+        Returns:
+            (Prompt 文本, token 统计)
+        """
+        ordered = sorted((s for s in sections if s.content), key=lambda s: s.priority)
+        sizes = [_section_tokens(s.name, s.content) for s in ordered]
+        floors = [min(size, s.min_tokens) for s, size in zip(ordered, sizes)]
+
+        remaining = self.budget
+        allocations: Dict[str, int] = {}
+        for i, section in enumerate(ordered):
+            reserve_rest = sum(floors[i + 1:])
+            allowance = max(floors[i], remaining - reserve_rest)
+            allocations[section.name] = min(sizes[i], allowance)
+            remaining -= allocations[section.name]
+
+        rendered = []
+        report_sections: Dict[str, Dict[str, int]] = {}
+        for section, size in zip(ordered, sizes):
+            allocated = allocations[section.name]
+            if allocated < size:
+                body_budget = max(allocated - _section_tokens(section.name, ""), 1)
+                body = compact_text(section.content, body_budget)
+            else:
+                body = section.content
+            rendered.append(f"## {section.name}\n{body}")
+            report_sections[section.name] = {
+                "original": size,
+                "final": _section_tokens(section.name, body),
+            }
+
+        prompt = "\n\n".join(rendered)
+        report = {
+            "sections": report_sections,
+            "original_tokens": sum(sizes),
+            "prompt_tokens": estimate_tokens(prompt),
+            "budget": self.budget,
+        }
+        return prompt, report
+
+
+_budgeters: Dict[str, ContextBudgeter] = {}
+
+
+def get_context_budgeter(task: str = "fusion") -> ContextBudgeter:
+    """
+    获取指定任务的预算器（按任务缓存）。
+
+    Args:
+        task: 任务名称
+
+    Returns:
+        ContextBudgeter 实例
+    """
+    if task not in _budgeters:
+        _budgeters[task] = ContextBudgeter.from_model_config(task=task)
+    return _budgeters[task]
@@ -5,9 +5,10 @@ Embedding 工厂类
 """
 
 from typing import Any, Dict
-from langchain.embeddings.base import Embeddings
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
-from hikebutler.config.loader import load_model_config
+from hikebutler.config.loader import load_config, load_model_config
+from hikebutler.network.http_pool import get_http_client
 import logging
 
 logger = logging.getLogger(__name__)
@@ -30,7 +31,25 @@ class EmbeddingFactory:
         """初始化工厂。"""
         if self._config is None:
             self._config = load_model_config()
-            self._embedding = self._create_embedding()
+            self._embedding = self._wrap_cache(self._create_embedding())
+
+    def _wrap_cache(self, embedding: Embeddings) -> Embeddings:
+        """
+        按 server.cache.embedding 配置为 Embedding 加上共享缓存。
+
+        Args:
+            embedding: Embedding 实例
+
+        Returns:
+            原实例或带缓存的包装
+        """
+        cache_config = load_config().get("server", {}).get("cache", {})
+        if not cache_config.get("embedding", False):
+            return embedding
+        from hikebutler.serving.adapters import CachedEmbeddings
+
+        model_name = self._config.get("embedding", {}).get("model_name", "text-embedding-v2")
+        return CachedEmbeddings(embedding, model_name, cache_config.get("embedding_ttl"))
 
     def _create_embedding(self) -> Embeddings:
         """
@@ -51,11 +70,16 @@ class EmbeddingFactory:
         if not api_key:
             raise ValueError(f"未配置 {provider} Embedding API Key")
 
+        # 与其他出站请求共享连接池
+        base_url = embedding_config.get("base_url") or "https://api.openai.com/v1"
+        http_client = get_http_client(base_url)
+
         # 根据提供商创建不同的 Embedding 实例
         if provider == "openai":
             return OpenAIEmbeddings(
                 model=model_name,
                 openai_api_key=api_key,
+                http_client=http_client,
             )
         elif provider == "qwen":
             # TODO: 实现 Qwen Embedding 封装
@@ -63,6 +87,7 @@ class EmbeddingFactory:
             return OpenAIEmbeddings(
                 model="text-embedding-ada-002",  # 临时使用
                 openai_api_key=api_key,
+                http_client=http_client,
             )
         elif provider == "deepseek":
             # TODO: 实现 DeepSeek Embedding 封装
@@ -70,6 +95,7 @@ class EmbeddingFactory:
             return OpenAIEmbeddings(
                 model="text-embedding-ada-002",  # 临时使用
                 openai_api_key=api_key,
+                http_client=http_client,
             )
         else:
             raise ValueError(f"不支持的 Embedding 提供商: {provider}")
@@ -86,7 +112,7 @@ class EmbeddingFactory:
     def reload(self):
         """重新加载配置并创建新的 Embedding 实例。"""
         self._config = load_model_config()
-        self._embedding = self._create_embedding()
+        self._embedding = self._wrap_cache(self._create_embedding())
         logger.info("Embedding 配置已重新加载")
 
 
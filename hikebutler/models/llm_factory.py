@@ -2,22 +2,44 @@
 LLM 工厂类
 
 通过抽象层实现模型切换，支持 DeepSeek、Qwen、OpenAI 等。
+
+models.yaml 中可以定义多个命名档位（如 fast、quality），并按节点选择档位：
+抽取类的简单任务使用便宜的快速模型，最终计划融合使用强模型。
+档位调用超时时自动回退到配置的备用档位；配置了备用档位的档位默认不在 SDK 内重试，
+超时后立即回退，而不是先耗尽 SDK 的重试次数。
 """
 
-from typing import Any, Dict
-from langchain.llms.base import BaseLLM
+from typing import Any, Dict, Optional
+import httpx
+import openai
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
 from hikebutler.config.loader import load_model_config
+from hikebutler.models.metrics import MetricsCallbackHandler
+from hikebutler.network.http_pool import get_http_client
 import logging
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PROFILE = "default"
+
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+# OpenAI 兼容接口地址
+PROVIDER_BASE_URLS = {
+    "deepseek": "https://api.deepseek.com",
+    "qwen": "https://dashscope.aliyuncs.com/compatible-mode/v1",
+}
+
+# 触发档位回退的超时异常
+TIMEOUT_ERRORS = (TimeoutError, openai.APITimeoutError, httpx.TimeoutException)
+
 
 class LLMFactory:
-    """LLM 工厂类，负责创建和管理 LLM 实例。"""
+    """LLM 工厂类，负责创建和管理各档位的 LLM 实例。"""
 
     _instance: "LLMFactory" = None
-    _llm: BaseLLM = None
+    _llms: Dict[str, Runnable] = None
     _config: Dict[str, Any] = None
 
     def __new__(cls):
@@ -30,11 +52,43 @@ class LLMFactory:
         """初始化工厂。"""
         if self._config is None:
             self._config = load_model_config()
-            self._llm = self._create_llm()
+            self._llms = {}
 
-    def _create_llm(self) -> BaseLLM:
+    def _profile_config(self, profile: str) -> Dict[str, Any]:
         """
-        根据配置创建 LLM 实例。
+        获取档位配置，未配置的字段继承 llm 默认配置。
+
+        Args:
+            profile: 档位名称
+
+        Returns:
+            档位配置字典
+
+        Raises:
+            ValueError: 档位不存在
+        """
+        base = dict(self._config.get("llm", {}))
+        if profile == DEFAULT_PROFILE:
+            return base
+
+        profiles = self._config.get("llm_profiles", {})
+        if profile not in profiles:
+            raise ValueError(f"未定义的模型档位: {profile}")
+        base.pop("fallback", None)
+        base.update(profiles[profile] or {})
+        return base
+
+    def _create_llm(
+        self,
+        profile: str = DEFAULT_PROFILE,
+        max_retries: Optional[int] = None,
+    ) -> ChatOpenAI:
+        """
+        根据档位配置创建 LLM 实例。
+
+        Args:
+            profile: 档位名称
+            max_retries: SDK 重试次数，默认读取档位配置的 max_retries（未配置时为 2）
 
         Returns:
             LLM 实例
@@ -42,7 +96,7 @@ class LLMFactory:
         Raises:
             ValueError: 不支持的模型提供商
         """
-        llm_config = self._config.get("llm", {})
+        llm_config = self._profile_config(profile)
         provider = llm_config.get("provider", "deepseek")
         model_name = llm_config.get("model_name", "deepseek-chat")
         api_key = llm_config.get("api_key")
@@ -52,59 +106,104 @@ class LLMFactory:
         if not api_key:
             raise ValueError(f"未配置 {provider} API Key")
 
-        # 根据提供商创建不同的 LLM 实例
-        if provider == "openai":
-            return ChatOpenAI(
-                model=model_name,
-                api_key=api_key,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
-        elif provider == "deepseek":
-            # TODO: 实现 DeepSeek LLM 封装
-            # 可以使用 langchain_community 或自定义封装
-            logger.warning("DeepSeek LLM 封装待实现，当前使用 OpenAI 接口")
-            return ChatOpenAI(
-                model="gpt-3.5-turbo",  # 临时使用
-                api_key=api_key,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
-        elif provider == "qwen":
-            # TODO: 实现 Qwen LLM 封装
-            logger.warning("Qwen LLM 封装待实现，当前使用 OpenAI 接口")
-            return ChatOpenAI(
-                model="gpt-3.5-turbo",  # 临时使用
-                api_key=api_key,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
-        else:
+        if provider not in ("openai", *PROVIDER_BASE_URLS):
             raise ValueError(f"不支持的 LLM 提供商: {provider}")
 
-    def get_llm(self) -> BaseLLM:
+        # DeepSeek、Qwen 均提供 OpenAI 兼容接口
+        base_url = llm_config.get("base_url") or PROVIDER_BASE_URLS.get(provider)
+        metrics_handler = MetricsCallbackHandler(
+            profile,
+            cost_per_1k_input=llm_config.get("cost_per_1k_input", 0.0),
+            cost_per_1k_output=llm_config.get("cost_per_1k_output", 0.0),
+        )
+        return ChatOpenAI(
+            model=model_name,
+            api_key=api_key,
+            base_url=base_url,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=llm_config.get("timeout"),
+            max_retries=max_retries if max_retries is not None else llm_config.get("max_retries", 2),
+            callbacks=[metrics_handler],
+            http_client=get_http_client(base_url or OPENAI_BASE_URL),
+        )
+
+    def get_llm(self, profile: Optional[str] = None, max_retries: Optional[int] = None) -> Runnable:
         """
-        获取 LLM 实例。
+        获取指定档位的 LLM 实例（带超时回退）。
+
+        Args:
+            profile: 档位名称，默认使用 llm 默认配置
+            max_retries: 覆盖 SDK 重试次数（由调用方自行重试时传 0），默认按档位配置
 
         Returns:
             LLM 实例
         """
-        return self._llm
+        profile = profile or DEFAULT_PROFILE
+        key = profile if max_retries is None else f"{profile}:retries={max_retries}"
+        if key not in self._llms:
+            profile_config = self._profile_config(profile)
+            fallback = profile_config.get("fallback")
+            if fallback and fallback != profile:
+                # 超时后直接回退，重试次数只取档位中显式配置的值
+                primary_retries = max_retries
+                if primary_retries is None:
+                    primary_retries = profile_config.get("max_retries", 0)
+                llm = self._create_llm(profile, max_retries=primary_retries).with_fallbacks(
+                    [self._create_llm(fallback, max_retries=max_retries)],
+                    exceptions_to_handle=TIMEOUT_ERRORS,
+                )
+            else:
+                llm = self._create_llm(profile, max_retries=max_retries)
+            self._llms[key] = llm
+        return self._llms[key]
+
+    def get_llm_for_node(self, node: str, max_retries: Optional[int] = None) -> Runnable:
+        """
+        获取节点对应档位的 LLM 实例，调用指标按节点归类。
+
+        Args:
+            node: 节点名称（如 route、gear、fusion）
+            max_retries: 覆盖 SDK 重试次数，默认按档位配置
+
+        Returns:
+            LLM 实例
+        """
+        profile = self._config.get("llm_routing", {}).get(node, DEFAULT_PROFILE)
+        return self.get_llm(profile, max_retries=max_retries).with_config(metadata={"node": node})
 
     def reload(self):
-        """重新加载配置并创建新的 LLM 实例。"""
+        """重新加载配置，各档位实例在下次使用时重新创建。"""
         self._config = load_model_config()
-        self._llm = self._create_llm()
+        self._llms = {}
         logger.info("LLM 配置已重新加载")
 
 
-def get_llm() -> BaseLLM:
+def get_llm(profile: Optional[str] = None, max_retries: Optional[int] = None) -> Runnable:
     """
     获取 LLM 实例的便捷函数。
 
+    Args:
+        profile: 档位名称，默认使用 llm 默认配置
+        max_retries: 覆盖 SDK 重试次数，默认按档位配置
+
     Returns:
         LLM 实例
     """
     factory = LLMFactory()
-    return factory.get_llm()
+    return factory.get_llm(profile, max_retries=max_retries)
+
 
+def get_llm_for_node(node: str, max_retries: Optional[int] = None) -> Runnable:
+    """
+    获取节点对应档位 LLM 实例的便捷函数。
+
+    Args:
+        node: 节点名称
+        max_retries: 覆盖 SDK 重试次数，默认按档位配置
+
+    Returns:
+        LLM 实例
+    """
+    factory = LLMFactory()
+    return factory.get_llm_for_node(node, max_retries=max_retries)
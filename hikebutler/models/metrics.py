@@ -0,0 +1,213 @@
+"""
+LLM 调用指标
+
+记录每个节点、每个模型档位的调用延迟、token 用量和费用，
+用于判断各节点使用哪个档位足够快、足够便宜。
+"""
+
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 每个 (节点, 档位) 保留的最近延迟样本数
+MAX_SAMPLES = 500
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """计算百分位数（最近邻法）。"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class LLMMetrics:
+    """线程安全的 LLM 调用指标收集器。"""
+
+    def __init__(self):
+        """初始化指标收集器。"""
+        self._lock = threading.Lock()
+        self._latencies: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+        self._counters: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(
+            lambda: {
+                "calls": 0,
+                "errors": 0,
+                "timeouts": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "cost": 0.0,
+            }
+        )
+
+    def record(
+        self,
+        node: str,
+        profile: str,
+        latency_ms: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cost: float = 0.0,
+        error: Optional[BaseException] = None,
+    ):
+        """
+        记录一次调用。
+
+        Args:
+            node: 节点名称
+            profile: 模型档位
+            latency_ms: 延迟（毫秒）
+            prompt_tokens: 输入 token 数
+            completion_tokens: 输出 token 数
+            cost: 费用
+            error: 调用异常（成功时为 None）
+        """
+        key = (node, profile)
+        with self._lock:
+            samples = self._latencies[key]
+            samples.append(latency_ms)
+            if len(samples) > MAX_SAMPLES:
+                del samples[: len(samples) - MAX_SAMPLES]
+
+            counter = self._counters[key]
+            counter["calls"] += 1
+            counter["prompt_tokens"] += prompt_tokens
+            counter["completion_tokens"] += completion_tokens
+            counter["cost"] += cost
+            if error is not None:
+                counter["errors"] += 1
+                if "timeout" in type(error).__name__.lower():
+                    counter["timeouts"] += 1
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        汇总指标。
+
+        Returns:
+            {节点: {档位: {calls, errors, timeouts, p50_ms, p95_ms, avg_tokens, cost}}}
+        """
+        result: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(dict)
+        with self._lock:
+            for (node, profile), counter in self._counters.items():
+                samples = self._latencies[(node, profile)]
+                calls = counter["calls"] or 1
+                result[node][profile] = {
+                    **counter,
+                    "p50_ms": _percentile(samples, 50),
+                    "p95_ms": _percentile(samples, 95),
+                    "avg_tokens": (counter["prompt_tokens"] + counter["completion_tokens"]) / calls,
+                    "avg_cost": counter["cost"] / calls,
+                }
+        return dict(result)
+
+    def recommend_profiles(self, latency_slo_ms: float, min_calls: int = 20) -> Dict[str, str]:
+        """
+        为每个节点推荐满足延迟目标的最便宜档位。
+
+        Args:
+            latency_slo_ms: p95 延迟目标（毫秒）
+            min_calls: 档位至少需要的样本数
+
+        Returns:
+            {节点: 推荐档位}，样本不足的节点不出现在结果中
+        """
+        recommendations = {}
+        for node, profiles in self.summary().items():
+            candidates = [
+                (stats["avg_cost"], name)
+                for name, stats in profiles.items()
+                if stats["calls"] >= min_calls
+                and stats["p95_ms"] <= latency_slo_ms
+                and stats["errors"] / stats["calls"] < 0.05
+            ]
+            if candidates:
+                recommendations[node] = min(candidates)[1]
+        return recommendations
+
+    def reset(self):
+        """清空指标。"""
+        with self._lock:
+            self._latencies.clear()
+            self._counters.clear()
+
+
+_metrics = LLMMetrics()
+
+
+def get_llm_metrics() -> LLMMetrics:
+    """
+    获取进程内共享的指标收集器。
+
+    Returns:
+        LLMMetrics 实例
+    """
+    return _metrics
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """将某个模型档位的调用延迟、token 用量和费用写入 LLMMetrics。"""
+
+    def __init__(
+        self,
+        profile: str,
+        cost_per_1k_input: float = 0.0,
+        cost_per_1k_output: float = 0.0,
+        metrics: Optional[LLMMetrics] = None,
+    ):
+        """
+        初始化回调。
+
+        Args:
+            profile: 模型档位名称
+            cost_per_1k_input: 每千输入 token 价格
+            cost_per_1k_output: 每千输出 token 价格
+            metrics: 指标收集器，默认使用全局实例
+        """
+        self.profile = profile
+        self.cost_per_1k_input = cost_per_1k_input
+        self.cost_per_1k_output = cost_per_1k_output
+        self.metrics = metrics or get_llm_metrics()
+        self._runs: Dict[UUID, Tuple[float, str]] = {}
+
+    def _start(self, run_id: UUID, metadata: Optional[Dict[str, Any]]):
+        node = (metadata or {}).get("node", "unknown")
+        self._runs[run_id] = (time.perf_counter(), node)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        """对话模型开始调用。"""
+        self._start(run_id, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        """文本模型开始调用。"""
+        self._start(run_id, metadata)
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs):
+        """调用成功，记录延迟、token 和费用。"""
+        started, node = self._runs.pop(run_id, (time.perf_counter(), "unknown"))
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = int(usage.get("prompt_tokens", 0) or 0)
+        completion_tokens = int(usage.get("completion_tokens", 0) or 0)
+        cost = (
+            prompt_tokens / 1000 * self.cost_per_1k_input
+            + completion_tokens / 1000 * self.cost_per_1k_output
+        )
+        self.metrics.record(
+            node,
+            self.profile,
+            (time.perf_counter() - started) * 1000,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost=cost,
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id, **kwargs):
+        """调用失败，记录延迟和错误类型。"""
+        started, node = self._runs.pop(run_id, (time.perf_counter(), "unknown"))
+        self.metrics.record(node, self.profile, (time.perf_counter() - started) * 1000, error=error)
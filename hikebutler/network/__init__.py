@@ -0,0 +1 @@
+"""网络连接管理模块"""
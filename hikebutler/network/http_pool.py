@@ -0,0 +1,310 @@
+"""
+HTTP 连接管理器
+
+进程内共享的出站 HTTP 连接池，LLM、Embedding、Windy、小红书和远程 ChromaDB 的请求都从这里获取客户端：
+- 按主机维护 keep-alive 连接池，并限制每个主机的连接数；
+- 连接池内的 DNS 缓存（不影响进程中其他库的域名解析）；
+- 可按主机配置 HTTP/1.1 或 HTTP/2（部分 ChromaDB Docker 服务与 httpx 的兼容问题见
+  scripts/CHROMADB_ISSUE.md，这类主机需要强制 HTTP/1.1）；
+- 按主机统计请求延迟；
+- trust_env 开启时按 HTTP(S)_PROXY、ALL_PROXY 和 NO_PROXY 环境变量为每个代理挂载一个同样计量的传输层
+  （httpx 在传入自定义 transport 时不再读取代理环境变量，需要自行挂载）。
+"""
+
+import ipaddress
+import socket
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import httpcore
+import httpx
+from httpx._utils import get_environment_proxies
+from hikebutler.config.loader import load_config
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 每个主机保留的最近延迟样本数
+MAX_LATENCY_SAMPLES = 500
+
+
+class _DNSCache:
+    """带 TTL 和容量上限的 DNS 缓存，只供连接池内的连接使用。"""
+
+    def __init__(self, ttl: float, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple[str, int], Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str, port: int) -> str:
+        """解析主机名，返回 IP 地址；IP 地址原样返回。"""
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] > now:
+                self._cache.move_to_end(key)
+                return cached[1]
+
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        address = infos[0][4][0]
+        with self._lock:
+            self._cache[key] = (now + self.ttl, address)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return address
+
+    def invalidate(self, host: str, port: int):
+        """删除某个主机的缓存（连接失败时调用）。"""
+        with self._lock:
+            self._cache.pop((host, port), None)
+
+    def clear(self):
+        """清空缓存。"""
+        with self._lock:
+            self._cache.clear()
+
+
+class _CachingNetworkBackend(httpcore.NetworkBackend):
+    """先经 DNS 缓存解析主机名再建立 TCP 连接的网络后端。
+
+    TLS 握手的 SNI 与证书校验仍使用原始主机名（由 httpcore 按请求的 origin 设置）。
+    """
+
+    def __init__(self, dns_cache: _DNSCache):
+        self._dns_cache = dns_cache
+        self._backend = httpcore.SyncBackend()
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        address = self._dns_cache.resolve(host, port)
+        try:
+            return self._backend.connect_tcp(
+                address, port, timeout, local_address, socket_options
+            )
+        except httpcore.ConnectError:
+            self._dns_cache.invalidate(host, port)
+            raise
+
+    def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    def sleep(self, seconds: float):
+        self._backend.sleep(seconds)
+
+
+class _LatencyRecorder:
+    """按主机记录请求延迟和错误数。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = defaultdict(list)
+        self._errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, host: str, latency_ms: float, error: bool = False):
+        with self._lock:
+            samples = self._samples[host]
+            samples.append(latency_ms)
+            if len(samples) > MAX_LATENCY_SAMPLES:
+                del samples[: len(samples) - MAX_LATENCY_SAMPLES]
+            if error:
+                self._errors[host] += 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        with self._lock:
+            for host, samples in self._samples.items():
+                ordered = sorted(samples)
+                result[host] = {
+                    "requests": len(ordered),
+                    "errors": self._errors[host],
+                    "p50_ms": ordered[len(ordered) // 2],
+                    "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                    "max_ms": ordered[-1],
+                }
+        return result
+
+
+class _MeteredTransport(httpx.HTTPTransport):
+    """记录每个请求耗时的传输层，可选使用 DNS 缓存建立连接（经代理时由代理解析域名，不使用 DNS 缓存）。"""
+
+    def __init__(
+        self,
+        recorder: _LatencyRecorder,
+        dns_cache: Optional[_DNSCache] = None,
+        http2: bool = False,
+        limits: httpx.Limits = httpx.Limits(),
+        retries: int = 0,
+        proxy: Optional[str] = None,
+    ):
+        super().__init__(http2=http2, limits=limits, retries=retries, proxy=proxy)
+        self._recorder = recorder
+        if dns_cache is not None and proxy is None:
+            self._pool = httpcore.ConnectionPool(
+                ssl_context=httpx.create_ssl_context(),
+                max_connections=limits.max_connections,
+                max_keepalive_connections=limits.max_keepalive_connections,
+                keepalive_expiry=limits.keepalive_expiry,
+                http1=True,
+                http2=http2,
+                retries=retries,
+                network_backend=_CachingNetworkBackend(dns_cache),
+            )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = super().handle_request(request)
+        except Exception:
+            self._recorder.record(request.url.host, (time.perf_counter() - started) * 1000, True)
+            raise
+        self._recorder.record(
+            request.url.host,
+            (time.perf_counter() - started) * 1000,
+            error=response.status_code >= 500,
+        )
+        return response
+
+
+def _host_of(base_url: Optional[str]) -> str:
+    """从 URL 或主机名中提取主机名。"""
+    if not base_url:
+        return "default"
+    if "://" not in base_url:
+        base_url = f"http://{base_url}"
+    return urlsplit(base_url).hostname or "default"
+
+
+class HTTPConnectionManager:
+    """进程内共享的 HTTP 连接管理器。"""
+
+    _instance: "HTTPConnectionManager" = None
+    _config: Dict[str, Any] = None
+
+    def __new__(cls):
+        """单例模式。"""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """初始化连接管理器。"""
+        if self._config is None:
+            self._config = load_config().get("http", {})
+            self._clients: Dict[str, httpx.Client] = {}
+            self._lock = threading.Lock()
+            self._recorder = _LatencyRecorder()
+            self._dns_cache: Optional[_DNSCache] = None
+
+            dns_ttl = self._config.get("dns_cache_ttl", 300)
+            if dns_ttl:
+                self._dns_cache = _DNSCache(dns_ttl, self._config.get("dns_cache_size", 256))
+
+    def _host_config(self, host: str) -> Dict[str, Any]:
+        """获取主机配置，未配置的字段继承全局配置。"""
+        merged = {k: v for k, v in self._config.items() if k != "hosts"}
+        merged.update((self._config.get("hosts") or {}).get(host) or {})
+        return merged
+
+    def get_client(self, base_url: Optional[str] = None) -> httpx.Client:
+        """
+        获取某个主机的共享客户端。
+
+        Args:
+            base_url: 目标服务的 URL 或主机名，同一主机共享一个连接池
+
+        Returns:
+            httpx 客户端
+        """
+        host = _host_of(base_url)
+        with self._lock:
+            client = self._clients.get(host)
+            if client is None:
+                host_config = self._host_config(host)
+                limits = httpx.Limits(
+                    max_connections=host_config.get("max_connections_per_host", 20),
+                    max_keepalive_connections=host_config.get("max_keepalive_per_host", 10),
+                    keepalive_expiry=host_config.get("keepalive_expiry", 30),
+                )
+                http2 = bool(host_config.get("http2", False))
+                retries = host_config.get("connect_retries", 1)
+                trust_env = host_config.get("trust_env", True)
+                transport = _MeteredTransport(
+                    self._recorder,
+                    dns_cache=self._dns_cache,
+                    http2=http2,
+                    limits=limits,
+                    retries=retries,
+                )
+                # 值为 None 的挂载（NO_PROXY 命中）回落到上面的直连传输层
+                mounts = {
+                    pattern: _MeteredTransport(
+                        self._recorder, http2=http2, limits=limits, retries=retries, proxy=proxy
+                    )
+                    if proxy
+                    else None
+                    for pattern, proxy in (get_environment_proxies() if trust_env else {}).items()
+                }
+                client = httpx.Client(
+                    transport=transport,
+                    mounts=mounts,
+                    timeout=host_config.get("timeout", 30),
+                    trust_env=trust_env,
+                    follow_redirects=True,
+                )
+                self._clients[host] = client
+                proxies = [pattern for pattern, mount in mounts.items() if mount is not None]
+                logger.info(
+                    f"创建 HTTP 连接池: {host} (HTTP/{'2' if http2 else '1.1'})"
+                    + (f"，代理: {', '.join(proxies)}" if proxies else "")
+                )
+            return client
+
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        获取按主机统计的请求延迟。
+
+        Returns:
+            {主机: {requests, errors, p50_ms, p95_ms, max_ms}}
+        """
+        return self._recorder.summary()
+
+    def close(self):
+        """关闭所有连接池。"""
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+            if self._dns_cache is not None:
+                self._dns_cache.clear()
+        logger.info("HTTP 连接池已关闭")
+
+    @classmethod
+    def reset(cls):
+        """关闭连接池并丢弃单例，下次使用时按最新配置重建（主要用于测试）。"""
+        if cls._instance is not None and cls._instance._config is not None:
+            cls._instance.close()
+        cls._instance = None
+        cls._config = None
+
+
+def get_http_client(base_url: Optional[str] = None) -> httpx.Client:
+    """
+    获取共享 HTTP 客户端的便捷函数。
+
+    Args:
+        base_url: 目标服务的 URL 或主机名
+
+    Returns:
+        httpx 客户端
+    """
+    return HTTPConnectionManager().get_client(base_url)
@@ -5,6 +5,8 @@ from hikebutler.nodes.weather_node import weather_node
 from hikebutler.nodes.gear_node import gear_node
 from hikebutler.nodes.photo_plan_node import photo_plan_node
 from hikebutler.nodes.fusion_node import fusion_node
+from hikebutler.nodes.plan_cache_node import plan_cache_node
+from hikebutler.nodes.personalize_node import personalize_node
 from hikebutler.nodes.post_gen_node import post_gen_node
 from hikebutler.nodes.xhs_node import xhs_node
 
@@ -14,6 +16,8 @@ __all__ = [
     "gear_node",
     "photo_plan_node",
     "fusion_node",
+    "plan_cache_node",
+    "personalize_node",
     "post_gen_node",
     "xhs_node",
 ]
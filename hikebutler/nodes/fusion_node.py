@@ -4,32 +4,145 @@
 将所有中间结果融合，生成最终的徒步计划。
 """
 
-from typing import Dict, Any
-from hikebutler.state import HikeButlerState
+import json
+from dataclasses import asdict, is_dataclass
+from typing import Dict, Any, List
+from langchain_core.messages import HumanMessage, SystemMessage
+from hikebutler.state import HikeButlerState, WeatherResult, GearResult
+from hikebutler.models.context_budget import (
+    PromptSection,
+    dedupe_weather_hours,
+    get_context_budgeter,
+)
+from hikebutler.models.batch_scheduler import get_batch_scheduler
+from hikebutler.memory.session_cache import get_memory_cache
+from hikebutler.database.feature_store import format_features
+import logging
 
+logger = logging.getLogger(__name__)
 
-def fusion_node(state: HikeButlerState) -> HikeButlerState:
+FUSION_SYSTEM_PROMPT = (
+    "你是专业的徒步私人管家。请根据给定的路线、天气、装备、拍摄计划、用户画像、历史特征和历史记忆，"
+    "生成一份结构清晰的 Markdown 徒步计划，包含行程安排、安全提示和装备要点。"
+)
+
+
+def _format_result(result: Any) -> str:
+    """将中间结果渲染为 "字段: 值" 形式的紧凑文本，省略空字段。"""
+    if result is None:
+        return ""
+    data = asdict(result) if is_dataclass(result) else result
+    if not isinstance(data, dict):
+        return str(data)
+
+    lines = []
+    for key, value in data.items():
+        if value in (None, "", [], {}) or key.endswith("_ref") or key.endswith("_refs"):
+            continue
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        lines.append(f"{key}: {value}")
+    return "\n".join(lines)
+
+
+def _format_weather(weather: Any) -> str:
+    """渲染天气结果，逐小时数据合并为连续时段，沿线分段天气每段一行。"""
+    if not isinstance(weather, WeatherResult):
+        return _format_result(weather)
+
+    lines = [weather.summary] if weather.summary else []
+    if weather.hazards:
+        hazards = ", ".join(f"{k}={v:.2f}" for k, v in weather.hazards.items())
+        lines.append(f"风险评分: {hazards}")
+    lines.extend(dedupe_weather_hours(weather.hourly))
+    for segment in weather.segments:
+        parts = [f"{segment['from_km']}-{segment['to_km']} km"]
+        if "max_elevation_m" in segment:
+            parts.append(f"最高 {segment['max_elevation_m']} m")
+        parts.append(f"最低 {segment['temp_min_c']:.0f}°C 风 {segment['wind_max_ms']:.0f}m/s")
+        if segment["precip_mm"] > 0:
+            parts.append(f"降水 {segment['precip_mm']}mm")
+        lines.append(" ".join(parts))
+    if not lines:
+        lines.append(weather.message)
+    return "\n".join(lines)
+
+
+def _format_gear(gear: Any) -> str:
+    """渲染装备清单，每件装备一行。"""
+    if not isinstance(gear, GearResult) or not gear.items:
+        return _format_result(gear)
+    return "\n".join(" | ".join(str(col) for col in item if col != "") for item in gear.items)
+
+
+def _format_memories(memories: List[Dict[str, Any]]) -> str:
+    """渲染用户记忆，每条一行。"""
+    return "\n".join(f"- {m.get('memory', m)}" for m in memories)
+
+
+def fusion_node(state: HikeButlerState) -> Dict[str, Any]:
     """
     信息融合节点。
 
     将路线、天气、装备、拍摄计划等信息融合，生成完整的徒步计划。
+    各部分按优先级分配 token 预算，超出目标大小时压缩低优先级内容。
 
     Args:
         state: 当前状态
 
     Returns:
-        更新后的状态
+        状态增量（只包含本节点更新的键）
     """
-    # TODO: 实现信息融合逻辑
-    # 1. 收集所有中间结果
-    # 2. 调用 LLM 进行信息融合
-    # 3. 生成 Markdown 格式的徒步计划
-    # 4. 更新 state.output_data
-
-    state["output_data"] = {
-        "plan": "徒步计划融合功能待实现",
-        "format": "markdown",
-    }
+    results = state.get("intermediate_results") or {}
+    input_data = state.get("input_data") or {}
+    user_id = state.get("user_id")
 
-    return state
+    # 记忆在请求开始时已预取到会话缓存，这里只做本地相关度过滤
+    memories: List[Dict[str, Any]] = []
+    if user_id:
+        memories = get_memory_cache().recall(
+            state.get("session_id") or user_id, user_id, query=input_data.get("location")
+        )
 
+    profile = state.get("user_profile")
+    sections = [
+        PromptSection("用户需求", _format_result(input_data), priority=0),
+        PromptSection("路线", _format_result(results.get("route")), priority=1),
+        PromptSection("天气", _format_weather(results.get("weather")), priority=2),
+        PromptSection("装备", _format_gear(results.get("gear")), priority=3),
+        PromptSection(
+            "用户画像",
+            json.dumps(profile, ensure_ascii=False, separators=(",", ":")) if profile else "",
+            priority=4,
+        ),
+        PromptSection("用户特征", format_features(state.get("user_features")), priority=4),
+        PromptSection("拍摄计划", _format_result(results.get("photo_plan")), priority=5),
+        PromptSection("历史记忆", _format_memories(memories), priority=6),
+    ]
+
+    prompt, prompt_report = get_context_budgeter("fusion").build(sections)
+    logger.info(
+        f"融合 Prompt: {prompt_report['prompt_tokens']} tokens "
+        f"(原始 {prompt_report['original_tokens']}, 预算 {prompt_report['budget']})"
+    )
+
+    # 经 LLM 调度器调用（统一并发上限与 429 退避）；调用失败时异常向上抛出，
+    # 工作流停在本节点，重试时从检查点恢复
+    try:
+        response = get_batch_scheduler().invoke(
+            [SystemMessage(content=FUSION_SYSTEM_PROMPT), HumanMessage(content=prompt)],
+            node="fusion",
+        )
+    except Exception as e:
+        logger.error(f"徒步计划融合失败: {e}")
+        raise
+
+    gear = results.get("gear")
+    return {
+        "output_data": {
+            "plan": response.content,
+            "format": "markdown",
+            "gear_list": gear.items if isinstance(gear, GearResult) else [],
+            "prompt_report": prompt_report,
+        }
+    }
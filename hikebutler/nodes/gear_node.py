@@ -4,11 +4,39 @@
 根据路线、天气和用户画像，生成个性化装备清单。
 """
 
-from typing import Dict, Any
-from hikebutler.state import HikeButlerState
+from typing import Any, Dict, List
+from hikebutler.state import HikeButlerState, GearResult, WeatherResult
 
+# 天气危险指标超过阈值时必带的装备：(指标, 阈值, 装备名称, 备注)
+WEATHER_GEAR = (
+    ("precipitation", 0.1, "雨衣/冲锋衣", "预报有降水"),
+    ("thunderstorm", 0.3, "防水背包罩", "有雷暴可能，避开山脊和孤立高点"),
+    ("wind_chill", 0.2, "保暖中层和手套", "体感温度低"),
+    ("wind", 0.3, "防风外套", "阵风较大"),
+    ("freezing_level", 0.5, "冰爪", "0°C 层接近或低于路线最高点，可能结冰"),
+)
 
-def gear_node(state: HikeButlerState) -> HikeButlerState:
+
+def weather_gear(weather: Any) -> List[List[Any]]:
+    """
+    由天气危险指标确定必带装备。
+
+    Args:
+        weather: 天气结果
+
+    Returns:
+        [装备名称, 数量, 备注] 列表
+    """
+    if not isinstance(weather, WeatherResult) or not weather.hazards:
+        return []
+    return [
+        [name, 1, note]
+        for hazard, threshold, name, note in WEATHER_GEAR
+        if weather.hazards.get(hazard, 0.0) >= threshold
+    ]
+
+
+def gear_node(state: HikeButlerState) -> Dict[str, Any]:
     """
     装备建议节点。
 
@@ -18,18 +46,15 @@ def gear_node(state: HikeButlerState) -> HikeButlerState:
         state: 当前状态
 
     Returns:
-        更新后的状态
+        状态增量（只包含本节点更新的键）
     """
     # TODO: 实现装备建议逻辑
     # 1. 获取路线和天气信息
     # 2. 从用户画像中获取已有装备
-    # 3. 调用 LLM 生成装备清单
-    # 4. 更新 state.intermediate_results
-
-    state["intermediate_results"]["gear"] = {
-        "status": "pending",
-        "message": "装备建议功能待实现",
-    }
+    # 3. 调用 LLM 生成装备清单（经 get_batch_scheduler().invoke(..., node="gear") 派发）
+    # 4. 返回 intermediate_results 增量
 
-    return state
+    results = state.get("intermediate_results") or {}
+    result = GearResult(status="pending", message="装备建议功能待实现", items=weather_gear(results.get("weather")))
 
+    return {"intermediate_results": {"gear": result}}
@@ -0,0 +1,55 @@
+"""
+个性化节点
+
+在与用户无关的路线和基础装备清单（可能来自计划缓存）之上叠加用户特征：
+- 用户已有的装备在清单中标注“已有”；
+- 路线爬升明显超过用户历史最大爬升时，在路线结果中加入提示。
+"""
+
+from dataclasses import replace
+from typing import Dict, Any
+from hikebutler.state import HikeButlerState, GearResult, RouteResult
+
+# 路线爬升超过用户历史最大爬升的倍数时提示
+ASCENT_WARNING_RATIO = 1.5
+
+
+def personalize_node(state: HikeButlerState) -> Dict[str, Any]:
+    """
+    个性化节点。
+
+    Args:
+        state: 当前状态
+
+    Returns:
+        状态增量（只包含本节点更新的键）
+    """
+    features = state.get("user_features")
+    results = state.get("intermediate_results") or {}
+    if features is None:
+        return {}
+
+    updates: Dict[str, Any] = {}
+    gear = results.get("gear")
+    if isinstance(gear, GearResult) and gear.items and features.gear:
+        owned = set(features.gear)
+        items = []
+        for item in gear.items:
+            name, *rest = item
+            if name in owned:
+                note = rest[1] if len(rest) > 1 else ""
+                item = [name, rest[0] if rest else "", f"{note}（已有）" if note else "已有"]
+            items.append(item)
+        updates["gear"] = replace(gear, items=items)
+
+    route = results.get("route")
+    if (
+        isinstance(route, RouteResult)
+        and route.ascent_m
+        and features.max_ascent_m
+        and route.ascent_m > features.max_ascent_m * ASCENT_WARNING_RATIO
+    ):
+        warning = f"路线爬升 {route.ascent_m:.0f} m，明显超过你以往的最大爬升 {features.max_ascent_m:.0f} m"
+        updates["route"] = replace(route, message=f"{route.message}\n{warning}".strip())
+
+    return {"intermediate_results": updates} if updates else {}
@@ -1,35 +1,228 @@
 """
 拍摄计划节点
 
-根据路线特点生成拍摄计划建议。
+根据路线特点生成拍摄计划建议。日出日落、黄金时段和蓝调时段由本地太阳位置算法计算
+（见 hikebutler.geo.solar），不需要外部调用；沿线能看到哪些景观点、拍摄点的太阳何时越过山脊，
+查询离线生成的可视域库（见 hikebutler.geo.viewshed）；沿线的观景台和山峰查询知识点空间索引
+（见 hikebutler.geo.poi_index）。
 """
 
-from typing import Dict, Any
-from hikebutler.state import HikeButlerState
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+import numpy as np
+from hikebutler.config.loader import load_config
+from hikebutler.geo.forecast import hike_days, hike_start_date
+from hikebutler.geo.poi_index import pois_near
+from hikebutler.geo.solar import solar_position, sun_times_many
+from hikebutler.geo.track import Track, parse_gpx, resample_track, segment_lengths
+from hikebutler.geo.viewshed import ViewshedStore, get_viewshed_store
+from hikebutler.state import HikeButlerState, PhotoPlanResult
+from hikebutler.storage.blob_store import get_blob_store
+import logging
 
+logger = logging.getLogger(__name__)
 
-def photo_plan_node(state: HikeButlerState) -> HikeButlerState:
+# 起终点相距超过该距离（米）时终点单独作为拍摄点
+SEPARATE_END_M = 1000.0
+
+
+def _load_track(route: Any) -> Optional[Track]:
+    """读取路线轨迹，没有或读取失败时返回 None。"""
+    track_ref = getattr(route, "track_ref", None)
+    if not track_ref:
+        return None
+    try:
+        track = parse_gpx(get_blob_store().get_text(track_ref))
+    except Exception as e:
+        logger.warning(f"读取路线轨迹失败: {e}")
+        return None
+    return track if len(track) else None
+
+
+def _viewpoints(route: Any, track: Optional[Track], input_data: Dict[str, Any]) -> List[Tuple[str, float, float]]:
+    """
+    拍摄点：有路线轨迹时取起点、最高点和终点，否则取路线坐标。
+
+    Returns:
+        [(名称, 纬度, 经度)]
+    """
+    if track is not None:
+        points = [("起点", 0)]
+        if np.isfinite(track.ele).any():
+            top = int(np.nanargmax(track.ele))
+            if top not in (0, len(track) - 1):
+                points.append((f"最高点（{track.ele[top]:.0f} m）", top))
+        ends = np.array([track.lat[0], track.lat[-1]]), np.array([track.lon[0], track.lon[-1]])
+        if len(track) > 1 and segment_lengths(*ends)[0] > SEPARATE_END_M:
+            points.append(("终点", len(track) - 1))
+        return [(name, float(track.lat[i]), float(track.lon[i])) for name, i in points]
+
+    lat = input_data.get("lat", getattr(route, "lat", None))
+    lon = input_data.get("lon", getattr(route, "lon", None))
+    if lat is None or lon is None:
+        return []
+    return [("起点", float(lat), float(lon))]
+
+
+def _visible_spans(store: ViewshedStore, track: Track, step_m: float) -> List[Dict[str, Any]]:
+    """
+    沿轨迹每隔 step_m 查询可视域，返回各景观点可见的里程区间。
+
+    Returns:
+        [{"name", "kind", "ranges_km": [[起, 止], ...]}]
+    """
+    distance, lat, lon, _ = resample_track(track, step_m)
+    views = []
+    for index in store.covering(lat, lon):
+        seen = store.visible(index, lat, lon)
+        if not seen.any():
+            continue
+        # 连续可见的站点合并为区间
+        edges = np.diff(np.concatenate([[0], seen.astype(np.int8), [0]]))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+        point = store.points[index]
+        views.append(
+            {
+                "name": point["name"],
+                "kind": point.get("kind", ""),
+                "ranges_km": [[round(distance[a] / 1000, 1), round(distance[b] / 1000, 1)] for a, b in zip(starts, ends)],
+            }
+        )
+    return views
+
+
+def _photo_pois(track: Optional[Track], viewpoints: List[Tuple[str, float, float]]) -> List[Dict[str, Any]]:
+    """沿线（没有轨迹时为起点周边）的观景台和山峰，空间索引不可用时返回空列表。"""
+    kinds = load_config().get("poi_index", {}).get("photo_kinds", ["viewpoint", "peak"])
+    lats, lons = (track.lat, track.lon) if track is not None else ([viewpoints[0][1]], [viewpoints[0][2]])
+    try:
+        return pois_near(lats, lons, kinds)
+    except Exception as e:
+        logger.warning(f"知识点查询失败: {e}")
+        return []
+
+
+def _poi_label(poi: Dict[str, Any]) -> str:
+    """知识点的拍摄点描述。"""
+    name = poi.get("name") or poi.get("kind", "")
+    if "km" in poi:
+        return f"{name}（{poi['km']} km 处，距路线 {poi['offset_m']} m）"
+    return f"{name}（距起点 {poi['distance_m']} m）"
+
+
+def _ridge_times(
+    store: ViewshedStore, index: int, lat: float, lon: float, sun: Dict[str, Optional[float]]
+) -> Tuple[Optional[float], Optional[float]]:
+    """
+    按景观点的天际线计算太阳升出和落入山脊的时刻（逐分钟）。
+
+    Returns:
+        (升出时刻, 落入时刻) 时间戳，太阳全天被遮挡或无日出时为 None
+    """
+    if sun["sunrise"] is None or sun["sunset"] is None:
+        return None, None
+    grid = np.arange(sun["sunrise"], sun["sunset"], 60.0)
+    elevation, azimuth = solar_position(lat, lon, grid)
+    above = elevation > store.horizon(index, azimuth)
+    if not above.any():
+        return None, None
+    return float(grid[np.argmax(above)]), float(grid[len(above) - 1 - np.argmax(above[::-1])])
+
+
+def _clock(ts: Optional[float], zone: ZoneInfo) -> Optional[str]:
+    return datetime.fromtimestamp(ts, zone).strftime("%H:%M") if ts is not None else None
+
+
+def _span(start: Optional[float], end: Optional[float], zone: ZoneInfo) -> Optional[str]:
+    if start is None or end is None:
+        return None
+    return f"{_clock(start, zone)}-{_clock(end, zone)}"
+
+
+def photo_plan_node(state: HikeButlerState) -> Dict[str, Any]:
     """
     拍摄计划节点。
 
-    根据路线特点和最佳拍摄时间，生成拍摄计划。
+    根据路线的拍摄点、沿线可见的景观点和观景点，计算每天的日出日落、黄金时段、蓝调时段和太阳越过山脊的时刻。
 
     Args:
         state: 当前状态
 
     Returns:
-        更新后的状态
+        状态增量（只包含本节点更新的键）
     """
-    # TODO: 实现拍摄计划逻辑
-    # 1. 分析路线特点（景点、最佳拍摄点）
-    # 2. 结合天气和光线条件
-    # 3. 调用 LLM 生成拍摄计划
-    # 4. 更新 state.intermediate_results
+    input_data = state.get("input_data") or {}
+    route = (state.get("intermediate_results") or {}).get("route")
+    track = _load_track(route)
+    viewpoints = _viewpoints(route, track, input_data)
+    if not viewpoints:
+        result = PhotoPlanResult(status="pending", message="缺少路线坐标，无法生成拍摄计划")
+        return {"intermediate_results": {"photo_plan": result}}
+
+    config = load_config()
+    viewshed_config = config.get("viewshed", {})
+    tz = config.get("weather", {}).get("timezone", "Asia/Shanghai")
+    zone = ZoneInfo(tz)
+    days, _ = hike_days(input_data.get("duration", ""), getattr(route, "duration_h", None))
+    start = hike_start_date(input_data.get("date"), tz)
+    combos = [(name, lat, lon, start + timedelta(days=i)) for i in range(days) for name, lat, lon in viewpoints]
+    times = sun_times_many([c[1] for c in combos], [c[2] for c in combos], [c[3] for c in combos])
+
+    store = get_viewshed_store()
+    views = []
+    if store is not None and track is not None:
+        views = _visible_spans(store, track, viewshed_config.get("station_step_m", 200))
+    pois = _photo_pois(track, viewpoints)
+    ridges = {}
+    if store is not None:
+        for name, lat, lon in viewpoints:
+            index = store.nearest(lat, lon, viewshed_config.get("max_distance_m", 300))
+            if index is not None:
+                ridges[name] = index
 
-    state["intermediate_results"]["photo_plan"] = {
-        "status": "pending",
-        "message": "拍摄计划功能待实现",
-    }
+    light, golden_hours = [], []
+    for (name, lat, lon, day), sun in zip(combos, times):
+        row = {
+            "spot": name,
+            "date": day.isoformat(),
+            "sunrise": _clock(sun["sunrise"], zone),
+            "sunset": _clock(sun["sunset"], zone),
+            "golden_morning": _span(sun["golden_morning_start"], sun["golden_morning_end"], zone),
+            "golden_evening": _span(sun["golden_evening_start"], sun["golden_evening_end"], zone),
+            "blue_morning": _span(sun["blue_morning_start"], sun["golden_morning_start"], zone),
+            "blue_evening": _span(sun["golden_evening_end"], sun["blue_evening_end"], zone),
+            "sunrise_azimuth": round(sun["sunrise_azimuth"]) if sun["sunrise_azimuth"] is not None else None,
+            "sunset_azimuth": round(sun["sunset_azimuth"]) if sun["sunset_azimuth"] is not None else None,
+        }
+        if name in ridges:
+            over, behind = _ridge_times(store, ridges[name], lat, lon, sun)
+            row["sun_over_ridge"], row["sun_behind_ridge"] = _clock(over, zone), _clock(behind, zone)
+        light.append(row)
+        if row["sunrise"] is None:
+            golden_hours.append(f"{day:%m-%d} {name}：全天无日出日落")
+            continue
+        text = (
+            f"{day:%m-%d} {name}：日出 {row['sunrise']}（方位 {row['sunrise_azimuth']}°），"
+            f"蓝调 {row['blue_morning'] or '无'}，黄金时段 {row['golden_morning'] or '无'} / {row['golden_evening'] or '无'}，"
+            f"日落 {row['sunset']}（方位 {row['sunset_azimuth']}°）"
+        )
+        if row.get("sun_over_ridge"):
+            text += f"，太阳 {row['sun_over_ridge']} 升出山脊、{row['sun_behind_ridge']} 落入山脊"
+        golden_hours.append(text)
 
-    return state
+    result = PhotoPlanResult(
+        status="done",
+        spots=[name for name, _, _ in viewpoints]
+        + [
+            f"{view['name']}（可见于 {'、'.join(f'{a}-{b} km' for a, b in view['ranges_km'])}）"
+            for view in views
+        ]
+        + [_poi_label(poi) for poi in pois],
+        golden_hours=golden_hours,
+        light=light,
+        views=views,
+        pois=pois,
+    )
 
+    return {"intermediate_results": {"photo_plan": result}}
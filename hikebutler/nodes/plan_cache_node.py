@@ -0,0 +1,61 @@
+"""
+计划缓存节点
+
+徒步准备工作流的入口：记录请求，并查询离线预热的热门路线产物（路线、拍摄计划）。
+命中时直接写入中间结果，工作流跳过对应节点；缓存的路线没有用户信息，相似的历史徒步按当前用户补查。
+"""
+
+from dataclasses import replace
+from typing import Dict, Any
+from hikebutler.nodes.route_node import similar_for_route
+from hikebutler.state import HikeButlerState
+from hikebutler.storage.plan_cache import CACHED_NODES, cacheable, get_plan_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def plan_cache_node(state: HikeButlerState) -> Dict[str, Any]:
+    """
+    计划缓存节点。
+
+    Args:
+        state: 当前状态
+
+    Returns:
+        状态增量（命中时为缓存的中间结果，否则为空）
+    """
+    cache = get_plan_cache()
+    input_data = state.get("input_data") or {}
+    if cache is None or not cacheable(input_data):
+        return {}
+
+    try:
+        cache.log_request(input_data)
+        artifacts = cache.get(input_data)
+    except Exception as e:
+        # 缓存不可用时按未命中处理
+        logger.warning(f"计划缓存读取失败: {e}")
+        return {}
+
+    if artifacts is None:
+        return {}
+    logger.info(f"命中计划缓存: {input_data.get('location')}")
+    route = artifacts.get("route")
+    if route is not None:
+        artifacts["route"] = replace(route, similar_trips=similar_for_route(route, state.get("user_id")))
+    return {"intermediate_results": artifacts}
+
+
+def plan_cache_hit(state: HikeButlerState) -> bool:
+    """
+    判断缓存产物是否已写入中间结果。
+
+    Args:
+        state: 当前状态
+
+    Returns:
+        是否命中
+    """
+    results = state.get("intermediate_results") or {}
+    return all(results.get(node) is not None for node in CACHED_NODES)
@@ -8,7 +8,7 @@ from typing import Dict, Any
 from hikebutler.state import HikeButlerState
 
 
-def post_gen_node(state: HikeButlerState) -> HikeButlerState:
+def post_gen_node(state: HikeButlerState) -> Dict[str, Any]:
     """
     帖子生成节点。
 
@@ -18,19 +18,19 @@ def post_gen_node(state: HikeButlerState) -> HikeButlerState:
         state: 当前状态
 
     Returns:
-        更新后的状态
+        状态增量（只包含本节点更新的键）
     """
     # TODO: 实现帖子生成逻辑
-    # 1. 解析 GPX 文件（使用 gpxpy）
+    # 1. 通过 blob store 读取 input_data["gpx_ref"] 并解析 GPX 文件（使用 gpxpy）
     # 2. 提取关键数据（里程、爬升、配速等）
     # 3. 结合照片和感想
-    # 4. 调用 LLM 生成帖子内容
-    # 5. 更新 state.output_data
-
-    state["output_data"] = {
-        "post": "帖子生成功能待实现",
-        "format": "markdown",
+    # 4. 调用 LLM 生成帖子内容（get_llm_for_node("post_gen")）
+    # 5. 返回 output_data 增量
+
+    return {
+        "output_data": {
+            "post": "帖子生成功能待实现",
+            "format": "markdown",
+        }
     }
 
-    return state
-
@@ -1,14 +1,49 @@
 """
 路线规划节点
 
-负责分析用户输入的徒步地点和偏好，生成路线建议。
+负责分析用户输入的徒步地点和偏好，生成路线建议：
+- 用户提供路线 GPX（input_data["route_gpx_ref"]）时直接计算路线统计；
+- 给出起点坐标且已构建步道图（见 hikebutler.geo.trail_graph）时，按期望时长和难度在本地计算环线
+  （给出终点坐标时为点到点路线），最佳路线导出为 GPX 供天气和拍摄计划节点使用；
+- 计算出的候选路线摘要经 LLM 调度器交给 LLM 叙述（models.yaml 的 llm_routing.route 档位），
+  LLM 只基于摘要生成文字，叙述失败时只返回结构化结果；
+- 相似的历史徒步通过轨迹指纹索引检索（见 database/trip_index.py），只检索当前用户自己的记录；
+- 沿线（没有轨迹时为起点周边）的水源、避难所和下撤点查询知识点空间索引（见 hikebutler.geo.poi_index）。
 """
 
-from typing import Dict, Any
-from hikebutler.state import HikeButlerState
+import json
+from typing import Any, Dict, List, Optional
+import numpy as np
+from langchain_core.messages import HumanMessage, SystemMessage
+from hikebutler.config.loader import load_config
+from hikebutler.database.trip_index import get_trip_index
+from hikebutler.geo.forecast import hike_days
+from hikebutler.geo.poi_index import pois_near
+from hikebutler.geo.track import Track, compute_stats, parse_gpx
+from hikebutler.geo.trail_graph import RoutePlan, get_trail_graph
+from hikebutler.models.batch_scheduler import get_batch_scheduler
+from hikebutler.state import HikeButlerState, RouteResult
+from hikebutler.storage.blob_store import get_blob_store
+import logging
 
+logger = logging.getLogger(__name__)
 
-def route_node(state: HikeButlerState) -> HikeButlerState:
+# 难度偏好到允许的最高 SAC 等级和爬升上限（config.yaml 的 trail_graph.difficulty 可覆盖）
+DEFAULT_DIFFICULTY = {
+    "简单": {"max_sac": 1, "max_ascent_m": 500},
+    "中等": {"max_sac": 2, "max_ascent_m": 1200},
+    "困难": {"max_sac": 4, "max_ascent_m": 2500},
+    "极限": {"max_sac": 6},
+}
+
+ROUTE_SYSTEM_PROMPT = (
+    "你是徒步路线规划助手。下面是根据步道图计算出的候选路线（第一条为推荐路线）和沿线的补给、避险点。"
+    "请只依据给出的数据，用简洁的中文说明推荐路线的走向、里程、爬升、耗时和难度，并简要对比其他候选路线；"
+    "不要编造数据中没有的地名或数值。"
+)
+
+
+def route_node(state: HikeButlerState) -> Dict[str, Any]:
     """
     路线规划节点。
 
@@ -19,18 +54,223 @@ def route_node(state: HikeButlerState) -> HikeButlerState:
         state: 当前状态
 
     Returns:
-        更新后的状态
+        状态增量（只包含本节点更新的键）
+    """
+    input_data = state.get("input_data") or {}
+    user_id = state.get("user_id")
+    top_k = load_config().get("trip_index", {}).get("top_k", 5)
+    gpx_ref = input_data.get("route_gpx_ref")
+    if gpx_ref:
+        try:
+            track = parse_gpx(get_blob_store().get_text(gpx_ref))
+        except Exception as e:
+            logger.error(f"路线 GPX 解析失败: {e}")
+            result = RouteResult(status="error", message=f"路线 GPX 解析失败: {e}")
+            return {"intermediate_results": {"route": result}}
+        result = _track_result(track, gpx_ref, top_k, user_id)
+        if result is not None:
+            return {"intermediate_results": {"route": result}}
+
+    lat, lon = input_data.get("lat"), input_data.get("lon")
+    if lat is None or lon is None:
+        result = RouteResult(status="pending", message="缺少起点坐标，无法计算路线，请提供路线 GPX 或更具体的地点")
+        return {"intermediate_results": {"route": result}}
+
+    lat, lon = float(lat), float(lon)
+    result = _plan_route(input_data, lat, lon, top_k, user_id)
+    if result is not None:
+        return {"intermediate_results": {"route": result}}
+
+    # 步道图不可用或起点附近没有步道：只给出起点周边的知识点和相似的历史徒步
+    result = RouteResult(
+        status="pending",
+        message="起点附近没有可计算的步道路线，请提供路线 GPX",
+        pois=_route_pois([lat], [lon]),
+        similar_trips=_similar(
+            user_id,
+            lambda index: index.similar_to_plan(
+                lat,
+                lon,
+                distance_km=input_data.get("distance_km"),
+                ascent_m=input_data.get("ascent_m"),
+                k=top_k,
+                user_id=user_id,
+            ),
+        ),
+    )
+    return {"intermediate_results": {"route": result}}
+
+
+def _track_result(
+    track: Track, track_ref: str, top_k: int, user_id: Optional[str], **fields: Any
+) -> Optional[RouteResult]:
+    """由路线轨迹生成结果，轨迹为空时返回 None。"""
+    stats = compute_stats(track)
+    if stats is None:
+        return None
+    ele = track.ele[np.isfinite(track.ele)]
+    fields.setdefault("duration_h", round(stats.duration_s / 3600, 1) if stats.duration_s else None)
+    return RouteResult(
+        status="done",
+        distance_km=round(stats.distance_m / 1000, 2),
+        ascent_m=stats.ascent_m,
+        lat=float(track.lat[0]),
+        lon=float(track.lon[0]),
+        min_elevation_m=float(ele.min()) if len(ele) else None,
+        max_elevation_m=float(ele.max()) if len(ele) else None,
+        track_ref=track_ref,
+        similar_trips=_similar(user_id, lambda index: index.match_track(track, k=top_k, user_id=user_id)),
+        pois=_route_pois(track.lat, track.lon),
+        **fields,
+    )
+
+
+def _plan_route(
+    input_data: Dict[str, Any], lat: float, lon: float, top_k: int, user_id: Optional[str]
+) -> Optional[RouteResult]:
+    """
+    在步道图上计算路线。
+
+    Args:
+        input_data: 用户输入（duration、difficulty，可选 end_lat、end_lon、location）
+        lat: 起点纬度
+        lon: 起点经度
+        top_k: 相似历史徒步条数
+        user_id: 用户 ID（相似徒步只检索该用户的记录）
+
+    Returns:
+        RouteResult；步道图未构建或起点附近没有步道时返回 None
+    """
+    graph = get_trail_graph()
+    if graph is None:
+        return None
+    config = load_config().get("trail_graph", {})
+    source, offset_m = graph.nearest(lat, lon)
+    if offset_m > config.get("max_snap_m", 1000):
+        logger.info(f"起点 {offset_m:.0f} 米内没有步道，跳过路线计算")
+        return None
+
+    difficulty = {**DEFAULT_DIFFICULTY, **config.get("difficulty", {})}.get(
+        input_data.get("difficulty", ""), DEFAULT_DIFFICULTY["中等"]
+    )
+    max_sac = difficulty.get("max_sac", 6)
+    days, hours = hike_days(input_data.get("duration", ""))
+    target_h = days * (hours if hours is not None else config.get("hours_per_day", 7.0))
+    count = config.get("candidates", 3)
+
+    end_lat, end_lon = input_data.get("end_lat"), input_data.get("end_lon")
+    if end_lat is not None and end_lon is not None:
+        target, _ = graph.nearest(float(end_lat), float(end_lon))
+        plans = graph.point_to_point(source, target, max_sac=max_sac, count=count)
+    else:
+        plans = graph.loops(
+            source, target_h * 3600, max_sac=max_sac, count=count, max_ascent_m=difficulty.get("max_ascent_m")
+        )
+    if not plans:
+        return RouteResult(status="error", message="步道图中没有符合时长和难度的路线")
+
+    best: RoutePlan = plans[0]
+    name = input_data.get("location") or ""
+    track_ref = get_blob_store().put(best.to_gpx(name))
+    track = Track(lat=best.lat, lon=best.lon, ele=best.ele.astype(np.float64), time=np.full(len(best.lat), np.nan))
+    logger.info(f"路线计算完成: {best.summary()}")
+    result = _track_result(
+        track,
+        track_ref,
+        top_k,
+        user_id,
+        name=name or None,
+        duration_h=round(best.duration_s / 3600, 1),
+        highlights=best.names[:6],
+        candidates=[plan.summary() for plan in plans],
+    )
+    if result is not None:
+        result.message = _narrate(result)
+    return result
+
+
+def _narrate(route: RouteResult) -> str:
     """
-    # TODO: 实现路线规划逻辑
-    # 1. 从 state 中提取输入数据
-    # 2. 查询 RAG 知识库获取相似路线
-    # 3. 调用 LLM 生成路线建议
-    # 4. 更新 state.intermediate_results
+    让 LLM 基于候选路线摘要和沿线知识点叙述路线。
+
+    路线结果会写入计划缓存供所有用户共用，提示中只放与用户无关的数据。
+
+    Args:
+        route: 步道图计算出的路线
 
-    state["intermediate_results"]["route"] = {
-        "status": "pending",
-        "message": "路线规划功能待实现",
+    Returns:
+        路线说明；调用失败或超时时为空字符串（结构化字段已完整，融合节点仍可使用）
+    """
+    data = {
+        "location": route.name,
+        "candidates": route.candidates,
+        "pois": [{k: poi[k] for k in ("name", "kind", "km") if k in poi} for poi in route.pois],
     }
+    timeout = load_config().get("trail_graph", {}).get("narration_timeout", 20)
+    try:
+        response = get_batch_scheduler().invoke(
+            [
+                SystemMessage(content=ROUTE_SYSTEM_PROMPT),
+                HumanMessage(content=json.dumps(data, ensure_ascii=False, separators=(",", ":"))),
+            ],
+            node="route",
+            timeout=timeout,
+        )
+    except Exception as e:
+        logger.warning(f"路线叙述失败: {e}")
+        return ""
+    return str(response.content).strip()
+
+
+def similar_for_route(route: RouteResult, user_id: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    为共享的路线结果（计划缓存中的路线没有用户信息）检索该用户相似的历史徒步。
+
+    Args:
+        route: 路线结果
+        user_id: 用户 ID
+
+    Returns:
+        徒步记录列表；没有用户、路线没有位置或索引不可用时为空列表
+    """
+    top_k = load_config().get("trip_index", {}).get("top_k", 5)
+    if route.track_ref:
+        try:
+            track = parse_gpx(get_blob_store().get_text(route.track_ref))
+        except Exception as e:
+            logger.warning(f"读取路线轨迹失败: {e}")
+        else:
+            return _similar(user_id, lambda index: index.match_track(track, k=top_k, user_id=user_id))
+    if route.lat is None or route.lon is None:
+        return []
+    return _similar(
+        user_id,
+        lambda index: index.similar_to_plan(
+            route.lat, route.lon, distance_km=route.distance_km, ascent_m=route.ascent_m, k=top_k, user_id=user_id
+        ),
+    )
+
+
+def _similar(user_id: Optional[str], query) -> List[Dict[str, Any]]:
+    """
+    检索相似的历史徒步，没有用户或索引不可用时返回空列表。
+
+    结果会进入状态、流式输出和计划缓存，不能包含其他用户的记录，query 必须按 user_id 过滤。
+    """
+    if not user_id:
+        return []
+    try:
+        return query(get_trip_index())
+    except Exception as e:
+        logger.warning(f"相似徒步检索失败: {e}")
+        return []
 
-    return state
 
+def _route_pois(lats, lons) -> List[Dict[str, Any]]:
+    """沿线或起点周边的补给、避险和下撤点，空间索引不可用时返回空列表。"""
+    kinds = load_config().get("poi_index", {}).get("route_kinds", ["water", "shelter", "bailout", "campsite"])
+    try:
+        return pois_near(lats, lons, kinds)
+    except Exception as e:
+        logger.warning(f"知识点查询失败: {e}")
+        return []
@@ -1,35 +1,133 @@
 """
 天气查询节点
 
-通过 MCP 工具调用 Windy API 获取天气预报。
+通过 MCP 工具调用 Windy API 获取天气预报，只保留徒步时段和路线海拔范围内的天气，
+输出紧凑摘要和危险指标（见 hikebutler.geo.forecast），原始预报只保存 blob 句柄。
+路线有 GPX 轨迹时沿线分段查询（见 hikebutler.geo.route_weather）。
 """
 
-from typing import Dict, Any
-from hikebutler.state import HikeButlerState
+import json
+from typing import Any, Dict, List, Tuple
+from hikebutler.config.loader import load_config
+from hikebutler.geo.forecast import analyze_forecast, hike_days, hike_start_date, hike_windows, parse_windy
+from hikebutler.geo.route_weather import analyze_route, fetch_forecasts, grid_cells, interpolate_route, sample_route
+from hikebutler.geo.track import parse_gpx
+from hikebutler.state import HikeButlerState, WeatherResult
+from hikebutler.storage.blob_store import get_blob_store
+from hikebutler.tools.mcp_tools import mcp_windy_fetch
+import logging
 
+logger = logging.getLogger(__name__)
 
-def weather_node(state: HikeButlerState) -> HikeButlerState:
+
+def weather_node(state: HikeButlerState) -> Dict[str, Any]:
     """
     天气查询节点。
 
-    根据用户输入的徒步地点和时间，调用 MCP 工具获取天气预报。
+    根据路线坐标和徒步日期、时长，调用 MCP 工具获取 7 天预报，切出徒步时段并按路线海拔分带
+    计算风寒、雷暴、降水和冻结高度等危险指标。
 
     Args:
         state: 当前状态
 
     Returns:
-        更新后的状态
+        状态增量（只包含本节点更新的键）
     """
-    # TODO: 实现天气查询逻辑
-    # 1. 从 state 中提取地点和时间信息
-    # 2. 调用 MCP 工具 mcp_windy_fetch
-    # 3. 解析天气数据
-    # 4. 更新 state.intermediate_results
+    input_data = state.get("input_data") or {}
+    route = (state.get("intermediate_results") or {}).get("route")
+    config = load_config().get("weather", {})
+    tz = config.get("timezone", "Asia/Shanghai")
+    days, hours = hike_days(input_data.get("duration", ""), getattr(route, "duration_h", None))
+    start_hour = config.get("start_hour", 8)
+    end_hour = start_hour + hours if hours is not None else config.get("end_hour", 17)
+    windows = hike_windows(hike_start_date(input_data.get("date"), tz), days, start_hour, end_hour, tz=tz)
+
+    track_ref = getattr(route, "track_ref", None)
+    if track_ref:
+        try:
+            result = _route_weather(track_ref, windows, config)
+        except Exception as e:
+            logger.error(f"沿线天气查询失败: {e}")
+            result = WeatherResult(status="error", message=f"沿线天气查询失败: {e}")
+        return {"intermediate_results": {"weather": result}}
+
+    lat = input_data.get("lat", getattr(route, "lat", None))
+    lon = input_data.get("lon", getattr(route, "lon", None))
+    if lat is None or lon is None:
+        result = WeatherResult(status="pending", message="缺少路线坐标，无法查询天气")
+        return {"intermediate_results": {"weather": result}}
+
+    try:
+        payload = mcp_windy_fetch(float(lat), float(lon), days=config.get("forecast_days", 7))
+    except Exception as e:
+        logger.error(f"天气查询失败: {e}")
+        result = WeatherResult(status="error", message=f"天气查询失败: {e}")
+        return {"intermediate_results": {"weather": result}}
+    if payload.get("status") == "pending":
+        result = WeatherResult(status="pending", message=payload.get("message", ""))
+        return {"intermediate_results": {"weather": result}}
+
+    analysis = analyze_forecast(
+        parse_windy(payload),
+        windows,
+        min_elevation=getattr(route, "min_elevation_m", None),
+        max_elevation=getattr(route, "max_elevation_m", None),
+        bands=config.get("elevation_bands", 3),
+        tz=tz,
+    )
+    forecast_ref = get_blob_store().put(json.dumps(payload, ensure_ascii=False))
+    if analysis is None:
+        result = WeatherResult(status="error", message="徒步日期超出预报范围", forecast_ref=forecast_ref)
+    else:
+        result = WeatherResult(status="done", forecast_ref=forecast_ref, **analysis)
+        logger.info(f"天气查询完成: {result.summary}")
+
+    return {"intermediate_results": {"weather": result}}
+
 
-    state["intermediate_results"]["weather"] = {
-        "status": "pending",
-        "message": "天气查询功能待实现",
-    }
+def _route_weather(track_ref: str, windows: List[Tuple[float, float]], config: Dict[str, Any]) -> WeatherResult:
+    """
+    沿路线分段查询天气：选代表点、按预报网格去重后并发查询，再插值回轨迹汇总。
+
+    Args:
+        track_ref: 路线 GPX 的 blob 句柄
+        windows: 徒步时段
+        config: weather 配置
+
+    Returns:
+        天气结果
+    """
+    sampling = config.get("sampling", {})
+    tz = config.get("timezone", "Asia/Shanghai")
+    days = config.get("forecast_days", 7)
+    track = parse_gpx(get_blob_store().get_text(track_ref))
+    if not len(track):
+        return WeatherResult(status="error", message="路线轨迹为空")
 
-    return state
+    samples = sample_route(
+        track,
+        distance_step_m=sampling.get("distance_step_m", 5000),
+        elevation_step_m=sampling.get("elevation_step_m", 300),
+        max_points=sampling.get("max_points", 12),
+    )
+    centers, sample_cells = grid_cells(
+        track.lat[samples], track.lon[samples], resolution=sampling.get("grid_resolution", 0.1)
+    )
+    forecasts = fetch_forecasts(
+        centers,
+        lambda lat, lon: mcp_windy_fetch(lat, lon, days=days),
+        max_workers=sampling.get("max_workers", 4),
+    )
+    logger.info(f"沿线天气: 代表点 {len(samples)}，预报网格 {len(centers)}，成功 {sum(f is not None for f in forecasts)}")
 
+    route_weather = interpolate_route(
+        track, samples, sample_cells, forecasts, station_step_m=sampling.get("station_step_m", 250)
+    )
+    if route_weather is None:
+        return WeatherResult(status="pending", message="沿线天气预报暂不可用")
+    analysis = analyze_route(route_weather, windows, tz=tz)
+    if analysis is None:
+        return WeatherResult(status="error", message="徒步日期超出预报范围")
+    result = WeatherResult(status="done", **analysis)
+    logger.info(f"沿线天气查询完成: {result.summary}")
+    return result
@@ -8,7 +8,7 @@ from typing import Dict, Any
 from hikebutler.state import HikeButlerState
 
 
-def xhs_node(state: HikeButlerState) -> HikeButlerState:
+def xhs_node(state: HikeButlerState) -> Dict[str, Any]:
     """
     小红书发布节点。
 
@@ -18,18 +18,20 @@ def xhs_node(state: HikeButlerState) -> HikeButlerState:
         state: 当前状态
 
     Returns:
-        更新后的状态
+        状态增量（只包含本节点更新的键）
     """
     # TODO: 实现小红书发布逻辑
     # 1. 从 state.output_data 获取帖子内容
     # 2. 调用 MCP 工具 mcp_xhs_post
     # 3. 处理发布结果
-    # 4. 更新 state.output_data
-
-    state["output_data"]["xhs_status"] = {
-        "status": "pending",
-        "message": "小红书发布功能待实现",
+    # 4. 返回 output_data 增量
+
+    return {
+        "output_data": {
+            "xhs_status": {
+                "status": "pending",
+                "message": "小红书发布功能待实现",
+            }
+        }
     }
 
-    return state
-
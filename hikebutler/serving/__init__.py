@@ -0,0 +1 @@
+"""服务部署模块"""
@@ -0,0 +1,112 @@
+"""
+共享缓存适配器
+
+把 embedding 和 LLM 调用接到共享缓存上：多进程部署时同一段文本、同一个提示词在任一进程
+计算过一次后，其他进程直接复用结果。
+"""
+
+from typing import Any, List, Optional, Sequence
+from langchain_core.caches import BaseCache
+from langchain_core.embeddings import Embeddings
+from hikebutler.serving.shared_cache import cache_key, get_shared_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CachedEmbeddings(Embeddings):
+    """带共享缓存的 Embedding 包装，只对未命中的文本调用底层模型。"""
+
+    def __init__(self, embedding: Embeddings, model_name: str, ttl: Optional[float] = None):
+        """
+        初始化包装。
+
+        Args:
+            embedding: 底层 Embedding 实例
+            model_name: 模型名称（参与缓存键，换模型后不会命中旧向量）
+            ttl: 缓存有效期（秒），None 表示不过期
+        """
+        self.embedding = embedding
+        self.model_name = model_name
+        self.ttl = ttl
+
+    def _key(self, text: str) -> str:
+        return cache_key("embedding", self.model_name, text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        计算文档向量。
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            向量列表，顺序与输入一致
+        """
+        cache = get_shared_cache()
+        vectors: List[Optional[List[float]]] = [cache.get(self._key(text)) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = self.embedding.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+                cache.set(self._key(texts[i]), vector, self.ttl)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        计算查询向量。
+
+        Args:
+            text: 查询文本
+
+        Returns:
+            向量
+        """
+        cache = get_shared_cache()
+        key = self._key(text)
+        vector = cache.get(key)
+        if vector is None:
+            vector = self.embedding.embed_query(text)
+            cache.set(key, vector, self.ttl)
+        return vector
+
+
+class SharedLLMCache(BaseCache):
+    """LangChain LLM 缓存，按 (提示词, 模型参数) 存入共享缓存。"""
+
+    def __init__(self, ttl: Optional[float] = None):
+        """
+        初始化缓存。
+
+        Args:
+            ttl: 缓存有效期（秒），None 表示不过期
+        """
+        self.ttl = ttl
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Any]]:
+        """读取缓存的生成结果。"""
+        return get_shared_cache().get(cache_key("llm", llm_string, prompt))
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Any]):
+        """写入生成结果。"""
+        get_shared_cache().set(cache_key("llm", llm_string, prompt), list(return_val), self.ttl)
+
+    def clear(self, **kwargs: Any):
+        """共享缓存按有效期和容量淘汰，不支持单独清空 LLM 条目。"""
+        logger.warning("共享缓存不支持清空 LLM 条目，将按有效期淘汰")
+
+
+def install_llm_cache(cache_config: dict):
+    """
+    按配置为当前进程启用 LLM 共享缓存。
+
+    Args:
+        cache_config: server.cache 配置
+    """
+    if not cache_config.get("llm", False):
+        return
+    from langchain_core.globals import set_llm_cache
+
+    set_llm_cache(SharedLLMCache(cache_config.get("llm_ttl")))
+    logger.info("已启用 LLM 共享缓存")
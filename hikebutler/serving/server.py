@@ -0,0 +1,299 @@
+"""
+多进程服务
+
+单个 Python 进程受 GIL 限制，LangGraph 节点里的 CPU 工作（GPX 解析、向量计算、序列化）
+会让所有用户排在同一把锁后面。多进程模式下主进程只做管理：
+
+- 启动共享缓存服务（Unix 域套接字），工作进程通过环境变量获得地址；
+- 启动 N 个工作进程，每个进程各自以 SO_REUSEPORT 绑定同一端口，由内核分发连接；
+- 工作进程异常退出时自动重启；
+- SIGTERM/SIGINT：通知所有工作进程停止接受新连接，进行中的请求在 drain_timeout 内完成后退出；
+- SIGHUP：滚动重启，先启动新进程并等待其就绪，再让旧进程排空退出，重启期间端口始终有进程在监听。
+"""
+
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from hikebutler.config.loader import load_config
+from hikebutler.serving.shared_cache import AUTHKEY_ENV, SOCKET_ENV, CacheServer
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 工作进程使用 spawn 启动，不继承主进程的线程和连接
+_mp = multiprocessing.get_context("spawn")
+
+
+def bind_socket(host: str, port: int, reuse_port: bool = True) -> socket.socket:
+    """
+    创建监听套接字。
+
+    Args:
+        host: 地址
+        port: 端口
+        reuse_port: 是否设置 SO_REUSEPORT（多个进程绑定同一端口）
+
+    Returns:
+        已绑定的套接字
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    return sock
+
+
+def build_app(bench: bool = False, ui: bool = True):
+    """
+    创建工作进程的 ASGI 应用：HTTP API 挂载在 /api，Gradio UI 挂载在根路径，另有健康检查接口。
+
+    Args:
+        bench: 是否提供压测接口 POST /bench/track（请求体为 GPX，返回轨迹统计）
+        ui: 是否挂载 Gradio UI（为 False 时不导入 gradio）
+
+    Returns:
+        FastAPI 应用
+    """
+    from fastapi import FastAPI, Request
+    from starlette.concurrency import run_in_threadpool
+    from hikebutler.api.app import create_api
+
+    app = FastAPI()
+    app.mount("/api", create_api())
+
+    @app.get("/healthz")
+    def healthz() -> Dict[str, Any]:
+        return {"status": "ok", "pid": os.getpid()}
+
+    if bench:
+        from hikebutler.geo.track import compute_stats, parse_gpx
+
+        def track_stats(gpx_text: str) -> Dict[str, Any]:
+            stats = compute_stats(parse_gpx(gpx_text))
+            return {"pid": os.getpid(), "distance_m": stats.distance_m if stats else 0.0}
+
+        @app.post("/bench/track")
+        async def bench_track(request: Request) -> Dict[str, Any]:
+            body = await request.body()
+            return await run_in_threadpool(track_stats, body.decode("utf-8"))
+
+    if not ui:
+        return app
+
+    import gradio as gr
+    from hikebutler.ui.gradio_app import configure_queue, create_ui
+
+    return gr.mount_gradio_app(app, configure_queue(create_ui()), path="/")
+
+
+def run_worker(
+    host: str,
+    port: int,
+    drain_timeout: int,
+    ready: Any = None,
+    bench: bool = False,
+    ui: bool = True,
+):
+    """
+    工作进程入口：绑定端口、启动 uvicorn，收到 SIGTERM 后排空进行中的请求再退出。
+
+    Args:
+        host: 地址
+        port: 端口
+        drain_timeout: 排空请求的最长时间（秒）
+        ready: 启动完成后置位的 multiprocessing.Event
+        bench: 是否提供压测接口
+        ui: 是否挂载 Gradio UI
+    """
+    import uvicorn
+    from hikebutler.jobs.worker import get_worker_pool
+    from hikebutler.memory.session_cache import get_memory_cache
+    from hikebutler.serving.adapters import install_llm_cache
+
+    install_llm_cache(load_config().get("server", {}).get("cache", {}))
+    sock = bind_socket(host, port)
+    server = uvicorn.Server(
+        uvicorn.Config(
+            build_app(bench, ui),
+            timeout_graceful_shutdown=drain_timeout,
+            log_level="warning",
+        )
+    )
+
+    def notify_ready():
+        while not server.started and not server.should_exit:
+            time.sleep(0.05)
+        if server.started and ready is not None:
+            ready.set()
+
+    threading.Thread(target=notify_ready, daemon=True).start()
+    pool = get_worker_pool()
+    pool.start()
+    try:
+        server.run(sockets=[sock])
+    finally:
+        # 已接受的复盘任务留在持久队列中，由其他进程继续执行
+        pool.stop(timeout=drain_timeout)
+        get_memory_cache().writer.flush(timeout=drain_timeout)
+        sock.close()
+        logger.info(f"工作进程已退出: pid={os.getpid()}")
+
+
+class Supervisor:
+    """管理共享缓存服务和工作进程。"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 7860,
+        workers: int = 2,
+        drain_timeout: int = 30,
+        cache_socket: str = "./data/cache.sock",
+        cache_max_items: int = 10000,
+        bench: bool = False,
+        ui: bool = True,
+    ):
+        """
+        初始化。
+
+        Args:
+            host: 地址
+            port: 端口
+            workers: 工作进程数
+            drain_timeout: 排空请求的最长时间（秒）
+            cache_socket: 共享缓存的 Unix 域套接字路径
+            cache_max_items: 共享缓存最大条目数
+            bench: 工作进程是否提供压测接口
+            ui: 工作进程是否挂载 Gradio UI（为 False 时只提供 HTTP API）
+        """
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self.bench = bench
+        self.ui = ui
+        Path(cache_socket).parent.mkdir(parents=True, exist_ok=True)
+        self.cache_server = CacheServer(cache_socket, os.urandom(16), cache_max_items)
+        self._processes: List[multiprocessing.Process] = []
+        self._stopping = threading.Event()
+        self._reload = threading.Event()
+
+    @classmethod
+    def from_config(cls, **overrides: Any) -> "Supervisor":
+        """
+        按 server 配置创建。
+
+        Args:
+            overrides: 覆盖配置的参数（值为 None 的忽略）
+
+        Returns:
+            Supervisor 实例
+        """
+        server_config = load_config().get("server", {})
+        cache_config = server_config.get("cache", {})
+        kwargs = {
+            "host": server_config.get("host", "127.0.0.1"),
+            "port": server_config.get("port", 7860),
+            "workers": server_config.get("workers", 1),
+            "drain_timeout": server_config.get("drain_timeout", 30),
+            "cache_socket": cache_config.get("socket", "./data/cache.sock"),
+            "cache_max_items": cache_config.get("max_items", 10000),
+        }
+        kwargs.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**kwargs)
+
+    def _spawn(self) -> multiprocessing.Process:
+        ready = _mp.Event()
+        process = _mp.Process(
+            target=run_worker,
+            args=(self.host, self.port, self.drain_timeout, ready, self.bench, self.ui),
+            name="hikebutler-worker",
+        )
+        process.ready = ready
+        process.start()
+        logger.info(f"工作进程已启动: pid={process.pid}")
+        return process
+
+    def _terminate(self, process: multiprocessing.Process):
+        """让工作进程排空后退出，超时则强制结束。"""
+        if process.is_alive():
+            process.terminate()
+        process.join(self.drain_timeout + 5)
+        if process.is_alive():
+            logger.warning(f"工作进程排空超时，强制结束: pid={process.pid}")
+            process.kill()
+            process.join()
+
+    def start(self, wait_ready: Optional[float] = 60.0) -> bool:
+        """
+        启动共享缓存服务和全部工作进程。
+
+        Args:
+            wait_ready: 等待工作进程就绪的最长时间（秒），None 表示不等待
+
+        Returns:
+            全部工作进程是否已就绪
+        """
+        self.cache_server.start()
+        os.environ[SOCKET_ENV] = self.cache_server.path
+        os.environ[AUTHKEY_ENV] = self.cache_server.authkey.hex()
+        self._processes = [self._spawn() for _ in range(self.workers)]
+        if wait_ready is None:
+            return True
+        deadline = time.monotonic() + wait_ready
+        return all(p.ready.wait(max(0.0, deadline - time.monotonic())) for p in self._processes)
+
+    def rolling_restart(self):
+        """逐个替换工作进程：新进程就绪后再排空旧进程。"""
+        for i, old in enumerate(list(self._processes)):
+            new = self._spawn()
+            if not new.ready.wait(60):
+                logger.error("新工作进程未能就绪，停止滚动重启")
+                self._terminate(new)
+                return
+            self._processes[i] = new
+            self._terminate(old)
+        logger.info("滚动重启完成")
+
+    def stop(self):
+        """排空并停止全部工作进程，关闭共享缓存服务。"""
+        self._stopping.set()
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            self._terminate(process)
+        self._processes = []
+        self.cache_server.stop()
+        logger.info("服务已停止")
+
+    def serve_forever(self, poll_interval: float = 1.0):
+        """
+        启动并守护工作进程，直到收到 SIGTERM/SIGINT；SIGHUP 触发滚动重启。
+
+        Args:
+            poll_interval: 检查工作进程存活的间隔（秒）
+        """
+        signal.signal(signal.SIGTERM, lambda *_: self._stopping.set())
+        signal.signal(signal.SIGINT, lambda *_: self._stopping.set())
+        signal.signal(signal.SIGHUP, lambda *_: self._reload.set())
+        self.start(wait_ready=None)
+        logger.info(f"服务已启动: http://{self.host}:{self.port}，工作进程数 {self.workers}")
+        try:
+            while not self._stopping.wait(poll_interval):
+                if self._reload.is_set():
+                    self._reload.clear()
+                    self.rolling_restart()
+                for i, process in enumerate(self._processes):
+                    if not process.is_alive():
+                        logger.warning(f"工作进程异常退出: pid={process.pid}, exitcode={process.exitcode}")
+                        self._processes[i] = self._spawn()
+        finally:
+            self.stop()
@@ -0,0 +1,255 @@
+"""
+跨进程共享缓存
+
+多进程部署时，embedding、LLM 响应、天气预报等缓存如果各进程各存一份，命中率会随进程数下降。
+主进程运行一个 CacheServer（Unix 域套接字），各工作进程通过 SocketCache 读写同一份缓存；
+单进程运行时使用进程内的 LocalCache，接口相同。
+
+- 值以 pickle 编码传输（multiprocessing.connection），只在本机进程间使用，连接需要 authkey；
+- 缓存服务不可用时客户端按未命中处理并在下次调用时重连，不影响请求。
+"""
+
+import hashlib
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, Optional, Tuple
+from hikebutler.config.loader import load_config
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 工作进程通过环境变量获得缓存服务地址和认证密钥
+SOCKET_ENV = "HIKEBUTLER_CACHE_SOCKET"
+AUTHKEY_ENV = "HIKEBUTLER_CACHE_AUTHKEY"
+
+
+def cache_key(namespace: str, *parts: Any) -> str:
+    """
+    生成缓存键。
+
+    Args:
+        namespace: 命名空间（embedding、llm、weather 等）
+        parts: 参与计算的值
+
+    Returns:
+        "<namespace>:<sha1>" 形式的键
+    """
+    digest = hashlib.sha1("\x1f".join(map(str, parts)).encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class LocalCache:
+    """进程内 LRU 缓存，条目可以设置有效期。"""
+
+    def __init__(self, max_items: int = 10000):
+        """
+        初始化缓存。
+
+        Args:
+            max_items: 最大条目数
+        """
+        self.max_items = max_items
+        self._items: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        读取缓存。
+
+        Args:
+            key: 键
+
+        Returns:
+            值，不存在或已过期时为 None
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or (item[0] is not None and item[0] < time.monotonic()):
+                if item is not None:
+                    del self._items[key]
+                self._stats["misses"] += 1
+                return None
+            self._items.move_to_end(key)
+            self._stats["hits"] += 1
+            return item[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        写入缓存。
+
+        Args:
+            key: 键
+            value: 值
+            ttl: 有效期（秒），None 表示不过期
+        """
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._items[key] = (expires, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """命中次数、未命中次数和当前条目数。"""
+        with self._lock:
+            return {**self._stats, "items": len(self._items)}
+
+
+class CacheServer:
+    """在主进程中运行的共享缓存服务，每个客户端连接一个处理线程。"""
+
+    def __init__(self, path: str, authkey: bytes, max_items: int = 10000):
+        """
+        初始化服务。
+
+        Args:
+            path: Unix 域套接字路径
+            authkey: 连接认证密钥
+            max_items: 最大条目数
+        """
+        self.path = path
+        self.authkey = authkey
+        self.cache = LocalCache(max_items)
+        self._listener: Optional[Listener] = None
+        self._thread: Optional[threading.Thread] = None
+        self._connections: set = set()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """开始监听。"""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._listener = Listener(self.path, family="AF_UNIX", authkey=self.authkey)
+        self._thread = threading.Thread(target=self._accept, name="cache-server", daemon=True)
+        self._thread.start()
+        logger.info(f"共享缓存服务已启动: {self.path}")
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except Exception:
+                # 监听套接字关闭或认证失败
+                if self._listener is None:
+                    return
+                continue
+            with self._lock:
+                self._connections.add(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: Connection):
+        try:
+            self._handle(conn)
+        except (EOFError, OSError):
+            # 客户端断开或服务停止
+            pass
+        finally:
+            with self._lock:
+                self._connections.discard(conn)
+            conn.close()
+
+    def _handle(self, conn: Connection):
+        while True:
+            request = conn.recv()
+            op = request[0]
+            if op == "get":
+                conn.send(self.cache.get(request[1]))
+            elif op == "set":
+                self.cache.set(request[1], request[2], request[3])
+                conn.send(True)
+            elif op == "stats":
+                conn.send(self.cache.stats())
+            else:
+                conn.send(None)
+
+    def stop(self):
+        """停止监听、断开所有客户端并删除套接字文件。"""
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.close()
+        with self._lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            # 只关闭读写方向，处理线程收到 EOF 后自行关闭连接
+            try:
+                with socket.fromfd(conn.fileno(), socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class SocketCache:
+    """共享缓存客户端，每个线程一条连接。"""
+
+    def __init__(self, path: str, authkey: bytes, timeout: float = 0.5):
+        """
+        初始化客户端。
+
+        Args:
+            path: 缓存服务的 Unix 域套接字路径
+            authkey: 连接认证密钥
+            timeout: 等待响应的最长时间（秒）
+        """
+        self.path = path
+        self.authkey = authkey
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _call(self, *request: Any) -> Any:
+        conn = getattr(self._local, "conn", None)
+        try:
+            if conn is None:
+                conn = self._local.conn = Client(self.path, family="AF_UNIX", authkey=self.authkey)
+            conn.send(request)
+            if not conn.poll(self.timeout):
+                raise TimeoutError("共享缓存响应超时")
+            return conn.recv()
+        except Exception as e:
+            # 连接状态未知，丢弃后下次重连
+            if conn is not None:
+                conn.close()
+            self._local.conn = None
+            logger.debug(f"共享缓存不可用: {e}")
+            return None
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存，服务不可用时返回 None。"""
+        return self._call("get", key)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """写入缓存，服务不可用时忽略。"""
+        self._call("set", key, value, ttl)
+
+    def stats(self) -> Dict[str, int]:
+        """缓存服务的统计。"""
+        return self._call("stats") or {}
+
+
+_shared_cache: Any = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache():
+    """
+    获取共享缓存：设置了缓存服务地址（多进程部署）时使用 SocketCache，否则使用进程内缓存。
+
+    Returns:
+        SocketCache 或 LocalCache 实例
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            path = os.environ.get(SOCKET_ENV)
+            if path:
+                _shared_cache = SocketCache(path, bytes.fromhex(os.environ[AUTHKEY_ENV]))
+            else:
+                cache_config = load_config().get("server", {}).get("cache", {})
+                _shared_cache = LocalCache(cache_config.get("max_items", 10000))
+    return _shared_cache
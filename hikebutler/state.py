@@ -2,10 +2,133 @@
 LangGraph State 定义
 
 使用 TypedDict 定义状态结构，包含用户画像和中间结果。
+
+为降低每一步的检查点与合并开销：
+- 各节点的中间结果使用带 ``__slots__`` 的 dataclass 表示，字段固定；
+- GPX、图片、检索文档等大块数据存放在 blob store 中，状态里只保存句柄；
+- 节点只返回自己修改的键，由 reducer 负责合并。
 """
 
-from typing import TypedDict, List, Dict, Any, Optional
-from langgraph.graph.message import add_messages
+from dataclasses import dataclass, field
+from typing import Annotated, TypedDict, List, Dict, Any, Optional
+
+# 状态中保留的最大消息条数，超出部分丢弃最早的消息
+MAX_MESSAGES = 20
+
+
+@dataclass(slots=True)
+class RouteResult:
+    """路线规划结果。"""
+
+    status: str = "pending"
+    message: str = ""
+    name: Optional[str] = None
+    distance_km: Optional[float] = None
+    ascent_m: Optional[float] = None
+    duration_h: Optional[float] = None
+    highlights: List[str] = field(default_factory=list)
+    doc_refs: List[str] = field(default_factory=list)  # 检索文档的 blob 句柄
+    lat: Optional[float] = None  # 起点坐标，天气查询使用
+    lon: Optional[float] = None
+    min_elevation_m: Optional[float] = None
+    max_elevation_m: Optional[float] = None
+    track_ref: Optional[str] = None  # 路线 GPX 的 blob 句柄，天气节点据此分段查询
+    similar_trips: List[Dict[str, Any]] = field(default_factory=list)  # 相似的历史徒步（轨迹指纹检索）
+    candidates: List[Dict[str, Any]] = field(default_factory=list)  # 步道图计算的候选路线摘要，第一条为所选路线
+    pois: List[Dict[str, Any]] = field(default_factory=list)  # 沿线的水源、避难所、下撤点（空间索引查询）
+
+
+@dataclass(slots=True)
+class WeatherResult:
+    """天气查询结果。"""
+
+    status: str = "pending"
+    message: str = ""
+    summary: Optional[str] = None
+    hazards: Dict[str, float] = field(default_factory=dict)  # 危险指标，0~1，越大越危险
+    metrics: Dict[str, Any] = field(default_factory=dict)  # 最低体感温度、累计降水、0°C 层高度等
+    hourly: List[Dict[str, Any]] = field(default_factory=list)  # 徒步时段内的逐小时天气
+    segments: List[Dict[str, Any]] = field(default_factory=list)  # 沿线分段天气（有路线轨迹时）
+    forecast_ref: Optional[str] = None  # 原始预报数据的 blob 句柄
+
+
+@dataclass(slots=True)
+class GearResult:
+    """装备建议结果，items 为 (装备名称, 数量, 备注) 三元组。"""
+
+    status: str = "pending"
+    message: str = ""
+    items: List[List[Any]] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class PhotoPlanResult:
+    """拍摄计划结果。"""
+
+    status: str = "pending"
+    message: str = ""
+    spots: List[str] = field(default_factory=list)
+    golden_hours: List[str] = field(default_factory=list)
+    light: List[Dict[str, Any]] = field(default_factory=list)  # 各拍摄点每天的日出日落、黄金和蓝调时段
+    views: List[Dict[str, Any]] = field(default_factory=list)  # 沿线可以看到的景观点及可见的里程区间
+    pois: List[Dict[str, Any]] = field(default_factory=list)  # 沿线的观景台、山峰（空间索引查询）
+
+
+@dataclass(slots=True)
+class UserFeatures:
+    """用户历史特征（由特征库增量维护，见 database/feature_store.py）。"""
+
+    trip_count: int = 0
+    level: str = "beginner"  # beginner / intermediate / advanced
+    total_distance_km: float = 0.0
+    total_ascent_m: float = 0.0
+    typical_distance_km: float = 0.0  # 近期加权的单次里程
+    typical_ascent_m: float = 0.0
+    typical_duration_h: float = 0.0
+    max_distance_km: float = 0.0
+    max_ascent_m: float = 0.0
+    preferred_terrain: Optional[str] = None  # flat / rolling / mountain
+    terrain: Dict[str, float] = field(default_factory=dict)  # 各地形的徒步次数占比
+    regions: List[str] = field(default_factory=list)  # 常去地区（geohash 前缀，按次数降序）
+    gear: List[str] = field(default_factory=list)  # 已有装备
+    last_trip_date: Optional[str] = None
+
+
+def merge_dict(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    字典合并 reducer，节点只需返回新增或修改的键。
+
+    Args:
+        left: 已有的字典
+        right: 节点返回的增量字典
+
+    Returns:
+        合并后的新字典
+    """
+    if not left:
+        return dict(right or {})
+    if not right:
+        return left
+    merged = dict(left)
+    merged.update(right)
+    return merged
+
+
+def append_messages(left: Optional[List[Any]], right: Optional[List[Any]]) -> List[Any]:
+    """
+    消息追加 reducer，只保留最近 MAX_MESSAGES 条消息。
+
+    Args:
+        left: 已有的消息列表
+        right: 节点返回的新消息
+
+    Returns:
+        截断后的消息列表
+    """
+    if not right:
+        return left or []
+    combined = list(left or []) + list(right)
+    return combined[-MAX_MESSAGES:]
 
 
 class HikeButlerState(TypedDict):
@@ -13,20 +136,23 @@ class HikeButlerState(TypedDict):
     HikeButler Agent 的状态定义。
 
     Attributes:
-        messages: 消息列表，用于与 LLM 交互
+        messages: 消息列表，用于与 LLM 交互（最多保留 MAX_MESSAGES 条）
         user_profile: 用户画像（JSON 格式）
         user_id: 用户 ID
-        intermediate_results: 中间结果字典
+        user_features: 用户历史特征（UserFeatures，可为空）
+        session_id: 客户端会话标识（用于会话级缓存，可为空）
+        intermediate_results: 中间结果字典，值为 RouteResult 等 dataclass
         current_task: 当前任务类型（preparation 或 review）
-        input_data: 用户输入数据
+        input_data: 用户输入数据，大块数据以 blob 句柄形式保存
         output_data: 最终输出数据
     """
 
-    messages: List[Any]
+    messages: Annotated[List[Any], append_messages]
     user_profile: Optional[Dict[str, Any]]
     user_id: Optional[str]
-    intermediate_results: Dict[str, Any]
+    user_features: Optional[UserFeatures]
+    session_id: Optional[str]
+    intermediate_results: Annotated[Dict[str, Any], merge_dict]
     current_task: Optional[str]  # "preparation" 或 "review"
     input_data: Optional[Dict[str, Any]]
-    output_data: Optional[Dict[str, Any]]
-
+    output_data: Annotated[Optional[Dict[str, Any]], merge_dict]
@@ -0,0 +1 @@
+"""存储模块"""
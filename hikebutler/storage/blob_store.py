@@ -0,0 +1,203 @@
+"""
+Blob 存储
+
+内容寻址的大对象存储，用于存放 GPX 轨迹、图片、检索文档等大块数据。
+LangGraph 状态中只保存形如 ``blob://<sha256>`` 的句柄，避免每一步检查点都复制原始数据。
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Union
+from hikebutler.config.loader import load_config
+import logging
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = "blob://"
+
+
+def is_blob_ref(value: object) -> bool:
+    """
+    判断一个值是否为 blob 句柄。
+
+    Args:
+        value: 任意值
+
+    Returns:
+        是否为 blob 句柄
+    """
+    return isinstance(value, str) and value.startswith(BLOB_PREFIX)
+
+
+class BlobStore:
+    """内容寻址的 blob 存储，磁盘持久化并带进程内 LRU 缓存。"""
+
+    def __init__(self, root: Union[str, Path], max_memory_items: int = 64):
+        """
+        初始化 blob 存储。
+
+        Args:
+            root: blob 文件存放目录
+            max_memory_items: 内存中缓存的最大 blob 数量
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, digest: str) -> Path:
+        """根据摘要计算文件路径（两级目录，避免单目录文件过多）。"""
+        return self.root / digest[:2] / digest[2:]
+
+    def _remember(self, digest: str, data: bytes):
+        """写入内存 LRU 缓存。"""
+        with self._lock:
+            self._memory[digest] = data
+            self._memory.move_to_end(digest)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    def put(self, data: Union[bytes, str]) -> str:
+        """
+        保存数据并返回句柄，相同内容只存储一份。
+
+        Args:
+            data: 二进制数据或文本（文本按 UTF-8 编码）
+
+        Returns:
+            blob 句柄
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # 每次写入使用独立的临时文件，并发写入同一内容时互不干扰
+            with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as tmp_file:
+                tmp_file.write(data)
+            try:
+                os.replace(tmp_file.name, path)
+            except OSError:
+                os.unlink(tmp_file.name)
+                # 内容寻址：目标已被其他写入者落盘即视为成功
+                if not path.exists():
+                    raise
+
+        self._remember(digest, data)
+        return f"{BLOB_PREFIX}{digest}"
+
+    def put_file(self, file_path: Union[str, Path]) -> str:
+        """
+        保存文件内容并返回句柄。
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            blob 句柄
+        """
+        return self.put(Path(file_path).read_bytes())
+
+    def _digest(self, handle: str) -> str:
+        """校验句柄并返回摘要。"""
+        if not is_blob_ref(handle):
+            raise ValueError(f"无效的 blob 句柄: {handle}")
+        digest = handle[len(BLOB_PREFIX):]
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            raise ValueError(f"无效的 blob 句柄: {handle}")
+        return digest
+
+    def get(self, handle: str) -> bytes:
+        """
+        根据句柄读取数据。
+
+        Args:
+            handle: blob 句柄
+
+        Returns:
+            二进制数据
+
+        Raises:
+            ValueError: 句柄格式不正确
+            KeyError: blob 不存在
+        """
+        digest = self._digest(handle)
+        with self._lock:
+            data = self._memory.get(digest)
+            if data is not None:
+                self._memory.move_to_end(digest)
+                return data
+
+        path = self._path(digest)
+        if not path.exists():
+            raise KeyError(f"blob 不存在: {handle}")
+
+        data = path.read_bytes()
+        self._remember(digest, data)
+        return data
+
+    def get_text(self, handle: str, encoding: str = "utf-8") -> str:
+        """
+        根据句柄读取文本。
+
+        Args:
+            handle: blob 句柄
+            encoding: 文本编码
+
+        Returns:
+            文本内容
+        """
+        return self.get(handle).decode(encoding)
+
+    def exists(self, handle: str) -> bool:
+        """判断 blob 是否存在。"""
+        try:
+            return self._path(self._digest(handle)).exists()
+        except ValueError:
+            return False
+
+    def delete(self, handle: str):
+        """
+        删除 blob。
+
+        Args:
+            handle: blob 句柄
+
+        Raises:
+            ValueError: 句柄格式不正确
+        """
+        digest = self._digest(handle)
+        with self._lock:
+            self._memory.pop(digest, None)
+        path = self._path(digest)
+        if path.exists():
+            path.unlink()
+
+
+_blob_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    """
+    获取进程内共享的 BlobStore 实例。
+
+    Returns:
+        BlobStore 实例
+    """
+    global _blob_store
+    if _blob_store is None:
+        config = load_config()
+        storage_config = config.get("storage", {})
+        _blob_store = BlobStore(
+            root=storage_config.get("blob_path", "./data/blobs"),
+            max_memory_items=storage_config.get("blob_cache_items", 64),
+        )
+        logger.info(f"Blob 存储初始化成功: {_blob_store.root}")
+    return _blob_store
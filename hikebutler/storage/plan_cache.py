@@ -0,0 +1,254 @@
+"""
+热门路线计划缓存
+
+少数热门路线占了大部分徒步准备请求。离线预热任务（scripts/warm_plan_cache.py）按请求日志选出
+最常见的输入组合，提前运行与用户和天气都无关的节点（路线、拍摄计划），把结果按输入和日期存入缓存；
+在线请求命中时只需运行天气、装备、个性化和融合节点（装备清单依赖天气危险指标，不缓存）。
+
+- 缓存键：地点、时长、难度，以及输入中出现的徒步日期（影响日出日落）和起终点坐标（影响步道图路线）；
+  带用户自己路线 GPX 的请求不使用缓存；
+- 请求日志：每次徒步准备请求记录一条规范化后的输入，用于挑选预热集合，预热时按该输入重新运行；
+- 产物：中间结果 dataclass 用检查点同一个序列化器编码，读取时还原为原类型。
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+from hikebutler.config.loader import load_config
+from hikebutler.graph.checkpoint import _create_serializer
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 缓存的与用户和天气无关的节点产物
+CACHED_NODES = ("route", "photo_plan")
+# 缓存键中的文本字段，其中 date 只在输入中出现时计入
+TEXT_FIELDS = ("location", "duration", "difficulty")
+OPTIONAL_TEXT_FIELDS = ("date",)
+# 缓存键中的坐标字段（地点解析或用户给出），出现时按 COORD_DIGITS 位小数计入
+COORD_FIELDS = ("lat", "lon", "end_lat", "end_lon")
+COORD_DIGITS = 5
+# 输入中出现这些字段时结果只属于该请求，不读写缓存
+UNCACHEABLE_FIELDS = ("route_gpx_ref",)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plan_artifacts (
+    input_key TEXT NOT NULL,
+    day TEXT NOT NULL,
+    node TEXT NOT NULL,
+    type TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (input_key, day, node)
+);
+CREATE TABLE IF NOT EXISTS request_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    input_key TEXT NOT NULL,
+    input_json TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_request_log_created ON request_log (created_at);
+"""
+
+
+def normalize_input(input_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    规范化徒步准备输入：文本字段去掉首尾和内部多余空白，坐标保留 COORD_DIGITS 位小数，
+    没有出现的可选字段不计入。
+
+    Args:
+        input_data: 用户输入
+
+    Returns:
+        规范化后的输入
+    """
+    normalized: Dict[str, Any] = {
+        key: " ".join(str(input_data.get(key) or "").split()) for key in TEXT_FIELDS
+    }
+    for key in OPTIONAL_TEXT_FIELDS:
+        if input_data.get(key):
+            normalized[key] = " ".join(str(input_data[key]).split())
+    for key in COORD_FIELDS:
+        if input_data.get(key) is not None:
+            normalized[key] = round(float(input_data[key]), COORD_DIGITS)
+    return normalized
+
+
+def cacheable(input_data: Dict[str, Any]) -> bool:
+    """
+    判断输入的结果能否与其他请求共享。
+
+    Args:
+        input_data: 用户输入
+
+    Returns:
+        是否可以读写计划缓存
+    """
+    return bool(input_data.get("location")) and not any(input_data.get(key) for key in UNCACHEABLE_FIELDS)
+
+
+def input_key(input_data: Dict[str, Any]) -> str:
+    """
+    计算输入的缓存键。
+
+    Args:
+        input_data: 用户输入
+
+    Returns:
+        缓存键
+    """
+    payload = json.dumps(normalize_input(input_data), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:20]
+
+
+class PlanCache:
+    """基于 SQLite 的计划产物缓存和请求日志。"""
+
+    def __init__(self, path: Union[str, Path] = "./data/plan_cache.sqlite"):
+        """
+        初始化缓存。
+
+        Args:
+            path: SQLite 文件路径
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._serde = _create_serializer()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def log_request(self, input_data: Dict[str, Any]):
+        """
+        记录一次徒步准备请求。
+
+        Args:
+            input_data: 用户输入
+        """
+        normalized = normalize_input(input_data)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO request_log (input_key, input_json, created_at) VALUES (?, ?, ?)",
+                (input_key(normalized), json.dumps(normalized, ensure_ascii=False), time.time()),
+            )
+
+    def top_inputs(self, limit: int = 20, window_days: float = 7) -> List[Tuple[Dict[str, Any], int]]:
+        """
+        最近一段时间内最常见的输入组合。
+
+        Args:
+            limit: 返回的组合数
+            window_days: 统计窗口（天）
+
+        Returns:
+            (输入, 请求次数) 列表，按次数降序
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT MIN(input_json), COUNT(*) AS n FROM request_log WHERE created_at >= ? "
+                "GROUP BY input_key ORDER BY n DESC LIMIT ?",
+                (time.time() - window_days * 86400, limit),
+            ).fetchall()
+        return [(json.loads(input_json), count) for input_json, count in rows]
+
+    def put(self, input_data: Dict[str, Any], day: date, results: Dict[str, Any]):
+        """
+        写入一组节点产物（只保存 CACHED_NODES 中的节点，不可共享的输入不写入）。
+
+        Args:
+            input_data: 用户输入
+            day: 日期
+            results: 节点名到中间结果的映射
+        """
+        if not cacheable(input_data):
+            return
+        key = input_key(input_data)
+        now = time.time()
+        rows = []
+        for node in CACHED_NODES:
+            if results.get(node) is None:
+                continue
+            type_name, payload = self._serde.dumps_typed(results[node])
+            rows.append((key, day.isoformat(), node, type_name, payload, now))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO plan_artifacts (input_key, day, node, type, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.execute("COMMIT")
+
+    def get(self, input_data: Dict[str, Any], day: Optional[date] = None) -> Optional[Dict[str, Any]]:
+        """
+        读取一组节点产物；缺少任一节点时视为未命中。
+
+        Args:
+            input_data: 用户输入
+            day: 日期，默认今天
+
+        Returns:
+            节点名到中间结果的映射，未命中时为 None
+        """
+        day = day or date.today()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT node, type, payload FROM plan_artifacts WHERE input_key = ? AND day = ?",
+                (input_key(input_data), day.isoformat()),
+            ).fetchall()
+        if len(rows) < len(CACHED_NODES):
+            return None
+        return {node: self._serde.loads_typed((type_name, payload)) for node, type_name, payload in rows}
+
+    def purge(self, keep_days: int = 1, log_days: float = 30) -> Tuple[int, int]:
+        """
+        删除过期的产物和请求日志。
+
+        Args:
+            keep_days: 保留今天之前多少天的产物
+            log_days: 请求日志保留天数
+
+        Returns:
+            (删除的产物数, 删除的日志数)
+        """
+        cutoff = (date.today() - timedelta(days=keep_days)).isoformat()
+        with self._lock:
+            artifacts = self._conn.execute(
+                "DELETE FROM plan_artifacts WHERE day < ?", (cutoff,)
+            ).rowcount
+            logs = self._conn.execute(
+                "DELETE FROM request_log WHERE created_at < ?", (time.time() - log_days * 86400,)
+            ).rowcount
+        return artifacts, logs
+
+    def close(self):
+        """关闭数据库连接。"""
+        with self._lock:
+            self._conn.close()
+
+
+_plan_cache: Optional[PlanCache] = None
+_plan_cache_lock = threading.Lock()
+
+
+def get_plan_cache() -> Optional[PlanCache]:
+    """
+    获取进程内共享的计划缓存，未启用时返回 None。
+
+    Returns:
+        PlanCache 实例或 None
+    """
+    global _plan_cache
+    cache_config = load_config().get("plan_cache", {})
+    if not cache_config.get("enabled", True):
+        return None
+    with _plan_cache_lock:
+        if _plan_cache is None:
+            _plan_cache = PlanCache(cache_config.get("path", "./data/plan_cache.sqlite"))
+    return _plan_cache
@@ -0,0 +1,297 @@
+"""
+地点解析
+
+把用户填写的自由文本地点解析为 WGS-84 坐标，按代价从低到高依次尝试：
+1. 离线地名库（见 hikebutler.geo.gazetteer），精确命中为一次字典查表；
+2. 历史解析缓存：高德和 LLM 的解析结果存入 SQLite，启动时一次载入内存，之后同一地点不再调用外部服务；
+3. 高德地理编码（mcp_amap_geocode），结果由 GCJ-02 转换为 WGS-84；
+4. LLM（llm_routing.geocode 档位），经 LLM 调度器派发。
+
+都解析不到的地点记为否定结果，negative_ttl 秒内不再调用高德和 LLM；调用失败（网络错误等）不记录。
+"""
+
+import json
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Union
+from langchain_core.messages import HumanMessage, SystemMessage
+from hikebutler.config.loader import load_config
+from hikebutler.geo.gazetteer import Gazetteer, Place, get_gazetteer, normalize
+from hikebutler.models.batch_scheduler import get_batch_scheduler
+from hikebutler.tools.mcp_tools import amap_configured, mcp_amap_geocode
+import logging
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_SYSTEM_PROMPT = (
+    "你是地理编码助手。用户给出一个中国境内的徒步地点，请给出它的标准名称和 WGS-84 坐标，"
+    '只输出 JSON：{"name": "标准名称", "lat": 纬度, "lon": 经度}；无法确定时只输出 null。'
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocode_cache (
+    query TEXT PRIMARY KEY,
+    name TEXT,
+    lat REAL,
+    lon REAL,
+    admin TEXT,
+    source TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+Resolver = Callable[[str], Optional[Place]]
+
+# GCJ-02 偏移参数（克拉索夫斯基椭球）
+_GCJ_A = 6378245.0
+_GCJ_EE = 0.00669342162296594323
+
+
+def _gcj_offset(lat: float, lon: float) -> Tuple[float, float]:
+    """WGS-84 坐标在 GCJ-02 中的偏移量（度）。"""
+    x, y = lon - 105.0, lat - 35.0
+    dlat = -100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * math.sqrt(abs(x))
+    dlat += (20.0 * math.sin(6.0 * x * math.pi) + 20.0 * math.sin(2.0 * x * math.pi)) * 2.0 / 3.0
+    dlat += (20.0 * math.sin(y * math.pi) + 40.0 * math.sin(y / 3.0 * math.pi)) * 2.0 / 3.0
+    dlat += (160.0 * math.sin(y / 12.0 * math.pi) + 320.0 * math.sin(y * math.pi / 30.0)) * 2.0 / 3.0
+    dlon = 300.0 + x + 2.0 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * math.sqrt(abs(x))
+    dlon += (20.0 * math.sin(6.0 * x * math.pi) + 20.0 * math.sin(2.0 * x * math.pi)) * 2.0 / 3.0
+    dlon += (20.0 * math.sin(x * math.pi) + 40.0 * math.sin(x / 3.0 * math.pi)) * 2.0 / 3.0
+    dlon += (150.0 * math.sin(x / 12.0 * math.pi) + 300.0 * math.sin(x / 30.0 * math.pi)) * 2.0 / 3.0
+    rad = math.radians(lat)
+    magic = 1 - _GCJ_EE * math.sin(rad) ** 2
+    dlat = dlat * 180.0 / ((_GCJ_A * (1 - _GCJ_EE)) / (magic * math.sqrt(magic)) * math.pi)
+    dlon = dlon * 180.0 / (_GCJ_A / math.sqrt(magic) * math.cos(rad) * math.pi)
+    return dlat, dlon
+
+
+def _in_china(lat: float, lon: float) -> bool:
+    return 0.8293 <= lat <= 55.8271 and 72.004 <= lon <= 137.8347
+
+
+def wgs84_to_gcj02(lat: float, lon: float) -> Tuple[float, float]:
+    """
+    WGS-84 转 GCJ-02（中国境外不偏移）。
+
+    Args:
+        lat: 纬度
+        lon: 经度
+
+    Returns:
+        (纬度, 经度)
+    """
+    if not _in_china(lat, lon):
+        return lat, lon
+    dlat, dlon = _gcj_offset(lat, lon)
+    return lat + dlat, lon + dlon
+
+
+def gcj02_to_wgs84(lat: float, lon: float) -> Tuple[float, float]:
+    """
+    GCJ-02 转 WGS-84，迭代求逆，误差在厘米级。
+
+    Args:
+        lat: 纬度
+        lon: 经度
+
+    Returns:
+        (纬度, 经度)
+    """
+    if not _in_china(lat, lon):
+        return lat, lon
+    wgs_lat, wgs_lon = lat, lon
+    for _ in range(4):
+        gcj_lat, gcj_lon = wgs84_to_gcj02(wgs_lat, wgs_lon)
+        wgs_lat, wgs_lon = wgs_lat - (gcj_lat - lat), wgs_lon - (gcj_lon - lon)
+    return wgs_lat, wgs_lon
+
+
+class Geocoder:
+    """带持久化缓存的地点解析器。"""
+
+    def __init__(
+        self,
+        cache_path: Union[str, Path] = "./data/geocode_cache.sqlite",
+        gazetteer: Optional[Gazetteer] = None,
+        remote: Optional[Resolver] = None,
+        llm: Optional[Resolver] = None,
+        min_score: float = 0.6,
+        negative_ttl: float = 86400.0,
+    ):
+        """
+        打开解析缓存并载入全部记录。
+
+        Args:
+            cache_path: SQLite 文件路径
+            gazetteer: 离线地名库（可选）
+            remote: 远程地理编码（可选），返回 WGS-84 坐标
+            llm: LLM 解析（可选）
+            min_score: 地名库模糊匹配的最低 Dice 系数
+            negative_ttl: 否定结果的有效期（秒）
+        """
+        self.path = Path(cache_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.gazetteer = gazetteer
+        self.remote = remote
+        self.llm = llm
+        self.min_score = min_score
+        self.negative_ttl = negative_ttl
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Tuple[Optional[Place], float]] = {}
+        rows = self._conn.execute("SELECT query, name, lat, lon, admin, source, created_at FROM geocode_cache")
+        for query, name, lat, lon, admin, source, created_at in rows:
+            place = None if lat is None else Place(name=name, lat=lat, lon=lon, admin=admin or "", source=source)
+            self._cache[query] = (place, created_at)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def resolve(self, query: str) -> Optional[Place]:
+        """
+        解析地点。
+
+        Args:
+            query: 自由文本地点
+
+        Returns:
+            地点（source 标明来源），解析不到时返回 None
+        """
+        key = normalize(query)
+        if not key:
+            return None
+        if self.gazetteer is not None:
+            hit = self.gazetteer.lookup(query, min_score=self.min_score)
+            if hit is not None:
+                return hit[0]
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            place, created_at = cached
+            if place is not None or time.time() - created_at < self.negative_ttl:
+                return place
+
+        failed = False
+        for source, resolver in (("remote", self.remote), ("llm", self.llm)):
+            if resolver is None:
+                continue
+            try:
+                place = resolver(query)
+            except Exception as e:
+                logger.warning(f"地点解析失败（{source}）: {query}: {e}")
+                failed = True
+                continue
+            if place is not None:
+                place.source = source
+                logger.info(f"地点解析（{source}）: {query} -> {place.name} ({place.lat:.5f}, {place.lon:.5f})")
+                self._store(key, place)
+                return place
+        if not failed and (self.remote is not None or self.llm is not None):
+            self._store(key, None)
+        return None
+
+    def _store(self, key: str, place: Optional[Place]):
+        """写入缓存（内存和 SQLite）。"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache (query, name, lat, lon, admin, source, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    place.name if place else None,
+                    place.lat if place else None,
+                    place.lon if place else None,
+                    place.admin if place else None,
+                    place.source if place else "none",
+                    now,
+                ),
+            )
+            self._cache[key] = (place, now)
+
+    def close(self):
+        """关闭数据库连接。"""
+        with self._lock:
+            self._conn.close()
+
+
+def _remote_place(query: str) -> Optional[Place]:
+    """高德地理编码，坐标转换为 WGS-84。"""
+    timeout = load_config().get("geocoding", {}).get("remote_timeout", 5)
+    result = mcp_amap_geocode(query, timeout=timeout)
+    if result is None:
+        return None
+    lat, lon = gcj02_to_wgs84(result["lat"], result["lon"])
+    return Place(name=result["name"], lat=lat, lon=lon, admin=result["admin"], kind=result["level"])
+
+
+def _llm_place(query: str) -> Optional[Place]:
+    """让 LLM 给出坐标，输出无法解析或超出范围时返回 None。"""
+    timeout = load_config().get("geocoding", {}).get("llm_timeout", 15)
+    response = get_batch_scheduler().invoke(
+        [SystemMessage(content=GEOCODE_SYSTEM_PROMPT), HumanMessage(content=query)],
+        node="geocode",
+        timeout=timeout,
+    )
+    text = str(response.content)
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        return None
+    try:
+        data = json.loads(text[start : end + 1])
+        lat, lon = float(data["lat"]), float(data["lon"])
+    except (ValueError, KeyError, TypeError):
+        logger.warning(f"LLM 地点解析输出无法解析: {text[:200]}")
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return Place(name=str(data.get("name") or query), lat=lat, lon=lon)
+
+
+_geocoder: Optional[Geocoder] = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder() -> Geocoder:
+    """
+    获取进程内共享的地点解析器。
+
+    Returns:
+        Geocoder 实例
+    """
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is None:
+            config = load_config().get("geocoding", {})
+            _geocoder = Geocoder(
+                config.get("cache_path", "./data/geocode_cache.sqlite"),
+                gazetteer=get_gazetteer(),
+                remote=_remote_place if config.get("remote", True) and amap_configured() else None,
+                llm=_llm_place if config.get("llm_fallback", True) else None,
+                min_score=config.get("min_score", 0.6),
+                negative_ttl=config.get("negative_ttl", 86400),
+            )
+            logger.info(f"地点解析缓存: {_geocoder.path}，记录 {len(_geocoder)}")
+    return _geocoder
+
+
+def resolve_location(location: str) -> Optional[Place]:
+    """
+    解析地点，出错时返回 None（不影响后续流程，相关节点按缺少坐标处理）。
+
+    Args:
+        location: 自由文本地点
+
+    Returns:
+        地点或 None
+    """
+    try:
+        return get_geocoder().resolve(location)
+    except Exception as e:
+        logger.warning(f"地点解析失败: {location}: {e}")
+        return None
@@ -1,10 +1,13 @@
 """
 MCP 工具定义
 
-定义所有外部服务交互的 MCP 工具，包括 Windy 天气和小红书发布。
+定义所有外部服务交互的 MCP 工具，包括 Windy 天气、高德地理编码和小红书发布。
 """
 
 from typing import Dict, Any, Optional
+from hikebutler.config.loader import load_config
+from hikebutler.network.http_pool import get_http_client
+from hikebutler.serving.shared_cache import cache_key, get_shared_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,7 +15,38 @@ logger = logging.getLogger(__name__)
 
 def mcp_windy_fetch(lat: float, lon: float, days: int = 7) -> Dict[str, Any]:
     """
-    通过 Windy API 获取天气预报。
+    通过 Windy API 获取天气预报，结果在共享缓存中保留 server.cache.weather_ttl 秒。
+
+    坐标按 0.01° 取整后作为缓存键，相近地点的请求共用一份预报。
+
+    Args:
+        lat: 纬度
+        lon: 经度
+        days: 预报天数（默认 7 天）
+
+    Returns:
+        天气数据字典
+
+    Raises:
+        Exception: API 调用失败时抛出异常
+    """
+    ttl = load_config().get("server", {}).get("cache", {}).get("weather_ttl", 0)
+    if not ttl:
+        return _windy_request(lat, lon, days)
+    cache = get_shared_cache()
+    key = cache_key("weather", round(lat, 2), round(lon, 2), days)
+    forecast = cache.get(key)
+    if forecast is None:
+        forecast = _windy_request(lat, lon, days)
+        # 未完成的结果不缓存
+        if forecast.get("status") != "pending":
+            cache.set(key, forecast, ttl)
+    return forecast
+
+
+def _windy_request(lat: float, lon: float, days: int) -> Dict[str, Any]:
+    """
+    调用 Windy API。
 
     Args:
         lat: 纬度
@@ -27,7 +61,7 @@ def mcp_windy_fetch(lat: float, lon: float, days: int = 7) -> Dict[str, Any]:
     """
     # TODO: 实现 Windy API 调用
     # 1. 构建 API 请求
-    # 2. 发送请求并处理响应
+    # 2. 通过 get_http_client() 获取共享连接池发送请求并处理响应
     # 3. 解析天气数据
     # 4. 返回结构化数据
 
@@ -41,6 +75,51 @@ def mcp_windy_fetch(lat: float, lon: float, days: int = 7) -> Dict[str, Any]:
     }
 
 
+def amap_configured() -> bool:
+    """是否配置了高德地理编码 API key。"""
+    config = load_config().get("mcp_tools", {}).get("amap", {})
+    api_key = config.get("api_key") or ""
+    return bool(config.get("enabled", True) and api_key and not api_key.startswith("${"))
+
+
+def mcp_amap_geocode(address: str, timeout: float = 5.0) -> Optional[Dict[str, Any]]:
+    """
+    通过高德地理编码 API 解析地点。
+
+    Args:
+        address: 自由文本地点
+        timeout: 请求超时（秒）
+
+    Returns:
+        {"name", "lat", "lon", "admin", "level"}，坐标为高德使用的 GCJ-02；未配置 api_key 或没有结果时返回 None
+
+    Raises:
+        httpx.HTTPError: 请求失败时抛出异常
+    """
+    if not amap_configured():
+        return None
+    config = load_config().get("mcp_tools", {}).get("amap", {})
+    url = config.get("url", "https://restapi.amap.com/v3/geocode/geo")
+    response = get_http_client(url).get(
+        url, params={"address": address, "key": config["api_key"], "output": "JSON"}, timeout=timeout
+    )
+    response.raise_for_status()
+    data = response.json()
+    if str(data.get("status")) != "1" or not data.get("geocodes"):
+        return None
+    geocode = data["geocodes"][0]
+    lon, lat = (float(v) for v in geocode["location"].split(","))
+    # 没有值的字段高德返回空列表
+    admin = " ".join(geocode[k] for k in ("province", "city", "district") if isinstance(geocode.get(k), str) and geocode[k])
+    return {
+        "name": geocode.get("formatted_address") or address,
+        "lat": lat,
+        "lon": lon,
+        "admin": admin,
+        "level": geocode.get("level") or "",
+    }
+
+
 def mcp_xhs_post(text: str, images: Optional[list] = None) -> Dict[str, Any]:
     """
     发布小红书帖子。
@@ -56,7 +135,7 @@ def mcp_xhs_post(text: str, images: Optional[list] = None) -> Dict[str, Any]:
         Exception: 发布失败时抛出异常
     """
     # TODO: 实现小红书发布逻辑
-    # 1. 构建发布请求
+    # 1. 构建发布请求（通过 get_http_client() 获取共享连接池）
     # 2. 上传图片（如果有）
     # 3. 发布帖子
     # 4. 返回发布结果
@@ -4,13 +4,20 @@ Gradio UI 应用
 提供"徒步准备"和"徒步复盘"两个页面的交互界面。
 """
 
+import uuid
 import gradio as gr
-from typing import Dict, Any, Tuple, List
-from hikebutler.graph.workflow import (
-    create_preparation_workflow,
-    create_review_workflow,
+from typing import Dict, Any, Tuple, List, Optional
+from hikebutler.config.loader import load_config
+from hikebutler.graph.runner import run_workflow
+from hikebutler.graph.service import (
+    finish_review,
+    preparation_state,
+    preparation_workflow,
+    review_state,
+    review_workflow,
 )
-from hikebutler.state import HikeButlerState
+from hikebutler.jobs.worker import get_worker_pool
+from hikebutler.storage.blob_store import get_blob_store
 import logging
 
 try:
@@ -21,16 +28,13 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
-# 初始化工作流
-preparation_workflow = create_preparation_workflow()
-review_workflow = create_review_workflow()
-
 
 def prepare_hiking(
     location: str,
     duration: str,
     difficulty: str,
     user_id: str = "default_user",
+    session_id: Optional[str] = None,
 ) -> Tuple[Any, str]:
     """
     处理徒步准备请求。
@@ -40,28 +44,16 @@ def prepare_hiking(
         duration: 期望时长
         difficulty: 难度偏好
         user_id: 用户 ID
+        session_id: 浏览器会话标识，重试时命中同一检查点
 
     Returns:
         (装备清单 DataFrame, 徒步计划)
     """
     try:
-        # 构建初始状态
-        initial_state: HikeButlerState = {
-            "messages": [],
-            "user_profile": None,
-            "user_id": user_id,
-            "intermediate_results": {},
-            "current_task": "preparation",
-            "input_data": {
-                "location": location,
-                "duration": duration,
-                "difficulty": difficulty,
-            },
-            "output_data": None,
-        }
-
-        # 执行工作流
-        result = preparation_workflow.invoke(initial_state)
+        initial_state = preparation_state(location, duration, difficulty, user_id, session_id)
+
+        # 执行工作流（失败重试时从检查点恢复）
+        result = run_workflow(preparation_workflow, initial_state, session_id=session_id)
 
         # 提取结果
         output_data = result.get("output_data", {})
@@ -102,11 +94,25 @@ def prepare_hiking(
             return [["错误", str(e), ""]], f"错误: {str(e)}"
 
 
+def _file_path(file_obj: Any) -> str:
+    """
+    获取 Gradio 上传文件的本地路径。
+
+    Args:
+        file_obj: Gradio 文件对象或路径字符串
+
+    Returns:
+        文件路径
+    """
+    return file_obj if isinstance(file_obj, str) else file_obj.name
+
+
 def review_hiking(
     gpx_file: Any,
     photos: Any,
     thoughts: str,
     user_id: str = "default_user",
+    session_id: Optional[str] = None,
 ) -> Tuple[str, str]:
     """
     处理徒步复盘请求。
@@ -116,40 +122,32 @@ def review_hiking(
         photos: 照片文件列表
         thoughts: 个人感想
         user_id: 用户 ID
+        session_id: 浏览器会话标识，重试时命中同一检查点
 
     Returns:
         (帖子预览, 发布状态)
     """
     try:
-        # 读取 GPX 文件
-        gpx_content = None
+        # GPX 和照片存入 blob store，状态中只保存句柄
+        blob_store = get_blob_store()
+        gpx_ref = None
         if gpx_file:
-            with open(gpx_file.name, "r", encoding="utf-8") as f:
-                gpx_content = f.read()
-
-        # 构建初始状态
-        initial_state: HikeButlerState = {
-            "messages": [],
-            "user_profile": None,
-            "user_id": user_id,
-            "intermediate_results": {},
-            "current_task": "review",
-            "input_data": {
-                "gpx": gpx_content,
-                "photos": photos,
-                "thoughts": thoughts,
-            },
-            "output_data": None,
-        }
-
-        # 执行工作流
-        result = review_workflow.invoke(initial_state)
+            gpx_ref = blob_store.put_file(_file_path(gpx_file))
+
+        photo_refs = [blob_store.put_file(_file_path(photo)) for photo in photos or []]
+
+        # 执行工作流（失败重试时从检查点恢复）
+        review_id, initial_state = review_state(gpx_ref, photo_refs, thoughts, user_id, session_id)
+        result = run_workflow(review_workflow, initial_state, thread_id=review_id)
 
         # 提取结果
         output_data = result.get("output_data", {})
         post = output_data.get("post", "帖子生成中...")
         xhs_status = output_data.get("xhs_status", {}).get("message", "待发布")
 
+        # 保存轨迹、写入记忆、知识库入库交给后台任务，不阻塞响应
+        finish_review(review_id, initial_state, output_data)
+
         return post, xhs_status
 
     except Exception as e:
@@ -167,6 +165,8 @@ def create_ui():
     # 创建 Tab 布局
     with gr.Blocks(title="HikeButler - 徒步私人管家") as app:
         gr.Markdown("# 🏔️ HikeButler - 徒步私人管家 AI Agent")
+        # 每个浏览器会话一个标识，重试时随请求带回，用于定位该会话的检查点
+        session_state = gr.State(lambda: uuid.uuid4().hex)
 
         with gr.Tabs():
             # 徒步准备页面
@@ -203,7 +203,13 @@ def create_ui():
 
                 prepare_btn.click(
                     fn=prepare_hiking,
-                    inputs=[location_input, duration_input, difficulty_input, user_id_input],
+                    inputs=[
+                        location_input,
+                        duration_input,
+                        difficulty_input,
+                        user_id_input,
+                        session_state,
+                    ],
                     outputs=[gear_output, plan_output],
                 )
 
@@ -244,6 +250,7 @@ def create_ui():
                         photos_input,
                         thoughts_input,
                         review_user_id_input,
+                        session_state,
                     ],
                     outputs=[post_output, xhs_status_output],
                 )
@@ -251,6 +258,23 @@ def create_ui():
     return app
 
 
+def configure_queue(app: gr.Blocks) -> gr.Blocks:
+    """
+    按 server.queue 配置 Gradio 事件队列。
+
+    Args:
+        app: Gradio 应用
+
+    Returns:
+        同一个应用
+    """
+    queue_config = load_config().get("server", {}).get("queue", {})
+    return app.queue(
+        max_size=queue_config.get("max_size"),
+        default_concurrency_limit=queue_config.get("concurrency", 1),
+    )
+
+
 def launch_ui(share: bool = False, server_name: str = "127.0.0.1", server_port: int = 7860):
     """
     启动 Gradio UI。
@@ -260,6 +284,10 @@ def launch_ui(share: bool = False, server_name: str = "127.0.0.1", server_port:
         server_name: 服务器地址
         server_port: 服务器端口
     """
-    app = create_ui()
+    from hikebutler.serving.adapters import install_llm_cache
+
+    install_llm_cache(load_config().get("server", {}).get("cache", {}))
+    get_worker_pool().start()
+    app = configure_queue(create_ui())
     app.launch(share=share, server_name=server_name, server_port=server_port)
 
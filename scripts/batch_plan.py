@@ -0,0 +1,103 @@
+"""
+批量规划（俱乐部/团队出行）
+
+同一条路线为多名成员生成个性化计划：路线、天气、基础装备、拍摄计划只计算一次，
+每名成员并发运行个性化和融合。
+
+用法：
+    python scripts/batch_plan.py --location 北京香山 --duration 一天 --difficulty 简单 \\
+        --users u1 u2 u3 [--users-file members.txt] [--workers 8] [--output plans/]
+
+不指定 --output 时把结果以 JSON 打印到标准输出；指定时每名成员写一个 <user_id>.md，
+另写 batch.json 汇总（共享中间结果、各成员装备清单、错误和耗时）。
+"""
+
+import argparse
+import json
+import logging
+import re
+import sys
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.graph.batch import plan_batch
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    stream=sys.stderr,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(obj):
+    return asdict(obj) if is_dataclass(obj) else str(obj)
+
+
+def _safe_name(user_id: str) -> str:
+    """用户 ID 转换为文件名。"""
+    return re.sub(r"[^\w.-]", "_", user_id)
+
+
+def main():
+    """运行批量规划。"""
+    parser = argparse.ArgumentParser(description="同一路线为多名成员批量生成计划")
+    parser.add_argument("--location", required=True)
+    parser.add_argument("--duration", default="")
+    parser.add_argument("--difficulty", default="")
+    parser.add_argument("--users", nargs="*", default=[], help="成员用户 ID")
+    parser.add_argument("--users-file", type=Path, help="成员用户 ID 文件，每行一个")
+    parser.add_argument("--workers", type=int, help="并发生成的成员数，默认读取 batch.max_workers")
+    parser.add_argument("--output", type=Path, help="输出目录")
+    args = parser.parse_args()
+
+    user_ids = list(args.users)
+    if args.users_file:
+        user_ids += [line.strip() for line in args.users_file.read_text(encoding="utf-8").splitlines() if line.strip()]
+    if not user_ids:
+        parser.error("至少需要一个成员（--users 或 --users-file）")
+
+    input_data = {"location": args.location, "duration": args.duration, "difficulty": args.difficulty}
+    try:
+        result = plan_batch(input_data, user_ids, max_workers=args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.output is None:
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2, default=_json_default)
+        print()
+    else:
+        args.output.mkdir(parents=True, exist_ok=True)
+        for member in result["members"]:
+            if "output" in member:
+                path = args.output / f"{_safe_name(member['user_id'])}.md"
+                path.write_text(member["output"].get("plan", ""), encoding="utf-8")
+        summary = {
+            **result,
+            "members": [
+                {key: value for key, value in member.items() if key != "output"}
+                | ({"gear_list": member["output"].get("gear_list", [])} if "output" in member else {})
+                for member in result["members"]
+            ],
+        }
+        (args.output / "batch.json").write_text(
+            json.dumps(summary, ensure_ascii=False, indent=2, default=_json_default), encoding="utf-8"
+        )
+        logger.info(f"已写入 {args.output}")
+
+    timings = result["timings"]
+    failed = [member["user_id"] for member in result["members"] if "error" in member]
+    logger.info(
+        f"成员 {len(result['members'])}，共享阶段 {timings['shared_s']:.2f} s，成员阶段 {timings['members_s']:.2f} s"
+        + (f"，失败: {', '.join(failed)}" if failed else "")
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+地点解析基准测试
+
+生成 N 个随机中文地名（带拼音式别名和行政区）构建地名库，统计精确命中、带行政区前缀、模糊匹配、
+解析缓存命中的单次耗时。
+
+用法：
+    python scripts/bench_geocoding.py [--places 200000] [--repeat 20000]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.geo.gazetteer import Gazetteer, Place
+from hikebutler.tools.geocoding import Geocoder
+
+CHARS = "东西南北大小青白黑红金银龙凤虎马牛羊云雾霞雪松柏竹梅兰石岩峰岭峡谷溪泉湖海天池沟坪坝寨村"
+SUFFIXES = ("山", "峰", "岭", "沟", "峡", "湖", "村", "寺")
+ADMINS = ("北京市 门头沟区", "河北省 张家口市", "四川省 阿坝州", "云南省 迪庆州", "浙江省 宁波市", "陕西省 宝鸡市")
+
+
+def _us(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    """运行基准测试。"""
+    parser = argparse.ArgumentParser(description="地点解析基准测试")
+    parser.add_argument("--places", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    entries = []
+    for i in range(args.places):
+        name = "".join(rng.choice(list(CHARS), rng.integers(2, 5))) + SUFFIXES[i % len(SUFFIXES)]
+        place = Place(name, rng.uniform(20, 45), rng.uniform(95, 125), admin=ADMINS[i % len(ADMINS)], rank=i % 7)
+        entries.append((place, [f"place{i}"]))
+    start = time.perf_counter()
+    gazetteer = Gazetteer(entries)
+    print(f"构建 {args.places} 个地名: {time.perf_counter() - start:.1f} s")
+
+    name = entries[args.places // 2][0].name
+    admin = entries[args.places // 2][0].admin.split()[0]
+    queries = {
+        "精确命中": name,
+        "拉丁字母别名": f"Place {args.places // 2}",
+        "行政区前缀": admin + name,
+        "模糊匹配（错一字）": name[:-1] + "X",
+        "未命中": "完全不存在的地点名称",
+    }
+    for label, query in queries.items():
+        hit = gazetteer.lookup(query)
+        repeat = args.repeat if label != "未命中" and "模糊" not in label else max(1, args.repeat // 20)
+        print(f"{label} {query!r}: {_us(lambda: gazetteer.lookup(query), repeat):.1f} µs -> {hit and hit[0].name}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        geocoder = Geocoder(Path(tmp) / "geocode.sqlite", remote=lambda q: Place("远程", 30.0, 110.0))
+        geocoder.resolve("远程解析过的地点")
+        print(f"解析缓存命中: {_us(lambda: geocoder.resolve('远程解析过的地点'), args.repeat):.1f} µs")
+        geocoder.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+本地记忆库召回基准测试
+
+为一个用户写入 N 条合成记忆，然后统计 search 的延迟分布（p50/p99）。
+召回只包含查询 embedding、一次矩阵乘法和按 ID 读取 top-k 记录；
+--index-only 只统计前两步（不含 SQLite 读取）。
+
+用法：
+    python scripts/bench_memory.py [--memories 10000] [--queries 1000] [--top-k 5]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.memory.local_backend import LocalMemoryStore
+
+PLACES = ["香山", "泰山", "黄山", "华山", "峨眉山", "武功山", "四姑娘山", "雨崩", "虎跳峡", "梅里"]
+EVENTS = ["脚滑了", "膝盖疼", "水带少了", "晒伤了", "迷路了", "看到日出", "手机没电", "鞋子磨脚", "冷得发抖", "拍到云海"]
+ADVICE = ["下次带登山杖", "多带一升水", "涂防晒", "提前下载离线地图", "带充电宝", "穿徒步鞋", "带抓绒衣"]
+
+
+def _memory(rng: random.Random, i: int) -> str:
+    """生成一条合成记忆，带序号避免被合并。"""
+    return f"第{i}次去{rng.choice(PLACES)}{rng.choice(EVENTS)}，{rng.choice(ADVICE)}"
+
+
+def main():
+    """运行基准测试。"""
+    parser = argparse.ArgumentParser(description="本地记忆库召回基准测试")
+    parser.add_argument("--memories", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--index-only", action="store_true", help="不统计按 ID 读取记录的时间")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    filters = {"user_id": "bench_user"}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = LocalMemoryStore(Path(tmp_dir) / "memories.sqlite", dedup_threshold=1.01)
+
+        start = time.perf_counter()
+        batch = [{"role": "user", "content": _memory(rng, i)} for i in range(args.memories)]
+        store.add(batch, filters=filters)
+        print(f"写入 {args.memories} 条记忆: {time.perf_counter() - start:.2f} s")
+
+        # 重新打开，统计冷启动时载入用户索引的时间
+        store.close()
+        store = LocalMemoryStore(Path(tmp_dir) / "memories.sqlite")
+        start = time.perf_counter()
+        index = store._index("bench_user")
+        print(f"载入用户索引: {(time.perf_counter() - start) * 1000:.1f} ms（{index.size} 条）")
+
+        queries = [f"{rng.choice(PLACES)}{rng.choice(EVENTS)}" for _ in range(args.queries)]
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            if args.index_only:
+                scores = index.scores(store.embedder.embed(query))
+                np.argpartition(-scores, args.top_k - 1)[: args.top_k]
+            else:
+                store.search(query, filters=filters, top_k=args.top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+        store.close()
+
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"召回 {args.queries} 次 (top_k={args.top_k}): p50 {p50:.3f} ms  p99 {p99:.3f} ms  max {max(latencies):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+知识点空间索引基准测试
+
+生成 N 个随机知识点写入临时索引，统计周边查询和沿线走廊查询的单次耗时，
+并与对全部知识点逐一计算距离对比。
+
+用法：
+    python scripts/bench_poi_index.py [--pois 1000000] [--route-points 2000] [--repeat 50]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.geo.poi_index import PoiIndex, write_poi_index
+
+KINDS = ("water", "shelter", "bailout", "campsite", "viewpoint", "peak")
+
+
+def _mean_ms(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    """运行基准测试。"""
+    parser = argparse.ArgumentParser(description="知识点空间索引基准测试")
+    parser.add_argument("--pois", type=int, default=1_000_000)
+    parser.add_argument("--route-points", type=int, default=2000, help="走廊查询的路线点数")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(20.0, 45.0, args.pois)
+    lon = rng.uniform(95.0, 125.0, args.pois)
+    kind = rng.integers(0, len(KINDS), args.pois)
+    pois = [{"name": f"p{i}", "kind": KINDS[k], "lat": a, "lon": b} for i, (a, b, k) in enumerate(zip(lat, lon, kind))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        write_poi_index(tmp, pois)
+        print(f"写入 {args.pois} 个知识点: {time.perf_counter() - start:.1f} s")
+        index = PoiIndex(tmp)
+
+        ms = _mean_ms(lambda: index.radius(30.0, 110.0, 3000), args.repeat)
+        print(f"周边 3 km 查询: {ms:.2f} ms，命中 {len(index.radius(30.0, 110.0, 3000))}")
+
+        def brute_force():
+            dy = (lat - 30.0) * 111320.0
+            dx = (lon - 110.0) * 111320.0 * np.cos(np.radians(30.0))
+            return np.flatnonzero(np.hypot(dx, dy) <= 3000)
+
+        print(f"逐一计算距离: {_mean_ms(brute_force, 5):.1f} ms")
+
+        # 约 25 km 的蛇形路线
+        t = np.linspace(0.0, 1.0, args.route_points)
+        route_lat = 30.0 + 0.2 * t
+        route_lon = 110.0 + 0.05 * np.sin(t * 12)
+        kinds = ["water", "shelter", "bailout"]
+        ms = _mean_ms(lambda: index.corridor(route_lat, route_lon, 500, kinds=kinds), args.repeat)
+        hits = index.corridor(route_lat, route_lon, 500, kinds=kinds)
+        print(f"沿线 500 m 走廊查询（{args.route_points} 个路线点）: {ms:.2f} ms，命中 {len(hits)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+太阳位置计算基准测试
+
+对 N 个随机 (纬度, 经度, 时间) 一次性计算太阳高度角和方位角，统计每个点的平均耗时，
+并与逐点调用（标量参数）对比；另外统计日出日落时段的向量化计算和缓存命中耗时。
+
+用法：
+    python scripts/bench_solar.py [--points 100000] [--loop-points 2000] [--repeat 5]
+"""
+
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.geo.solar import day_timestamp, solar_position, sun_events, sun_times_many
+
+
+def _best(func, repeat: int) -> float:
+    """多次运行取最短耗时（秒）。"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """运行基准测试。"""
+    parser = argparse.ArgumentParser(description="太阳位置计算基准测试")
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--loop-points", type=int, default=2000, help="逐点调用对比的点数")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(18, 50, args.points)
+    lon = rng.uniform(75, 135, args.points)
+    ts = day_timestamp(date(2026, 6, 1)) + rng.uniform(0, 365 * 86400, args.points)
+
+    elapsed = _best(lambda: solar_position(lat, lon, ts), args.repeat)
+    print(f"太阳位置（向量化，{args.points} 点）: {elapsed * 1000:.1f} ms，每点 {elapsed / args.points * 1e6:.3f} µs")
+
+    n = args.loop_points
+
+    def loop():
+        for i in range(n):
+            solar_position(float(lat[i]), float(lon[i]), float(ts[i]))
+
+    elapsed = _best(loop, max(1, args.repeat // 2))
+    print(f"太阳位置（逐点调用，{n} 点）: {elapsed * 1000:.1f} ms，每点 {elapsed / n * 1e6:.1f} µs")
+
+    days = np.floor(ts / 86400.0) * 86400.0
+    elapsed = _best(lambda: sun_events(lat, lon, days), args.repeat)
+    print(f"光线时段（向量化，{args.points} 点）: {elapsed * 1000:.1f} ms，每点 {elapsed / args.points * 1e6:.3f} µs")
+
+    m = min(args.points, 5000)
+    day_list = [date(2026, 6, 1) + timedelta(days=int(d)) for d in rng.integers(0, 7, m)]
+    start = time.perf_counter()
+    sun_times_many(lat[:m], lon[:m], day_list)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    sun_times_many(lat[:m], lon[:m], day_list)
+    warm = time.perf_counter() - start
+    print(f"光线时段缓存（{m} 点）: 未命中 {cold / m * 1e6:.1f} µs/点，命中 {warm / m * 1e6:.1f} µs/点")
+
+
+if __name__ == "__main__":
+    main()
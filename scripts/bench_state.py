@@ -0,0 +1,195 @@
+"""
+State 检查点体积基准测试
+
+用同一条线性工作流分别跑两种状态表示，并用 SqliteSaver 保存每一步的检查点，
+对比检查点存储实际写入的字节数和整次运行耗时：
+- 旧表示：原始 GPX 字符串、照片字节、dict 中间结果，节点返回完整状态；
+- 新表示：blob 句柄、slotted dataclass 中间结果，节点只返回增量（HikeButlerState 的 reducer）。
+
+两侧每一步都追加一条同样的消息、写入一份同样内容的中间结果，差别只在状态表示。
+
+用法：
+    python scripts/bench_state.py [--gpx-points 20000] [--photos 6] [--steps 5]
+"""
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TypedDict
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.graph import StateGraph, END
+
+from hikebutler.graph.checkpoint import _create_serializer
+from hikebutler.state import (
+    HikeButlerState,
+    RouteResult,
+    WeatherResult,
+    GearResult,
+    PhotoPlanResult,
+)
+from hikebutler.storage.blob_store import BlobStore
+
+DOC_TEXT = "检索文档内容" * 50
+MESSAGE_TEXT = "y" * 500
+
+
+class LegacyState(TypedDict):
+    """旧状态表示：没有 reducer，节点返回完整状态。"""
+
+    messages: List[Any]
+    user_profile: Optional[Dict[str, Any]]
+    user_id: Optional[str]
+    intermediate_results: Dict[str, Any]
+    current_task: Optional[str]
+    input_data: Optional[Dict[str, Any]]
+    output_data: Optional[Dict[str, Any]]
+
+
+def _make_gpx(points: int) -> str:
+    """生成合成 GPX 轨迹。"""
+    rows = [
+        f'<trkpt lat="{39.99 + i * 1e-5:.6f}" lon="{116.19 + i * 1e-5:.6f}">'
+        f"<ele>{100 + (i % 500) * 0.5:.1f}</ele>"
+        f"<time>2024-05-01T08:{(i // 60) % 60:02d}:{i % 60:02d}Z</time></trkpt>"
+        for i in range(points)
+    ]
+    return "<gpx><trk><trkseg>" + "".join(rows) + "</trkseg></trk></gpx>"
+
+
+def _legacy_graph(steps: int, checkpointer: SqliteSaver):
+    """旧表示的工作流：每个节点复制并返回完整状态。"""
+
+    def make_node(i: int):
+        def node(state: LegacyState) -> LegacyState:
+            results = dict(state["intermediate_results"])
+            results[f"step_{i}"] = {"status": "done", "message": "x" * 200, "docs": [DOC_TEXT] * 5}
+            return {
+                **state,
+                "messages": state["messages"] + [AIMessage(content=MESSAGE_TEXT)],
+                "intermediate_results": results,
+            }
+
+        return node
+
+    return _linear_graph(LegacyState, make_node, steps, checkpointer)
+
+
+def _compact_graph(steps: int, checkpointer: SqliteSaver, doc_refs: List[str]):
+    """新表示的工作流：节点只返回本步更新的键。"""
+    result_types = [RouteResult, WeatherResult, GearResult, PhotoPlanResult]
+
+    def make_node(i: int):
+        def node(state: HikeButlerState) -> Dict[str, Any]:
+            result = result_types[i % len(result_types)](status="done", message="x" * 200)
+            if isinstance(result, RouteResult):
+                result.doc_refs = doc_refs
+            return {
+                "messages": [AIMessage(content=MESSAGE_TEXT)],
+                "intermediate_results": {f"step_{i}": result},
+            }
+
+        return node
+
+    return _linear_graph(HikeButlerState, make_node, steps, checkpointer)
+
+
+def _linear_graph(state_cls, make_node, steps: int, checkpointer: SqliteSaver):
+    """构建 step_0 -> step_1 -> ... -> END 的线性工作流。"""
+    graph = StateGraph(state_cls)
+    for i in range(steps):
+        graph.add_node(f"step_{i}", make_node(i))
+        if i:
+            graph.add_edge(f"step_{i - 1}", f"step_{i}")
+    graph.set_entry_point("step_0")
+    graph.add_edge(f"step_{steps - 1}", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+def _run(label: str, build, initial_state: Dict[str, Any], db_path: Path):
+    """运行工作流并统计检查点存储写入的字节数。"""
+    conn = sqlite3.connect(str(db_path), check_same_thread=False)
+    saver = SqliteSaver(conn, serde=_create_serializer())
+    saver.setup()
+    workflow = build(saver)
+
+    start = time.perf_counter()
+    workflow.invoke(initial_state, {"configurable": {"thread_id": label}})
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    checkpoints, checkpoint_bytes = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints"
+    ).fetchone()
+    write_bytes = conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes").fetchone()[0]
+    conn.close()
+
+    total = checkpoint_bytes + write_bytes
+    print(
+        f"{label:<8} 检查点 {checkpoints:3d} 个  检查点 {checkpoint_bytes / 1024:10.1f} KiB  "
+        f"writes {write_bytes / 1024:10.1f} KiB  平均每个检查点 {total / checkpoints / 1024:10.1f} KiB  "
+        f"运行 {elapsed_ms:8.1f} ms"
+    )
+
+
+def main():
+    """运行基准测试。"""
+    parser = argparse.ArgumentParser(description="State 检查点体积基准测试")
+    parser.add_argument("--gpx-points", type=int, default=20000)
+    parser.add_argument("--photos", type=int, default=6)
+    parser.add_argument("--photo-kib", type=int, default=512)
+    parser.add_argument("--steps", type=int, default=5)
+    args = parser.parse_args()
+
+    gpx = _make_gpx(args.gpx_points)
+    photos = [bytes(args.photo_kib * 1024) for _ in range(args.photos)]
+    base_state = {
+        "messages": [],
+        "user_profile": {"level": "intermediate"},
+        "user_id": "bench_user",
+        "intermediate_results": {},
+        "current_task": "review",
+        "output_data": None,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp = Path(tmp_dir)
+        blob_store = BlobStore(tmp / "blobs")
+        doc_refs = [blob_store.put(DOC_TEXT) for _ in range(5)]
+
+        legacy_state = {
+            **base_state,
+            "input_data": {"gpx": gpx, "photos": photos, "thoughts": "很开心"},
+        }
+        compact_state = {
+            **base_state,
+            "input_data": {
+                "gpx_ref": blob_store.put(gpx),
+                "photo_refs": [blob_store.put(p) for p in photos],
+                "thoughts": "很开心",
+            },
+        }
+
+        _run(
+            "before",
+            lambda saver: _legacy_graph(args.steps, saver),
+            legacy_state,
+            tmp / "before.sqlite",
+        )
+        _run(
+            "after",
+            lambda saver: _compact_graph(args.steps, saver, doc_refs),
+            compact_state,
+            tmp / "after.sqlite",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+步道图路线计算基准测试
+
+生成 N×N 的网格步道图（中心一座山），统计不同距离的点到点路线（A*）和不同时长的环线计算耗时。
+网格是 A* 的不利情形（实际步道网稀疏得多，扩展的顶点更少）。
+
+用法：
+    python scripts/bench_trail_graph.py [--size 200] [--step 250] [--repeat 5]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.geo.trail_graph import OsmWay, build_trail_graph
+
+LAT0, LON0 = 40.0, 116.0
+
+
+def grid_ways(size: int, step_m: float):
+    """size×size 网格道路，中心有一座约 600 米高的山。"""
+    dlat = step_m / 111320.0
+    dlon = step_m / (111320.0 * np.cos(np.radians(LAT0)))
+    index = np.arange(size)
+    rows, cols = np.meshgrid(index, index, indexing="ij")
+    ele = 300 + 600 * np.exp(-((rows - size / 2) ** 2 + (cols - size / 2) ** 2) / (size * size / 16))
+    ids = rows * size + cols + 1
+    ways = []
+    for i in range(size):
+        ways.append(OsmWay(ids[i], np.full(size, LAT0 + i * dlat), LON0 + index * dlon, ele[i], 1, f"横{i}"))
+        ways.append(OsmWay(ids[:, i], LAT0 + index * dlat, np.full(size, LON0 + i * dlon), ele[:, i], 1, f"纵{i}"))
+    return ways
+
+
+def _mean_ms(func, repeat: int):
+    """多次运行的平均耗时（毫秒）和最后一次的结果。"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    """运行基准测试。"""
+    parser = argparse.ArgumentParser(description="步道图路线计算基准测试")
+    parser.add_argument("--size", type=int, default=200)
+    parser.add_argument("--step", type=float, default=250.0, help="网格间距（米）")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    graph = build_trail_graph(grid_ways(args.size, args.step))
+    print(f"构建: 顶点 {graph.node_count}，边 {graph.edge_count}，{time.perf_counter() - start:.2f} s")
+    graph._adjacency()
+
+    source, _ = graph.nearest(LAT0, LON0)
+    for km in (5, 10, 20):
+        cells = min(args.size - 1, int(km * 1000 / args.step / np.sqrt(2)))
+        target, _ = graph.nearest(LAT0 + cells * args.step / 111320.0, LON0 + cells * args.step / (111320.0 * np.cos(np.radians(LAT0))))
+        ms, plans = _mean_ms(lambda: graph.point_to_point(source, target, count=1), args.repeat)
+        print(f"点到点（直线约 {km} km，路线 {plans[0].distance_m / 1000:.1f} km）: {ms:.1f} ms")
+    for hours in (3, 5, 8):
+        ms, plans = _mean_ms(lambda: graph.loops(source, hours * 3600), args.repeat)
+        durations = ", ".join(f"{plan.duration_s / 3600:.1f}h" for plan in plans)
+        print(f"环线（目标 {hours} h，候选 {durations}）: {ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
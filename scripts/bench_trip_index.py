@@ -0,0 +1,80 @@
+"""
+徒步轨迹相似检索基准测试
+
+生成 N 条随机轨迹写入临时索引，统计按计划（起点、里程、爬升）检索和按轨迹匹配（指纹检索 + Fréchet 重排序）
+的单次耗时，并与对全部轨迹逐一计算 Fréchet 距离对比。
+
+用法：
+    python scripts/bench_trip_index.py [--trips 5000] [--points 2000] [--repeat 20]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.database.trip_index import TripIndex
+from hikebutler.geo.fingerprint import fingerprint, frechet_many
+from hikebutler.geo.track import Track
+
+
+def _random_track(rng: np.random.Generator, points: int) -> Track:
+    """华北山区范围内的随机游走轨迹。"""
+    lat0, lon0 = rng.uniform(39.5, 41.0), rng.uniform(115.5, 117.5)
+    step = rng.uniform(5, 15)  # 米
+    heading = np.cumsum(rng.normal(0, 0.2, points))
+    lat = lat0 + np.cumsum(np.cos(heading)) * step / 111320.0
+    lon = lon0 + np.cumsum(np.sin(heading)) * step / (111320.0 * np.cos(np.radians(lat0)))
+    ele = rng.uniform(100, 1500) + np.cumsum(rng.normal(0, 3, points))
+    return Track(lat=lat, lon=lon, ele=ele, time=np.full(points, np.nan))
+
+
+def _mean_ms(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    """运行基准测试。"""
+    parser = argparse.ArgumentParser(description="徒步轨迹相似检索基准测试")
+    parser.add_argument("--trips", type=int, default=5000)
+    parser.add_argument("--points", type=int, default=2000, help="每条轨迹的点数")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    tracks = [_random_track(rng, args.points) for _ in range(args.trips)]
+    with tempfile.TemporaryDirectory() as tmp:
+        index = TripIndex(Path(tmp) / "trip_index.sqlite")
+        start = time.perf_counter()
+        for i, track in enumerate(tracks):
+            index.add(f"r{i}", f"u{i % 100}", track)
+        elapsed = time.perf_counter() - start
+        print(f"写入 {args.trips} 条指纹: {elapsed:.1f} s，每条 {elapsed / args.trips * 1000:.2f} ms")
+
+        query = tracks[args.trips // 2]
+        lat, lon = float(query.lat[0]), float(query.lon[0])
+        ms = _mean_ms(lambda: index.similar_to_plan(lat, lon, distance_km=12, ascent_m=800), args.repeat)
+        print(f"按计划检索: {ms:.2f} ms")
+        ms = _mean_ms(lambda: index.match_track(query), args.repeat)
+        print(f"按轨迹匹配（含指纹计算和 {index.candidates} 条 Fréchet 重排序）: {ms:.2f} ms")
+        print(f"最佳匹配: {index.match_track(query, k=1)}")
+
+        n = min(args.trips, 500)
+        shapes = np.stack([fingerprint(track).shape for track in tracks[:n]])
+        query_shape = fingerprint(query).shape
+        ms = _mean_ms(lambda: frechet_many(query_shape, shapes), 1)
+        print(f"逐一 Fréchet（{n} 条）: {ms:.1f} ms，全部 {args.trips} 条约 {ms * args.trips / n:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+构建离线地名库
+
+从 GeoNames 国家导出（如 https://download.geonames.org/export/dump/CN.zip 解压后的 CN.txt）提取地名，
+中文名取别名中的第一个中文写法，拼音取 asciiname，所属行政区取一、二级行政区的中文名；
+可再合并人工整理的地名文件（格式见 hikebutler.geo.gazetteer.read_places，如“鳌太线”这类线路名），
+写入 geocoding.gazetteer 指定的 JSON 文件。重新运行即可整体覆盖，服务重启后读取新文件。
+
+用法：
+    python scripts/build_gazetteer.py --geonames data/geonames/CN.txt [--extra data/places.csv ...] \\
+        [--classes PTLH] [--output data/gazetteer.json]
+"""
+
+import argparse
+import csv
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.config.loader import load_config
+from hikebutler.geo.gazetteer import read_places
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+# GeoNames 导出的列
+COLUMNS = (
+    "geonameid name asciiname alternatenames latitude longitude feature_class feature_code country_code cc2 "
+    "admin1 admin2 admin3 admin4 population elevation dem timezone modified"
+).split()
+MAX_ALIASES = 20
+
+
+def _rows(path: Path) -> Iterator[Dict[str, str]]:
+    csv.field_size_limit(sys.maxsize)
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if len(row) == len(COLUMNS):
+                yield dict(zip(COLUMNS, row))
+
+
+def _chinese(names: List[str]) -> Optional[str]:
+    """第一个包含汉字的名称。"""
+    return next((n for n in names if any("一" <= ch <= "鿿" for ch in n)), None)
+
+
+def read_geonames(path: Path, classes: str) -> List[Dict[str, Any]]:
+    """
+    读取 GeoNames 导出（读两遍：先收集行政区中文名，再提取地名）。
+
+    Args:
+        path: GeoNames 导出文件
+        classes: 保留的要素类别（P 居民点、T 山地、H 水体、L 区域、S 建筑等）
+
+    Returns:
+        地名库条目
+    """
+    admins: Dict[tuple, str] = {}
+    for row in _rows(path):
+        if row["feature_code"] in ("ADM1", "ADM2"):
+            name = _chinese(row["alternatenames"].split(",")) or row["name"]
+            key = (row["admin1"],) if row["feature_code"] == "ADM1" else (row["admin1"], row["admin2"])
+            admins[key] = name
+
+    entries = []
+    for row in _rows(path):
+        if row["feature_class"] not in classes or row["feature_code"].startswith("ADM"):
+            continue
+        aliases = [a for a in row["alternatenames"].split(",") if a and len(a) <= 30]
+        name = _chinese(aliases) or row["name"]
+        admin = [admins.get((row["admin1"],)), admins.get((row["admin1"], row["admin2"]))]
+        entries.append(
+            {
+                "name": name,
+                "aliases": [a for a in dict.fromkeys([row["name"], *aliases]) if a != name][:MAX_ALIASES],
+                "pinyin": row["asciiname"],
+                "lat": float(row["latitude"]),
+                "lon": float(row["longitude"]),
+                "admin": " ".join(a for a in admin if a),
+                "kind": row["feature_code"],
+                "rank": int(row["population"] or 0),
+            }
+        )
+    return entries
+
+
+def main():
+    """构建地名库。"""
+    config = load_config().get("geocoding", {})
+    parser = argparse.ArgumentParser(description="构建离线地名库")
+    parser.add_argument("--geonames", type=Path, help="GeoNames 国家导出（CN.txt）")
+    parser.add_argument("--extra", type=Path, action="append", default=[], help="人工整理的地名文件，可重复")
+    parser.add_argument("--classes", default="PTLH", help="保留的 GeoNames 要素类别")
+    parser.add_argument("--output", type=Path, default=Path(config.get("gazetteer", "./data/gazetteer.json")))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    entries = read_geonames(args.geonames, args.classes) if args.geonames else []
+    logger.info(f"GeoNames: 地名 {len(entries)}")
+    for path in args.extra:
+        # 人工整理的地名放在前面，同名时 rank 相同先出现者优先
+        extra = [
+            {
+                "name": place.name,
+                "aliases": aliases,
+                "lat": place.lat,
+                "lon": place.lon,
+                "admin": place.admin,
+                "kind": place.kind,
+                "rank": place.rank,
+                **({"bbox": list(place.bbox)} if place.bbox else {}),
+            }
+            for place, aliases in read_places(path)
+        ]
+        logger.info(f"{path}: 地名 {len(extra)}")
+        entries = extra + entries
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = args.output.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(entries, ensure_ascii=False), encoding="utf-8")
+    tmp_path.replace(args.output)
+    logger.info(f"已写入 {args.output}: 地名 {len(entries)}，耗时 {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+构建步道知识点空间索引
+
+读取 GeoJSON（如 Overpass 导出的水源、避难所、公交站、观景台等，或人工整理的知识点），
+按网格排序写入 poi_index.path 指定的目录，路线规划和拍摄计划节点请求时按范围查表。
+知识点更新后重新运行即可（整体覆盖）；运行中的服务重启后读取新索引。
+
+要素属性中的 kind 指定类别（water / shelter / bailout / campsite / viewpoint / peak 等），
+缺失时按 OSM 标签推断（amenity=drinking_water、tourism=alpine_hut 等），都没有时归为 other。
+
+用法：
+    python scripts/build_poi_index.py --geojson data/poi/water.geojson [--geojson ...] \\
+        [--output data/poi_index] [--cell-deg 0.01]
+"""
+
+import argparse
+import logging
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.config.loader import load_config
+from hikebutler.geo.poi_index import read_geojson, write_poi_index
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """构建空间索引。"""
+    config = load_config().get("poi_index", {})
+    parser = argparse.ArgumentParser(description="构建步道知识点空间索引")
+    parser.add_argument("--geojson", type=Path, action="append", required=True, help="GeoJSON 文件，可重复")
+    parser.add_argument("--output", type=Path, default=Path(config.get("path", "./data/poi_index")))
+    parser.add_argument("--cell-deg", type=float, default=config.get("cell_deg", 0.01), help="网格边长（度）")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pois = []
+    for path in args.geojson:
+        loaded = read_geojson(path)
+        logger.info(f"{path}: 知识点 {len(loaded)}")
+        pois.extend(loaded)
+    count = write_poi_index(args.output, pois, cell_deg=args.cell_deg)
+    kinds = ", ".join(f"{kind} {n}" for kind, n in Counter(p["kind"] for p in pois).most_common())
+    logger.info(f"已写入 {args.output}: 知识点 {count}（{kinds}），耗时 {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
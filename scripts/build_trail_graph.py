@@ -0,0 +1,58 @@
+"""
+构建离线步道图
+
+从 OSM 区域数据（如 Geofabrik 的 china-latest.osm.pbf 按区域裁剪后的文件）提取徒步道路，
+可选用 DEM 瓦片补充高程，构建 CSR 步道图并写入 trail_graph.path 指定的目录，路线规划节点请求时只做图搜索。
+OSM 数据或 DEM 更新后重新运行即可（整体覆盖）。
+
+.osm.pbf 需要安装 osmium（pyosmium）；.osm（XML）无需额外依赖，适合小范围数据。
+
+用法：
+    python scripts/build_trail_graph.py --osm data/osm/beijing.osm.pbf [--dem data/dem/N39E116.hgt ...] \\
+        [--output data/trail_graph]
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.config.loader import load_config
+from hikebutler.geo.dem import open_dem
+from hikebutler.geo.trail_graph import build_trail_graph, read_osm
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """构建步道图。"""
+    config = load_config().get("trail_graph", {})
+    parser = argparse.ArgumentParser(description="构建离线步道图")
+    parser.add_argument("--osm", type=Path, required=True, help="OSM 数据（.osm.pbf 或 .osm）")
+    parser.add_argument("--dem", type=Path, action="append", default=[], help="DEM 瓦片，可重复")
+    parser.add_argument("--output", type=Path, default=Path(config.get("path", "./data/trail_graph")))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ways = read_osm(args.osm)
+    logger.info(f"徒步道路 {len(ways)} 条，读取耗时 {time.perf_counter() - start:.1f} s")
+    graph = build_trail_graph(ways, [open_dem(path) for path in args.dem])
+    graph.save(args.output)
+    logger.info(
+        f"已写入 {args.output}: 顶点 {graph.node_count}，边 {graph.edge_count}，"
+        f"总耗时 {time.perf_counter() - start:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+回填徒步轨迹指纹索引
+
+按主键分批读取 trips 表中的压缩轨迹，计算指纹写入索引（见 hikebutler/database/trip_index.py）。
+新保存的徒步记录由 trip.save 任务增量写入，本脚本只需在启用索引时或索引文件丢失后执行一次；
+可重复执行，同一 review_id 会覆盖写入。
+
+用法：
+    python scripts/build_trip_index.py [--batch-size 200]
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.database.mysql_client import MySQLClient
+from hikebutler.database.trip_index import get_trip_index
+from hikebutler.geo.track import decompress_track, parse_gpx
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def backfill(client: MySQLClient, batch_size: int) -> int:
+    """按主键分批写入指纹。"""
+    index = get_trip_index()
+    last_id = 0
+    added = 0
+    while True:
+        rows = client.execute_query(
+            "SELECT id, review_id, user_id, track_z FROM trips "
+            "WHERE id > %s AND track_z IS NOT NULL AND review_id IS NOT NULL "
+            "ORDER BY id LIMIT %s",
+            (last_id, batch_size),
+        )
+        if not rows:
+            break
+        for row in rows:
+            last_id = row["id"]
+            try:
+                track = parse_gpx(decompress_track(row["track_z"]))
+            except Exception as e:
+                logger.warning(f"trip {row['id']} GPX 解析失败: {e}")
+                continue
+            if index.add(row["review_id"], row["user_id"], track):
+                added += 1
+        logger.info(f"已写入 {added} 条指纹（id <= {last_id}）")
+    return added
+
+
+def main():
+    """执行回填。"""
+    parser = argparse.ArgumentParser(description="回填徒步轨迹指纹索引")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    client = MySQLClient()
+    try:
+        added = backfill(client, args.batch_size)
+        logger.info(f"指纹索引回填完成，共 {added} 条")
+    except Exception as e:
+        logger.error(f"指纹索引回填失败: {e}")
+        sys.exit(1)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
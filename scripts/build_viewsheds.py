@@ -0,0 +1,72 @@
+"""
+景观点可视域与天际线预计算
+
+读取本地 DEM 瓦片（SRTM .hgt，或安装 tifffile 后的未压缩 GeoTIFF），为已知景观点计算可视域和天际线，
+写入 viewshed.path 指定的目录，拍摄计划节点请求时只查表。景观点或 DEM 更新后重新运行即可（整体覆盖）。
+
+景观点文件为 JSON 数组（[{"name": "香炉峰", "lat": 39.99, "lon": 116.18, "kind": "peak"}]）
+或带表头的 CSV（name,lat,lon[,kind]）。
+
+用法：
+    python scripts/build_viewsheds.py --dem data/dem/N39E116.hgt [--dem ...] --points data/scenic_points.json \\
+        [--output data/viewsheds] [--radius 30000]
+"""
+
+import argparse
+import csv
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.config.loader import load_config
+from hikebutler.geo.viewshed import build_viewsheds
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def load_points(path: Path) -> List[Dict[str, Any]]:
+    """读取景观点文件（JSON 或 CSV）。"""
+    if path.suffix.lower() == ".csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            return [row for row in csv.DictReader(f)]
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def main():
+    """运行预计算。"""
+    config = load_config().get("viewshed", {})
+    parser = argparse.ArgumentParser(description="景观点可视域与天际线预计算")
+    parser.add_argument("--dem", type=Path, action="append", required=True, help="DEM 瓦片，可重复")
+    parser.add_argument("--points", type=Path, required=True, help="景观点文件（JSON 或 CSV）")
+    parser.add_argument("--output", type=Path, default=Path(config.get("path", "./data/viewsheds")))
+    parser.add_argument("--radius", type=float, default=config.get("radius_m", 30000), help="扫描半径（米）")
+    args = parser.parse_args()
+
+    points = load_points(args.points)
+    start = time.perf_counter()
+    count = build_viewsheds(
+        args.dem,
+        points,
+        args.output,
+        radius_m=args.radius,
+        observer_height_m=config.get("observer_height_m", 2.0),
+        target_height_m=config.get("target_height_m", 1.7),
+        azimuth_bins=config.get("azimuth_bins", 360),
+    )
+    logger.info(f"已写入 {args.output}: 景观点 {count}/{len(points)}，耗时 {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
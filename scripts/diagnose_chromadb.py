@@ -145,6 +145,26 @@ def test_with_custom_httpx_client():
         return False
 
 
+def test_with_shared_pool():
+    """使用项目共享的 HTTP 连接池测试（按 config.yaml 中的 http 配置）"""
+    try:
+        from hikebutler.network.http_pool import HTTPConnectionManager
+
+        logger.info("=" * 60)
+        logger.info("测试 6: 项目共享 HTTP 连接池")
+        logger.info("=" * 60)
+
+        url = "http://localhost:8000/api/v2/auth/identity"
+        manager = HTTPConnectionManager()
+        response = manager.get_client(url).get(url, timeout=5.0)
+        logger.info(f"✓ 状态码: {response.status_code}")
+        logger.info(f"✓ 延迟统计: {manager.latency_stats().get('localhost')}")
+        return response.status_code == 200
+    except Exception as e:
+        logger.error(f"✗ 失败: {e}")
+        return False
+
+
 def main():
     """运行所有诊断测试"""
     logger.info("\n" + "=" * 60)
@@ -172,6 +192,10 @@ def main():
     # 测试 5: 自定义 httpx
     results["custom_httpx"] = test_with_custom_httpx_client()
     print()
+
+    # 测试 6: 共享连接池
+    results["shared_pool"] = test_with_shared_pool()
+    print()
     
     # 总结
     logger.info("=" * 60)
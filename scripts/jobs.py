@@ -0,0 +1,58 @@
+"""
+后台任务队列管理
+
+用法：
+    python scripts/jobs.py stats            # 队列指标（各状态任务数、depth、lag）
+    python scripts/jobs.py dead             # 查看死信任务
+    python scripts/jobs.py retry <job_id>   # 死信任务重新入队
+    python scripts/jobs.py run              # 在当前进程执行所有到期任务
+    python scripts/jobs.py purge [--days 7] # 清理已完成的旧任务
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.jobs.queue import get_job_queue
+from hikebutler.jobs.worker import get_worker_pool
+
+
+def main():
+    """命令行入口。"""
+    parser = argparse.ArgumentParser(description="后台任务队列管理")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats")
+    sub.add_parser("dead")
+    retry = sub.add_parser("retry")
+    retry.add_argument("job_id", type=int)
+    run = sub.add_parser("run")
+    run.add_argument("--timeout", type=float, default=300.0)
+    purge = sub.add_parser("purge")
+    purge.add_argument("--days", type=float, default=7)
+    args = parser.parse_args()
+
+    queue = get_job_queue()
+    if args.command == "stats":
+        print(json.dumps(queue.stats(), indent=2))
+    elif args.command == "dead":
+        for job in queue.dead_letters():
+            print(json.dumps(job, ensure_ascii=False))
+    elif args.command == "retry":
+        if not queue.retry_dead(args.job_id):
+            print(f"任务 {args.job_id} 不在死信中")
+            sys.exit(1)
+    elif args.command == "run":
+        pool = get_worker_pool()
+        pool.drain(timeout=args.timeout)
+        print(json.dumps(pool.stats(), indent=2))
+    elif args.command == "purge":
+        print(f"已删除 {queue.purge_done(args.days * 86400)} 个任务")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+多进程服务压测
+
+依次以不同的工作进程数启动服务（开启 /bench/track 压测接口），用多个并发连接持续发送同一条
+合成 GPX 轨迹，统计吞吐量和相对单进程的加速比。接口在工作进程中解析 GPX 并计算统计，
+是受 GIL 限制的纯 CPU 工作，加速比反映多进程带来的扩展性（上限为机器的 CPU 核数）。
+
+用法：
+    python scripts/load_test.py [--workers 1 2 4] [--points 5000] [--duration 10] [--port 7990]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.serving.server import Supervisor
+
+
+def _synthetic_gpx(points: int) -> str:
+    """生成一条合成轨迹。"""
+    start = datetime(2024, 5, 1, 8, tzinfo=timezone.utc)
+    rows = [
+        f'<trkpt lat="{40.0 + i * 1e-5:.6f}" lon="{116.0 + i * 1e-5:.6f}">'
+        f"<ele>{100 + (i % 200):.1f}</ele>"
+        f"<time>{(start + timedelta(seconds=5 * i)).strftime('%Y-%m-%dT%H:%M:%SZ')}</time></trkpt>"
+        for i in range(points)
+    ]
+    return (
+        '<?xml version="1.0"?><gpx version="1.1" creator="load_test"><trk><trkseg>'
+        + "".join(rows)
+        + "</trkseg></trk></gpx>"
+    )
+
+
+def _drive(url: str, body: bytes, deadline: float, counts: list, errors: list, pids: set):
+    """单个连接循环发送请求直到截止时间。"""
+    with httpx.Client(timeout=60) as client:
+        while time.monotonic() < deadline:
+            try:
+                response = client.post(url, content=body)
+                response.raise_for_status()
+                pids.add(response.json()["pid"])
+                counts.append(1)
+            except httpx.HTTPError:
+                errors.append(1)
+
+
+def run(workers: int, port: int, body: bytes, duration: float, connections: int) -> dict:
+    """
+    以指定工作进程数启动服务并压测。
+
+    Returns:
+        吞吐量、错误数和实际处理请求的进程数
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        supervisor = Supervisor(
+            port=port,
+            workers=workers,
+            drain_timeout=5,
+            cache_socket=os.path.join(tmp_dir, "cache.sock"),
+            bench=True,
+        )
+        if not supervisor.start(wait_ready=180):
+            supervisor.stop()
+            raise RuntimeError("工作进程未能就绪")
+        try:
+            url = f"http://127.0.0.1:{port}/bench/track"
+            httpx.post(url, content=body, timeout=60).raise_for_status()  # 预热
+
+            counts, errors, pids = [], [], set()
+            deadline = time.monotonic() + duration
+            threads = [
+                threading.Thread(target=_drive, args=(url, body, deadline, counts, errors, pids))
+                for _ in range(connections)
+            ]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            supervisor.stop()
+    return {"rps": len(counts) / elapsed, "errors": len(errors), "pids": len(pids)}
+
+
+def main():
+    """运行压测。"""
+    parser = argparse.ArgumentParser(description="多进程服务压测")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--points", type=int, default=5000, help="合成轨迹的点数（决定单次请求的 CPU 开销）")
+    parser.add_argument("--duration", type=float, default=10.0, help="每轮压测时长（秒）")
+    parser.add_argument("--connections-per-worker", type=int, default=4)
+    parser.add_argument("--port", type=int, default=7990)
+    args = parser.parse_args()
+
+    body = _synthetic_gpx(args.points).encode("utf-8")
+    print(f"CPU 核数: {os.cpu_count()}，轨迹点数: {args.points}，每轮 {args.duration:.0f} s")
+    print(f"{'workers':>8} {'req/s':>10} {'加速比':>8} {'效率':>8} {'错误':>6} {'处理进程':>8}")
+    baseline = None
+    for workers in args.workers:
+        result = run(workers, args.port, body, args.duration, workers * args.connections_per_worker)
+        baseline = baseline or result["rps"] / workers
+        speedup = result["rps"] / baseline
+        print(
+            f"{workers:>8} {result['rps']:>10.1f} {speedup:>8.2f} {speedup / workers:>8.0%} "
+            f"{result['errors']:>6} {result['pids']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+trips 表迁移与回填
+
+把旧版 trips 表（只有原始 gpx TEXT）迁移到带统计列的新结构：
+1. 补齐缺失的统计列和二级索引（见 MySQLClient 的 TRIP_COLUMNS / TRIP_INDEXES）；
+2. 按主键分批读取尚未回填的行，解析 GPX 计算统计列，并把原始轨迹压缩写入 track_z；
+3. 可选 --drop-raw：全部回填完成后删除旧的 gpx 列。
+
+脚本可重复执行，已回填的行（track_z 非空）会被跳过。
+
+用法：
+    python scripts/migrate_trips.py [--batch-size 200] [--drop-raw] [--dry-run]
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.database.mysql_client import MySQLClient, TRIP_COLUMNS, TRIP_INDEXES, trip_row
+from hikebutler.geo.track import compress_track
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _existing_columns(client: MySQLClient) -> set:
+    rows = client.execute_query(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'trips'"
+    )
+    return {row["COLUMN_NAME"] for row in rows}
+
+
+def _existing_indexes(client: MySQLClient) -> set:
+    rows = client.execute_query(
+        "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'trips'"
+    )
+    return {row["INDEX_NAME"] for row in rows}
+
+
+def migrate_schema(client: MySQLClient, dry_run: bool = False):
+    """补齐统计列和索引。"""
+    columns = _existing_columns(client)
+    statements = [
+        f"ALTER TABLE trips ADD COLUMN {name} {ddl}"
+        for name, ddl in TRIP_COLUMNS
+        if name not in columns
+    ]
+    indexes = _existing_indexes(client)
+    statements += [
+        f"ALTER TABLE trips ADD INDEX {name} ({cols})"
+        for name, cols in TRIP_INDEXES
+        if name not in indexes
+    ]
+    for sql in statements:
+        logger.info(sql)
+        if not dry_run:
+            client.execute_update(sql)
+
+
+def backfill(client: MySQLClient, batch_size: int, dry_run: bool = False) -> int:
+    """按主键分批回填统计列和压缩轨迹。"""
+    columns = _existing_columns(client)
+    if "gpx" not in columns:
+        logger.info("trips 表没有 gpx 列，无需回填")
+        return 0
+    if "track_z" not in columns:
+        # 仅在 --dry-run 时出现：表结构尚未迁移
+        logger.info("trips 表尚未迁移，跳过回填")
+        return 0
+
+    last_id = 0
+    migrated = 0
+    while True:
+        rows = client.execute_query(
+            "SELECT id, gpx FROM trips "
+            "WHERE id > %s AND gpx IS NOT NULL AND track_z IS NULL "
+            "ORDER BY id LIMIT %s",
+            (last_id, batch_size),
+        )
+        if not rows:
+            break
+        for row in rows:
+            last_id = row["id"]
+            try:
+                values = trip_row(row["gpx"])
+            except Exception as e:
+                # 无法解析的轨迹只压缩存储，统计列留空
+                logger.warning(f"trip {row['id']} GPX 解析失败: {e}")
+                values = {**trip_row(None), "track_z": compress_track(row["gpx"])}
+            if dry_run:
+                continue
+            assignments = ", ".join(f"{name} = %s" for name in values)
+            client.execute_update(
+                f"UPDATE trips SET {assignments} WHERE id = %s",
+                (*values.values(), row["id"]),
+            )
+        migrated += len(rows)
+        logger.info(f"已回填 {migrated} 行（id <= {last_id}）")
+    return migrated
+
+
+def drop_raw(client: MySQLClient, dry_run: bool = False):
+    """删除旧的 gpx 列（仍有未回填的行时拒绝执行）。"""
+    if "gpx" not in _existing_columns(client):
+        return
+    remaining = client.execute_query(
+        "SELECT COUNT(*) AS n FROM trips WHERE gpx IS NOT NULL AND track_z IS NULL"
+    )[0]["n"]
+    if remaining:
+        raise RuntimeError(f"仍有 {remaining} 行未回填，不能删除 gpx 列")
+    logger.info("ALTER TABLE trips DROP COLUMN gpx")
+    if not dry_run:
+        client.execute_update("ALTER TABLE trips DROP COLUMN gpx")
+
+
+def main():
+    """执行迁移。"""
+    parser = argparse.ArgumentParser(description="trips 表迁移与回填")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--drop-raw", action="store_true", help="回填完成后删除旧的 gpx 列")
+    parser.add_argument("--dry-run", action="store_true", help="只打印将要执行的变更")
+    args = parser.parse_args()
+
+    client = MySQLClient()
+    try:
+        migrate_schema(client, args.dry_run)
+        backfill(client, args.batch_size, args.dry_run)
+        if args.drop_raw:
+            drop_raw(client, args.dry_run)
+        logger.info("trips 表迁移完成")
+    except Exception as e:
+        logger.error(f"trips 表迁移失败: {e}")
+        sys.exit(1)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+知识库增量同步脚本
+
+扫描源目录中的文档，与清单比对后只对新增、修改的分块生成 embedding，并删除已移除的文档。
+
+源目录支持：
+- .md / .txt：每个文件是一篇源文档，ID 为相对路径；
+- .jsonl：每行一篇源文档，需包含 id 和 text（或 content）字段，其余字段作为元数据。
+
+用法：
+    python scripts/sync_knowledge.py data/knowledge [--partial] [--compact]
+"""
+
+import argparse
+import json
+import sys
+import logging
+from pathlib import Path
+from typing import Iterator
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.database.kb_sync import KnowledgeBaseSync, SourceDocument
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+_SCALAR_TYPES = (str, int, float, bool)
+
+
+def iter_documents(source_dir: Path) -> Iterator[SourceDocument]:
+    """遍历源目录中的文档。"""
+    for path in sorted(source_dir.rglob("*")):
+        if not path.is_file():
+            continue
+        relative = path.relative_to(source_dir).as_posix()
+        if path.suffix in (".md", ".txt"):
+            yield SourceDocument(relative, path.read_text(encoding="utf-8"), {"source": relative})
+        elif path.suffix == ".jsonl":
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    text = record.pop("text", None) or record.pop("content", "")
+                    source_id = f"{relative}:{record.pop('id')}"
+                    # ChromaDB 元数据只支持标量值
+                    metadata = {k: v for k, v in record.items() if isinstance(v, _SCALAR_TYPES)}
+                    yield SourceDocument(source_id, text, {**metadata, "source": relative})
+
+
+def main():
+    """运行增量同步。"""
+    parser = argparse.ArgumentParser(description="知识库增量同步")
+    parser.add_argument("source_dir", type=Path, help="源文档目录")
+    parser.add_argument(
+        "--partial",
+        action="store_true",
+        help="源目录只包含部分文档，不删除清单中未出现的文档",
+    )
+    parser.add_argument("--compact", action="store_true", help="同步后清理墓碑和孤立分块")
+    args = parser.parse_args()
+
+    try:
+        syncer = KnowledgeBaseSync.from_config()
+        report = syncer.sync(iter_documents(args.source_dir), full=not args.partial)
+        logger.info(f"同步结果: {report}")
+        if args.compact:
+            syncer.compact()
+    except Exception as e:
+        logger.error(f"知识库同步失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,21 +3,23 @@ ChromaDB 数据库验证脚本
 
 用于验证运行在 Docker 中的 ChromaDB 服务是否正常工作。
 
-注意：由于 ChromaDB Python 客户端（httpx）与某些 Docker 服务器存在兼容性问题，
-此脚本使用 REST API 直接测试服务器功能。
+注意：由于 ChromaDB Python 客户端与某些 Docker 服务器存在兼容性问题，
+此脚本使用 REST API 直接测试服务器功能。请求通过项目共享的 HTTP 连接池发出
+（该主机默认使用 HTTP/1.1，见 config.yaml 的 http 配置）。
 """
 
 import sys
 import logging
 from pathlib import Path
 from typing import List, Dict, Any
-import requests
 import json
 
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from hikebutler.network.http_pool import get_http_client
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -40,15 +42,17 @@ class ChromaDBVerifier:
         self.host = host
         self.port = port
         self.client = None
+        # 与应用共用同一主机的 keep-alive 连接池
+        self.session = get_http_client(f"http://{host}:{port}")
         self.test_collection_name = "test_verification_collection"
 
     def connect(self) -> bool:
         """测试连接 ChromaDB 服务器"""
         try:
             logger.info(f"正在连接到 ChromaDB: http://{self.host}:{self.port}")
-            # 使用 requests 库测试连接（绕过 httpx 兼容性问题）
+            # 直接调用 REST API 测试连接（绕过 ChromaDB 客户端兼容性问题）
             url = f"http://{self.host}:{self.port}/api/v2/auth/identity"
-            response = requests.get(url, timeout=5)
+            response = self.session.get(url, timeout=5)
             if response.status_code == 200:
                 identity = response.json()
                 logger.info(f"✓ 连接成功！")
@@ -69,7 +73,7 @@ class ChromaDBVerifier:
         try:
             logger.info("测试：心跳检测...")
             url = f"{self.base_url}/heartbeat"
-            response = requests.get(url, timeout=5)
+            response = self.session.get(url, timeout=5)
             if response.status_code == 200:
                 heartbeat = response.json()
                 logger.info(f"✓ 心跳正常: {heartbeat}")
@@ -88,7 +92,7 @@ class ChromaDBVerifier:
             # 如果集合已存在，先删除
             try:
                 delete_url = f"{self.base_url}/collections/{self.test_collection_name}"
-                requests.delete(delete_url, timeout=5)
+                self.session.delete(delete_url, timeout=5)
                 logger.info("  已删除已存在的测试集合")
             except Exception:
                 pass
@@ -99,7 +103,7 @@ class ChromaDBVerifier:
                 "name": self.test_collection_name,
                 "metadata": {"description": "测试集合", "hnsw:space": "cosine"}
             }
-            response = requests.post(url, json=data, timeout=5)
+            response = self.session.post(url, json=data, timeout=5)
             if response.status_code in [200, 201]:
                 collection = response.json()
                 logger.info(f"✓ 成功创建集合: {collection.get('name', self.test_collection_name)}")
@@ -134,7 +138,7 @@ class ChromaDBVerifier:
                 "metadatas": test_metadatas,
                 "ids": test_ids,
             }
-            response = requests.post(url, json=data, timeout=10)
+            response = self.session.post(url, json=data, timeout=10)
             if response.status_code in [200, 201]:
                 logger.info(f"✓ 成功添加 {len(test_documents)} 个文档")
                 return True
@@ -156,7 +160,7 @@ class ChromaDBVerifier:
                 "query_texts": ["测试文档"],
                 "n_results": 2,
             }
-            response = requests.post(url, json=data, timeout=10)
+            response = self.session.post(url, json=data, timeout=10)
             if response.status_code == 200:
                 results = response.json()
                 if results.get("documents") and len(results["documents"][0]) > 0:
@@ -184,7 +188,7 @@ class ChromaDBVerifier:
         try:
             logger.info("测试：获取集合文档数量...")
             url = f"{self.base_url}/collections/{self.test_collection_name}/count"
-            response = requests.get(url, timeout=5)
+            response = self.session.get(url, timeout=5)
             if response.status_code == 200:
                 count = response.json()
                 logger.info(f"✓ 集合中共有 {count} 个文档")
@@ -204,7 +208,7 @@ class ChromaDBVerifier:
             data = {
                 "ids": ["test_doc_1", "test_doc_2", "test_doc_3"]
             }
-            response = requests.post(url, json=data, timeout=5)
+            response = self.session.post(url, json=data, timeout=5)
             if response.status_code in [200, 201]:
                 logger.info("✓ 成功删除测试文档")
                 return True
@@ -220,7 +224,7 @@ class ChromaDBVerifier:
         try:
             logger.info(f"测试：删除测试集合 '{self.test_collection_name}'...")
             url = f"{self.base_url}/collections/{self.test_collection_name}"
-            response = requests.delete(url, timeout=5)
+            response = self.session.delete(url, timeout=5)
             if response.status_code in [200, 204]:
                 logger.info("✓ 成功删除测试集合")
                 return True
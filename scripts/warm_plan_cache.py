@@ -0,0 +1,107 @@
+"""
+热门路线计划缓存预热
+
+从请求日志中选出最近最常见的 N 个输入组合（地点、时长、难度，以及请求中的徒步日期和解析出的坐标），
+按记录的输入运行与用户无关的节点，把与天气无关的产物（路线、拍摄计划）写入当天的计划缓存，并清理过期产物。
+装备清单依赖天气，在线请求命中缓存后仍按当时的天气重新生成。
+
+建议每天清晨由 cron 运行一次，或用 --every 常驻循环：
+    0 5 * * * cd /path/to/HikeButler && python scripts/warm_plan_cache.py
+
+用法：
+    python scripts/warm_plan_cache.py [--top 20] [--window-days 7] [--workers 4] [--every 秒]
+"""
+
+import argparse
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from hikebutler.config.loader import load_config
+from hikebutler.graph.workflow import create_warm_workflow
+from hikebutler.state import HikeButlerState
+from hikebutler.storage.plan_cache import PlanCache, get_plan_cache
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def warm_one(workflow, cache: PlanCache, input_data: Dict[str, Any], day: date) -> bool:
+    """为一个输入组合运行预热工作流并写入缓存。"""
+    if cache.get(input_data, day) is not None:
+        return False
+    state: HikeButlerState = {
+        "messages": [],
+        "user_profile": None,
+        "user_id": None,
+        "user_features": None,
+        "session_id": None,
+        "intermediate_results": {},
+        "current_task": "preparation",
+        "input_data": dict(input_data),
+        "output_data": None,
+    }
+    result = workflow.invoke(state)
+    cache.put(input_data, day, result.get("intermediate_results") or {})
+    return True
+
+
+def warm(top: int, window_days: float, workers: int) -> int:
+    """运行一轮预热，返回新写入的组合数。"""
+    cache = get_plan_cache()
+    if cache is None:
+        logger.info("计划缓存未启用")
+        return 0
+    cache.purge(keep_days=load_config().get("plan_cache", {}).get("keep_days", 1))
+    inputs = cache.top_inputs(top, window_days)
+    logger.info(f"预热 {len(inputs)} 个热门组合")
+    workflow = create_warm_workflow()
+    day = date.today()
+
+    def run(item):
+        input_data, count = item
+        try:
+            warmed = warm_one(workflow, cache, input_data, day)
+        except Exception as e:
+            logger.error(f"预热失败 {input_data}: {e}")
+            return False
+        if warmed:
+            logger.info(f"已预热 {input_data['location']}（近期 {count} 次请求）")
+        return warmed
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(run, inputs))
+
+
+def main():
+    """命令行入口。"""
+    cache_config = load_config().get("plan_cache", {})
+    parser = argparse.ArgumentParser(description="热门路线计划缓存预热")
+    parser.add_argument("--top", type=int, default=cache_config.get("warm_top_n", 20))
+    parser.add_argument("--window-days", type=float, default=cache_config.get("warm_window_days", 7))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--every", type=float, default=None, help="常驻模式下两轮预热的间隔（秒）")
+    args = parser.parse_args()
+
+    while True:
+        warmed = warm(args.top, args.window_days, args.workers)
+        logger.info(f"本轮预热完成，新写入 {warmed} 个组合")
+        if args.every is None:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""
+测试公共 fixture
+"""
+
+import pytest
+from hikebutler.models.llm_factory import LLMFactory
+
+
+@pytest.fixture
+def factory(monkeypatch):
+    """使用测试配置的 LLM 工厂。"""
+    config = {
+        "llm": {"provider": "deepseek", "model_name": "deepseek-chat", "api_key": "sk-test"},
+        "llm_profiles": {
+            "fast": {"max_tokens": 300, "timeout": 5},
+            "quality": {"model_name": "deepseek-reasoner", "fallback": "fast"},
+        },
+        "llm_routing": {"route": "fast", "fusion": "quality"},
+    }
+    instance = LLMFactory()
+    monkeypatch.setattr(instance, "_config", config)
+    monkeypatch.setattr(instance, "_llms", {})
+    return instance
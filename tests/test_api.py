@@ -0,0 +1,174 @@
+"""
+HTTP API 测试
+"""
+
+import json
+import subprocess
+import sys
+import threading
+import pytest
+from langgraph.graph import StateGraph, END
+from starlette.testclient import TestClient
+from hikebutler.api import app as api_module
+from hikebutler.api.app import create_api
+from hikebutler.graph import service
+from hikebutler.state import GearResult, HikeButlerState, RouteResult
+
+
+def _state(location, duration, difficulty, user_id, session_id) -> HikeButlerState:
+    return {
+        "messages": [],
+        "user_profile": None,
+        "user_id": user_id,
+        "user_features": None,
+        "session_id": session_id,
+        "intermediate_results": {},
+        "current_task": "preparation",
+        "input_data": {"location": location, "duration": duration, "difficulty": difficulty},
+        "output_data": None,
+    }
+
+
+def _workflow(release: threading.Event = None):
+    def route(state):
+        return {"intermediate_results": {"route": RouteResult(status="done", name=state["input_data"]["location"])}}
+
+    def fusion(state):
+        if release is not None:
+            release.wait(5)
+        gear = GearResult(status="done", items=[["头灯", 1, ""]])
+        return {"output_data": {"plan": "计划", "gear_list": gear.items}}
+
+    graph = StateGraph(HikeButlerState)
+    graph.add_node("route", route)
+    graph.add_node("fusion", fusion)
+    graph.set_entry_point("route")
+    graph.add_edge("route", "fusion")
+    graph.add_edge("fusion", END)
+    return graph.compile()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(service, "preparation_state", _state)
+    monkeypatch.setattr(service, "preparation_workflow", _workflow())
+    return TestClient(create_api())
+
+
+def _events(text: str):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_plan_json(client):
+    """测试 JSON 响应包含工作流输出和请求 ID。"""
+    response = client.post("/v1/plan", json={"location": "北京香山"}, headers={"X-Request-ID": "req-1"})
+
+    assert response.status_code == 200
+    assert response.headers["x-request-id"] == "req-1"
+    body = response.json()
+    assert body["request_id"] == "req-1"
+    assert body["output"] == {"plan": "计划", "gear_list": [["头灯", 1, ""]]}
+
+
+def test_plan_stream(client):
+    """测试 SSE 逐个推送节点结果，最后推送 result 事件。"""
+    response = client.post("/v1/plan", json={"location": "北京香山", "stream": True})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert [event for event, _ in events] == ["node", "node", "result"]
+    assert events[0][1]["update"]["intermediate_results"]["route"]["name"] == "北京香山"
+    assert events[-1][1]["output"]["plan"] == "计划"
+    assert events[-1][1]["request_id"] == response.headers["x-request-id"]
+
+
+def test_plan_validation_and_timeout(client, monkeypatch):
+    """测试参数错误返回 400，超过服务端超时（含地点解析）返回 504 并带上重试用的 session_id。"""
+    assert client.post("/v1/plan", json={}).status_code == 400
+    assert client.post("/v1/plan", content=b"not json").status_code == 400
+
+    release = threading.Event()
+    monkeypatch.setattr(service, "preparation_workflow", _workflow(release))
+    monkeypatch.setattr(api_module, "_timeout", lambda: 0.1)
+    # 测试客户端关闭事件循环时会等待工作线程，超时后稍等再放行
+    threading.Timer(0.3, release.set).start()
+    response = client.post("/v1/plan", json={"location": "北京香山", "session_id": "s1"})
+    assert response.status_code == 504
+    assert response.json()["request_id"] == response.headers["x-request-id"]
+    assert response.json()["session_id"] == "s1"
+
+    def slow_state(*args):
+        release.wait(5)
+        return _state(*args)
+
+    release.clear()
+    monkeypatch.setattr(service, "preparation_workflow", _workflow())
+    monkeypatch.setattr(service, "preparation_state", slow_state)
+    threading.Timer(0.3, release.set).start()
+    response = client.post("/v1/plan", json={"location": "北京香山", "stream": True})
+    [(event, data)] = _events(response.text)
+    assert event == "error" and data["session_id"] == data["request_id"]
+
+
+def test_timeout_stops_after_current_node(monkeypatch):
+    """测试超时后工作流在当前节点完成时停止，不再运行后续节点。"""
+    release, ran = threading.Event(), []
+
+    def slow(state):
+        release.wait(5)
+        ran.append("slow")
+        return {"intermediate_results": {"slow": "done"}}
+
+    def after(state):
+        ran.append("after")
+        return {}
+
+    graph = StateGraph(HikeButlerState)
+    graph.add_node("slow", slow)
+    graph.add_node("after", after)
+    graph.set_entry_point("slow")
+    graph.add_edge("slow", "after")
+    graph.add_edge("after", END)
+    cancelled = threading.Event()
+    worker = threading.Thread(
+        target=api_module._drive, args=(graph.compile(), lambda: _state("香山", "", "", "u1", "s1"), cancelled)
+    )
+    worker.start()
+    cancelled.set()
+    release.set()
+    worker.join(5)
+    assert ran == ["slow"]
+
+
+def test_api_does_not_import_ui_dependencies():
+    """测试 API 不导入 gradio 和 pandas。"""
+    code = "import sys, hikebutler.api.app; print('gradio' in sys.modules or 'pandas' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "False"
+
+
+def test_plan_batch(client, monkeypatch):
+    """测试批量规划接口校验参数并以请求 ID 作为批次 ID。"""
+    from hikebutler.graph import batch
+
+    calls = []
+
+    def fake_batch(input_data, user_ids, batch_id=None):
+        calls.append((input_data["location"], user_ids, batch_id))
+        return {"batch_id": batch_id, "members": [{"user_id": u, "output": {}} for u in user_ids]}
+
+    monkeypatch.setattr(batch, "plan_batch", fake_batch)
+    assert client.post("/v1/plan/batch", json={"location": "北京香山"}).status_code == 400
+
+    response = client.post(
+        "/v1/plan/batch",
+        json={"location": "北京香山", "user_ids": ["a", "b"]},
+        headers={"X-Request-ID": "club-1"},
+    )
+    assert response.status_code == 200
+    assert calls == [("北京香山", ["a", "b"], "club-1")]
+    assert [m["user_id"] for m in response.json()["members"]] == ["a", "b"]
@@ -0,0 +1,100 @@
+"""
+批量规划测试
+"""
+
+import importlib
+from datetime import date
+from langchain_core.messages import AIMessage
+from hikebutler.graph import batch
+from hikebutler.graph import service
+from hikebutler.graph import workflow as workflow_module
+from hikebutler.state import PhotoPlanResult, RouteResult, UserFeatures
+from hikebutler.storage.plan_cache import PlanCache
+
+INPUT = {"location": "北京香山", "duration": "一天", "difficulty": "简单"}
+
+
+def _member_state(location, duration, difficulty, user_id, session_id):
+    if user_id == "broken":
+        raise RuntimeError("画像读取失败")
+    return {
+        "messages": [],
+        "user_profile": None,
+        "user_id": user_id,
+        "user_features": UserFeatures(trip_count=1, gear=["头灯"] if user_id == "alice" else []),
+        "session_id": session_id,
+        "intermediate_results": {},
+        "current_task": "preparation",
+        "input_data": {"location": location, "duration": duration, "difficulty": difficulty},
+        "output_data": None,
+    }
+
+
+def _patch(monkeypatch, cache):
+    """替换计划缓存、成员状态和融合调用，返回 (运行过的共享节点, 融合调用)。"""
+    plan_cache_module = importlib.import_module("hikebutler.nodes.plan_cache_node")
+    fusion_module = importlib.import_module("hikebutler.nodes.fusion_node")
+    monkeypatch.setattr(plan_cache_module, "get_plan_cache", lambda: cache)
+    monkeypatch.setattr(batch, "get_plan_cache", lambda: cache)
+    monkeypatch.setattr(batch, "resolve_location", lambda location: None)
+    monkeypatch.setattr(service, "preparation_state", _member_state)
+
+    fusions = []
+
+    class _Scheduler:
+        def invoke(self, messages, node=None):
+            fusions.append(node)
+            return AIMessage(content="计划")
+
+    monkeypatch.setattr(fusion_module, "get_batch_scheduler", lambda: _Scheduler())
+    ran = []
+    for name in ("route_node", "weather_node", "gear_node", "photo_plan_node"):
+        original = getattr(workflow_module, name)
+        monkeypatch.setattr(
+            workflow_module,
+            name,
+            lambda state, name=name, original=original: ran.append(name) or original(state),
+        )
+    monkeypatch.setattr(batch, "_shared_workflow", None)
+    monkeypatch.setattr(batch, "_member_workflow", None)
+    return ran, fusions
+
+
+def test_shared_stages_run_once(tmp_path, monkeypatch):
+    """测试共享阶段只运行一次，成员只运行个性化和融合，单个成员失败不影响其他成员。"""
+    cache = PlanCache(tmp_path / "plan_cache.sqlite")
+    ran, fusions = _patch(monkeypatch, cache)
+
+    result = batch.plan_batch(INPUT, ["alice", "bob", "alice", "broken"], max_workers=4)
+
+    assert sorted(ran) == ["gear_node", "photo_plan_node", "route_node", "weather_node"]
+    assert len(fusions) == 2
+    members = {member["user_id"]: member for member in result["members"]}
+    assert list(members) == ["alice", "bob", "broken"]
+    assert "output" in members["bob"]
+    assert members["broken"]["error"] == "画像读取失败"
+    # 共享产物写回计划缓存，当天的单人请求可以直接命中
+    assert cache.get(INPUT) is not None
+
+
+def test_members_personalize_cached_artifacts(tmp_path, monkeypatch):
+    """测试共享阶段命中计划缓存时只运行天气和装备，各成员的装备清单分别个性化。"""
+    cache = PlanCache(tmp_path / "plan_cache.sqlite")
+    cache.put(
+        INPUT,
+        date.today(),
+        {
+            "route": RouteResult(status="done", name="香山环线"),
+            "photo_plan": PhotoPlanResult(status="done"),
+        },
+    )
+    ran, fusions = _patch(monkeypatch, cache)
+    gear_module = importlib.import_module("hikebutler.nodes.gear_node")
+    monkeypatch.setattr(gear_module, "weather_gear", lambda weather: [["头灯", 1, ""], ["雨衣", 1, ""]])
+
+    result = batch.plan_batch(INPUT, ["alice", "bob"])
+
+    assert ran == ["weather_node", "gear_node"]
+    gear = {member["user_id"]: member["output"]["gear_list"] for member in result["members"]}
+    assert gear["alice"] == [["头灯", 1, "已有"], ["雨衣", 1, ""]]
+    assert gear["bob"] == [["头灯", 1, ""], ["雨衣", 1, ""]]
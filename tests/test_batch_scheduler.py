@@ -0,0 +1,103 @@
+"""
+LLM 调度器测试
+"""
+
+import threading
+import time
+import httpx
+import openai
+import pytest
+from hikebutler.models.batch_scheduler import LLMScheduler
+
+
+class FakeLLM:
+    """记录并发数的假 LLM。"""
+
+    def __init__(self, delay: float = 0.02, rate_limited: int = 0):
+        self.delay = delay
+        self.rate_limited = rate_limited
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, messages):
+        with self._lock:
+            self.calls += 1
+            if self.rate_limited > 0:
+                self.rate_limited -= 1
+                response = httpx.Response(
+                    429,
+                    headers={"retry-after": "0.01"},
+                    request=httpx.Request("POST", "http://llm.test"),
+                )
+                raise openai.RateLimitError("rate limited", response=response, body=None)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return f"echo:{messages}"
+
+
+def test_requests_dispatch_immediately_and_are_capped():
+    """测试请求提交后立即派发，并发数不超过上限，超出的请求排队。"""
+    llm = FakeLLM(delay=0.05)
+    scheduler = LLMScheduler(max_concurrency=3, llm_provider=lambda node, profile: llm)
+    futures = [scheduler.submit(i, node="gear") for i in range(9)]
+    time.sleep(0.02)
+
+    stats = scheduler.stats()
+    assert (stats["active"], stats["queued"]) == (3, 6)
+    assert [f.result(timeout=5) for f in futures] == [f"echo:{i}" for i in range(9)]
+    assert llm.peak == 3
+    assert scheduler.stats() == {"requests": 9, "queued": 0, "active": 0, "rate_limited": 0}
+    scheduler.shutdown()
+
+
+def test_rate_limit_backoff_and_retry():
+    """测试 429 时退避后重试成功。"""
+    llm = FakeLLM(delay=0, rate_limited=2)
+    scheduler = LLMScheduler(base_backoff=0.01, llm_provider=lambda node, profile: llm)
+
+    assert scheduler.invoke("hi", timeout=5) == "echo:hi"
+    assert scheduler.stats()["rate_limited"] == 2
+    scheduler.shutdown()
+
+
+def test_rate_limit_gives_up_after_max_retries():
+    """测试超过重试次数后返回限流异常。"""
+    llm = FakeLLM(delay=0, rate_limited=10)
+    scheduler = LLMScheduler(max_retries=1, llm_provider=lambda node, profile: llm)
+
+    with pytest.raises(openai.RateLimitError):
+        scheduler.invoke("hi", timeout=5)
+    scheduler.shutdown()
+
+
+def test_submit_after_shutdown_fails():
+    """测试关闭后提交请求直接报错，关闭前提交的请求正常完成。"""
+    llm = FakeLLM(delay=0.01)
+    scheduler = LLMScheduler(llm_provider=lambda node, profile: llm)
+    futures = [scheduler.submit(i) for i in range(4)]
+    scheduler.shutdown()
+
+    assert [f.result(timeout=5) for f in futures] == [f"echo:{i}" for i in range(4)]
+    assert scheduler.stats()["requests"] == 4
+    with pytest.raises(RuntimeError):
+        scheduler.submit("late")
+
+
+def test_default_provider_disables_sdk_retries(factory, monkeypatch):
+    """测试调度器使用的 LLM 关闭了 SDK 自带的重试。"""
+    from hikebutler.models import batch_scheduler
+
+    monkeypatch.setattr(batch_scheduler, "get_llm_for_node", factory.get_llm_for_node)
+    monkeypatch.setattr(batch_scheduler, "get_llm", factory.get_llm)
+
+    fusion = batch_scheduler._default_llm_provider("fusion", None).bound
+    assert fusion.runnable.max_retries == 0
+    assert fusion.fallbacks[0].max_retries == 0
+    assert batch_scheduler._default_llm_provider(None, "fast").max_retries == 0
+    # 节点直接使用的实例保持原有重试配置
+    assert factory.get_llm("fast").max_retries == 2
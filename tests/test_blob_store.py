@@ -0,0 +1,60 @@
+"""
+Blob 存储测试
+"""
+
+import pytest
+from hikebutler.storage.blob_store import BlobStore, is_blob_ref
+
+
+def test_put_and_get(tmp_path):
+    """测试写入与读取。"""
+    store = BlobStore(tmp_path, max_memory_items=1)
+    handle = store.put("<gpx></gpx>")
+
+    assert is_blob_ref(handle)
+    assert store.get_text(handle) == "<gpx></gpx>"
+    # 挤出内存缓存后仍可从磁盘读取
+    store.put(b"other")
+    assert store.get(handle) == b"<gpx></gpx>"
+
+
+def test_content_addressed(tmp_path):
+    """测试相同内容只存一份。"""
+    store = BlobStore(tmp_path)
+    assert store.put(b"same") == store.put(b"same")
+
+
+def test_missing_blob(tmp_path):
+    """测试读取不存在的 blob。"""
+    store = BlobStore(tmp_path)
+    with pytest.raises(KeyError):
+        store.get("blob://" + "0" * 64)
+    with pytest.raises(ValueError):
+        store.get("not-a-handle")
+
+
+def test_concurrent_put(tmp_path):
+    """测试并发写入同一内容。"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    store = BlobStore(tmp_path)
+    data = b"x" * 100_000
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        handles = set(executor.map(lambda _: store.put(data), range(32)))
+
+    assert len(handles) == 1
+    assert store.get(handles.pop()) == data
+    assert not [p for p in tmp_path.rglob("*") if p.is_file() and len(p.name) != 62]
+
+
+def test_delete_rejects_invalid_handle(tmp_path):
+    """测试删除时拒绝非 blob 句柄，避免误删存储目录外的文件。"""
+    store = BlobStore(tmp_path)
+    victim = tmp_path / "keep.txt"
+    victim.write_text("keep")
+
+    with pytest.raises(ValueError):
+        store.delete("../keep.txt")
+    with pytest.raises(ValueError):
+        store.delete("blob://../../keep.txt")
+    assert victim.exists()
@@ -0,0 +1,44 @@
+"""
+检查点配置测试
+"""
+
+import pytest
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+from hikebutler.graph.checkpoint import create_checkpointer
+from hikebutler.graph.workflow import create_preparation_workflow
+
+
+def _config(**checkpoint):
+    return {"langgraph": {"checkpoint": checkpoint}}
+
+
+def test_disabled():
+    """测试未启用时不创建检查点存储。"""
+    assert create_checkpointer(_config(enabled=False)) is None
+
+
+def test_sqlite_backend(tmp_path):
+    """测试 SQLite 后端创建数据库文件。"""
+    path = tmp_path / "nested" / "checkpoints.sqlite"
+    saver = create_checkpointer(_config(enabled=True, backend="sqlite", path=str(path)))
+
+    assert isinstance(saver, SqliteSaver)
+    assert path.exists()
+    saver.conn.close()
+
+
+def test_memory_backend():
+    """测试内存后端。"""
+    assert isinstance(create_checkpointer(_config(enabled=True, backend="memory")), InMemorySaver)
+
+
+def test_unknown_backend():
+    """测试不支持的后端。"""
+    with pytest.raises(ValueError):
+        create_checkpointer(_config(enabled=True, backend="redis"))
+
+
+def test_workflow_without_checkpointer():
+    """测试显式传入 None 时工作流不启用检查点。"""
+    assert create_preparation_workflow(checkpointer=None).checkpointer is None
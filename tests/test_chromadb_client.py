@@ -0,0 +1,125 @@
+"""
+ChromaDB 客户端测试
+"""
+
+import json
+import httpx
+import pytest
+from langchain_core.embeddings import Embeddings
+from hikebutler.database import chromadb_client
+from hikebutler.database.chroma_remote import RemoteChromaClient
+from hikebutler.database.chromadb_client import ChromaDBClient
+from hikebutler.state import UserFeatures
+
+
+class FakeEmbeddings(Embeddings):
+    """按关键词生成向量，并记录调用批次。"""
+
+    KEYWORDS = ["香山", "泰山", "黄山", "装备"]
+
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(len(texts))
+        return [[1.0 if k in t else 0.01 for k in self.KEYWORDS] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    fake = FakeEmbeddings()
+    monkeypatch.setattr(chromadb_client, "get_embedding", lambda: fake)
+    return fake
+
+
+def test_local_batched_add_and_search(tmp_path, embeddings):
+    """测试分批写入和批量查询。"""
+    client = ChromaDBClient({"mode": "local", "path": str(tmp_path), "batch_size": 2})
+    client.add_documents(
+        ["香山红叶", "泰山日出", "黄山云海", "装备清单"],
+        ids=["a", "b", "c", "d"],
+    )
+
+    assert embeddings.batches == [2, 2]
+    results = client.search_many(["香山", "黄山"], top_k=1, similarity_threshold=0.5)
+    assert [r[0]["document"] for r in results] == ["香山红叶", "黄山云海"]
+
+
+def test_region_shards(tmp_path, embeddings):
+    """测试按地区分片写入，未指定地区时合并所有分片的结果。"""
+    client = ChromaDBClient(
+        {"mode": "local", "path": str(tmp_path), "shards": ["north", "east"]}
+    )
+    client.add_documents(
+        ["香山红叶", "黄山云海", "装备清单"],
+        metadatas=[{"region": "north"}, {"region": "east"}, {}],
+        ids=["a", "b", "c"],
+    )
+
+    assert client.collections["north"].count() == 1
+    assert client.collections["east"].count() == 1
+    assert client.collection.count() == 1
+    assert client.search("黄山", similarity_threshold=0.5)[0]["document"] == "黄山云海"
+    assert client.search("黄山", similarity_threshold=0.5, region="north") == []
+
+
+def test_search_with_user_features(tmp_path, embeddings):
+    """测试带用户特征的检索：新手不返回 hard 路线，常去地区的路线排在前面。"""
+    client = ChromaDBClient({"mode": "local", "path": str(tmp_path)})
+    client.add_documents(
+        ["香山红叶 黄山", "香山 困难穿越", "香山 装备", "香山 泰山"],
+        metadatas=[{"geohash": "wtt"}, {"difficulty": "hard"}, {"difficulty": "easy"}, {"geohash": "wx4g1"}],
+        ids=["a", "b", "c", "d"],
+    )
+    features = UserFeatures(trip_count=1, level="beginner", regions=["wx4g"])
+
+    hits = client.search("香山", top_k=2, similarity_threshold=0.0, user_features=features)
+    assert [hit["document"] for hit in hits] == ["香山 泰山", "香山红叶 黄山"]
+    assert all(hit["metadata"].get("difficulty") != "hard" for hit in hits)
+    assert "score" in hits[0]
+    assert len(client.search("香山", top_k=4, similarity_threshold=0.0)) == 4
+
+
+def test_unknown_mode(tmp_path, embeddings):
+    """测试不支持的模式。"""
+    with pytest.raises(ValueError):
+        ChromaDBClient({"mode": "cloud"})
+
+
+def test_remote_collection_requests():
+    """测试远程集合发出的 REST 请求。"""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content) if request.content else None
+        requests.append((request.method, request.url.path, body))
+        if request.url.path.endswith("/collections"):
+            return httpx.Response(200, json={"id": "c1", "name": body["name"]})
+        if request.url.path.endswith("/query"):
+            return httpx.Response(
+                200,
+                json={"documents": [["d"]], "metadatas": [[None]], "distances": [[0.1]]},
+            )
+        if request.url.path.endswith("/count"):
+            return httpx.Response(200, json=3)
+        return httpx.Response(200, json=True)
+
+    client = RemoteChromaClient(http_client=httpx.Client(transport=httpx.MockTransport(handler)))
+    collection = client.get_or_create_collection("hiking_knowledge", {"hnsw:space": "cosine"})
+    collection.upsert(ids=["a"], embeddings=[[0.1]], documents=["d"], metadatas=[{}])
+    result = collection.query(query_embeddings=[[0.1], [0.2]], n_results=2)
+
+    prefix = "/api/v2/tenants/default_tenant/databases/default_database/collections"
+    assert requests[0][1] == prefix
+    assert requests[0][2]["get_or_create"] is True
+    assert requests[1] == (
+        "POST",
+        f"{prefix}/c1/upsert",
+        {"ids": ["a"], "embeddings": [[0.1]], "documents": ["d"], "metadatas": [None]},
+    )
+    assert requests[2][2]["query_embeddings"] == [[0.1], [0.2]]
+    assert result["distances"] == [[0.1]]
+    assert collection.count() == 3
@@ -0,0 +1,66 @@
+"""
+上下文预算器测试
+"""
+
+from hikebutler.models.context_budget import (
+    ContextBudgeter,
+    PromptSection,
+    compact_text,
+    dedupe_weather_hours,
+    estimate_tokens,
+)
+
+
+def test_estimate_tokens():
+    """测试 token 估算。"""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("北京香山") == 4
+    assert estimate_tokens("abcdefgh") == 2
+
+
+def test_compact_text_respects_budget():
+    """测试压缩后的文本不超过预算。"""
+    text = "\n".join(f"第{i}行：山路湿滑注意防滑" for i in range(200))
+    compacted = compact_text(text, 100)
+
+    assert estimate_tokens(compacted) <= 100
+    assert compacted.startswith("第0行")
+
+
+def test_low_priority_sections_are_compacted_first():
+    """测试超出预算时优先压缩低优先级段落。"""
+    budgeter = ContextBudgeter(context_window=8000, target_tokens=600, reserve_tokens=0)
+    route = "香山环线 10 公里，爬升 500 米"
+    memories = "\n".join(f"记忆 {i}：上次下雨脚滑了" for i in range(300))
+
+    prompt, report = budgeter.build(
+        [
+            PromptSection("历史记忆", memories, priority=5),
+            PromptSection("路线", route, priority=0),
+        ]
+    )
+
+    assert route in prompt
+    assert prompt.index("## 路线") < prompt.index("## 历史记忆")
+    assert report["prompt_tokens"] <= 600
+    assert report["sections"]["历史记忆"]["final"] < report["sections"]["历史记忆"]["original"]
+
+
+def test_budget_respects_context_window():
+    """测试预算不超过上下文窗口减去输出预留。"""
+    budgeter = ContextBudgeter(context_window=4000, target_tokens=10000, reserve_tokens=2000)
+    assert budgeter.budget == 2000
+
+
+def test_dedupe_weather_hours():
+    """测试合并相同天气的连续小时。"""
+    hours = [
+        {"time": "08:00", "condition": "晴", "temp": 12, "wind": 3},
+        {"time": "09:00", "condition": "晴", "temp": 14, "wind": 3},
+        {"time": "10:00", "condition": "晴", "temp": 15, "wind": 3},
+        {"time": "11:00", "condition": "小雨", "temp": 13, "wind": 5, "precip": 1.2},
+    ]
+
+    lines = dedupe_weather_hours(hours)
+
+    assert lines == ["08:00-10:00 晴 12~15°C 风 3m/s", "11:00 小雨 13°C 风 5m/s 降水 1.2mm"]
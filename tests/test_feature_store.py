@@ -0,0 +1,73 @@
+"""
+用户特征库测试
+"""
+
+from datetime import date
+from hikebutler.database.feature_store import (
+    FeatureStore,
+    format_features,
+    rag_filter,
+    rerank_hits,
+)
+
+
+def _trip(distance_km, ascent_m, geohash="wx4g0bm1", day="2024-05-01"):
+    return {
+        "distance_m": distance_km * 1000,
+        "ascent_m": ascent_m,
+        "duration_s": 3600 * 4,
+        "start_geohash": geohash,
+        "trip_date": date.fromisoformat(day),
+    }
+
+
+def test_apply_trip_is_incremental_and_idempotent(tmp_path):
+    """测试按徒步记录增量累加，同一 review_id 只累加一次。"""
+    store = FeatureStore(tmp_path / "features.sqlite")
+    assert store.get("u1").trip_count == 0
+
+    assert store.apply_trip("r1", "u1", _trip(10, 800))
+    assert store.apply_trip("r2", "u1", _trip(20, 200, geohash="wtw3sjq6", day="2024-06-01"))
+    assert not store.apply_trip("r2", "u1", _trip(20, 200))
+
+    features = store.get("u1")
+    assert features.trip_count == 2
+    assert features.total_distance_km == 30
+    assert features.max_ascent_m == 800
+    # 指数平滑偏向最近一次：0.3 * 20 + 0.7 * 10
+    assert features.typical_distance_km == 13
+    assert features.terrain == {"flat": 0.5, "mountain": 0.5}
+    assert features.level == "intermediate"
+    assert set(features.regions) == {"wx4g", "wtw3"}
+    assert features.last_trip_date == "2024-06-01"
+
+    # 重新打开后特征仍在
+    assert FeatureStore(tmp_path / "features.sqlite").get("u1") == features
+
+
+def test_profile_fields_are_merged_only_when_changed(tmp_path):
+    """测试画像中的装备和等级在画像变化时合并。"""
+    store = FeatureStore(tmp_path / "features.sqlite")
+    profile = {"gear": [{"name": "登山杖"}, "头灯"], "level": "advanced"}
+
+    assert store.get("u1", profile=profile).gear == ["登山杖", "头灯"]
+    assert not store.sync_profile("u1", profile)
+    assert store.get("u1", profile={**profile, "gear": []}).gear == []
+    assert store.get("u1").level == "advanced"
+    assert "已有装备" not in format_features(store.get("u1"))
+
+
+def test_rag_signals(tmp_path):
+    """测试 RAG 过滤条件和重排序。"""
+    store = FeatureStore(tmp_path / "features.sqlite")
+    store.apply_trip("r1", "u1", _trip(8, 300))
+    features = store.get("u1")
+    assert features.level == "beginner"
+    assert rag_filter(features) == {"difficulty": {"$ne": "hard"}}
+
+    hits = [
+        {"document": "远方高难路线", "distance": 0.20, "metadata": {"ascent_m": 2000}},
+        {"document": "常去地区路线", "distance": 0.25, "metadata": {"geohash": "wx4g12", "ascent_m": 250}},
+    ]
+    assert [h["document"] for h in rerank_hits(hits, features)] == ["常去地区路线", "远方高难路线"]
+    assert "经验等级: beginner" in format_features(features)
@@ -0,0 +1,177 @@
+"""
+离线地名库与地点解析测试
+"""
+
+import json
+import time
+import httpx
+from types import SimpleNamespace
+import hikebutler.tools.geocoding as geocoding
+import hikebutler.tools.mcp_tools as mcp_tools
+from hikebutler.geo.gazetteer import Gazetteer, Place, normalize, read_places
+from hikebutler.tools.geocoding import Geocoder, gcj02_to_wgs84, wgs84_to_gcj02
+
+PLACES = [
+    (Place("香山", 39.995, 116.188, admin="北京市 海淀区", kind="MT"), ["香山公园", "Xiangshan"]),
+    (Place("香山", 29.8, 121.9, admin="浙江省 宁波市", kind="PPL", rank=50000), ["Xiangshan"]),
+    (Place("东灵山", 40.04, 115.49, admin="北京市 门头沟区", kind="MT"), ["灵山", "Dongling Shan"]),
+    (Place("黄山", 30.13, 118.17, admin="安徽省 黄山市", kind="MT"), ["黄山风景区", "Huangshan"]),
+    (Place("四姑娘山", 31.1, 102.9, admin="四川省 阿坝藏族羌族自治州", kind="MT"), ["Siguniang Shan"]),
+]
+
+
+def test_normalize():
+    """测试全角、大小写、空白和标点。"""
+    assert normalize(" Xi'an ") == "xian"
+    assert normalize("ＨＵＡＮＧ Shan") == "huangshan"
+    assert normalize("北京·香山（公园）") == "北京香山公园"
+
+
+def test_gazetteer_lookup():
+    """测试精确、拼音、行政区前缀、通用后缀和模糊匹配。"""
+    gazetteer = Gazetteer(PLACES)
+    assert len(gazetteer) == 5
+
+    place, score = gazetteer.lookup("北京香山")
+    assert (place.admin, score) == ("北京市 海淀区", 1.0)
+    assert gazetteer.lookup("北京市海淀区香山")[0].lat == 39.995
+    # 没有行政区时按 rank
+    assert gazetteer.lookup("香山")[0].admin == "浙江省 宁波市"
+    assert gazetteer.lookup("宁波香山")[0].admin == "浙江省 宁波市"
+    assert gazetteer.lookup("香山公园")[0].admin == "北京市 海淀区"
+    assert gazetteer.lookup("xiang shan")[0].name == "香山"
+    assert gazetteer.lookup("黄山风景区")[0].name == "黄山"
+    assert gazetteer.lookup("安徽黄山景区")[0].name == "黄山"
+    assert gazetteer.lookup("北京灵山")[0].name == "东灵山"
+
+    place, score = gazetteer.lookup("四川四姑娘山景区")
+    assert place.name == "四姑娘山" and score == 1.0
+    place, score = gazetteer.lookup("四姑娘山大峰")
+    assert place.name == "四姑娘山" and 0.6 <= score < 1
+    assert gazetteer.lookup("四姑娘山大峰", min_score=0.9) is None
+    assert gazetteer.lookup("鳌太线") is None
+    assert gazetteer.lookup("  ") is None
+
+
+def test_read_places(tmp_path):
+    """测试 CSV 和 JSON 地名库文件。"""
+    csv_path = tmp_path / "places.csv"
+    csv_path.write_text(
+        "name,aliases,pinyin,lat,lon,admin,kind,rank,min_lat,min_lon,max_lat,max_lon\n"
+        "鳌太线,鳌山太白|太白鳌山,aotaixian,33.96,107.6,陕西省,route,,33.9,107.3,34.0,107.8\n",
+        encoding="utf-8",
+    )
+    [(place, aliases)] = read_places(csv_path)
+    assert place.name == "鳌太线" and place.bbox == (33.9, 107.3, 34.0, 107.8) and place.rank == 0.0
+    assert aliases == ["鳌山太白", "太白鳌山", "aotaixian"]
+
+    json_path = tmp_path / "places.json"
+    json_path.write_text(json.dumps([{"name": "武功山", "lat": 27.46, "lon": 114.17}]), encoding="utf-8")
+    gazetteer = Gazetteer(read_places(csv_path) + read_places(json_path))
+    assert gazetteer.lookup("太白鳌山")[0].name == "鳌太线"
+    assert gazetteer.lookup("武功山")[0].bbox is None
+
+
+def test_gcj02_roundtrip():
+    """测试 GCJ-02 偏移量级、逆转换精度和境外不偏移。"""
+    lat, lon = 39.9087, 116.3975
+    gcj = wgs84_to_gcj02(lat, lon)
+    offset_m = ((gcj[0] - lat) * 111320) ** 2 + ((gcj[1] - lon) * 111320 * 0.77) ** 2
+    assert 100 < offset_m**0.5 < 1000
+    back = gcj02_to_wgs84(*gcj)
+    assert abs(back[0] - lat) < 1e-7 and abs(back[1] - lon) < 1e-7
+    assert wgs84_to_gcj02(48.85, 2.35) == (48.85, 2.35)
+
+
+def test_geocoder_fallback_and_cache(tmp_path):
+    """测试地名库优先、远程和 LLM 兜底、持久化缓存和否定结果。"""
+    calls = []
+
+    def remote(query):
+        calls.append(("remote", query))
+        if query == "网络故障":
+            raise httpx.ConnectError("down")
+        return Place("武功山", 27.46, 114.17) if "武功" in query else None
+
+    def llm(query):
+        calls.append(("llm", query))
+        return Place("鳌太线", 33.96, 107.6) if "鳌太" in query else None
+
+    path = tmp_path / "geocode.sqlite"
+    geocoder = Geocoder(path, gazetteer=Gazetteer(PLACES), remote=remote, llm=llm)
+    assert geocoder.resolve("北京香山").source == "gazetteer"
+    assert calls == []
+
+    assert geocoder.resolve("江西武功山").source == "remote"
+    assert geocoder.resolve(" 江西 武功山").source == "remote"
+    assert geocoder.resolve("鳌太穿越").source == "llm"
+    assert geocoder.resolve("不存在的地方") is None
+    assert geocoder.resolve("不存在的地方") is None
+    assert geocoder.resolve("网络故障") is None
+    assert geocoder.resolve("网络故障") is None
+    assert calls == [
+        ("remote", "江西武功山"),
+        ("remote", "鳌太穿越"),
+        ("llm", "鳌太穿越"),
+        ("remote", "不存在的地方"),
+        ("llm", "不存在的地方"),
+        ("remote", "网络故障"),
+        ("llm", "网络故障"),
+        ("remote", "网络故障"),
+        ("llm", "网络故障"),
+    ]
+    geocoder.close()
+
+    # 重新打开后缓存仍在，否定结果过期后重试
+    calls.clear()
+    reopened = Geocoder(path, remote=remote, llm=llm, negative_ttl=0)
+    assert len(reopened) == 3
+    place = reopened.resolve("江西武功山")
+    assert (place.name, place.lat, place.source) == ("武功山", 27.46, "remote")
+    assert reopened.resolve("不存在的地方") is None
+    assert calls == [("remote", "不存在的地方"), ("llm", "不存在的地方")]
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        reopened.resolve("江西武功山")
+    assert (time.perf_counter() - start) / 1000 < 1e-3
+
+
+def test_amap_and_llm_resolvers(monkeypatch):
+    """测试高德结果解析和坐标转换，以及 LLM 输出解析。"""
+    config = {
+        "mcp_tools": {"amap": {"enabled": True, "api_key": "k", "url": "https://restapi.amap.com/v3/geocode/geo"}},
+        "geocoding": {},
+    }
+    monkeypatch.setattr(mcp_tools, "load_config", lambda: config)
+    monkeypatch.setattr(geocoding, "load_config", lambda: config)
+    gcj = wgs84_to_gcj02(39.995, 116.188)
+
+    def handler(request):
+        assert request.url.params["address"] == "北京香山" and request.url.params["key"] == "k"
+        geocode = {
+            "formatted_address": "北京市海淀区香山",
+            "province": "北京市",
+            "city": [],
+            "district": "海淀区",
+            "location": f"{gcj[1]:.6f},{gcj[0]:.6f}",
+            "level": "兴趣点",
+        }
+        return httpx.Response(200, json={"status": "1", "geocodes": [geocode]})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(mcp_tools, "get_http_client", lambda url=None: client)
+    place = geocoding._remote_place("北京香山")
+    assert place.name == "北京市海淀区香山" and place.admin == "北京市 海淀区"
+    assert abs(place.lat - 39.995) < 1e-5 and abs(place.lon - 116.188) < 1e-5
+
+    config["mcp_tools"]["amap"]["api_key"] = "${AMAP_API_KEY}"
+    assert mcp_tools.amap_configured() is False
+    assert mcp_tools.mcp_amap_geocode("北京香山") is None
+
+    replies = iter(['坐标如下：{"name": "鳌太线", "lat": 33.96, "lon": 107.6}', "null", '{"lat": 200, "lon": 0}'])
+    scheduler = SimpleNamespace(invoke=lambda messages, node, timeout: SimpleNamespace(content=next(replies)))
+    monkeypatch.setattr(geocoding, "get_batch_scheduler", lambda: scheduler)
+    assert geocoding._llm_place("鳌太穿越").name == "鳌太线"
+    assert geocoding._llm_place("乱写") is None
+    assert geocoding._llm_place("越界") is None
@@ -0,0 +1,124 @@
+"""
+HTTP 连接管理器测试
+"""
+
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from hikebutler.network.http_pool import HTTPConnectionManager, _DNSCache, _host_of
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def reset_manager():
+    """每个测试使用新的连接管理器。"""
+    HTTPConnectionManager.reset()
+    yield
+    HTTPConnectionManager.reset()
+
+
+@pytest.fixture
+def local_server():
+    """本地 HTTP 服务。"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_host_of():
+    """测试主机名提取。"""
+    assert _host_of("https://api.deepseek.com/v1") == "api.deepseek.com"
+    assert _host_of("localhost") == "localhost"
+    assert _host_of(None) == "default"
+
+
+def test_same_host_shares_client(local_server):
+    """测试同一主机共享连接池并记录延迟。"""
+    manager = HTTPConnectionManager()
+    client = manager.get_client(f"{local_server}/a")
+
+    assert manager.get_client(f"{local_server}/b") is client
+    assert client.get(f"{local_server}/a").text == "ok"
+    assert manager.latency_stats()["127.0.0.1"]["requests"] >= 1
+
+
+def test_dns_cache_reuses_results(monkeypatch):
+    """测试 DNS 缓存在 TTL 内复用解析结果。"""
+    calls = []
+
+    def fake_getaddrinfo(host, port, *args, **kwargs):
+        calls.append(host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.1", port))]
+
+    monkeypatch.setattr(socket, "getaddrinfo", fake_getaddrinfo)
+    cache = _DNSCache(ttl=60)
+
+    assert cache.resolve("example.com", 443) == "10.0.0.1"
+    assert cache.resolve("example.com", 443) == "10.0.0.1"
+    assert cache.resolve("127.0.0.1", 80) == "127.0.0.1"
+    assert calls == ["example.com"]
+
+
+def test_dns_cache_evicts_oldest(monkeypatch):
+    """测试 DNS 缓存超过容量时淘汰最久未使用的条目。"""
+    monkeypatch.setattr(
+        socket,
+        "getaddrinfo",
+        lambda host, port, *a, **k: [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.1", port))],
+    )
+    cache = _DNSCache(ttl=60, max_entries=2)
+    for host in ("a.com", "b.com", "c.com"):
+        cache.resolve(host, 443)
+
+    assert list(cache._cache) == [("b.com", 443), ("c.com", 443)]
+
+
+def test_dns_cache_not_installed_globally(local_server):
+    """测试 DNS 缓存只作用于连接池，不替换进程级的 socket.getaddrinfo。"""
+    original = socket.getaddrinfo
+    client = HTTPConnectionManager().get_client(local_server)
+
+    assert client.get(local_server).text == "ok"
+    assert socket.getaddrinfo is original
+
+
+def test_env_proxy_is_mounted(local_server, monkeypatch):
+    """测试 trust_env 时按代理环境变量经代理发送请求，NO_PROXY 中的主机直连，并同样记录延迟。"""
+    seen = []
+
+    class _ProxyHandler(_OkHandler):
+        def do_GET(self):
+            seen.append(self.path)
+            super().do_GET()
+
+    proxy = ThreadingHTTPServer(("127.0.0.1", 0), _ProxyHandler)
+    threading.Thread(target=proxy.serve_forever, daemon=True).start()
+    monkeypatch.setenv("HTTP_PROXY", f"http://127.0.0.1:{proxy.server_port}")
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    manager = HTTPConnectionManager()
+    try:
+        client = manager.get_client("http://api.example.invalid")
+        assert client.get("http://api.example.invalid/v1").text == "ok"
+        assert seen == ["http://api.example.invalid/v1"]
+        assert manager.latency_stats()["api.example.invalid"]["requests"] == 1
+
+        assert manager.get_client(local_server).get(local_server).text == "ok"
+        assert len(seen) == 1
+    finally:
+        proxy.shutdown()
@@ -0,0 +1,99 @@
+"""
+后台任务队列测试
+"""
+
+import time
+from hikebutler.jobs import handlers
+from hikebutler.jobs.queue import JobQueue
+from hikebutler.jobs.worker import WorkerPool
+
+
+def test_enqueue_is_idempotent(tmp_path):
+    """测试相同幂等键只入队一次。"""
+    queue = JobQueue(tmp_path / "jobs.sqlite")
+    first = queue.enqueue("trip.save", {"a": 1}, idempotency_key="k1")
+    second = queue.enqueue("trip.save", {"a": 2}, idempotency_key="k1")
+
+    assert first == second
+    assert queue.stats()["pending"] == 1
+    assert queue.claim().payload == {"a": 1}
+    assert queue.claim() is None
+
+
+def test_retry_with_backoff_then_dead_letter(tmp_path):
+    """测试失败任务按退避重试，超过次数后进入死信，可重新入队。"""
+    queue = JobQueue(tmp_path / "jobs.sqlite", max_attempts=2, base_backoff=0.05)
+    calls = []
+
+    def flaky(payload):
+        calls.append(payload)
+        raise ConnectionError("MySQL 不可用")
+
+    pool = WorkerPool(queue, {"flaky": flaky})
+    job_id = queue.enqueue("flaky", {"n": 1})
+
+    pool.drain()
+    assert len(calls) == 1
+    assert queue.stats()["depth"] == 0  # 退避中，尚未到期
+    time.sleep(0.06)
+    pool.drain()
+
+    assert len(calls) == 2
+    dead = queue.dead_letters()
+    assert [job["id"] for job in dead] == [job_id]
+    assert "MySQL 不可用" in dead[0]["last_error"]
+    assert pool.stats()["retried"] == 1 and pool.stats()["dead"] == 1
+
+    assert queue.retry_dead(job_id)
+    assert queue.stats()["depth"] == 1
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    """测试租约过期的任务会被重新领取。"""
+    queue = JobQueue(tmp_path / "jobs.sqlite", lease=0.05)
+    queue.enqueue("trip.save", {})
+    assert queue.claim().attempts == 1
+    assert queue.claim() is None
+
+    time.sleep(0.06)
+    job = queue.claim()
+    assert job.attempts == 2
+    queue.complete(job.id)
+    assert queue.stats()["done"] == 1
+
+
+def test_stats_report_depth_and_lag(tmp_path):
+    """测试队列深度和延迟指标。"""
+    queue = JobQueue(tmp_path / "jobs.sqlite")
+    queue.enqueue("a", {})
+    queue.enqueue("b", {}, delay=60)
+    time.sleep(0.02)
+
+    stats = queue.stats()
+    assert stats["pending"] == 2
+    assert stats["depth"] == 1
+    assert stats["lag"] >= 0.02
+
+
+def test_worker_threads_process_review_jobs(tmp_path, monkeypatch):
+    """测试复盘任务入队后由工作线程执行，重复提交不会重复执行。"""
+    queue = JobQueue(tmp_path / "jobs.sqlite")
+    monkeypatch.setattr(handlers, "get_job_queue", lambda: queue)
+    done = []
+    pool = WorkerPool(
+        queue,
+        {kind: (lambda payload, kind=kind: done.append(kind)) for kind in handlers.HANDLERS},
+        poll_interval=0.01,
+    )
+    pool.start()
+    try:
+        for _ in range(2):
+            handlers.enqueue_review_jobs("review-1", "u1", "blob://x", [], "很开心", "帖子")
+        pool.notify()
+        deadline = time.monotonic() + 5
+        while queue.stats()["done"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        pool.stop()
+
+    assert sorted(done) == ["kb.ingest", "memory.add", "trip.save"]
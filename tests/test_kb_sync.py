@@ -0,0 +1,114 @@
+"""
+知识库增量同步测试
+"""
+
+import json
+import threading
+import pytest
+from langchain_core.embeddings import Embeddings
+from hikebutler.database import chromadb_client
+from hikebutler.database.chromadb_client import ChromaDBClient
+from hikebutler.database.kb_sync import KnowledgeBaseSync, SourceDocument, split_text
+
+
+class CountingEmbeddings(Embeddings):
+    """记录生成 embedding 的文本数。"""
+
+    def __init__(self):
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@pytest.fixture
+def syncer(tmp_path, monkeypatch):
+    embeddings = CountingEmbeddings()
+    monkeypatch.setattr(chromadb_client, "get_embedding", lambda: embeddings)
+    client = ChromaDBClient({"mode": "local", "path": str(tmp_path / "chroma")})
+    instance = KnowledgeBaseSync(client, tmp_path / "manifest.sqlite", chunk_size=40, chunk_overlap=0)
+    instance.embeddings = embeddings
+    return instance
+
+
+def _doc(source_id, paragraphs):
+    return SourceDocument(source_id, "\n\n".join(paragraphs))
+
+
+def test_split_text_prefers_boundaries():
+    """测试分块在段落边界处断开。"""
+    chunks = split_text("第一段内容。" * 5 + "\n\n" + "第二段内容。" * 5, chunk_size=40, chunk_overlap=0)
+    assert chunks[0].endswith("。")
+    assert all(len(c) <= 40 for c in chunks)
+
+
+def test_only_changed_chunks_are_embedded(syncer):
+    """测试只对变化的分块生成 embedding。"""
+    first = syncer.sync([_doc("a", ["香山红叶" * 8, "门票十元" * 8]), _doc("b", ["泰山" * 10])])
+    assert (first.added, syncer.embeddings.embedded) == (2, 3)
+
+    syncer.embeddings.embedded = 0
+    second = syncer.sync([_doc("a", ["香山红叶" * 8, "门票免费" * 8]), _doc("b", ["泰山" * 10])])
+
+    assert (second.updated, second.unchanged) == (1, 1)
+    assert syncer.embeddings.embedded == 1
+    assert second.chunks_deleted == 1
+    assert syncer.client.collection.count() == 3
+    assert syncer.sources["a"]["version"] == 2
+
+
+def test_deleted_sources_and_compact(syncer):
+    """测试删除源文档后留下墓碑，压缩时清理墓碑和孤立分块。"""
+    syncer.sync([_doc("a", ["香山" * 10]), _doc("b", ["泰山" * 10])])
+    syncer.client.upsert_documents(["残留"], metadatas=[{"source_id": "x"}], ids=["x#orphan"])
+    syncer.client.add_documents(["手动文档"], ids=["manual"])
+
+    report = syncer.sync([_doc("a", ["香山" * 10])])
+    assert report.deleted == 1
+    assert syncer.sources["b"]["deleted"] is True
+
+    assert syncer.compact() == 1
+    assert "b" not in syncer.sources
+    assert sorted(syncer.client.list_ids()) == sorted(syncer.sources["a"]["chunks"] + ["manual"])
+
+    # 清单持久化，重新加载后不会重复生成 embedding
+    reloaded = KnowledgeBaseSync(syncer.client, syncer.manifest_path, chunk_size=40, chunk_overlap=0)
+    syncer.embeddings.embedded = 0
+    assert reloaded.sync([_doc("a", ["香山" * 10])]).unchanged == 1
+    assert syncer.embeddings.embedded == 0
+
+
+def test_concurrent_syncers_share_manifest(syncer):
+    """测试共用清单的多个同步器（多个进程）同时入库时不丢失更新。"""
+    other = KnowledgeBaseSync(syncer.client, syncer.manifest_path, chunk_size=40, chunk_overlap=0)
+    documents = [_doc(f"trip:{i}", [f"香山{i}"]) for i in range(10)]
+    threads = [
+        threading.Thread(target=(syncer, other)[i % 2].sync, args=([document],), kwargs={"full": False})
+        for i, document in enumerate(documents)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(syncer.sources) == len(other.sources) == 10
+    assert sorted(syncer.client.list_ids()) == sorted(
+        cid for entry in other.sources.values() for cid in entry["chunks"]
+    )
+
+
+def test_import_legacy_json_manifest(syncer, tmp_path):
+    """测试旧版 JSON 清单在新清单为空时导入，导入后内容未变的文档不重复生成 embedding。"""
+    syncer.sync([_doc("a", ["香山" * 10])])
+    legacy = {"version": 1, "sources": syncer.sources}
+    (tmp_path / "kb.json").write_text(json.dumps(legacy, ensure_ascii=False), encoding="utf-8")
+
+    imported = KnowledgeBaseSync(syncer.client, tmp_path / "kb.sqlite", chunk_size=40, chunk_overlap=0)
+    assert imported.sources == syncer.sources
+    syncer.embeddings.embedded = 0
+    assert imported.sync([_doc("a", ["香山" * 10])]).unchanged == 1
+    assert syncer.embeddings.embedded == 0
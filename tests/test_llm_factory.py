@@ -0,0 +1,34 @@
+"""
+LLM 工厂测试
+"""
+
+import pytest
+from langchain_core.runnables import RunnableWithFallbacks
+
+
+def test_profile_inherits_default_config(factory):
+    """测试档位继承默认配置。"""
+    fast = factory.get_llm("fast")
+
+    assert fast.model_name == "deepseek-chat"
+    assert fast.max_tokens == 300
+    assert factory.get_llm("fast") is fast
+
+
+def test_profile_with_fallback(factory):
+    """测试配置了 fallback 的档位带超时回退。"""
+    quality = factory.get_llm("quality")
+
+    assert isinstance(quality, RunnableWithFallbacks)
+    assert quality.runnable.model_name == "deepseek-reasoner"
+    assert quality.fallbacks[0].max_tokens == 300
+    # 主档位不在 SDK 内重试，超时后立即回退
+    assert quality.runnable.max_retries == 0
+    assert quality.fallbacks[0].max_retries == 2
+
+
+def test_unknown_profile(factory):
+    """测试未定义的档位。"""
+    with pytest.raises(ValueError):
+        factory.get_llm("turbo")
+
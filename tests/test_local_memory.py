@@ -0,0 +1,84 @@
+"""
+本地记忆后端测试
+"""
+
+from hikebutler.memory import mem0_client
+from hikebutler.memory.local_backend import LocalMemoryStore, get_local_store
+from hikebutler.memory.mem0_client import Mem0Client
+
+
+def _add(store, user_id, *contents, metadata=None):
+    messages = [{"role": "user", "content": c} for c in contents]
+    return store.add(messages, filters={"user_id": user_id}, metadata=metadata)["results"]
+
+
+def test_search_ranks_by_similarity_per_user(tmp_path):
+    """测试召回按相关度排序，且只返回该用户的记忆。"""
+    store = LocalMemoryStore(tmp_path / "memories.sqlite")
+    _add(store, "u1", "雨天下山脚滑，需要登山杖", "夏天爬泰山要带防晒", "膝盖不好需要护膝")
+    _add(store, "u2", "雨天下山脚滑")
+
+    results = store.search("下雨天下山", filters={"user_id": "u1"}, top_k=2)["results"]
+
+    assert results[0]["memory"] == "雨天下山脚滑，需要登山杖"
+    assert results[0]["score"] >= results[1]["score"]
+    assert {r["user_id"] for r in results} == {"u1"}
+    assert store.search("雨天", filters={"user_id": "u3"})["results"] == []
+
+
+def test_near_duplicates_are_merged(tmp_path):
+    """测试近似重复的记忆合并为一条。"""
+    store = LocalMemoryStore(tmp_path / "memories.sqlite")
+    first = _add(store, "u1", "上次雨天徒步时脚滑了，需要注意防滑", metadata={"trip": "香山"})
+    second = _add(store, "u1", "上次雨天徒步时脚滑了，要注意防滑", metadata={"type": "review"})
+
+    assert [first[0]["event"], second[0]["event"]] == ["ADD", "UPDATE"]
+    records = store.get_all(filters={"user_id": "u1"})["results"]
+    assert len(records) == 1
+    assert records[0]["memory"] == "上次雨天徒步时脚滑了，要注意防滑"
+    assert records[0]["metadata"] == {"trip": "香山", "type": "review"}
+    assert records[0]["hits"] == 2
+
+
+def test_index_reloads_from_sqlite(tmp_path):
+    """测试重新打开后从 SQLite 恢复索引，get_all 第一页是最近的记忆。"""
+    path = tmp_path / "memories.sqlite"
+    store = LocalMemoryStore(path)
+    _add(store, "u1", "香山红叶", "泰山日出", "黄山云海")
+    store.close()
+
+    store = LocalMemoryStore(path)
+    assert store.search("黄山", filters={"user_id": "u1"}, top_k=1)["results"][0]["memory"] == "黄山云海"
+    page = store.get_all(filters={"user_id": "u1"}, page=1, page_size=2)["results"]
+    assert [r["memory"] for r in page] == ["泰山日出", "黄山云海"]
+
+
+def test_index_sees_writes_from_other_processes(tmp_path):
+    """测试已载入的用户索引在访问时读入其他进程（另一个实例）新增和合并的记忆。"""
+    path = tmp_path / "memories.sqlite"
+    store = LocalMemoryStore(path)
+    writer = LocalMemoryStore(path)
+    _add(store, "u1", "香山红叶")
+    assert store.search("雨天", filters={"user_id": "u1"})["results"][0]["memory"] == "香山红叶"
+
+    _add(writer, "u1", "上次雨天徒步时脚滑了，需要注意防滑", "香山红叶")
+    _add(writer, "u1", "上次雨天徒步时脚滑了，要注意防滑")
+    results = store.search("雨天防滑", filters={"user_id": "u1"}, top_k=1)["results"]
+    assert results[0]["memory"] == "上次雨天徒步时脚滑了，要注意防滑" and results[0]["hits"] == 2
+
+    # 其他进程写入的重复记忆也会被合并，而不是新增
+    assert _add(store, "u1", "香山红叶")[0]["event"] == "UPDATE"
+    assert len(store.get_all(filters={"user_id": "u1"})["results"]) == 2
+
+
+def test_mem0_client_local_backend(tmp_path, monkeypatch):
+    """测试 Mem0Client 切换到本地后端。"""
+    config = {"mem0": {"backend": "local", "local": {"path": str(tmp_path / "m.sqlite")}}}
+    monkeypatch.setattr(mem0_client, "load_config", lambda: config)
+
+    client = Mem0Client()
+    client.add_memories("u1", [("雨天路滑要带登山杖", None), ("膝盖酸痛", {"type": "review"})])
+
+    assert client.client is get_local_store(config["mem0"]["local"])
+    assert client.get_memories("u1", query="下雨", limit=1)[0]["memory"] == "雨天路滑要带登山杖"
+    assert len(Mem0Client().get_memories("u1")) == 2
@@ -0,0 +1,44 @@
+"""
+LLM 调用指标测试
+"""
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_openai import ChatOpenAI
+from hikebutler.models.metrics import LLMMetrics, get_llm_metrics
+
+
+def test_recommend_profiles():
+    """测试按延迟目标推荐最便宜的档位。"""
+    metrics = LLMMetrics()
+    for _ in range(30):
+        metrics.record("route", "fast", 400, cost=0.001)
+        metrics.record("route", "quality", 2500, cost=0.01)
+        metrics.record("fusion", "fast", 900, cost=0.001)
+        metrics.record("fusion", "quality", 1500, cost=0.01)
+
+    assert metrics.recommend_profiles(latency_slo_ms=1000) == {"route": "fast", "fusion": "fast"}
+    assert metrics.recommend_profiles(latency_slo_ms=300) == {}
+    assert metrics.summary()["route"]["fast"]["calls"] == 30
+
+
+def test_callback_records_node_from_routing(factory, monkeypatch):
+    """测试经 get_llm_for_node 调用时，指标按节点和档位归类。"""
+
+    def fake_generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content="ok"))],
+            llm_output={"token_usage": {"prompt_tokens": 1000, "completion_tokens": 500}},
+        )
+
+    monkeypatch.setattr(ChatOpenAI, "_generate", fake_generate)
+    metrics = get_llm_metrics()
+    metrics.reset()
+
+    assert factory.get_llm_for_node("route").invoke("hi").content == "ok"
+
+    summary = metrics.summary()
+    assert summary["route"]["fast"]["calls"] == 1
+    assert summary["route"]["fast"]["prompt_tokens"] == 1000
+    assert "unknown" not in summary
+    metrics.reset()
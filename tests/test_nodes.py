@@ -39,3 +39,28 @@ def test_weather_node():
     result = weather_node(state)
     assert "weather" in result["intermediate_results"]
 
+
+
+def test_fusion_node_propagates_llm_errors(monkeypatch):
+    """测试融合失败时抛出异常，而不是把占位文本当作计划返回。"""
+    import importlib
+
+    fusion_module = importlib.import_module("hikebutler.nodes.fusion_node")
+
+    class _FailingScheduler:
+        def invoke(self, messages, node=None):
+            raise TimeoutError("llm timeout")
+
+    monkeypatch.setattr(fusion_module, "get_batch_scheduler", lambda: _FailingScheduler())
+    state: HikeButlerState = {
+        "messages": [],
+        "user_profile": None,
+        "user_id": None,
+        "intermediate_results": {},
+        "current_task": "preparation",
+        "input_data": {"location": "北京香山"},
+        "output_data": None,
+    }
+
+    with pytest.raises(TimeoutError):
+        fusion_module.fusion_node(state)
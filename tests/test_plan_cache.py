@@ -0,0 +1,121 @@
+"""
+计划缓存测试
+"""
+
+import importlib
+from datetime import date
+from langchain_core.messages import AIMessage
+from hikebutler.graph import workflow as workflow_module
+from hikebutler.graph.workflow import create_preparation_workflow
+from hikebutler.state import PhotoPlanResult, RouteResult, UserFeatures
+from hikebutler.storage.plan_cache import PlanCache, cacheable, input_key
+
+INPUT = {"location": "北京香山", "duration": "一天", "difficulty": "简单"}
+
+
+def _artifacts():
+    return {
+        "route": RouteResult(status="done", name="香山环线", ascent_m=1200, lat=39.99, lon=116.19),
+        "photo_plan": PhotoPlanResult(status="done", spots=["香炉峰"]),
+    }
+
+
+def test_put_and_get_restore_dataclasses(tmp_path):
+    """测试产物按输入和日期缓存，读取后还原为原类型。"""
+    cache = PlanCache(tmp_path / "plan_cache.sqlite")
+    day = date(2024, 5, 1)
+    cache.put({**INPUT, "location": " 北京香山 "}, day, _artifacts())
+
+    artifacts = cache.get(INPUT, day)
+    assert artifacts["route"] == _artifacts()["route"]
+    assert isinstance(artifacts["photo_plan"], PhotoPlanResult)
+    assert cache.get(INPUT, date(2024, 5, 2)) is None
+    assert cache.get({**INPUT, "difficulty": "困难"}, day) is None
+
+
+def test_key_covers_date_and_coordinates():
+    """测试徒步日期和起终点坐标计入缓存键，带用户路线 GPX 的请求不使用缓存。"""
+    located = {**INPUT, "lat": 39.995, "lon": 116.188}
+    assert input_key(located) == input_key({**located, "lat": 39.9950001, "place": "香山"})
+    point_to_point = {**located, "end_lat": 40.0, "end_lon": 116.2}
+    assert len({input_key(INPUT), input_key(located), input_key(point_to_point)}) == 3
+    assert input_key({**INPUT, "date": "2026-06-21"}) != input_key({**INPUT, "date": "2026-06-22"})
+    assert input_key({**INPUT, "date": None}) == input_key(INPUT)
+
+    assert cacheable(located) and not cacheable({**INPUT, "route_gpx_ref": "blob"})
+    assert not cacheable({**INPUT, "location": ""})
+
+
+def test_top_inputs_from_request_log(tmp_path):
+    """测试按请求日志挑选热门组合，记录的输入带坐标，预热时按同样的输入运行。"""
+    cache = PlanCache(tmp_path / "plan_cache.sqlite")
+    for _ in range(3):
+        cache.log_request({**INPUT, "lat": 39.995, "lon": 116.188, "place": "香山"})
+    cache.log_request({**INPUT, "location": "泰山"})
+
+    top = cache.top_inputs(limit=1)
+    assert top == [({**INPUT, "lat": 39.995, "lon": 116.188}, 3)]
+
+
+def test_cache_hit_skips_unpersonalized_nodes(tmp_path, monkeypatch):
+    """测试命中缓存时跳过路线和拍摄计划，装备按当天天气重新生成，相似徒步按当前用户补查。"""
+    cache = PlanCache(tmp_path / "plan_cache.sqlite")
+    cache.put(INPUT, date.today(), _artifacts())
+    plan_cache_module = importlib.import_module("hikebutler.nodes.plan_cache_node")
+    fusion_module = importlib.import_module("hikebutler.nodes.fusion_node")
+    gear_module = importlib.import_module("hikebutler.nodes.gear_node")
+    route_module = importlib.import_module("hikebutler.nodes.route_node")
+    monkeypatch.setattr(plan_cache_module, "get_plan_cache", lambda: cache)
+    monkeypatch.setattr(gear_module, "weather_gear", lambda weather: [["登山杖", 1, "下山护膝"]])
+
+    class _Index:
+        def similar_to_plan(self, lat, lon, distance_km=None, ascent_m=None, k=5, user_id=None):
+            return [{"review_id": f"{user_id}-trip", "distance": 0.1}]
+
+    monkeypatch.setattr(route_module, "get_trip_index", lambda: _Index())
+
+    class _Scheduler:
+        def invoke(self, messages, node=None):
+            return AIMessage(content="计划")
+
+    monkeypatch.setattr(fusion_module, "get_batch_scheduler", lambda: _Scheduler())
+    ran = []
+    for name in ("route_node", "gear_node", "photo_plan_node"):
+        original = getattr(workflow_module, name)
+        monkeypatch.setattr(
+            workflow_module,
+            name,
+            lambda state, name=name, original=original: ran.append(name) or original(state),
+        )
+
+    workflow = create_preparation_workflow(checkpointer=None)
+    result = workflow.invoke(
+        {
+            "messages": [],
+            "user_profile": None,
+            "user_id": "u1",
+            "user_features": UserFeatures(trip_count=3, max_ascent_m=500, gear=["登山杖"]),
+            "intermediate_results": {},
+            "current_task": "preparation",
+            "input_data": dict(INPUT),
+            "output_data": None,
+        }
+    )
+
+    assert ran == ["gear_node"]
+    assert result["output_data"]["gear_list"][0] == ["登山杖", 1, "下山护膝（已有）"]
+    route = result["intermediate_results"]["route"]
+    assert "超过你以往的最大爬升" in route.message
+    assert route.similar_trips == [{"review_id": "u1-trip", "distance": 0.1}]
+    assert result["intermediate_results"]["weather"] is not None
+    assert cache.top_inputs() == [(INPUT, 1)]
+
+    # 带用户自己路线 GPX 的请求不读写缓存
+    state = {
+        "messages": [],
+        "user_id": "u1",
+        "intermediate_results": {},
+        "input_data": {**INPUT, "route_gpx_ref": "missing"},
+    }
+    assert plan_cache_module.plan_cache_node(state) == {}
+    assert cache.top_inputs() == [(INPUT, 1)]
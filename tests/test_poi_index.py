@@ -0,0 +1,149 @@
+"""
+步道知识点空间索引测试
+"""
+
+import importlib
+import json
+import numpy as np
+import hikebutler.geo.poi_index as poi_module
+from hikebutler.geo.poi_index import PoiIndex, read_geojson, write_poi_index
+from hikebutler.geo.track import segment_lengths
+from hikebutler.state import RouteResult
+from hikebutler.storage.blob_store import BlobStore
+from tests.test_route_weather import _gpx, _ridge
+
+route_module = importlib.import_module("hikebutler.nodes.route_node")
+photo_module = importlib.import_module("hikebutler.nodes.photo_plan_node")
+
+M_PER_DEG = 111320.0
+
+
+def _random_index(tmp_path, n: int = 5000, cell_deg: float = 0.01):
+    rng = np.random.default_rng(1)
+    lat = rng.uniform(39.9, 40.1, n)
+    lon = rng.uniform(116.0, 116.3, n)
+    kinds = np.array(["water", "shelter", "viewpoint"])[rng.integers(0, 3, n)]
+    pois = [{"name": f"p{i}", "kind": k, "lat": a, "lon": b} for i, (a, b, k) in enumerate(zip(lat, lon, kinds))]
+    write_poi_index(tmp_path / "poi", pois, cell_deg=cell_deg)
+    return PoiIndex(tmp_path / "poi"), lat, lon, kinds
+
+
+def _names(records):
+    return {r["name"] for r in records}
+
+
+def test_read_geojson(tmp_path):
+    """测试类别推断、线和面取代表点、跳过没有几何的要素。"""
+    path = tmp_path / "poi.geojson"
+    square = [[[116.0, 40.0], [116.2, 40.0], [116.2, 40.2], [116.0, 40.2]]]
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [116.1, 40.0]},
+            "properties": {"name": "泉眼", "natural": "spring", "seasonal": "yes"},
+        },
+        {
+            "type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": square},
+            "properties": {"name:zh": "山屋", "tourism": "alpine_hut"},
+        },
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [116.3, 40.1]},
+            "properties": {"kind": "bailout"},
+        },
+        {"type": "Feature", "geometry": None, "properties": {"name": "无坐标"}},
+    ]
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}), encoding="utf-8")
+    pois = read_geojson(path)
+    assert [(p["name"], p["kind"]) for p in pois] == [("泉眼", "water"), ("山屋", "shelter"), ("", "bailout")]
+    assert pois[0]["seasonal"] == "yes"
+    assert abs(pois[1]["lat"] - 40.1) < 1e-9 and abs(pois[1]["lon"] - 116.1) < 1e-9
+
+    write_poi_index(tmp_path / "poi", pois)
+    index = PoiIndex(tmp_path / "poi")
+    assert len(index) == 3 and index.kinds == ["bailout", "shelter", "water"]
+    assert index.radius(40.0, 116.1, 10)[0] == {**pois[0], "distance_m": 0}
+
+
+def test_bbox_and_radius_match_brute_force(tmp_path):
+    """测试矩形和周边查询与逐点计算一致。"""
+    index, lat, lon, kinds = _random_index(tmp_path)
+    assert isinstance(index.lat, np.memmap)
+
+    box = index.bbox(39.95, 116.05, 40.03, 116.17)
+    expected = (lat >= 39.95) & (lat <= 40.03) & (lon >= 116.05) & (lon <= 116.17)
+    assert _names(box) == {f"p{i}" for i in np.flatnonzero(expected)}
+
+    distance = np.hypot((lat - 40.0) * M_PER_DEG, (lon - 116.1) * M_PER_DEG * np.cos(np.radians(40.0)))
+    near = index.radius(40.0, 116.1, 2500, kinds=["water"])
+    expected = np.flatnonzero((distance <= 2500) & (kinds == "water"))
+    assert _names(near) == {f"p{i}" for i in expected}
+    assert [r["distance_m"] for r in near] == sorted(r["distance_m"] for r in near)
+    assert len(index.radius(40.0, 116.1, 2500, limit=3)) == 3
+    assert index.radius(10.0, 10.0, 5000) == []
+
+
+def test_corridor_matches_brute_force(tmp_path):
+    """测试走廊查询（走廊比网格宽、路线斜穿网格）与逐点到折线的距离一致，并给出里程。"""
+    index, lat, lon, _ = _random_index(tmp_path, cell_deg=0.005)
+    route_lat = np.array([39.92, 39.98, 40.05, 40.08])
+    route_lon = np.array([116.02, 116.10, 116.12, 116.25])
+    cos_lat = np.cos(np.radians(route_lat.mean()))
+
+    # 加密路线后逐点求最近距离作为参照
+    t = np.linspace(0, 1, 4001)
+    dense_lat = np.interp(t * 3, np.arange(4), route_lat)
+    dense_lon = np.interp(t * 3, np.arange(4), route_lon)
+    dy = (lat[:, None] - dense_lat[None]) * M_PER_DEG
+    dx = (lon[:, None] - dense_lon[None]) * M_PER_DEG * cos_lat
+    reference = np.hypot(dx, dy).min(axis=1)
+
+    hits = index.corridor(route_lat, route_lon, 800)
+    got = _names(hits)
+    assert {f"p{i}" for i in np.flatnonzero(reference <= 795)} <= got
+    assert got <= {f"p{i}" for i in np.flatnonzero(reference <= 805)}
+    assert all(r["offset_m"] <= 800 for r in hits)
+    assert [r["km"] for r in hits] == sorted(r["km"] for r in hits)
+    assert 0 <= hits[0]["km"] and hits[-1]["km"] <= segment_lengths(route_lat, route_lon).sum() / 1000 + 0.01
+
+    nearest = index.corridor(route_lat, route_lon, 800, kinds=["shelter"], limit=5)
+    assert len(nearest) == 5 and {r["kind"] for r in nearest} == {"shelter"}
+    offsets = sorted(r["offset_m"] for r in hits if r["kind"] == "shelter")
+    assert max(r["offset_m"] for r in nearest) == offsets[4]
+
+
+def test_nodes_consult_index(tmp_path, monkeypatch):
+    """测试路线节点返回沿线补给和下撤点，拍摄计划节点把沿线观景点加入拍摄点。"""
+    dlon = 1 / (M_PER_DEG * np.cos(np.radians(40.02)))
+    pois = [
+        {"name": "山泉", "kind": "water", "lat": 40.02 + 200 / M_PER_DEG, "lon": 116.0 + 5000 * dlon},
+        {"name": "远处水源", "kind": "water", "lat": 40.02 + 2500 / M_PER_DEG, "lon": 116.0 + 5000 * dlon},
+        {"name": "村口车站", "kind": "bailout", "lat": 40.02 - 100 / M_PER_DEG, "lon": 116.0 + 20000 * dlon},
+        {"name": "望京台", "kind": "viewpoint", "lat": 40.02, "lon": 116.0 + 15000 * dlon},
+    ]
+    write_poi_index(tmp_path / "poi", pois)
+    index = PoiIndex(tmp_path / "poi")
+    blobs = BlobStore(tmp_path / "blobs")
+    monkeypatch.setattr(poi_module, "get_poi_index", lambda: index)
+    monkeypatch.setattr(route_module, "get_blob_store", lambda: blobs)
+    monkeypatch.setattr(route_module, "_similar", lambda user_id, query: [])
+    monkeypatch.setattr(photo_module, "get_blob_store", lambda: blobs)
+    monkeypatch.setattr(photo_module, "get_viewshed_store", lambda: None)
+
+    state = {"input_data": {"route_gpx_ref": blobs.put(_gpx(_ridge()))}, "intermediate_results": {}}
+    route = route_module.route_node(state)["intermediate_results"]["route"]
+    assert [(p["name"], p["offset_m"]) for p in route.pois] == [("山泉", 200), ("村口车站", 100)]
+    assert np.allclose([p["km"] for p in route.pois], [5, 20], atol=0.05)
+
+    state = {"input_data": {"location": "山脊", "lat": 40.02, "lon": 116.0 + 5000 * dlon}, "intermediate_results": {}}
+    route = route_module.route_node(state)["intermediate_results"]["route"]
+    assert [p["name"] for p in route.pois] == ["山泉", "远处水源"]
+
+    state = {
+        "input_data": {"location": "山脊", "duration": "一天", "date": "2026-06-21"},
+        "intermediate_results": {"route": RouteResult(status="done", track_ref=blobs.put(_gpx(_ridge())))},
+    }
+    plan = photo_module.photo_plan_node(state)["intermediate_results"]["photo_plan"]
+    assert [p["name"] for p in plan.pois] == ["望京台"]
+    assert f"望京台（{plan.pois[0]['km']} km 处，距路线 0 m）" in plan.spots
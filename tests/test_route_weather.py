@@ -0,0 +1,122 @@
+"""
+沿线分段天气测试
+"""
+
+import importlib
+import threading
+from datetime import timedelta
+import numpy as np
+import pytest
+from hikebutler.geo.forecast import hike_windows
+from hikebutler.geo.route_weather import analyze_route, fetch_forecasts, grid_cells, interpolate_route, sample_route
+from hikebutler.geo.track import Track
+from hikebutler.state import RouteResult
+from hikebutler.storage.blob_store import BlobStore
+from tests.test_weather import START, _payload
+
+weather_module = importlib.import_module("hikebutler.nodes.weather_node")
+
+
+def _ridge(n: int = 601) -> Track:
+    """向东 30 km 的山脊路线：海拔 500 m 升到 15 km 处 2200 m，再降到 600 m。"""
+    lon = np.linspace(116.0, 116.0 + 30000 / (111320 * np.cos(np.radians(40.0))), n)
+    lat = np.full(n, 40.02)
+    distance = np.linspace(0, 30000, n)
+    ele = np.where(distance <= 15000, 500 + distance / 15000 * 1700, 2200 - (distance - 15000) / 15000 * 1600)
+    return Track(lat=lat, lon=lon, ele=ele, time=np.full(n, np.nan))
+
+
+def _gpx(track: Track) -> str:
+    points = "".join(
+        f'<trkpt lat="{lat}" lon="{lon}"><ele>{ele}</ele></trkpt>' for lat, lon, ele in zip(track.lat, track.lon, track.ele)
+    )
+    return f'<?xml version="1.0"?><gpx version="1.1" creator="test"><trk><trkseg>{points}</trkseg></trk></gpx>'
+
+
+def _fetch(calls):
+    """东边更冷、风更大的合成预报。"""
+    lock = threading.Lock()
+
+    def fetch(lat, lon, days=7):
+        with lock:
+            calls.append((lat, lon))
+        east = (lon - 116.0) / 0.4
+        payload = _payload(surface_c=12.0 - 6.0 * east)
+        n = len(payload["ts"])
+        payload["wind_u-surface"] = [0.0] * n
+        payload["wind_v-surface"] = [4.0 + 8.0 * east] * n
+        return payload
+
+    return fetch
+
+
+def test_sample_route_by_distance_and_elevation():
+    """测试代表点按里程和海拔变化选取，保留起终点和最高点，并受数量上限约束。"""
+    track = _ridge()
+
+    samples = sample_route(track, distance_step_m=5000, elevation_step_m=300, max_points=100)
+    assert samples[0] == 0 and samples[-1] == len(track) - 1
+    assert int(np.argmax(track.ele)) in samples
+    # 爬升段每 300 m 海拔取一个点，比只按里程多
+    assert len(samples) > len(sample_route(track, distance_step_m=5000, elevation_step_m=10000, max_points=100))
+    # 相邻代表点的海拔差不超过间隔（最高点额外插入，其后一段略超）
+    assert np.all(np.abs(np.diff(track.ele[samples])) <= 360)
+    assert np.all(np.diff(np.linspace(0, 30000, len(track))[samples]) <= 5000 + 50)
+
+    capped = sample_route(track, distance_step_m=1000, elevation_step_m=50, max_points=6)
+    assert len(capped) <= 6
+    assert {0, len(track) - 1, int(np.argmax(track.ele))} <= set(capped.tolist())
+
+
+def test_grid_dedupe_and_concurrent_fetch():
+    """测试同一预报网格的代表点只查询一次。"""
+    track = _ridge()
+    samples = sample_route(track)
+    centers, cells = grid_cells(track.lat[samples], track.lon[samples], resolution=0.1)
+
+    assert len(centers) < len(samples)
+    assert len(cells) == len(samples)
+    calls = []
+    forecasts = fetch_forecasts(centers, _fetch(calls), max_workers=4)
+    assert len(calls) == len(centers) and all(f is not None for f in forecasts)
+    assert fetch_forecasts(centers[:1], lambda lat, lon: {"status": "pending"}) == [None]
+
+
+def test_interpolate_and_analyze_route():
+    """测试插值回轨迹后，最高点附近最冷，风取沿线最大值，并给出分段摘要。"""
+    track = _ridge()
+    samples = sample_route(track)
+    centers, cells = grid_cells(track.lat[samples], track.lon[samples], resolution=0.1)
+    forecasts = fetch_forecasts(centers, _fetch([]))
+
+    route_weather = interpolate_route(track, samples, cells, forecasts, station_step_m=500)
+    assert route_weather.temp_c.shape == (61, 56)
+    coldest = route_weather.distance_m[np.argmin(route_weather.temp_c[:, 0])]
+    assert coldest == pytest.approx(15000, abs=1000)
+
+    windows = hike_windows(START + timedelta(days=1), 1, 8, 17)
+    analysis = analyze_route(route_weather, windows)
+    assert analysis["metrics"]["wind_max_ms"] == pytest.approx(float(route_weather.wind_ms.max()), abs=0.1)
+    assert analysis["metrics"]["route_max_elevation_m"] == pytest.approx(2200, abs=20)
+    assert analysis["segments"][0]["from_km"] == 0.0
+    assert analysis["segments"][-1]["to_km"] == 30.0
+    assert len(analysis["hourly"]) == 3
+
+
+def test_weather_node_uses_route_track(tmp_path, monkeypatch):
+    """测试路线有 GPX 轨迹时天气节点按网格分段查询。"""
+    store = BlobStore(tmp_path)
+    calls = []
+    monkeypatch.setattr(weather_module, "mcp_windy_fetch", _fetch(calls))
+    monkeypatch.setattr(weather_module, "get_blob_store", lambda: store)
+    route = RouteResult(status="done", track_ref=store.put(_gpx(_ridge())))
+    state = {
+        "input_data": {"location": "山脊", "duration": "一天", "date": (START + timedelta(days=1)).isoformat()},
+        "intermediate_results": {"route": route},
+    }
+
+    weather = weather_module.weather_node(state)["intermediate_results"]["weather"]
+
+    assert weather.status == "done"
+    assert 1 < len(calls) <= 12
+    assert weather.segments and weather.hazards["wind"] >= 0
@@ -0,0 +1,142 @@
+"""
+工作流运行器测试
+"""
+
+import threading
+import time
+import pytest
+from datetime import date
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import StateGraph, END
+from hikebutler.graph.runner import make_thread_id, run_workflow, stream_workflow
+from hikebutler.state import HikeButlerState
+
+
+def _initial_state() -> HikeButlerState:
+    return {
+        "messages": [],
+        "user_profile": None,
+        "user_id": "test_user",
+        "intermediate_results": {},
+        "current_task": "preparation",
+        "input_data": {"location": "北京香山"},
+        "output_data": None,
+    }
+
+
+def test_make_thread_id_is_stable():
+    """测试相同输入得到相同 thread_id。"""
+    day = date(2024, 5, 1)
+    first = make_thread_id("preparation", "u1", {"location": "香山", "duration": "一天"}, day)
+    second = make_thread_id("preparation", "u1", {"duration": "一天", "location": "香山"}, day)
+    other = make_thread_id("preparation", "u1", {"location": "八达岭"}, day)
+
+    assert first == second
+    assert first != other
+    assert first.startswith("preparation-u1-20240501-")
+
+
+def test_make_thread_id_separates_sessions():
+    """测试同一默认用户的不同会话不共享 thread_id。"""
+    day = date(2024, 5, 1)
+    input_data = {"location": "香山"}
+    first = make_thread_id("preparation", "default_user", input_data, day, session_id="s1")
+    retry = make_thread_id("preparation", "default_user", input_data, day, session_id="s1")
+    other = make_thread_id("preparation", "default_user", input_data, day, session_id="s2")
+
+    assert first == retry
+    assert first != other
+
+
+def test_retry_resumes_from_failed_node():
+    """测试失败后重试不会重算已完成的节点。"""
+    calls = {"route": 0, "weather": 0}
+
+    def route(state):
+        calls["route"] += 1
+        return {"intermediate_results": {"route": "done"}}
+
+    def weather(state):
+        calls["weather"] += 1
+        if calls["weather"] == 1:
+            raise TimeoutError("weather timeout")
+        return {"intermediate_results": {"weather": "done"}}
+
+    graph = StateGraph(HikeButlerState)
+    graph.add_node("route", route)
+    graph.add_node("weather", weather)
+    graph.set_entry_point("route")
+    graph.add_edge("route", "weather")
+    graph.add_edge("weather", END)
+    workflow = graph.compile(checkpointer=InMemorySaver())
+
+    with pytest.raises(TimeoutError):
+        run_workflow(workflow, _initial_state(), thread_id="t1")
+
+    result = run_workflow(workflow, _initial_state(), thread_id="t1")
+
+    assert calls == {"route": 1, "weather": 2}
+    assert result["intermediate_results"] == {"route": "done", "weather": "done"}
+
+
+def test_same_thread_runs_are_serialized():
+    """测试同一 thread_id 的并发运行串行执行。"""
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def slow(state):
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        return {"intermediate_results": {"slow": "done"}}
+
+    graph = StateGraph(HikeButlerState)
+    graph.add_node("slow", slow)
+    graph.set_entry_point("slow")
+    graph.add_edge("slow", END)
+    workflow = graph.compile(checkpointer=InMemorySaver())
+
+    threads = [
+        threading.Thread(target=run_workflow, args=(workflow, _initial_state(), "t2"))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert active["max"] == 1
+
+
+def test_rerun_after_completion_starts_fresh():
+    """测试已完成的运行再次提交时重新计算，不合并上次的中间结果和消息。"""
+    calls = {"route": 0}
+
+    def route(state):
+        calls["route"] += 1
+        assert "route" not in (state.get("intermediate_results") or {})
+        return {
+            "intermediate_results": {"route": calls["route"]},
+            "messages": [AIMessage(content=f"run {calls['route']}")],
+        }
+
+    graph = StateGraph(HikeButlerState)
+    graph.add_node("route", route)
+    graph.set_entry_point("route")
+    graph.add_edge("route", END)
+    workflow = graph.compile(checkpointer=InMemorySaver())
+
+    first = run_workflow(workflow, _initial_state(), thread_id="t3")
+    second = stream_workflow(workflow, _initial_state(), thread_id="t3")
+    final = [chunk for kind, chunk in second if kind == "state"][0]
+
+    assert calls["route"] == 2
+    assert first["intermediate_results"] == {"route": 1}
+    assert final["intermediate_results"] == {"route": 2}
+    assert [m.content for m in final["messages"]] == ["run 2"]
+    rerun = workflow.get_state({"configurable": {"thread_id": "t3-2"}})
+    assert rerun.values["intermediate_results"] == {"route": 2}
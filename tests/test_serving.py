@@ -0,0 +1,109 @@
+"""
+多进程服务与共享缓存测试
+"""
+
+import time
+import pytest
+from langchain_core.embeddings import Embeddings
+from langchain_core.outputs import Generation
+from hikebutler.serving import shared_cache
+from hikebutler.serving.adapters import CachedEmbeddings, SharedLLMCache
+from hikebutler.serving.shared_cache import CacheServer, LocalCache, SocketCache, cache_key
+from hikebutler.tools import mcp_tools
+
+
+class CountingEmbeddings(Embeddings):
+    """记录实际计算的文本。"""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        self.calls.append(text)
+        return [float(len(text)), 1.0]
+
+
+@pytest.fixture
+def local_cache(monkeypatch):
+    """进程内共享缓存。"""
+    cache = LocalCache(max_items=100)
+    monkeypatch.setattr(shared_cache, "_shared_cache", cache)
+    return cache
+
+
+def test_local_cache_ttl_and_lru():
+    """测试条目过期和按最近使用淘汰。"""
+    cache = LocalCache(max_items=2)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=0.05)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # 淘汰最久未使用的 b
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    cache.set("d", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("d") is None
+    assert cache.stats()["hits"] == 3
+
+
+def test_socket_cache_round_trip(tmp_path):
+    """测试客户端通过 Unix 域套接字读写主进程中的缓存。"""
+    server = CacheServer(str(tmp_path / "cache.sock"), b"secret")
+    server.start()
+    try:
+        client = SocketCache(server.path, b"secret")
+        assert client.get("k") is None
+        client.set("k", {"vector": [0.1, 0.2]}, ttl=60)
+        assert SocketCache(server.path, b"secret").get("k") == {"vector": [0.1, 0.2]}
+        assert client.stats()["items"] == 1
+        # 密钥不匹配时按未命中处理
+        assert SocketCache(server.path, b"wrong").get("k") is None
+    finally:
+        server.stop()
+    assert client.get("k") is None
+
+
+def test_cached_embeddings_only_computes_misses(local_cache):
+    """测试只对未缓存的文本调用底层模型，结果顺序与输入一致。"""
+    inner = CountingEmbeddings()
+    embedding = CachedEmbeddings(inner, "test-model")
+    embedding.embed_documents(["香山", "泰山"])
+    vectors = embedding.embed_documents(["泰山", "黄山", "香山"])
+
+    assert vectors == [[2.0, 1.0], [2.0, 1.0], [2.0, 1.0]]
+    assert inner.calls == ["香山", "泰山", "黄山"]
+    embedding.embed_query("黄山")
+    assert inner.calls == ["香山", "泰山", "黄山"]
+    assert CachedEmbeddings(inner, "other-model").embed_query("黄山") and len(inner.calls) == 4
+
+
+def test_shared_llm_cache(local_cache):
+    """测试 LLM 结果按提示词和模型参数缓存。"""
+    cache = SharedLLMCache()
+    cache.update("prompt", "model=a", [Generation(text="hello")])
+    assert cache.lookup("prompt", "model=a")[0].text == "hello"
+    assert cache.lookup("prompt", "model=b") is None
+
+
+def test_windy_fetch_caches_completed_forecasts(local_cache, monkeypatch):
+    """测试天气预报按取整后的坐标缓存，未完成的结果不缓存。"""
+    monkeypatch.setattr(
+        mcp_tools, "load_config", lambda: {"server": {"cache": {"weather_ttl": 60}}}
+    )
+    calls = []
+
+    def fake_request(lat, lon, days):
+        calls.append((lat, lon))
+        return {"status": "pending" if len(calls) == 1 else "success", "days": days}
+
+    monkeypatch.setattr(mcp_tools, "_windy_request", fake_request)
+    assert mcp_tools.mcp_windy_fetch(39.991, 116.191)["status"] == "pending"
+    assert mcp_tools.mcp_windy_fetch(39.991, 116.191)["status"] == "success"
+    assert mcp_tools.mcp_windy_fetch(39.992, 116.189)["status"] == "success"
+    assert len(calls) == 2
+    assert local_cache.get(cache_key("weather", 39.99, 116.19, 7)) is not None
@@ -0,0 +1,96 @@
+"""
+会话记忆缓存测试
+"""
+
+import threading
+from langchain_core.embeddings import Embeddings
+from hikebutler.memory.session_cache import AsyncMemoryWriter, MemorySessionCache
+
+
+class FakeMemoryClient:
+    """记录调用的假记忆客户端。"""
+
+    def __init__(self, memories=None):
+        self.memories = memories or []
+        self.fetches = 0
+        self.added = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_memories(self, user_id, query=None, limit=100):
+        self.release.wait()
+        self.fetches += 1
+        return [dict(m) for m in self.memories]
+
+    def add_memories(self, user_id, memories):
+        self.added.append((user_id, list(memories)))
+
+
+class KeywordEmbeddings(Embeddings):
+    KEYWORDS = ["雨", "防晒", "膝盖"]
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [[1.0 if k in t else 0.0 for k in self.KEYWORDS] + [0.1] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def _cache(client, embeddings=None, **kwargs):
+    writer = AsyncMemoryWriter(lambda: client, batch_size=2, flush_interval=0.05)
+    return MemorySessionCache(
+        client_factory=lambda: client,
+        embedding_provider=lambda: embeddings or KeywordEmbeddings(),
+        writer=writer,
+        **kwargs,
+    )
+
+
+def test_recall_uses_cached_embeddings():
+    """测试预取一次后，召回在本地按相关度排序。"""
+    client = FakeMemoryClient(
+        [{"memory": "雨天下山脚滑"}, {"memory": "夏天要带防晒"}, {"memory": "膝盖不好需要护膝"}]
+    )
+    embeddings = KeywordEmbeddings()
+    cache = _cache(client, embeddings)
+
+    cache.prefetch("s1", "u1", ["雨天徒步"]).result(timeout=5)
+    first = cache.recall("s1", "u1", query="雨天徒步", top_k=1)
+    second = cache.recall("s1", "u1", query="雨天徒步", top_k=2)
+
+    assert first[0]["memory"] == "雨天下山脚滑"
+    assert len(second) == 2
+    assert client.fetches == 1
+    # 查询提示与记忆在预取时一次生成 embedding
+    assert embeddings.calls == 1
+
+
+def test_recall_times_out_without_blocking():
+    """测试预取过慢时召回不阻塞。"""
+    client = FakeMemoryClient([{"memory": "雨天下山脚滑"}])
+    client.release.clear()
+    cache = _cache(client, recall_timeout=0.05)
+
+    assert cache.recall("s1", "u1", query="雨") == []
+    client.release.set()
+
+
+def test_remember_is_visible_and_written_in_batches():
+    """测试新记忆立即可召回，并由后台批量写入。"""
+    client = FakeMemoryClient([{"memory": "夏天要带防晒"}])
+    cache = _cache(client)
+    cache.prefetch("s1", "u1").result(timeout=5)
+
+    cache.remember("s1", "u1", "雨天路滑要带登山杖")
+    cache.remember("s1", "u1", "膝盖酸痛", {"type": "review"})
+
+    assert cache.recall("s1", "u1", query="下雨", top_k=1)[0]["memory"] == "雨天路滑要带登山杖"
+    assert cache.writer.flush(timeout=5)
+    assert client.added == [
+        ("u1", [("雨天路滑要带登山杖", None), ("膝盖酸痛", {"type": "review"})])
+    ]
+    cache.writer.close()
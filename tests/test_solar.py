@@ -0,0 +1,90 @@
+"""
+太阳位置与光线时段测试
+"""
+
+import importlib
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+import numpy as np
+import pytest
+from hikebutler.geo import solar
+from hikebutler.geo.solar import day_timestamp, solar_position, sun_events, sun_times_many
+from hikebutler.state import RouteResult
+
+TZ = ZoneInfo("Asia/Shanghai")
+BEIJING = (39.9042, 116.4074)
+
+
+def _local(ts: float) -> datetime:
+    return datetime.fromtimestamp(float(ts), TZ)
+
+
+def test_solstice_sunrise_sunset_beijing():
+    """测试北京夏至、冬至的日出日落时刻和方位与天文台数据相差不超过 2 分钟。"""
+    summer = sun_events(*BEIJING, day_timestamp(date(2026, 6, 21)))
+    winter = sun_events(*BEIJING, day_timestamp(date(2026, 12, 21)))
+
+    def minutes(ts):
+        local = _local(ts)
+        return local.hour * 60 + local.minute + local.second / 60
+
+    assert minutes(summer["sunrise"]) == pytest.approx(4 * 60 + 46, abs=2)
+    assert minutes(summer["sunset"]) == pytest.approx(19 * 60 + 46, abs=2)
+    assert minutes(winter["sunrise"]) == pytest.approx(7 * 60 + 33, abs=2)
+    assert minutes(winter["sunset"]) == pytest.approx(16 * 60 + 53, abs=2)
+    assert float(summer["sunrise_azimuth"]) == pytest.approx(58, abs=1)
+    assert float(winter["sunset_azimuth"]) == pytest.approx(240, abs=1)
+    # 时段顺序：蓝调 < 黄金时段开始 < 日出 < 黄金时段结束
+    order = ["blue_morning_start", "golden_morning_start", "sunrise", "golden_morning_end", "solar_noon",
+             "golden_evening_start", "sunset", "golden_evening_end", "blue_evening_end"]
+    assert all(summer[a] < summer[b] for a, b in zip(order, order[1:]))
+
+
+def test_solar_position_vectorized():
+    """测试正午太阳高度、数组广播与逐点计算一致，极夜无日出。"""
+    noon = sun_events(0.0, 0.0, day_timestamp(date(2026, 3, 20)))["solar_noon"]
+    elevation, _ = solar_position(0.0, 0.0, noon, refraction=False)
+    assert float(elevation) == pytest.approx(90.0, abs=0.5)
+
+    rng = np.random.default_rng(1)
+    lat, lon = rng.uniform(-60, 60, 50), rng.uniform(-180, 180, 50)
+    ts = day_timestamp(date(2026, 5, 1)) + rng.uniform(0, 86400, 50)
+    elevations, azimuths = solar_position(lat, lon, ts)
+    for i in (0, 17, 49):
+        e, a = solar_position(lat[i], lon[i], ts[i])
+        assert elevations[i] == pytest.approx(float(e)) and azimuths[i] == pytest.approx(float(a))
+
+    polar = sun_events(80.0, 15.0, day_timestamp(date(2026, 12, 21)))
+    assert np.isnan(polar["sunrise"]) and np.isnan(polar["sunset_azimuth"])
+
+
+def test_sun_times_cached_per_geohash_day(monkeypatch):
+    """测试同一 geohash 网格和日期只计算一次。"""
+    monkeypatch.setattr(solar, "_cache", type(solar._cache)())
+    calls = []
+    original = solar.sun_events
+    monkeypatch.setattr(solar, "sun_events", lambda *args: calls.append(np.size(args[0])) or original(*args))
+
+    day = date(2026, 6, 21)
+    first = sun_times_many([39.9042, 39.9050, 31.2], [116.4074, 116.4080, 121.5], [day, day, day])
+    second = sun_times_many([39.9042], [116.4074], [day])
+
+    assert calls == [2]
+    assert first[0] == first[1] == second[0]
+    assert first[2]["sunrise"] != first[0]["sunrise"]
+
+
+def test_photo_plan_node_golden_hours():
+    """测试拍摄计划节点为每天输出日出日落和黄金时段。"""
+    node = importlib.import_module("hikebutler.nodes.photo_plan_node")
+    state = {
+        "input_data": {"location": "香山", "duration": "两天", "date": "2026-06-20"},
+        "intermediate_results": {"route": RouteResult(status="done", lat=BEIJING[0], lon=BEIJING[1])},
+    }
+
+    plan = node.photo_plan_node(state)["intermediate_results"]["photo_plan"]
+
+    assert plan.status == "done" and plan.message == ""
+    assert [row["date"] for row in plan.light] == ["2026-06-20", "2026-06-21"]
+    assert plan.light[1]["sunrise"] in ("04:45", "04:46", "04:47")
+    assert plan.golden_hours[0].startswith("06-20 起点：日出")
@@ -2,7 +2,15 @@
 State 测试
 """
 
-from hikebutler.state import HikeButlerState
+import pytest
+from hikebutler.state import (
+    HikeButlerState,
+    RouteResult,
+    WeatherResult,
+    MAX_MESSAGES,
+    merge_dict,
+    append_messages,
+)
 
 
 def test_state_structure():
@@ -21,3 +29,31 @@ def test_state_structure():
     assert state["current_task"] == "preparation"
     assert state["input_data"]["location"] == "北京香山"
 
+
+
+def test_merge_dict_reducer():
+    """测试中间结果的增量合并。"""
+    left = {"route": RouteResult(status="done")}
+    merged = merge_dict(left, {"weather": WeatherResult(summary="晴")})
+
+    assert set(merged) == {"route", "weather"}
+    assert merged["weather"].summary == "晴"
+    assert "weather" not in left
+    assert merge_dict(None, None) == {}
+
+
+def test_append_messages_is_bounded():
+    """测试消息列表不会无限增长。"""
+    messages = []
+    for i in range(MAX_MESSAGES + 5):
+        messages = append_messages(messages, [f"msg_{i}"])
+
+    assert len(messages) == MAX_MESSAGES
+    assert messages[-1] == f"msg_{MAX_MESSAGES + 4}"
+
+
+def test_result_dataclasses_are_slotted():
+    """测试中间结果使用 __slots__，不能动态添加属性。"""
+    result = RouteResult()
+    with pytest.raises(AttributeError):
+        result.unknown = 1
@@ -0,0 +1,54 @@
+"""
+轨迹统计与 geohash 测试
+"""
+
+from datetime import date
+import pytest
+from hikebutler.database.mysql_client import trip_row
+from hikebutler.geo import geohash
+from hikebutler.geo.track import compute_stats, decompress_track, parse_gpx
+
+GPX = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="test"><trk><trkseg>
+<trkpt lat="39.9900" lon="116.1900"><ele>100</ele><time>2024-05-01T08:00:00Z</time></trkpt>
+<trkpt lat="39.9990" lon="116.1900"><ele>101</ele><time>2024-05-01T08:10:00Z</time></trkpt>
+<trkpt lat="40.0080" lon="116.1900"><ele>150</ele><time>2024-05-01T08:30:00Z</time></trkpt>
+<trkpt lat="40.0080" lon="116.2000"><ele>120</ele><time>2024-05-01T09:00:00Z</time></trkpt>
+</trkseg></trk></gpx>"""
+
+
+def test_geohash_round_trip():
+    """测试 geohash 编解码和相邻格子。"""
+    assert geohash.encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    code = geohash.encode(39.9042, 116.4074, 7)
+    lat, lon = geohash.decode(code)
+    assert lat == pytest.approx(39.9042, abs=1e-3)
+    assert lon == pytest.approx(116.4074, abs=1e-3)
+    neighbors = geohash.neighbors(code)
+    assert len(neighbors) == 8 and code not in neighbors
+    assert all(len(n) == 7 for n in neighbors)
+
+
+def test_compute_stats():
+    """测试里程、爬升、耗时和外包矩形。"""
+    stats = compute_stats(parse_gpx(GPX))
+
+    # 两段各约 1 km（0.009° 纬度）加一段约 850 m（0.01° 经度）
+    assert stats.distance_m == pytest.approx(2001 + 853, rel=0.01)
+    assert stats.ascent_m == 50  # 1 m 抖动不计入，100 -> 150
+    assert stats.descent_m == 30
+    assert stats.duration_s == 3600
+    assert (stats.min_lat, stats.max_lon) == (39.99, 116.2)
+    assert stats.start_geohash == geohash.encode(39.99, 116.19, 8)
+    assert stats.trip_date == date.fromtimestamp(1714550400)
+    assert stats.points == 4
+
+
+def test_trip_row_compresses_track():
+    """测试 trips 行包含统计列和可还原的压缩轨迹。"""
+    row = trip_row(GPX)
+
+    assert decompress_track(row["track_z"]) == GPX
+    assert row["point_count"] == 4
+    assert row["ascent_m"] == 50
+    assert all(value is None for value in trip_row(None).values())
@@ -0,0 +1,162 @@
+"""
+离线步道图与路线计算测试
+"""
+
+import importlib
+import json
+import numpy as np
+from langchain_core.messages import AIMessage
+from hikebutler.geo.trail_graph import TrailGraph, build_trail_graph, read_osm, tobler_speed
+from hikebutler.geo.track import parse_gpx
+from hikebutler.storage.blob_store import BlobStore
+
+route_module = importlib.import_module("hikebutler.nodes.route_node")
+
+SIZE = 12
+STEP_M = 500.0
+LAT0, LON0 = 40.0, 116.0
+
+
+def _write_osm(tmp_path):
+    """
+    12×12 网格步道（间距 500 米），海拔向东北升高：
+    第 1 行是 alpine_hiking（SAC 4）的捷径；另有一条私有道路和一条不是步道的公路不应入图。
+    """
+    dlat = STEP_M / 111320.0
+    dlon = STEP_M / (111320.0 * np.cos(np.radians(LAT0)))
+    nodes = []
+    for i in range(SIZE):
+        for j in range(SIZE):
+            ele = 200 + 20 * (i + j)
+            nodes.append(
+                f'<node id="{i * SIZE + j + 1}" lat="{LAT0 + i * dlat:.7f}" lon="{LON0 + j * dlon:.7f}">'
+                f'<tag k="ele" v="{ele}"/></node>'
+            )
+    ways = []
+    for i in range(SIZE):
+        refs = "".join(f'<nd ref="{i * SIZE + j + 1}"/>' for j in range(SIZE))
+        sac = '<tag k="sac_scale" v="alpine_hiking"/>' if i == 1 else ""
+        ways.append(f'<way id="{100 + i}">{refs}<tag k="highway" v="path"/><tag k="name" v="横{i}"/>{sac}</way>')
+        refs = "".join(f'<nd ref="{j * SIZE + i + 1}"/>' for j in range(SIZE))
+        ways.append(f'<way id="{200 + i}">{refs}<tag k="highway" v="footway"/><tag k="name" v="纵{i}"/></way>')
+    ways.append(
+        f'<way id="300"><nd ref="1"/><nd ref="{SIZE * SIZE}"/>'
+        '<tag k="highway" v="path"/><tag k="access" v="private"/></way>'
+    )
+    ways.append(f'<way id="301"><nd ref="1"/><nd ref="{SIZE * SIZE}"/><tag k="highway" v="primary"/></way>')
+    # 引用了不存在的节点：在缺失处断开，只保留前两个节点之间的一段
+    ways.append(f'<way id="302"><nd ref="1"/><nd ref="{SIZE + 2}"/><nd ref="9999"/><tag k="highway" v="path"/></way>')
+    path = tmp_path / "trails.osm"
+    path.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?><osm version="0.6">' + "".join(nodes) + "".join(ways) + "</osm>",
+        encoding="utf-8",
+    )
+    return path
+
+
+def _graph(tmp_path) -> TrailGraph:
+    graph = build_trail_graph(read_osm(_write_osm(tmp_path)))
+    graph.save(tmp_path / "graph")
+    return TrailGraph.open(tmp_path / "graph")
+
+
+def test_build_csr_graph(tmp_path):
+    """测试道路过滤、CSR 结构、上下坡时间和内存映射读取。"""
+    ways = read_osm(_write_osm(tmp_path))
+    assert len(ways) == 2 * SIZE + 1
+    assert {way.sac for way in ways} == {1, 4}
+
+    graph = _graph(tmp_path)
+    assert isinstance(graph.arc_target, np.memmap)
+    assert graph.node_count == SIZE * SIZE
+    # 网格 2×SIZE×(SIZE-1) 条边，加上节点 1 到 SIZE+2 的对角线
+    assert graph.edge_count == 2 * SIZE * (SIZE - 1) + 1
+    assert len(graph.arc_target) == 2 * graph.edge_count
+    assert graph.indptr[-1] == len(graph.arc_target)
+    assert np.all(np.diff(graph.indptr) >= 1)
+
+    # 同一条边：上坡（向东）比下坡慢
+    edge = int(np.flatnonzero(graph.edge_ascent > 0)[0])
+    times = graph.arc_time[graph.arc_edge_id == edge]
+    assert times.max() > times.min()
+    assert tobler_speed(np.array([0.1]))[0] < tobler_speed(np.array([-0.1]))[0]
+    assert abs(float(graph.edge_distance[edge]) - STEP_M) < 5
+
+
+def test_point_to_point_respects_difficulty(tmp_path):
+    """测试 A* 最快路线、难度过滤和备选路线。"""
+    graph = _graph(tmp_path)
+    start, offset = graph.nearest(LAT0 + 1 * STEP_M / 111320.0, LON0)
+    assert offset < 1
+    dlon = STEP_M / (111320.0 * np.cos(np.radians(LAT0)))
+    end, _ = graph.nearest(LAT0 + 1 * STEP_M / 111320.0, LON0 + (SIZE - 1) * dlon)
+
+    plans = graph.point_to_point(start, end, max_sac=6, count=2)
+    assert len(plans) == 2
+    assert plans[0].names == ["横1"] and plans[0].max_sac == 4
+    assert abs(plans[0].distance_m - (SIZE - 1) * STEP_M) < 20
+    assert plans[1].duration_s >= plans[0].duration_s and plans[1].edges != plans[0].edges
+
+    easy = graph.point_to_point(start, end, max_sac=1, count=1)[0]
+    assert easy.max_sac == 1 and "横1" not in easy.names
+    assert easy.distance_m > plans[0].distance_m
+    assert easy.ascent_m > easy.descent_m
+
+
+def test_loops_match_target_duration(tmp_path):
+    """测试环线回到起点、时长接近目标、少走回头路，并能导出 GPX。"""
+    graph = _graph(tmp_path)
+    start, _ = graph.nearest(LAT0, LON0)
+    plans = graph.loops(start, 2 * 3600, max_sac=1, count=3)
+    assert plans
+    best = plans[0]
+    assert best.kind == "loop" and best.max_sac == 1
+    assert abs(best.duration_s - 7200) / 7200 < 0.25
+    assert best.overlap < 0.5
+    assert (best.lat[0], best.lon[0]) == (best.lat[-1], best.lon[-1])
+    assert [plan.score for plan in plans] == sorted(plan.score for plan in plans)
+
+    track = parse_gpx(best.to_gpx("测试环线"))
+    assert len(track) == len(best.lat)
+    assert np.allclose(track.ele, best.ele, atol=0.1)
+
+
+def test_route_node_plans_on_graph(tmp_path, monkeypatch):
+    """测试路线节点按期望时长在步道图上计算环线，并把轨迹交给后续节点。"""
+    graph = _graph(tmp_path)
+    blobs = BlobStore(tmp_path / "blobs")
+    monkeypatch.setattr(route_module, "get_trail_graph", lambda: graph)
+    monkeypatch.setattr(route_module, "get_blob_store", lambda: blobs)
+    monkeypatch.setattr(route_module, "_similar", lambda user_id, query: [])
+    prompts = []
+
+    class _Scheduler:
+        def invoke(self, messages, node=None, timeout=None):
+            prompts.append((node, json.loads(messages[-1].content)))
+            return AIMessage(content="推荐网格山环线")
+
+    monkeypatch.setattr(route_module, "get_batch_scheduler", lambda: _Scheduler())
+
+    state = {
+        "input_data": {"location": "网格山", "duration": "半天", "difficulty": "简单", "lat": LAT0, "lon": LON0},
+        "intermediate_results": {},
+    }
+    route = route_module.route_node(state)["intermediate_results"]["route"]
+    assert route.status == "done" and route.name == "网格山"
+    assert route.message == "推荐网格山环线"
+    assert prompts == [("route", {"location": "网格山", "candidates": route.candidates, "pois": []})]
+    assert route.candidates and route.candidates[0]["kind"] == "loop"
+    assert route.candidates[0]["max_sac"] == 1
+    assert abs(route.duration_h - 5) <= 1.25
+    assert route.min_elevation_m >= 200 and route.max_elevation_m > route.min_elevation_m
+    assert len(parse_gpx(blobs.get_text(route.track_ref))) > 2
+
+    # 叙述失败时仍返回计算出的路线，不带占位文字
+    _Scheduler.invoke = lambda self, messages, node=None, timeout=None: 1 / 0
+    route = route_module.route_node(state)["intermediate_results"]["route"]
+    assert route.status == "done" and route.message == ""
+
+    # 起点远离步道时不计算
+    state["input_data"].update(lat=LAT0 - 1.0)
+    route = route_module.route_node(state)["intermediate_results"]["route"]
+    assert route.status == "pending" and "没有可计算的步道路线" in route.message
@@ -0,0 +1,133 @@
+"""
+轨迹指纹与相似徒步检索测试
+"""
+
+import importlib
+import numpy as np
+from hikebutler.database.trip_index import TripIndex
+from hikebutler.geo.fingerprint import DIM, fingerprint, frechet_many, reverse_fingerprint
+from hikebutler.geo.track import Track
+from hikebutler.storage.blob_store import BlobStore
+from tests.test_route_weather import _gpx, _ridge
+
+route_module = importlib.import_module("hikebutler.nodes.route_node")
+
+
+def _loop(lat0: float, lon0: float, radius_m: float = 2000.0, n: int = 400) -> Track:
+    """绕一座小山的环线：北侧最高。"""
+    angle = np.linspace(0, 2 * np.pi, n)
+    lat = lat0 + radius_m * np.sin(angle) / 111320
+    lon = lon0 + radius_m * (1 - np.cos(angle)) / (111320 * np.cos(np.radians(lat0)))
+    ele = 400 + 300 * np.sin(angle).clip(0)
+    return Track(lat=lat, lon=lon, ele=ele, time=np.full(n, np.nan))
+
+
+def _reversed(track: Track) -> Track:
+    return Track(lat=track.lat[::-1], lon=track.lon[::-1], ele=track.ele[::-1], time=track.time)
+
+
+def test_frechet_many_matches_reference():
+    """测试向量化 Fréchet 距离与逐格动态规划一致。"""
+    rng = np.random.default_rng(0)
+    query = rng.normal(40.0, 0.01, (7, 2))
+    candidates = rng.normal(40.0, 0.01, (3, 11, 2))
+    scale = np.array([1.0, np.cos(np.radians(query[:, 0].mean()))]) * 111320.0
+
+    def reference(other):
+        cost = np.hypot(*((query[:, None] - other[None]) * scale).transpose(2, 0, 1))
+        acc = np.full((len(query) + 1, len(other) + 1), np.inf)
+        acc[0, 0] = 0.0
+        for i in range(len(query)):
+            for j in range(len(other)):
+                acc[i + 1, j + 1] = max(cost[i, j], min(acc[i, j + 1], acc[i, j], acc[i + 1, j]))
+        return acc[-1, -1]
+
+    expected = [reference(other) for other in candidates]
+    assert np.allclose(frechet_many(query, candidates), expected, rtol=1e-5)
+    # 平行相距约 111 米的两条直线
+    line = np.stack([np.full(10, 40.0), np.linspace(116.0, 116.1, 10)], axis=1)
+    assert abs(frechet_many(line, (line + [0.001, 0.0])[None])[0] - 111.3) < 0.5
+
+
+def test_fingerprint_layout():
+    """测试指纹维度、反向指纹和没有海拔的轨迹。"""
+    ridge = fingerprint(_ridge())
+    assert ridge.vector.shape == (DIM,) and ridge.vector.dtype == np.float32
+    assert abs(ridge.distance_m - 30000) < 50
+    assert np.allclose(reverse_fingerprint(fingerprint(_reversed(_ridge())).vector), ridge.vector, atol=1e-3)
+
+    flat = _ridge()
+    flat.ele[:] = np.nan
+    assert fingerprint(flat) is not None
+    assert fingerprint(Track(*(np.zeros(1) for _ in range(4)))) is None
+
+
+def test_index_search_and_rerank(tmp_path):
+    """测试按计划检索、按轨迹匹配（含反向行走）和重新打开后的索引。"""
+    index = TripIndex(tmp_path / "trip_index.sqlite", candidates=4)
+    loop = _loop(40.0, 116.2)
+    index.add("loop", "u1", loop)
+    index.add("loop-reversed", "u2", _reversed(loop))
+    index.add("nearby", "u1", _loop(40.01, 116.21, radius_m=2500))
+    index.add("ridge", "u1", _ridge())
+    for i in range(20):
+        index.add(f"far{i}", "u3", _loop(30.0 + i * 0.1, 105.0))
+    index.add("loop", "u1", loop)
+    assert len(index) == 24
+
+    matches = index.match_track(loop, k=3)
+    assert {m["review_id"] for m in matches[:2]} == {"loop", "loop-reversed"}
+    assert matches[0]["frechet_m"] < 1 and matches[1]["frechet_m"] < 1
+    assert matches[2]["review_id"] == "nearby" and matches[2]["frechet_m"] > 500
+    assert [m["review_id"] for m in index.match_track(loop, k=2, user_id="u2")] == ["loop-reversed"]
+
+    plan = index.similar_to_plan(40.0, 116.2, distance_km=12.6, k=3)
+    assert {p["review_id"] for p in plan[:2]} == {"loop", "loop-reversed"} and "row" not in plan[0]
+    assert plan[2]["review_id"] == "nearby"
+    assert index.similar_to_plan(40.02, 116.0, distance_km=30, k=1)[0]["review_id"] == "ridge"
+
+    reopened = TripIndex(tmp_path / "trip_index.sqlite", candidates=4)
+    assert len(reopened) == 24
+    assert reopened.match_track(loop, k=1)[0]["review_id"] in {"loop", "loop-reversed"}
+
+
+def test_search_sees_rows_from_other_processes(tmp_path):
+    """测试检索前载入其他进程（另一个索引实例）新写入或覆盖的记录。"""
+    index = TripIndex(tmp_path / "trip_index.sqlite")
+    writer = TripIndex(tmp_path / "trip_index.sqlite")
+    loop = _loop(40.0, 116.2)
+    assert index.match_track(loop, user_id="u1") == []
+
+    writer.add("loop", "u1", loop)
+    assert [m["review_id"] for m in index.match_track(loop, user_id="u1")] == ["loop"]
+    writer.add("loop", "u2", loop)
+    assert index.match_track(loop, user_id="u1") == []
+    assert [p["review_id"] for p in index.similar_to_plan(40.0, 116.2, user_id="u2")] == ["loop"]
+    assert len(index) == 1
+
+
+def test_route_node_uses_route_gpx(tmp_path, monkeypatch):
+    """测试路线节点从路线 GPX 计算统计并附带当前用户相似的历史徒步。"""
+    index = TripIndex(tmp_path / "trip_index.sqlite")
+    index.add("r1", "u1", _ridge())
+    index.add("other", "u2", _ridge())
+    blobs = BlobStore(tmp_path / "blobs")
+    monkeypatch.setattr(route_module, "get_trip_index", lambda: index)
+    monkeypatch.setattr(route_module, "get_blob_store", lambda: blobs)
+
+    gpx_ref = blobs.put(_gpx(_ridge()))
+    state = {"user_id": "u1", "input_data": {"route_gpx_ref": gpx_ref}, "intermediate_results": {}}
+    route = route_module.route_node(state)["intermediate_results"]["route"]
+    assert route.status == "done" and route.track_ref == state["input_data"]["route_gpx_ref"]
+    assert abs(route.distance_km - 30) < 0.1
+    assert route.min_elevation_m == 500 and route.max_elevation_m == 2200
+    assert [trip["review_id"] for trip in route.similar_trips] == ["r1"]
+
+    input_data = {"location": "香山", "lat": 40.02, "lon": 116.0}
+    state = {"user_id": "u1", "input_data": input_data, "intermediate_results": {}}
+    route = route_module.route_node(state)["intermediate_results"]["route"]
+    assert route.status == "pending" and [trip["review_id"] for trip in route.similar_trips] == ["r1"]
+
+    # 没有用户时不检索，避免返回其他用户的记录
+    state = {"input_data": {"route_gpx_ref": gpx_ref}, "intermediate_results": {}}
+    assert route_module.route_node(state)["intermediate_results"]["route"].similar_trips == []
@@ -0,0 +1,78 @@
+"""
+可视域与天际线测试
+"""
+
+import importlib
+import numpy as np
+import pytest
+from hikebutler.geo.dem import open_dem, radial_sweep
+from hikebutler.geo.viewshed import ViewshedStore, build_viewsheds
+from hikebutler.state import RouteResult
+from hikebutler.storage.blob_store import BlobStore
+
+SIZE = 121  # 格网间距 1/120°（南北约 930 m，东西约 715 m）
+PEAK = (39.5, 116.5)
+
+
+def _write_hgt(tmp_path):
+    """平地上一座 800 m 的山，山东边约 7 km 处有一道 2000 m 的南北向山墙。"""
+    rows, cols = np.mgrid[0:SIZE, 0:SIZE]
+    distance = np.hypot(rows - 60, cols - 60)
+    ele = np.maximum(100, 800 - distance * 50)
+    ele[:, 70:72] = 2000
+    path = tmp_path / "N39E116.hgt"
+    ele.astype(">i2").tofile(path)
+    return path
+
+
+def test_sweep_visibility_and_horizon(tmp_path):
+    """测试山墙后面不可见、山墙方向的天际线抬高。"""
+    dem = open_dem(_write_hgt(tmp_path))
+    assert isinstance(dem.data, np.memmap)
+    assert float(dem.elevation(*PEAK)) == 800
+
+    sweep = radial_sweep(dem, *PEAK, radius_m=20000)
+    west = dem.rowcol(39.5, 116.3)
+    east = dem.rowcol(39.5, 116.7)
+    origin_row = int(round((dem.north - sweep.north) / dem.dlat))
+    origin_col = int(round((sweep.west - dem.west) / dem.dlon))
+    assert sweep.visible[int(west[0]) - origin_row, int(west[1]) - origin_col]
+    assert not sweep.visible[int(east[0]) - origin_row, int(east[1]) - origin_col]
+    assert sweep.horizon_deg[90] > 5
+    assert sweep.horizon_deg[270] < 0
+
+
+def test_store_lookup_and_photo_plan(tmp_path, monkeypatch):
+    """测试库查询与扫描一致，拍摄计划给出沿线可见区间和太阳越过山脊的时刻。"""
+    points = [{"name": "主峰", "lat": PEAK[0], "lon": PEAK[1], "kind": "peak"}]
+    assert build_viewsheds([_write_hgt(tmp_path)], points, tmp_path / "viewsheds", radius_m=20000) == 1
+    store = ViewshedStore(tmp_path / "viewsheds")
+
+    lons = np.linspace(116.3, 116.7, 41)
+    lats = np.full_like(lons, 39.5)
+    seen = store.visible(0, lats, lons)
+    assert seen[0] and not seen[-1]
+    assert store.covering(lats, lons) == [0]
+    assert store.nearest(39.501, 116.5) == 0 and store.nearest(39.6, 116.5) is None
+    assert float(store.horizon(0, 90.5)) > 5
+
+    node = importlib.import_module("hikebutler.nodes.photo_plan_node")
+    blobs = BlobStore(tmp_path / "blobs")
+    track = "".join(f'<trkpt lat="39.5" lon="{lon:.4f}"><ele>{800 - abs(lon - 116.5) * 2000:.0f}</ele></trkpt>' for lon in lons)
+    gpx = f'<?xml version="1.0"?><gpx version="1.1" creator="test"><trk><trkseg>{track}</trkseg></trk></gpx>'
+    monkeypatch.setattr(node, "get_viewshed_store", lambda: store)
+    monkeypatch.setattr(node, "get_blob_store", lambda: blobs)
+    state = {
+        "input_data": {"location": "主峰", "duration": "一天", "date": "2026-06-21"},
+        "intermediate_results": {"route": RouteResult(status="done", track_ref=blobs.put(gpx))},
+    }
+
+    plan = node.photo_plan_node(state)["intermediate_results"]["photo_plan"]
+
+    assert plan.status == "done" and plan.message == ""
+    view = plan.views[0]
+    assert view["name"] == "主峰" and view["ranges_km"][0][0] == 0.0
+    assert view["ranges_km"][-1][1] < 30
+    summit = next(row for row in plan.light if row["spot"].startswith("最高点"))
+    assert summit["sun_over_ridge"] > summit["sunrise"]
+    assert any("主峰（可见于" in spot for spot in plan.spots)
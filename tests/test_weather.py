@@ -0,0 +1,142 @@
+"""
+天气预报处理测试
+"""
+
+import importlib
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+import numpy as np
+import pytest
+from hikebutler.geo.forecast import (
+    analyze_forecast,
+    freezing_level,
+    hike_windows,
+    parse_windy,
+    select_windows,
+    temperature_at,
+    thunder_probability,
+    wind_chill,
+)
+from hikebutler.nodes.gear_node import weather_gear
+from hikebutler.state import RouteResult
+from hikebutler.storage.blob_store import BlobStore
+
+weather_module = importlib.import_module("hikebutler.nodes.weather_node")
+
+TZ = ZoneInfo("Asia/Shanghai")
+START = date(2026, 5, 1)
+
+
+def _payload(days: int = 7, surface_c: float = 10.0, cape: float = 0.0, precip_m: float = 0.0):
+    """每 3 小时一个时刻的合成 Windy 响应，850 hPa 在 1500 m，700 hPa 在 3000 m。"""
+    first = datetime.combine(START, datetime.min.time(), tzinfo=TZ)
+    ts = [int((first + timedelta(hours=3 * i)).timestamp() * 1000) for i in range(days * 8)]
+    n = len(ts)
+    kelvin = surface_c + 273.15
+    return {
+        "ts": ts,
+        "temp-surface": [kelvin] * n,
+        "wind_u-surface": [3.0] * n,
+        "wind_v-surface": [4.0] * n,
+        "gust-surface": [8.0] * n,
+        "past3hprecip-surface": [precip_m] * n,
+        "past3hconvprecip-surface": [0.0] * n,
+        "cape-surface": [cape] * n,
+        "lclouds-surface": [None] * n,
+        "mclouds-surface": [80.0] * n,
+        "hclouds-surface": [10.0] * n,
+        "gh-850h": [1500.0] * n,
+        "temp-850h": [kelvin - 6.0] * n,
+        "gh-700h": [3000.0] * n,
+        "temp-700h": [kelvin - 18.0] * n,
+    }
+
+
+def test_parse_and_slice_window():
+    """测试解析单位换算，并只保留徒步各天白天时段内的时刻。"""
+    forecast = parse_windy({"data": _payload()})
+
+    assert len(forecast) == 56
+    assert forecast.wind_ms[0] == pytest.approx(5.0)
+    assert forecast.temp_c[0] == pytest.approx(10.0)
+    assert forecast.cloud_pct[0] == 80.0
+    assert forecast.level_height_m.shape == (2, 56)
+
+    window = select_windows(forecast, hike_windows(START + timedelta(days=1), 2, 8, 17, tz="Asia/Shanghai"))
+    hours = [datetime.fromtimestamp(ts, TZ).strftime("%d %H") for ts in window.ts]
+    assert hours == ["02 09", "02 12", "02 15", "03 09", "03 12", "03 15"]
+    assert window.level_temp_c.shape == (2, 6)
+
+
+def test_vertical_profile():
+    """测试按气压层插值各海拔气温和 0°C 层高度，没有分层数据时按递减率估算。"""
+    forecast = parse_windy(_payload(days=1, surface_c=10.0))
+
+    temps = temperature_at(forecast, [1500.0, 2250.0, 3000.0])
+    assert temps[:, 0] == pytest.approx([4.0, -2.0, -8.0])
+    # 850 hPa 为 4°C、700 hPa 为 -8°C，0°C 层在 1500 + 4/12 * 1500 = 2000 m
+    assert freezing_level(forecast)[0] == pytest.approx(2000.0)
+
+    payload = _payload(days=1, surface_c=10.0)
+    for key in ("gh-850h", "temp-850h", "gh-700h", "temp-700h"):
+        del payload[key]
+    flat = parse_windy(payload)
+    assert temperature_at(flat, [500.0, 1500.0])[:, 0] == pytest.approx([10.0, 3.5])
+    assert freezing_level(flat, reference_elevation=500.0)[0] == pytest.approx(500.0 + 10.0 / 0.0065)
+
+
+def test_hazard_formulas():
+    """测试风寒和雷暴代理值。"""
+    chill = wind_chill(np.array([-10.0, 15.0, -10.0]), np.array([10.0, 10.0, 1.0]))
+    assert chill[0] == pytest.approx(-20.3, abs=0.1)
+    assert chill[1:] == pytest.approx([15.0, -10.0])
+
+    probability = thunder_probability(np.array([0.0, 1400.0, 3000.0, 100.0]), np.array([0.0, 0.0, 0.0, 1.0]))
+    assert probability == pytest.approx([0.0, 0.5, 1.0, 0.5])
+
+
+def test_analyze_forecast_hazards():
+    """测试路线最高点接近 0°C 层、雷暴和降水时的危险指标和摘要。"""
+    forecast = parse_windy(_payload(surface_c=10.0, cape=1850.0, precip_m=0.002))
+    windows = hike_windows(START + timedelta(days=1), 1, 8, 17, tz="Asia/Shanghai")
+
+    analysis = analyze_forecast(forecast, windows, min_elevation=500.0, max_elevation=2200.0)
+
+    hazards, metrics = analysis["hazards"], analysis["metrics"]
+    assert metrics["precip_mm"] == pytest.approx(6.0)
+    assert hazards["precipitation"] == pytest.approx(0.3)
+    assert hazards["thunderstorm"] == pytest.approx(0.7)
+    # 0°C 层 2000 m 低于路线最高点 200 m
+    assert metrics["freezing_level_min_m"] == pytest.approx(2000.0)
+    assert hazards["freezing_level"] == pytest.approx(0.83)
+    assert "低于路线最高点 200 m" in analysis["summary"]
+    assert [hour["time"] for hour in analysis["hourly"]] == ["09:00", "12:00", "15:00"]
+    assert analysis["hourly"][0]["condition"] == "雷阵雨"
+    assert analysis["hourly"][0]["temp_top"] < 0
+
+    assert analyze_forecast(forecast, hike_windows(START + timedelta(days=30), 1, 8, 17)) is None
+
+
+def test_weather_node_compact_result(tmp_path, monkeypatch):
+    """测试天气节点只输出摘要和指标，原始预报存入 blob 存储，装备节点据此添加必带装备。"""
+    store = BlobStore(tmp_path)
+    payload = _payload(surface_c=10.0, precip_m=0.002)
+    monkeypatch.setattr(weather_module, "mcp_windy_fetch", lambda lat, lon, days=7: payload)
+    monkeypatch.setattr(weather_module, "get_blob_store", lambda: store)
+    state = {
+        "input_data": {"location": "香山", "duration": "一天", "date": (START + timedelta(days=1)).isoformat()},
+        "intermediate_results": {
+            "route": RouteResult(status="done", lat=39.99, lon=116.19, min_elevation_m=100.0, max_elevation_m=600.0)
+        },
+    }
+
+    weather = weather_module.weather_node(state)["intermediate_results"]["weather"]
+
+    assert weather.status == "done"
+    assert weather.summary and "ts" not in weather.summary
+    assert len(weather.hourly) == 3
+    assert store.get_text(weather.forecast_ref).startswith("{")
+    assert [item[0] for item in weather_gear(weather)] == ["雨衣/冲锋衣"]
+
+    missing = weather_module.weather_node({"input_data": {"location": "香山"}, "intermediate_results": {}})
+    assert missing["intermediate_results"]["weather"].status == "pending"